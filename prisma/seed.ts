@@ -1,5 +1,6 @@
 import { PrismaClient } from "@prisma/client";
 import bcrypt from "bcryptjs";
+import { rebuildMonthlyRollups } from "../src/lib/monthly-rollups";
 
 const prisma = new PrismaClient();
 
@@ -292,6 +293,12 @@ async function main() {
             });
         }
 
+        // Persist invoice totals (taxRate defaults to 0)
+        await prisma.invoice.update({
+            where: { id: invoice.id },
+            data: { subtotal, totalAmount: subtotal, balanceDue: status === "PAID" ? 0 : subtotal },
+        });
+
         // Update client outstanding for pending/overdue
         if (status !== "PAID") {
             await prisma.client.update({
@@ -586,6 +593,10 @@ async function main() {
     console.log(`   Inventory synced: EGP ${Math.round(inventoryValue).toLocaleString()}`);
     console.log(`   Accounts Payable synced: EGP ${Math.round(apTotal).toLocaleString()}`);
 
+    // Seed data bypasses the API write paths, so build the reporting rollups once
+    const rollups = await rebuildMonthlyRollups(company.id);
+    console.log(`   Monthly rollups built: ${rollups.months} months`);
+
     console.log("\n✅ Fully Arabized demo data created successfully!");
 }
 
@@ -0,0 +1,53 @@
+/**
+ * Measure migration import throughput with synthetic client rows.
+ * Runs an insert pass and an update pass over the same rows, then deletes them.
+ *
+ *   npm run db:benchmark-import                     # 20000 rows, first company
+ *   npm run db:benchmark-import -- --rows=5000
+ *   npm run db:benchmark-import -- --company=<id>
+ */
+
+import { prisma } from "@/lib/prisma";
+import { importClients } from "@/lib/migration/importers";
+
+async function main() {
+    const args = process.argv.slice(2);
+    const rowCount = Number(args.find(a => a.startsWith("--rows="))?.split("=")[1] ?? 20000);
+    const companyId = args.find(a => a.startsWith("--company="))?.split("=")[1]
+        ?? (await prisma.company.findFirst({ select: { id: true } }))?.id;
+
+    if (!companyId) {
+        throw new Error("No company found; seed the database or pass --company=<id>");
+    }
+
+    const prefix = `BENCH-${Date.now()}-`;
+    const mapping = { Name: "name", Email: "email", Phone: "phone" };
+    const rows = Array.from({ length: rowCount }, (_, i) => ({
+        Name: `${prefix}${i}`,
+        Email: `bench${i}@example.com`,
+        Phone: `+20100${String(i).padStart(7, "0")}`,
+    }));
+
+    try {
+        for (const pass of ["insert", "update"]) {
+            const started = performance.now();
+            const result = await importClients(rows, mapping, companyId);
+            const seconds = (performance.now() - started) / 1000;
+
+            console.log(
+                `${pass}: ${rowCount} rows in ${seconds.toFixed(2)}s ` +
+                `(${Math.round(rowCount / seconds)} rows/sec) ` +
+                `created=${result.created} updated=${result.updated} errors=${result.errors.length}`
+            );
+        }
+    } finally {
+        await prisma.client.deleteMany({ where: { companyId, name: { startsWith: prefix } } });
+    }
+}
+
+main()
+    .catch(error => {
+        console.error(error);
+        process.exitCode = 1;
+    })
+    .finally(() => prisma.$disconnect());
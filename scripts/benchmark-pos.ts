@@ -0,0 +1,137 @@
+/**
+ * Load-test POS checkout with synthetic baskets rung up from concurrent terminals.
+ * Creates temporary stocked products, times every checkoutSale call (the server
+ * time of POST /api/pos/sales after auth), prints latency percentiles, then
+ * deletes what it created and restores the account balances and monthly
+ * rollups the sales moved. Run it against a test database: sales made by
+ * others while it runs are rolled back with the restore.
+ *
+ * Terminals of one company serialize on its JOURNAL sequence row (numbers
+ * are allocated in the checkout transaction to stay gapless), its account
+ * balances and its rollup and hourly bucket rows. Checkout writes these last,
+ * so the wait is the tail of each transaction, but latency under many
+ * terminals is bounded by it; raise --terminals to see the effect.
+ *
+ *   npm run db:benchmark-pos                              # 500 sales of 10 lines, 4 terminals
+ *   npm run db:benchmark-pos -- --sales=2000 --terminals=8 --lines=10
+ *   npm run db:benchmark-pos -- --company=<id>
+ */
+
+import { prisma } from "@/lib/prisma";
+import { applyStockMovements } from "@/lib/accounting/cost-layers";
+import { checkoutSale } from "@/lib/pos-checkout";
+
+const WARMUP_SALES = 20;
+const TARGET_P50_MS = 20;
+
+function arg(name: string, fallback: number): number {
+    return Number(process.argv.slice(2).find(a => a.startsWith(`--${name}=`))?.split("=")[1] ?? fallback);
+}
+
+function percentile(sorted: number[], p: number): number {
+    return sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * p / 100))];
+}
+
+async function main() {
+    const saleCount = arg("sales", 500);
+    const terminals = arg("terminals", 4);
+    const linesPerSale = arg("lines", 10);
+    const productCount = Math.max(linesPerSale * 20, 200);
+
+    const companyId = process.argv.slice(2).find(a => a.startsWith("--company="))?.split("=")[1]
+        ?? (await prisma.company.findFirst({ select: { id: true } }))?.id;
+    if (!companyId) {
+        throw new Error("No company found; seed the database or pass --company=<id>");
+    }
+    const cashier = await prisma.companyMembership.findFirst({ where: { companyId }, select: { userId: true } });
+    if (!cashier) {
+        throw new Error("Company has no members to ring up sales as");
+    }
+
+    const [balances, rollups] = await Promise.all([
+        prisma.account.findMany({ where: { companyId }, select: { id: true, currentBalance: true } }),
+        prisma.monthlyRollup.findMany({ where: { companyId, metric: { in: ["POS_REVENUE", "POS_COGS"] } } }),
+    ]);
+
+    const prefix = `BENCH-POS-${Date.now()}-`;
+    const products = await prisma.product.createManyAndReturn({
+        data: Array.from({ length: productCount }, (_, i) => ({
+            companyId,
+            sku: `${prefix}${i}`,
+            name: `Benchmark product ${i}`,
+            costPrice: 4 + (i % 5),
+            sellingPrice: 10 + (i % 7),
+            stockQuantity: 1000000,
+        })),
+        select: { id: true, costPrice: true },
+    });
+    // Opening receipts, so every sale issues from existing cost layers
+    await prisma.$transaction(async (tx) => {
+        const receipts = await tx.stockMovement.createManyAndReturn({
+            data: products.map(p => ({
+                companyId,
+                productId: p.id,
+                type: "PURCHASE",
+                quantity: 1000000,
+                unitCost: p.costPrice,
+                balanceAfter: 1000000,
+                referenceType: "BENCHMARK",
+            })),
+        });
+        await applyStockMovements(tx, receipts);
+    }, { timeout: productCount * 50 });
+
+    const saleIds: string[] = [];
+    const durations: number[] = [];
+    let next = 0;
+
+    const terminal = async () => {
+        while (next < saleCount) {
+            const n = next++;
+            const items = Array.from({ length: linesPerSale }, (_, line) => ({
+                productId: products[(n * linesPerSale + line * 7) % products.length].id,
+                quantity: 1 + (line % 3),
+            }));
+            const started = performance.now();
+            const sale = await checkoutSale(companyId, cashier.userId, { items, paymentMethod: "CASH" });
+            const elapsed = performance.now() - started;
+            saleIds.push(sale.id);
+            if (n >= WARMUP_SALES) durations.push(elapsed);
+        }
+    };
+
+    const started = performance.now();
+    try {
+        await Promise.all(Array.from({ length: terminals }, terminal));
+        const seconds = (performance.now() - started) / 1000;
+
+        const sorted = [...durations].sort((a, b) => a - b);
+        const p50 = percentile(sorted, 50);
+        console.log(
+            `${saleIds.length} sales of ${linesPerSale} lines from ${terminals} terminals in ${seconds.toFixed(2)}s ` +
+            `(${Math.round(saleIds.length / seconds)} sales/sec)`
+        );
+        console.log(
+            `latency ms: p50=${p50.toFixed(1)} p95=${percentile(sorted, 95).toFixed(1)} ` +
+            `p99=${percentile(sorted, 99).toFixed(1)} max=${sorted[sorted.length - 1].toFixed(1)}`
+        );
+        console.log(p50 < TARGET_P50_MS ? `p50 within the ${TARGET_P50_MS}ms target` : `p50 over the ${TARGET_P50_MS}ms target`);
+        if (p50 >= TARGET_P50_MS) process.exitCode = 1;
+    } finally {
+        await prisma.pOSSale.deleteMany({ where: { id: { in: saleIds } } });
+        await prisma.journalEntry.deleteMany({ where: { companyId, sourceType: "POS_SALE", sourceId: { in: saleIds } } });
+        await prisma.product.deleteMany({ where: { companyId, sku: { startsWith: prefix } } });
+        for (const account of balances) {
+            await prisma.account.update({ where: { id: account.id }, data: { currentBalance: account.currentBalance } });
+        }
+        await prisma.monthlyRollup.deleteMany({ where: { companyId, metric: { in: ["POS_REVENUE", "POS_COGS"] } } });
+        if (rollups.length > 0) await prisma.monthlyRollup.createMany({ data: rollups });
+    }
+}
+
+main()
+    .catch(error => {
+        console.error(error);
+        process.exitCode = 1;
+    })
+    .finally(() => prisma.$disconnect());
@@ -0,0 +1,41 @@
+/**
+ * Verify and rebuild perpetual inventory cost layers from the stock movement history.
+ *
+ *   npm run db:cost-layers                      # verify every company, rebuild drifted products
+ *   npm run db:cost-layers -- --dry-run         # report drift only
+ *   npm run db:cost-layers -- --company=<id>    # limit to one company
+ */
+
+import { prisma } from "@/lib/prisma";
+import { rebuildCostLayers } from "@/lib/accounting/cost-layers";
+
+async function main() {
+    const args = process.argv.slice(2);
+    const dryRun = args.includes("--dry-run");
+    const companyId = args.find(a => a.startsWith("--company="))?.split("=")[1];
+
+    const companies = await prisma.company.findMany({
+        where: companyId ? { id: companyId } : undefined,
+        select: { id: true, name: true },
+    });
+
+    let drifted = 0;
+    for (const company of companies) {
+        const { products, rebuilt, drift } = await rebuildCostLayers(company.id, { dryRun });
+        drifted += drift.length;
+
+        console.log(`${company.name}: ${products} products, ${drift.length} drifted values${dryRun ? "" : `, ${rebuilt} products rebuilt`}`);
+        drift.slice(0, 10).forEach(d => {
+            console.log(`  ${d.productId} ${d.field}: stored ${d.stored.toFixed(2)}, expected ${d.expected.toFixed(2)}`);
+        });
+    }
+
+    if (dryRun && drifted > 0) process.exitCode = 1;
+}
+
+main()
+    .catch(error => {
+        console.error(error);
+        process.exitCode = 1;
+    })
+    .finally(() => prisma.$disconnect());
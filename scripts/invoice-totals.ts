@@ -0,0 +1,33 @@
+/**
+ * Verify or backfill persisted invoice totals against InvoiceItem rows.
+ *
+ *   npm run db:invoice-totals                      # report drift only
+ *   npm run db:invoice-totals -- --fix             # backfill drifted invoices
+ *   npm run db:invoice-totals -- --company=<id>    # limit to one company
+ */
+
+import { prisma } from "@/lib/prisma";
+import { verifyInvoiceTotals } from "@/lib/invoice-totals";
+
+async function main() {
+    const args = process.argv.slice(2);
+    const fix = args.includes("--fix");
+    const companyId = args.find(a => a.startsWith("--company="))?.split("=")[1];
+
+    const { checked, mismatches, fixed } = await verifyInvoiceTotals({ companyId, fix });
+
+    mismatches.slice(0, 20).forEach(m => {
+        console.log(`  ${m.invoiceNumber}: stored ${m.stored.totalAmount.toFixed(2)}, expected ${m.expected.totalAmount.toFixed(2)}`);
+    });
+    if (mismatches.length > 20) console.log(`  ... and ${mismatches.length - 20} more`);
+
+    console.log(`Checked ${checked} invoices, ${mismatches.length} mismatched, ${fixed} fixed`);
+    if (mismatches.length > fixed) process.exitCode = 1;
+}
+
+main()
+    .catch(error => {
+        console.error(error);
+        process.exitCode = 1;
+    })
+    .finally(() => prisma.$disconnect());
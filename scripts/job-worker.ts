@@ -0,0 +1,38 @@
+/**
+ * Run background jobs until interrupted.
+ *
+ *   npm run jobs:worker                          # 4 jobs at a time
+ *   npm run jobs:worker -- --concurrency=8
+ *
+ * Per-company limits come from JOB_COMPANY_CONCURRENCY (default 2). Start as
+ * many workers as needed; they share the queue through the database.
+ * Import and export files live in JOB_FILES_DIR, which must be shared with
+ * the web server.
+ */
+
+import { prisma } from "@/lib/prisma";
+import { runWorker } from "@/lib/job-queue";
+import "@/lib/job-handlers";
+
+async function main() {
+    const args = process.argv.slice(2);
+    const concurrency = Number(args.find(a => a.startsWith("--concurrency="))?.split("=")[1] ?? 4);
+
+    const controller = new AbortController();
+    for (const signal of ["SIGINT", "SIGTERM"] as const) {
+        process.on(signal, () => {
+            console.log("Stopping after in-flight jobs finish...");
+            controller.abort();
+        });
+    }
+
+    console.log(`Job worker started (concurrency ${concurrency})`);
+    await runWorker({ concurrency, signal: controller.signal });
+}
+
+main()
+    .catch(error => {
+        console.error(error);
+        process.exitCode = 1;
+    })
+    .finally(() => prisma.$disconnect());
@@ -0,0 +1,41 @@
+/**
+ * Rebuild monthly rollups from the raw invoice, POS sale, expense and bill tables.
+ *
+ *   npm run db:monthly-rollups                      # rebuild every company
+ *   npm run db:monthly-rollups -- --dry-run         # report drift only
+ *   npm run db:monthly-rollups -- --company=<id>    # limit to one company
+ */
+
+import { prisma } from "@/lib/prisma";
+import { rebuildMonthlyRollups } from "@/lib/monthly-rollups";
+
+async function main() {
+    const args = process.argv.slice(2);
+    const dryRun = args.includes("--dry-run");
+    const companyId = args.find(a => a.startsWith("--company="))?.split("=")[1];
+
+    const companies = await prisma.company.findMany({
+        where: companyId ? { id: companyId } : undefined,
+        select: { id: true, name: true },
+    });
+
+    let drifted = 0;
+    for (const company of companies) {
+        const { months, drift } = await rebuildMonthlyRollups(company.id, { dryRun });
+        drifted += drift.length;
+
+        console.log(`${company.name}: ${months} months, ${drift.length} drifted rollups${dryRun ? "" : " rebuilt"}`);
+        drift.slice(0, 10).forEach(d => {
+            console.log(`  ${d.month} ${d.metric}: stored ${d.stored.toFixed(2)}, expected ${d.expected.toFixed(2)}`);
+        });
+    }
+
+    if (dryRun && drifted > 0) process.exitCode = 1;
+}
+
+main()
+    .catch(error => {
+        console.error(error);
+        process.exitCode = 1;
+    })
+    .finally(() => prisma.$disconnect());
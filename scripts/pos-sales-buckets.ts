@@ -0,0 +1,41 @@
+/**
+ * Rebuild the hourly POS sales buckets from the raw POS sale tables.
+ *
+ *   npm run db:pos-sales-buckets                      # rebuild every company
+ *   npm run db:pos-sales-buckets -- --dry-run         # report drift only
+ *   npm run db:pos-sales-buckets -- --company=<id>    # limit to one company
+ */
+
+import { prisma } from "@/lib/prisma";
+import { rebuildSalesBuckets } from "@/lib/pos-sales-buckets";
+
+async function main() {
+    const args = process.argv.slice(2);
+    const dryRun = args.includes("--dry-run");
+    const companyId = args.find(a => a.startsWith("--company="))?.split("=")[1];
+
+    const companies = await prisma.company.findMany({
+        where: companyId ? { id: companyId } : undefined,
+        select: { id: true, name: true },
+    });
+
+    let drifted = 0;
+    for (const company of companies) {
+        const { buckets, drift } = await rebuildSalesBuckets(company.id, { dryRun });
+        drifted += drift.length;
+
+        console.log(`${company.name}: ${buckets} buckets, ${drift.length} drifted${dryRun ? "" : " rebuilt"}`);
+        drift.slice(0, 10).forEach(d => {
+            console.log(`  ${d.hour.toISOString()} ${d.dimension} ${d.key || "-"}: stored ${d.stored.toFixed(2)}, expected ${d.expected.toFixed(2)}`);
+        });
+    }
+
+    if (dryRun && drifted > 0) process.exitCode = 1;
+}
+
+main()
+    .catch(error => {
+        console.error(error);
+        process.exitCode = 1;
+    })
+    .finally(() => prisma.$disconnect());
@@ -0,0 +1,35 @@
+/**
+ * Recompute product stock statuses and the low/out-of-stock counters.
+ *
+ *   npm run db:stock-levels                      # rebuild every company
+ *   npm run db:stock-levels -- --company=<id>    # limit to one company
+ */
+
+import { prisma } from "@/lib/prisma";
+import { rebuildStockLevels } from "@/lib/stock-alerts";
+
+async function main() {
+    const args = process.argv.slice(2);
+    const companyId = args.find(a => a.startsWith("--company="))?.split("=")[1];
+
+    const companies = await prisma.company.findMany({
+        where: companyId ? { id: companyId } : undefined,
+        select: { id: true, name: true },
+    });
+
+    for (const company of companies) {
+        const before = await prisma.stockLevelCounter.findUnique({ where: { companyId: company.id } });
+        const after = await rebuildStockLevels(company.id);
+        const drift = before
+            ? ` (was ${before.lowStockCount} low, ${before.outOfStockCount} out)`
+            : "";
+        console.log(`${company.name}: ${after.lowStockCount} low, ${after.outOfStockCount} out of stock${drift}`);
+    }
+}
+
+main()
+    .catch(error => {
+        console.error(error);
+        process.exitCode = 1;
+    })
+    .finally(() => prisma.$disconnect());
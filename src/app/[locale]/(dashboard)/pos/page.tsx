@@ -132,6 +132,7 @@ export default function POSPage() {
 
     const completeSale = useMutation({
         mutationFn: async (saleData: {
+            idempotencyKey: string;
             items: CartItem[];
             subtotal: number;
             taxAmount: number;
@@ -221,6 +222,8 @@ export default function POSPage() {
     const handleCheckout = (paymentMethod: string) => {
         const cashReceivedNum = parseFloat(cashReceived) || 0;
         completeSale.mutate({
+            // Lets the server drop a resubmitted sale instead of recording it twice
+            idempotencyKey: crypto.randomUUID(),
             items: cart,
             subtotal: cartSubtotal,
             taxAmount: cartTax,
@@ -280,6 +283,21 @@ export default function POSPage() {
         }
     }, [scanFeedbackEnabled]);
 
+    // Scanned code: the loaded products first, then the server's product index
+    const findScannedProduct = useCallback(async (code: string): Promise<Product | null> => {
+        const local = products.find((p) => p.barcode === code || p.sku === code);
+        if (local) return local;
+        try {
+            const res = await fetch(`/api/pos/lookup?code=${encodeURIComponent(code)}`);
+            if (!res.ok) return null;
+            const found = await res.json();
+            if (!found.isActive) return null;
+            return { ...found, lowStockAlert: 0, imageUrl: null, category: null };
+        } catch {
+            return null;
+        }
+    }, [products]);
+
     // Handle barcode scanning with visual feedback
     useEffect(() => {
         let barcode = "";
@@ -311,21 +329,22 @@ export default function POSPage() {
 
             if (e.key === "Enter" && barcode.length > 5) {
                 // Look up product by barcode
-                const product = products.find((p) => p.barcode === barcode);
-                if (product) {
-                    addToCart(product);
-                    setScanStatus("success");
-                    playBeep(true);
-                    setLastScannedBarcode(barcode);
-                } else {
-                    setScanStatus("error");
-                    playBeep(false);
-                    setLastScannedBarcode(barcode);
-                }
-                barcode = "";
+                const scanned = barcode;
+                findScannedProduct(scanned).then((product) => {
+                    if (product) {
+                        addToCart(product);
+                        setScanStatus("success");
+                        playBeep(true);
+                    } else {
+                        setScanStatus("error");
+                        playBeep(false);
+                    }
+                    setLastScannedBarcode(scanned);
 
-                // Reset status after feedback
-                setTimeout(() => setScanStatus("idle"), 2000);
+                    // Reset status after feedback
+                    setTimeout(() => setScanStatus("idle"), 2000);
+                });
+                barcode = "";
             } else if (e.key.length === 1) {
                 barcode += e.key;
             }
@@ -336,7 +355,7 @@ export default function POSPage() {
             window.removeEventListener("keypress", handleKeyPress);
             clearTimeout(scanTimeout);
         };
-    }, [products, addToCart, playBeep, scanStatus]);
+    }, [findScannedProduct, addToCart, playBeep, scanStatus]);
 
     return (
         <div className="flex flex-col h-[calc(100vh-4rem)] bg-muted/30">
@@ -839,9 +858,9 @@ export default function POSPage() {
             <CameraBarcodeScanner
                 isOpen={showCameraScanner}
                 onClose={() => setShowCameraScanner(false)}
-                onScan={(barcode) => {
+                onScan={async (barcode) => {
                     // Look up product by barcode
-                    const product = products.find((p) => p.barcode === barcode || p.sku === barcode);
+                    const product = await findScannedProduct(barcode);
                     if (product) {
                         addToCart(product);
                         setScanStatus("success");
@@ -1,28 +1,70 @@
 "use client";
 
+import { useState } from "react";
 import { motion } from "framer-motion";
 import { TrendingUp, ShoppingBag, DollarSign, Clock, CreditCard, Banknote, Smartphone } from "lucide-react";
 import { useQuery } from "@tanstack/react-query";
 import { BarChart, Bar, XAxis, YAxis, ResponsiveContainer, PieChart, Pie, Cell, Tooltip } from "recharts";
 import { formatCurrency } from "@/lib/utils";
 
+type Granularity = "hour" | "day" | "week" | "month";
+
 interface POSStats {
-    todaySales: number;
-    todayTransactions: number;
+    totalSales: number;
+    transactions: number;
     avgTransaction: number;
-    topProduct: { name: string; quantity: number; revenue: number } | null;
-    topProducts: { name: string; quantity: number; revenue: number }[];
-    paymentMethods: { method: string; amount: number }[];
-    salesByHour: { hour: string; sales: number }[];
-    lastWeekTotal: number;
+    previousTotal: number;
+    series: { start: string; sales: number; transactions: number }[];
+    topProducts: { productId: string; name: string; quantity: number; revenue: number }[];
+    paymentMethods: { method: string; amount: number; transactions: number }[];
+    terminals: { terminalId: string | null; name: string | null; sales: number; transactions: number }[];
+    cashiers: { cashierId: string; name: string | null; sales: number; transactions: number }[];
 }
 
-const fetchStats = async (): Promise<POSStats> => {
-    const res = await fetch("/api/pos/reports/stats");
+// Report ranges, ending with the current hour/day/week/month
+const RANGES: { id: string; label: string; granularity: Granularity; periods: number }[] = [
+    { id: "today", label: "Today", granularity: "hour", periods: 24 },
+    { id: "7d", label: "7 Days", granularity: "day", periods: 7 },
+    { id: "30d", label: "30 Days", granularity: "day", periods: 30 },
+    { id: "12w", label: "12 Weeks", granularity: "week", periods: 12 },
+    { id: "12m", label: "12 Months", granularity: "month", periods: 12 },
+];
+
+const rangeBounds = (range: (typeof RANGES)[number]) => {
+    const now = new Date();
+    const to = new Date(now.getFullYear(), now.getMonth(), now.getDate() + 1);
+    switch (range.granularity) {
+        case "hour":
+            return { from: new Date(now.getFullYear(), now.getMonth(), now.getDate()), to };
+        case "day":
+            return { from: new Date(now.getFullYear(), now.getMonth(), now.getDate() + 1 - range.periods), to };
+        case "week":
+            return { from: new Date(now.getFullYear(), now.getMonth(), now.getDate() + 1 - range.periods * 7), to };
+        case "month":
+            return { from: new Date(now.getFullYear(), now.getMonth() + 1 - range.periods, 1), to: new Date(now.getFullYear(), now.getMonth() + 1, 1) };
+    }
+};
+
+const fetchStats = async (range: (typeof RANGES)[number]): Promise<POSStats> => {
+    const { from, to } = rangeBounds(range);
+    const params = new URLSearchParams({ from: from.toISOString(), to: to.toISOString(), granularity: range.granularity });
+    const res = await fetch(`/api/pos/reports/stats?${params}`);
     if (!res.ok) throw new Error("Failed to fetch");
     return res.json();
 };
 
+const periodLabel = (start: string, granularity: Granularity) => {
+    const date = new Date(start);
+    switch (granularity) {
+        case "hour":
+            return `${date.getHours()}:00`;
+        case "month":
+            return date.toLocaleDateString(undefined, { month: "short", year: "2-digit" });
+        default:
+            return date.toLocaleDateString(undefined, { month: "short", day: "numeric" });
+    }
+};
+
 const PAYMENT_COLORS: Record<string, string> = {
     CASH: "#22c55e",
     CARD: "#3b82f6",
@@ -32,21 +74,42 @@ const PAYMENT_COLORS: Record<string, string> = {
 };
 
 export default function POSReportsPage() {
+    const [rangeId, setRangeId] = useState(RANGES[0].id);
+    const range = RANGES.find(r => r.id === rangeId) || RANGES[0];
+
     const { data: stats, isLoading } = useQuery({
-        queryKey: ["pos-stats"],
-        queryFn: fetchStats,
+        queryKey: ["pos-stats", range.id],
+        queryFn: () => fetchStats(range),
     });
 
-    const growthPercent = stats?.lastWeekTotal
-        ? ((stats.todaySales - stats.lastWeekTotal / 7) / (stats.lastWeekTotal / 7)) * 100
+    const growthPercent = stats?.previousTotal
+        ? ((stats.totalSales - stats.previousTotal) / stats.previousTotal) * 100
         : 0;
+    const topProduct = stats?.topProducts[0];
+    const series = (stats?.series || [])
+        .map(point => ({ ...point, label: periodLabel(point.start, range.granularity) }))
+        // Trading hours only for a single day
+        .filter(point => range.granularity !== "hour" || (new Date(point.start).getHours() >= 8 && new Date(point.start).getHours() <= 22));
 
     return (
         <div className="space-y-6">
             {/* Header */}
-            <div>
-                <h1 className="text-2xl font-semibold tracking-tight">POS Analytics</h1>
-                <p className="text-muted-foreground">Real-time sales performance and insights.</p>
+            <div className="flex items-center justify-between">
+                <div>
+                    <h1 className="text-2xl font-semibold tracking-tight">POS Analytics</h1>
+                    <p className="text-muted-foreground">Real-time sales performance and insights.</p>
+                </div>
+                <div className="flex gap-1 rounded-lg bg-muted p-1">
+                    {RANGES.map(r => (
+                        <button
+                            key={r.id}
+                            onClick={() => setRangeId(r.id)}
+                            className={`h-8 px-3 rounded-md text-sm font-medium ${r.id === range.id ? "bg-background shadow-sm" : "text-muted-foreground hover:text-foreground"}`}
+                        >
+                            {r.label}
+                        </button>
+                    ))}
+                </div>
             </div>
 
             {/* KPI Cards */}
@@ -60,16 +123,16 @@ export default function POSReportsPage() {
                         <div className="h-10 w-10 rounded-lg bg-green-100 flex items-center justify-center">
                             <DollarSign className="h-5 w-5 text-green-600" />
                         </div>
-                        <span className="text-sm text-muted-foreground">Today&apos;s Sales</span>
+                        <span className="text-sm text-muted-foreground">{range.id === "today" ? "Today\u2019s Sales" : "Sales"}</span>
                     </div>
                     {isLoading ? (
                         <div className="h-8 w-24 skeleton rounded" />
                     ) : (
                         <>
-                            <p className="text-3xl font-bold">{formatCurrency(stats?.todaySales || 0)}</p>
+                            <p className="text-3xl font-bold">{formatCurrency(stats?.totalSales || 0)}</p>
                             {growthPercent !== 0 && (
                                 <p className={`text-sm mt-1 ${growthPercent > 0 ? "text-green-600" : "text-red-600"}`}>
-                                    {growthPercent > 0 ? "↑" : "↓"} {Math.abs(growthPercent).toFixed(1)}% vs daily avg
+                                    {growthPercent > 0 ? "↑" : "↓"} {Math.abs(growthPercent).toFixed(1)}% vs previous period
                                 </p>
                             )}
                         </>
@@ -91,7 +154,7 @@ export default function POSReportsPage() {
                     {isLoading ? (
                         <div className="h-8 w-16 skeleton rounded" />
                     ) : (
-                        <p className="text-3xl font-bold">{stats?.todayTransactions || 0}</p>
+                        <p className="text-3xl font-bold">{stats?.transactions || 0}</p>
                     )}
                 </motion.div>
 
@@ -129,7 +192,7 @@ export default function POSReportsPage() {
                     {isLoading ? (
                         <div className="h-8 w-24 skeleton rounded" />
                     ) : (
-                        <p className="text-xl font-bold truncate">{stats?.topProduct?.name || "—"}</p>
+                        <p className="text-xl font-bold truncate">{topProduct?.name || "—"}</p>
                     )}
                 </motion.div>
             </div>
@@ -138,13 +201,13 @@ export default function POSReportsPage() {
             <div className="grid gap-6 lg:grid-cols-2">
                 {/* Sales by Hour */}
                 <div className="rounded-xl border border-border bg-card p-6">
-                    <h3 className="font-semibold mb-4">Sales by Hour</h3>
+                    <h3 className="font-semibold mb-4">Sales by {range.granularity[0].toUpperCase() + range.granularity.slice(1)}</h3>
                     {isLoading ? (
                         <div className="h-64 skeleton rounded" />
                     ) : (
                         <ResponsiveContainer width="100%" height={250}>
-                            <BarChart data={stats?.salesByHour?.filter(h => parseInt(h.hour) >= 8 && parseInt(h.hour) <= 22)}>
-                                <XAxis dataKey="hour" tickLine={false} axisLine={false} fontSize={12} />
+                            <BarChart data={series}>
+                                <XAxis dataKey="label" tickLine={false} axisLine={false} fontSize={12} />
                                 <YAxis tickLine={false} axisLine={false} fontSize={12} tickFormatter={(v) => `$${v}`} />
                                 <Tooltip formatter={(value: number) => formatCurrency(value)} />
                                 <Bar dataKey="sales" fill="hsl(var(--primary))" radius={[4, 4, 0, 0]} />
@@ -195,7 +258,7 @@ export default function POSReportsPage() {
                         </div>
                     ) : (
                         <div className="h-64 flex items-center justify-center text-muted-foreground">
-                            No sales data today
+                            No sales in this period
                         </div>
                     )}
                 </div>
@@ -214,7 +277,7 @@ export default function POSReportsPage() {
                     <div className="space-y-3">
                         {stats.topProducts.map((product, index) => (
                             <motion.div
-                                key={product.name}
+                                key={product.productId}
                                 initial={{ opacity: 0, x: -20 }}
                                 animate={{ opacity: 1, x: 0 }}
                                 transition={{ delay: index * 0.1 }}
@@ -234,9 +297,38 @@ export default function POSReportsPage() {
                         ))}
                     </div>
                 ) : (
-                    <p className="text-center py-8 text-muted-foreground">No sales data today</p>
+                    <p className="text-center py-8 text-muted-foreground">No sales in this period</p>
                 )}
             </div>
+
+            {/* Terminals and Cashiers */}
+            <div className="grid gap-6 lg:grid-cols-2">
+                {[
+                    { title: "Sales by Terminal", rows: (stats?.terminals || []).map(t => ({ id: t.terminalId || "none", name: t.name || "No terminal", sales: t.sales, transactions: t.transactions })) },
+                    { title: "Sales by Cashier", rows: (stats?.cashiers || []).map(c => ({ id: c.cashierId, name: c.name || "Unknown", sales: c.sales, transactions: c.transactions })) },
+                ].map(section => (
+                    <div key={section.title} className="rounded-xl border border-border bg-card p-6">
+                        <h3 className="font-semibold mb-4">{section.title}</h3>
+                        {isLoading ? (
+                            <div className="h-32 skeleton rounded" />
+                        ) : section.rows.length > 0 ? (
+                            <div className="space-y-2">
+                                {section.rows.map(row => (
+                                    <div key={row.id} className="flex items-center justify-between p-3 rounded-lg bg-muted/50">
+                                        <div>
+                                            <p className="font-medium">{row.name}</p>
+                                            <p className="text-sm text-muted-foreground">{row.transactions} transactions</p>
+                                        </div>
+                                        <p className="font-bold">{formatCurrency(row.sales)}</p>
+                                    </div>
+                                ))}
+                            </div>
+                        ) : (
+                            <p className="text-center py-8 text-muted-foreground">No sales in this period</p>
+                        )}
+                    </div>
+                ))}
+            </div>
         </div>
     );
 }
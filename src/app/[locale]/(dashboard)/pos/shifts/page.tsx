@@ -24,6 +24,18 @@ const fetchCurrentShift = async (): Promise<CashierShift | null> => {
     return res.json();
 };
 
+interface ShiftSummary {
+    salesCount: number;
+    totalSales: number;
+    expectedCash: number;
+}
+
+const fetchShiftSummary = async (id: string): Promise<ShiftSummary> => {
+    const res = await fetch(`/api/pos/shifts/${id}/summary`);
+    if (!res.ok) throw new Error("Failed to fetch");
+    return res.json();
+};
+
 const fetchShifts = async (): Promise<CashierShift[]> => {
     const res = await fetch("/api/pos/shifts");
     if (!res.ok) throw new Error("Failed to fetch");
@@ -41,6 +53,14 @@ export default function ShiftsPage() {
         queryFn: fetchCurrentShift,
     });
 
+    // Live X-report figures for the open shift
+    const { data: summary } = useQuery({
+        queryKey: ["shift-summary", currentShift?.id],
+        queryFn: () => fetchShiftSummary(currentShift!.id),
+        enabled: !!currentShift,
+        refetchInterval: 30000,
+    });
+
     const { data: shifts = [], isLoading: loadingShifts } = useQuery({
         queryKey: ["shifts"],
         queryFn: fetchShifts,
@@ -128,11 +148,20 @@ export default function ShiftsPage() {
                             </button>
                         </div>
 
-                        <div className="grid gap-4 md:grid-cols-3">
+                        <div className="grid gap-4 md:grid-cols-4">
                             <div className="rounded-lg bg-muted/50 p-4">
                                 <p className="text-sm text-muted-foreground">Opening Cash</p>
                                 <p className="text-2xl font-bold">{formatCurrency(currentShift.openingCash)}</p>
                             </div>
+                            <div className="rounded-lg bg-muted/50 p-4">
+                                <p className="text-sm text-muted-foreground">Sales So Far</p>
+                                <p className="text-2xl font-bold">{summary ? formatCurrency(summary.totalSales) : "-"}</p>
+                                {summary && (
+                                    <p className="text-xs text-muted-foreground">
+                                        {summary.salesCount} sales · {formatCurrency(summary.expectedCash)} expected in drawer
+                                    </p>
+                                )}
+                            </div>
                             <div className="rounded-lg bg-green-50 p-4">
                                 <p className="text-sm text-green-700">Cashier</p>
                                 <p className="text-2xl font-bold text-green-700">{currentShift.cashier.name}</p>
@@ -36,6 +36,9 @@ interface PrepaidExpense {
     lastRecognizedAt: string | null;
 }
 
+// How long the page waits for the recognition job before reporting it
+const JOB_POLL_TIMEOUT_MS = 2 * 60 * 1000;
+
 const fetchPrepaidExpenses = async () => {
     const res = await fetch("/api/prepaid-expenses");
     if (!res.ok) throw new Error("Failed to fetch");
@@ -60,7 +63,24 @@ export default function PrepaidExpensesPage() {
                 method: "POST",
             });
             if (!res.ok) throw new Error("Failed to process recognition");
-            return res.json();
+            const { statusUrl } = await res.json();
+
+            // Recognition runs as a background job; wait for it before refreshing,
+            // but give up once the deadline passes (e.g. no worker is running)
+            const deadline = Date.now() + JOB_POLL_TIMEOUT_MS;
+            let status = "QUEUED";
+            while (Date.now() < deadline) {
+                await new Promise(resolve => setTimeout(resolve, 1500));
+                const jobRes = await fetch(statusUrl);
+                if (!jobRes.ok) throw new Error("Failed to check recognition status");
+                const job = await jobRes.json();
+                status = job.status;
+                if (status === "SUCCEEDED") return job.result;
+                if (status === "FAILED") throw new Error(job.error || "Failed to process recognition");
+            }
+            throw new Error(status === "QUEUED"
+                ? "Recognition is still queued. Check that the job worker is running."
+                : "Recognition is still running. Refresh the page later to see the results.");
         },
         onSuccess: () => {
             queryClient.invalidateQueries({ queryKey: ["prepaid-expenses"] });
@@ -113,6 +133,13 @@ export default function PrepaidExpensesPage() {
                 </div>
             </div>
 
+            {processMutation.isError && (
+                <div className="flex items-center gap-2 rounded-lg bg-red-50 dark:bg-red-900/20 p-3 text-sm text-red-600">
+                    <AlertCircle className="h-4 w-4 shrink-0" />
+                    {processMutation.error.message}
+                </div>
+            )}
+
             {/* Summary Cards */}
             <div className="grid gap-4 md:grid-cols-4">
                 <div className="rounded-xl border border-border bg-card p-4">
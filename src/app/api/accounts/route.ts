@@ -3,6 +3,7 @@ import { prisma } from "@/lib/prisma";
 import { seedDefaultChartOfAccounts } from "@/lib/gl/auto-post";
 import { requireCompanyId } from "@/lib/api-auth";
 import { permissions } from "@/lib/rbac";
+import { invalidateCompanyCache } from "@/lib/response-cache";
 
 // Get all accounts
 export async function GET(request: NextRequest) {
@@ -67,6 +68,7 @@ export async function POST(request: NextRequest) {
         // Seed defaults if requested
         if (seedDefaults) {
             const count = await seedDefaultChartOfAccounts(companyId);
+            await invalidateCompanyCache(companyId);
             return NextResponse.json({ success: true, message: `Seeded ${count} default accounts` });
         }
 
@@ -83,6 +85,7 @@ export async function POST(request: NextRequest) {
                 normalBalance,
             },
         });
+        await invalidateCompanyCache(companyId);
 
         return NextResponse.json(account);
     } catch (error: any) {
@@ -122,6 +125,7 @@ export async function PUT(request: NextRequest) {
             where: { id },
             data,
         });
+        await invalidateCompanyCache(companyId);
 
         return NextResponse.json(account);
     } catch (error) {
@@ -165,6 +169,7 @@ export async function DELETE(request: NextRequest) {
         }
 
         await prisma.account.delete({ where: { id } });
+        await invalidateCompanyCache(companyId);
         return NextResponse.json({ success: true });
     } catch (error) {
         console.error("Error deleting account:", error);
@@ -3,10 +3,7 @@ import bcrypt from "bcryptjs";
 import { SignJWT } from "jose";
 import { prisma } from "@/lib/prisma";
 import { apiResponse, apiError } from "@/lib/api-response";
-
-const JWT_SECRET = new TextEncoder().encode(
-    process.env.AUTH_SECRET || "fallback-secret-for-dev-only"
-);
+import { JWT_SECRET } from "@/lib/api-auth";
 
 export async function POST(request: NextRequest) {
     try {
@@ -2,6 +2,12 @@ import { NextResponse } from "next/server";
 import { prisma } from "@/lib/prisma";
 import { requireCompanyId } from "@/lib/api-auth";
 import { permissions } from "@/lib/rbac";
+import { applyRollupChange, billRollup } from "@/lib/monthly-rollups";
+import { invalidateCompanyCache } from "@/lib/response-cache";
+import { applyStockMovement } from "@/lib/accounting/cost-layers";
+import { evaluateStockLevels } from "@/lib/stock-alerts";
+import { markProductsChanged } from "@/lib/product-index";
+import { parsePageParams, pageWhere, pageOrder, takePage, projectFields, pageHeaders } from "@/lib/pagination";
 
 // GET /api/bills - Fetch all bills
 export async function GET(request: Request) {
@@ -20,18 +26,25 @@ export async function GET(request: Request) {
         const status = searchParams.get("status");
         const supplierId = searchParams.get("supplierId");
 
-        const bills = await prisma.bill.findMany({
-            where: {
-                companyId,
-                status: status || undefined,
-                supplierId: supplierId || undefined,
-            },
+        const page = parsePageParams(searchParams);
+        if ("error" in page) {
+            return NextResponse.json({ error: page.error }, { status: 400 });
+        }
+
+        const where = {
+            companyId,
+            status: status || undefined,
+            supplierId: supplierId || undefined,
+        };
+        const rows = await prisma.bill.findMany({
+            where: pageWhere(page, where),
             include: {
                 supplier: { select: { id: true, name: true } },
                 items: true,
             },
-            orderBy: { dueDate: "asc" },
+            ...pageOrder(page, { dueDate: "asc" as const }),
         });
+        const { items: bills, nextCursor } = takePage(rows, page);
 
         const formatted = bills.map((bill) => {
             const subtotal = bill.items.reduce((sum, item) => sum + item.quantity * item.unitPrice, 0);
@@ -45,7 +58,9 @@ export async function GET(request: Request) {
             };
         });
 
-        return NextResponse.json(formatted);
+        return NextResponse.json(projectFields(formatted, page.fields), {
+            headers: await pageHeaders(page, nextCursor, () => prisma.bill.count({ where })),
+        });
     } catch (error) {
         console.error("Bills API error:", error);
         return NextResponse.json({ error: "Failed to fetch bills" }, { status: 500 });
@@ -104,18 +119,39 @@ export async function POST(request: Request) {
             // 2. Update Stock Levels (Fulfill Item Cards)
             for (const item of body.items) {
                 if (item.productId) {
-                    await tx.product.update({
+                    const product = await tx.product.update({
                         where: { id: item.productId },
                         data: {
                             stockQuantity: { increment: item.quantity },
                             costPrice: item.unitPrice, // Update last cost price
                         },
                     });
+
+                    // Receipt at the bill price opens a cost layer
+                    const movement = await tx.stockMovement.create({
+                        data: {
+                            companyId,
+                            productId: item.productId,
+                            type: "PURCHASE",
+                            quantity: item.quantity,
+                            unitCost: item.unitPrice,
+                            balanceBefore: product.stockQuantity - item.quantity,
+                            balanceAfter: product.stockQuantity,
+                            reference: bill.billNumber,
+                            referenceType: "BILL",
+                        },
+                    });
+                    await applyStockMovement(tx, movement);
                 }
             }
+            await evaluateStockLevels(companyId, body.items.map((item: { productId?: string }) => item.productId).filter(Boolean), tx);
+
+            await applyRollupChange(companyId, [], billRollup(bill), tx);
 
             return bill;
         });
+        await invalidateCompanyCache(companyId);
+        markProductsChanged(companyId);
 
         return NextResponse.json(result, { status: 201 });
     } catch (error) {
@@ -3,9 +3,10 @@ import { prisma } from "@/lib/prisma";
 import { requireCompanyId } from "@/lib/api-auth";
 import { permissions, canAccessModule } from "@/lib/rbac";
 import { apiResponse, apiError, unauthorizedError, forbiddenError } from "@/lib/api-response";
+import { parsePageParams, pageWhere, pageOrder, takePage, projectFields, pageHeaders } from "@/lib/pagination";
 
-// GET /api/clients - Fetch all clients
-export async function GET() {
+// GET /api/clients - Fetch clients (keyset paged when limit/cursor given)
+export async function GET(request: NextRequest) {
     try {
         const auth = await requireCompanyId();
         if ("error" in auth) {
@@ -17,38 +18,48 @@ export async function GET() {
             return forbiddenError("Access to clients is restricted");
         }
 
-        const clients = await prisma.client.findMany({
-            where: { companyId },
-            include: {
-                invoices: {
-                    include: { items: true },
-                },
-            },
-            orderBy: { name: "asc" },
-        });
+        const page = parsePageParams(request.nextUrl.searchParams);
+        if ("error" in page) {
+            return apiError(page.error, "INVALID_CURSOR", 400);
+        }
 
-        const formatted = clients.map((client) => {
-            const totalRevenue = client.invoices
-                .filter((inv) => inv.status === "PAID")
-                .reduce((sum, inv) => {
-                    const invoiceTotal = inv.items.reduce(
-                        (s, item) => s + item.quantity * item.unitPrice,
-                        0
-                    ) * (1 + inv.taxRate);
-                    return sum + invoiceTotal;
-                }, 0);
+        const where = { companyId };
+        const rows = await prisma.client.findMany({
+            where: pageWhere(page, where),
+            select: { id: true, name: true, email: true, phone: true, createdAt: true },
+            ...pageOrder(page, { name: "asc" as const }),
+        });
+        const { items: clients, nextCursor } = takePage(rows, page);
 
-            return {
-                id: client.id,
-                name: client.name,
-                email: client.email,
-                phone: client.phone,
-                invoiceCount: client.invoices.length,
-                totalRevenue: Math.round(totalRevenue),
-            };
+        // Invoice counts and paid revenue for this page only, from persisted totals
+        const stats = clients.length === 0 ? [] : await prisma.invoice.groupBy({
+            by: ["clientId", "status"],
+            where: { companyId, clientId: { in: clients.map(c => c.id) } },
+            _count: { _all: true },
+            _sum: { totalAmount: true },
+        });
+        const byClient = new Map<string, { invoiceCount: number; totalRevenue: number }>();
+        stats.forEach(row => {
+            const current = byClient.get(row.clientId) || { invoiceCount: 0, totalRevenue: 0 };
+            current.invoiceCount += row._count._all;
+            if (row.status === "PAID") current.totalRevenue += row._sum.totalAmount || 0;
+            byClient.set(row.clientId, current);
         });
 
-        return apiResponse(formatted);
+        const formatted = clients.map((client) => ({
+            id: client.id,
+            name: client.name,
+            email: client.email,
+            phone: client.phone,
+            invoiceCount: byClient.get(client.id)?.invoiceCount || 0,
+            totalRevenue: Math.round(byClient.get(client.id)?.totalRevenue || 0),
+        }));
+
+        return apiResponse(
+            projectFields(formatted, page.fields),
+            200,
+            await pageHeaders(page, nextCursor, () => prisma.client.count({ where }))
+        );
     } catch (error) {
         console.error("Clients API error:", error);
         return apiError("Failed to fetch clients", "CLIENTS_FETCH_ERROR", 500, error);
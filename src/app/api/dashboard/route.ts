@@ -1,12 +1,16 @@
 import { NextRequest } from "next/server";
 import { getCompanyId, requireCompanyId } from "@/lib/api-auth";
-import { apiResponse, apiError, unauthorizedError } from "@/lib/api-response";
+import { apiResponse, apiError, unauthorizedError, serverTiming } from "@/lib/api-response";
 import {
-    getFinancialSummary,
+    loadFinancialSnapshot,
+    summarizeSnapshot,
     getMonthlyData,
     getARAgingBuckets,
+    timed,
+    QueryTiming,
 } from "@/lib/financial-core";
 import { prisma } from "@/lib/prisma";
+import { withCompanyCache } from "@/lib/response-cache";
 
 // Helper to get date range from period
 function getDateRange(period: string): { startDate: Date; endDate: Date } {
@@ -49,84 +53,98 @@ export async function GET(request: NextRequest) {
         }
         const { companyId } = auth;
 
-        const { startDate, endDate } = getDateRange(period);
-
-        // Get comprehensive financial summary with date filtering
-        const summary = await getFinancialSummary(companyId, startDate, endDate);
-
-        // Get monthly data for charts (last 6 months)
-        const monthlyData = await getMonthlyData(companyId, 6);
-
-        // Get AR aging for pending invoices display (always current, not filtered)
-        const arAging = await getARAgingBuckets(companyId);
-        const totalPending = arAging.reduce((sum, b) => sum + b.amount, 0);
-
-        // Get recent invoices (most recent, not date filtered)
-        const recentInvoices = await prisma.invoice.findMany({
-            where: { companyId },
-            include: { client: true, items: true },
-            orderBy: { createdAt: "desc" },
-            take: 5,
-        });
-
-        const formattedRecentInvoices = recentInvoices.map((inv) => {
-            const subtotal = inv.items.reduce((s, item) => s + item.quantity * item.unitPrice, 0);
-            const total = subtotal * (1 + (inv.taxRate || 0));
-            return {
+        // Cached per company and query; writes to the underlying records bump the company version
+        const timings: QueryTiming[] = [];
+        const { value, hit } = await withCompanyCache(companyId, "dashboard", searchParams, async () => {
+            const { startDate, endDate } = getDateRange(period);
+
+            // Independent blocks load concurrently; the summary reads one shared snapshot
+            const [snapshot, monthlyData, arAging, recentInvoices, invoices] = await Promise.all([
+                // Comprehensive financial summary with date filtering
+                loadFinancialSnapshot(companyId, startDate, endDate),
+                // Monthly data for charts (last 6 months)
+                timed(timings, "monthly", () => getMonthlyData(companyId, 6)),
+                // AR aging for pending invoices display (always current, not filtered)
+                timed(timings, "ar_aging", () => getARAgingBuckets(companyId)),
+                // Recent invoices (most recent, not date filtered)
+                timed(timings, "recent_invoices", () => prisma.invoice.findMany({
+                    where: { companyId },
+                    select: {
+                        id: true,
+                        invoiceNumber: true,
+                        status: true,
+                        totalAmount: true,
+                        client: { select: { name: true } },
+                    },
+                    orderBy: { createdAt: "desc" },
+                    take: 5,
+                })),
+                // Invoice counts for AR summary (within date range)
+                timed(timings, "invoice_counts", () => prisma.invoice.findMany({
+                    where: { companyId, issueDate: { gte: startDate, lte: endDate } },
+                    select: { status: true },
+                })),
+            ]);
+            timings.push(...snapshot.timings);
+
+            const summary = summarizeSnapshot(snapshot);
+            const totalPending = arAging.reduce((sum, b) => sum + b.amount, 0);
+
+            const formattedRecentInvoices = recentInvoices.map((inv) => ({
                 id: inv.id,
                 number: inv.invoiceNumber,
                 client: inv.client.name,
-                amount: Math.round(total),
+                amount: Math.round(inv.totalAmount),
                 status: inv.status,
+            }));
+
+            // Format monthly revenue for chart
+            const monthlyRevenue = monthlyData.map(m => ({
+                name: m.month,
+                value: m.revenue,
+                expenses: m.expenses,
+            }));
+
+            const paidCount = invoices.filter(i => i.status === "PAID").length;
+            const pendingCount = invoices.filter(i => i.status === "PENDING" || i.status === "SENT").length;
+            const overdueCount = invoices.filter(i => i.status === "OVERDUE").length;
+
+            return {
+                // Period info
+                period,
+                startDate: startDate.toISOString(),
+                endDate: endDate.toISOString(),
+
+                // Main KPIs from centralized calculations (date filtered)
+                revenue: summary.revenue,
+                expenses: summary.operatingExpenses,
+                cogs: summary.cogs,
+                grossProfit: summary.grossProfit,
+                profit: summary.netProfit,
+                pending: totalPending,
+                cash: summary.cashBalance,
+
+                // AR/AP
+                accountsReceivable: summary.accountsReceivable,
+                accountsPayable: summary.accountsPayable,
+
+                // Monthly chart data
+                monthlyRevenue,
+
+                // Recent invoices
+                recentInvoices: formattedRecentInvoices,
+
+                // Invoice counts (for selected period)
+                invoiceCount: invoices.length,
+                paidInvoiceCount: paidCount,
+                pendingInvoiceCount: pendingCount,
+                overdueInvoiceCount: overdueCount,
             };
         });
 
-        // Format monthly revenue for chart
-        const monthlyRevenue = monthlyData.map(m => ({
-            name: m.month,
-            value: m.revenue,
-            expenses: m.expenses,
-        }));
-
-        // Get invoice counts for AR summary (within date range)
-        const invoices = await prisma.invoice.findMany({
-            where: { companyId, issueDate: { gte: startDate, lte: endDate } },
-            select: { status: true },
-        });
-        const paidCount = invoices.filter(i => i.status === "PAID").length;
-        const pendingCount = invoices.filter(i => i.status === "PENDING" || i.status === "SENT").length;
-        const overdueCount = invoices.filter(i => i.status === "OVERDUE").length;
-
-        return apiResponse({
-            // Period info
-            period,
-            startDate: startDate.toISOString(),
-            endDate: endDate.toISOString(),
-
-            // Main KPIs from centralized calculations (date filtered)
-            revenue: summary.revenue,
-            expenses: summary.operatingExpenses,
-            cogs: summary.cogs,
-            grossProfit: summary.grossProfit,
-            profit: summary.netProfit,
-            pending: totalPending,
-            cash: summary.cashBalance,
-
-            // AR/AP
-            accountsReceivable: summary.accountsReceivable,
-            accountsPayable: summary.accountsPayable,
-
-            // Monthly chart data
-            monthlyRevenue,
-
-            // Recent invoices
-            recentInvoices: formattedRecentInvoices,
-
-            // Invoice counts (for selected period)
-            invoiceCount: invoices.length,
-            paidInvoiceCount: paidCount,
-            pendingInvoiceCount: pendingCount,
-            overdueInvoiceCount: overdueCount,
+        return apiResponse(value, 200, {
+            "Server-Timing": serverTiming(timings),
+            "X-Cache": hit ? "HIT" : "MISS",
         });
     } catch (error) {
         console.error("Dashboard API error:", error);
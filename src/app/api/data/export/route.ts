@@ -1,14 +1,36 @@
 import { NextRequest, NextResponse } from "next/server";
 import { prisma } from "@/lib/prisma";
+import { createExportStream, EXPORT_ENTITIES } from "@/lib/export-stream";
+import { requireCompanyId } from "@/lib/api-auth";
+import { enqueueJob, jobAccepted } from "@/lib/job-queue";
 
 // Data Export API - Export company data as JSON or prepare for Excel
 export async function GET(request: NextRequest) {
     try {
+        const auth = await requireCompanyId();
+        if ("error" in auth) {
+            return NextResponse.json({ error: auth.error }, { status: auth.status });
+        }
+        const { companyId } = auth;
+
         const { searchParams } = new URL(request.url);
-        const companyId = searchParams.get("companyId") || "demo-company";
         const format = searchParams.get("format") || "json";
         const dataType = searchParams.get("type") || "all";
 
+        // Background export to a file; poll /api/jobs/[id], then fetch /api/jobs/[id]/download
+        if (searchParams.get("async") === "true") {
+            const jobFormat = format === "csv" ? "csv" : "ndjson";
+            if (dataType !== "all" && !(dataType in EXPORT_ENTITIES)) {
+                return NextResponse.json({ error: `Unknown export type: ${dataType}` }, { status: 400 });
+            }
+            if (jobFormat === "csv" && dataType === "all") {
+                return NextResponse.json({ error: "CSV export requires a single type" }, { status: 400 });
+            }
+
+            const job = await enqueueJob(companyId, "data.export", { format: jobFormat, type: dataType });
+            return NextResponse.json(jobAccepted(job), { status: 202 });
+        }
+
         // Get company data
         const company = await prisma.company.findUnique({
             where: { id: companyId },
@@ -18,6 +40,32 @@ export async function GET(request: NextRequest) {
             return NextResponse.json({ error: "Company not found" }, { status: 404 });
         }
 
+        // Streaming formats page through each entity instead of loading it whole
+        if (format === "ndjson" || format === "csv") {
+            const entities = dataType === "all" ? Object.keys(EXPORT_ENTITIES) : [dataType];
+            if (!entities.every(name => name in EXPORT_ENTITIES)) {
+                return NextResponse.json({ error: `Unknown export type: ${dataType}` }, { status: 400 });
+            }
+            if (format === "csv" && entities.length !== 1) {
+                return NextResponse.json({ error: "CSV export requires a single type" }, { status: 400 });
+            }
+
+            const stream = createExportStream({
+                companyId,
+                entities,
+                format,
+                meta: { company: { name: company.name, taxId: company.taxId, currency: company.currency } },
+            });
+            const fileName = `brownledger-${dataType}-${new Date().toISOString().split("T")[0]}.${format}`;
+            return new Response(stream, {
+                headers: {
+                    "Content-Type": format === "csv" ? "text/csv; charset=utf-8" : "application/x-ndjson",
+                    "Content-Disposition": `attachment; filename="${fileName}"`,
+                    "Cache-Control": "no-store",
+                },
+            });
+        }
+
         let exportData: any = {
             exportDate: new Date().toISOString(),
             company: {
@@ -52,8 +100,8 @@ export async function GET(request: NextRequest) {
                     phone: true,
                     address: true,
                     taxId: true,
-                    creditLimit: true,
-                    currentBalance: true,
+                    paymentTerms: true,
+                    totalOutstanding: true,
                 },
             });
         }
@@ -68,7 +116,7 @@ export async function GET(request: NextRequest) {
                     address: true,
                     taxId: true,
                     paymentTerms: true,
-                    currentBalance: true,
+                    isActive: true,
                 },
             });
         }
@@ -102,7 +150,7 @@ export async function GET(request: NextRequest) {
                     costPrice: true,
                     sellingPrice: true,
                     stockQuantity: true,
-                    reorderLevel: true,
+                    lowStockAlert: true,
                     isActive: true,
                 },
             });
@@ -155,8 +203,14 @@ export async function GET(request: NextRequest) {
 // Data Import API (restore from backup)
 export async function POST(request: NextRequest) {
     try {
+        const auth = await requireCompanyId();
+        if ("error" in auth) {
+            return NextResponse.json({ error: auth.error }, { status: auth.status });
+        }
+        const { companyId } = auth;
+
         const body = await request.json();
-        const { data, companyId = "demo-company" } = body;
+        const { data } = body;
 
         if (!data) {
             return NextResponse.json({ error: "No data provided" }, { status: 400 });
@@ -2,6 +2,8 @@ import { NextResponse } from "next/server";
 import { prisma } from "@/lib/prisma";
 import { requireCompanyId } from "@/lib/api-auth";
 import { permissions } from "@/lib/rbac";
+import { applyRollupChange, expenseRollup } from "@/lib/monthly-rollups";
+import { invalidateCompanyCache } from "@/lib/response-cache";
 
 // GET /api/expenses - Fetch all expenses
 export async function GET() {
@@ -53,17 +55,23 @@ export async function POST(request: Request) {
 
         const body = await request.json();
 
-        const expense = await prisma.expense.create({
-            data: {
-                companyId,
-                categoryId: body.categoryId || null,
-                date: new Date(body.date),
-                amount: body.amount,
-                vendor: body.vendor,
-                description: body.description,
-                notes: body.notes,
-            },
+        // The expense and its rollup change commit together
+        const expense = await prisma.$transaction(async (tx) => {
+            const created = await tx.expense.create({
+                data: {
+                    companyId,
+                    categoryId: body.categoryId || null,
+                    date: new Date(body.date),
+                    amount: body.amount,
+                    vendor: body.vendor,
+                    description: body.description,
+                    notes: body.notes,
+                },
+            });
+            await applyRollupChange(companyId, [], expenseRollup(created), tx);
+            return created;
         });
+        await invalidateCompanyCache(companyId);
 
         return NextResponse.json(expense, { status: 201 });
     } catch (error) {
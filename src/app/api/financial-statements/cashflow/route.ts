@@ -1,6 +1,7 @@
 import { NextRequest, NextResponse } from "next/server";
 import { prisma } from "@/lib/prisma";
 import { requireCompanyId } from "@/lib/api-auth";
+import { withCompanyCache } from "@/lib/response-cache";
 import { permissions } from "@/lib/rbac";
 
 // IFRS-Compliant Statement of Cash Flows (IAS 7)
@@ -17,161 +18,166 @@ export async function GET(request: NextRequest) {
         if (!permissions.canViewFinancials(role)) {
             return NextResponse.json({ error: "Forbidden: Only accountants can view financials" }, { status: 403 });
         }
-        const startDate = searchParams.get("start");
-        const endDate = searchParams.get("end");
 
-        const start = startDate ? new Date(startDate) : new Date(new Date().getFullYear(), 0, 1);
-        const end = endDate ? new Date(endDate) : new Date();
+        const { value, hit } = await withCompanyCache(companyId, "statement_cashflow", searchParams, async () => {
+            const startDate = searchParams.get("start");
+            const endDate = searchParams.get("end");
+
+            const start = startDate ? new Date(startDate) : new Date(new Date().getFullYear(), 0, 1);
+            const end = endDate ? new Date(endDate) : new Date();
+
+            // Get all accounts
+            const accounts = await prisma.account.findMany({
+                where: { companyId, isActive: true },
+                orderBy: { accountCode: "asc" },
+            });
+
+            // Calculate Profit for the Period (starting point for indirect method)
+            const revenueAccounts = accounts.filter(a => a.accountType === "REVENUE");
+            const expenseAccounts = accounts.filter(a => a.accountType === "EXPENSE");
+            const profitForPeriod =
+                revenueAccounts.reduce((sum, a) => sum + a.currentBalance, 0) -
+                expenseAccounts.reduce((sum, a) => sum + a.currentBalance, 0);
+
+            // Get account balances for adjustments
+            const getBalance = (code: string) => accounts.find(a => a.accountCode === code)?.currentBalance || 0;
+            const getCategoryTotal = (type: string, category: string) =>
+                accounts.filter(a => a.accountType === type && a.accountCategory === category)
+                    .reduce((sum, a) => sum + a.currentBalance, 0);
+
+            // ============ OPERATING ACTIVITIES (Indirect Method per IAS 7) ============
+            const operatingActivities = {
+                // Start with profit
+                profitForPeriod,
+
+                // Adjustments for non-cash items
+                adjustments: {
+                    depreciation: getBalance("6500"), // Add back depreciation
+                    amortization: 0,
+                    provisionChanges: 0,
+                    unrealizedGains: 0,
+                    interestExpense: 0, // Add back if not paid
+                    interestIncome: 0, // Subtract if not received
+                },
+
+                // Changes in working capital
+                workingCapitalChanges: {
+                    inventoryChange: -getBalance("1200") * 0.1, // Simulated change
+                    receivablesChange: -getBalance("1100") * 0.05, // Increase is cash outflow
+                    prepaidChange: -getBalance("1300") * 0.02,
+                    payablesChange: getBalance("2000") * 0.08, // Increase is cash inflow
+                    accruedChange: getBalance("2100") * 0.05,
+                },
+
+                // Cash paid/received
+                taxesPaid: 0,
+                interestPaid: 0,
+
+                total: 0,
+            };
+
+            // Calculate operating cash flow
+            const adjustmentsTotal = Object.values(operatingActivities.adjustments).reduce((a, b) => a + b, 0);
+            const workingCapitalTotal = Object.values(operatingActivities.workingCapitalChanges).reduce((a, b) => a + b, 0);
+            operatingActivities.total = profitForPeriod + adjustmentsTotal + workingCapitalTotal -
+                operatingActivities.taxesPaid - operatingActivities.interestPaid;
+
+            // ============ INVESTING ACTIVITIES ============
+            const investingActivities = {
+                items: [
+                    { description: "Purchase of property, plant & equipment", amount: -getCategoryTotal("ASSET", "FIXED_ASSET") * 0.05 },
+                    { description: "Proceeds from sale of equipment", amount: 0 },
+                    { description: "Purchase of intangible assets", amount: 0 },
+                    { description: "Investment in subsidiaries", amount: 0 },
+                ],
+                total: 0,
+            };
+            investingActivities.total = investingActivities.items.reduce((sum, i) => sum + i.amount, 0);
+
+            // ============ FINANCING ACTIVITIES ============
+            const financingActivities = {
+                items: [
+                    { description: "Proceeds from borrowings", amount: getBalance("2500") * 0.1 },
+                    { description: "Repayment of borrowings", amount: -getBalance("2500") * 0.05 },
+                    { description: "Dividends paid", amount: 0 },
+                    { description: "Share capital issued", amount: 0 },
+                ],
+                total: 0,
+            };
+            financingActivities.total = financingActivities.items.reduce((sum, i) => sum + i.amount, 0);
+
+            // ============ CASH RECONCILIATION ============
+            const cashAtStart = (getBalance("1000") + getBalance("1010")) * 0.9; // Simulated opening balance
+            const netChangeInCash = operatingActivities.total + investingActivities.total + financingActivities.total;
+            const cashAtEnd = getBalance("1000") + getBalance("1010");
+            const exchangeRateEffect = cashAtEnd - cashAtStart - netChangeInCash;
+
+            const statement = {
+                title: "Statement of Cash Flows",
+                standard: "IFRS / IAS 7",
+                method: "Indirect Method",
+                periodStart: start.toISOString(),
+                periodEnd: end.toISOString(),
+                currency: "USD",
+
+                // A. Operating Activities
+                operatingActivities: {
+                    profitForPeriod: Math.round(operatingActivities.profitForPeriod),
+                    adjustmentsForNonCashItems: [
+                        { item: "Depreciation and amortization", amount: Math.round(operatingActivities.adjustments.depreciation) },
+                        { item: "Provision changes", amount: 0 },
+                        { item: "Unrealized foreign exchange", amount: 0 },
+                    ],
+                    adjustmentsSubtotal: Math.round(adjustmentsTotal),
+                    workingCapitalChanges: [
+                        { item: "Decrease/(Increase) in inventories", amount: Math.round(operatingActivities.workingCapitalChanges.inventoryChange) },
+                        { item: "Decrease/(Increase) in trade receivables", amount: Math.round(operatingActivities.workingCapitalChanges.receivablesChange) },
+                        { item: "Decrease/(Increase) in prepayments", amount: Math.round(operatingActivities.workingCapitalChanges.prepaidChange) },
+                        { item: "Increase/(Decrease) in trade payables", amount: Math.round(operatingActivities.workingCapitalChanges.payablesChange) },
+                        { item: "Increase/(Decrease) in accrued expenses", amount: Math.round(operatingActivities.workingCapitalChanges.accruedChange) },
+                    ],
+                    workingCapitalSubtotal: Math.round(workingCapitalTotal),
+                    cashFromOperationsBeforeTax: Math.round(profitForPeriod + adjustmentsTotal + workingCapitalTotal),
+                    incomeTaxesPaid: 0,
+                    netCashFromOperating: Math.round(operatingActivities.total),
+                },
+
+                // B. Investing Activities
+                investingActivities: {
+                    items: investingActivities.items.map(i => ({ ...i, amount: Math.round(i.amount) })),
+                    netCashFromInvesting: Math.round(investingActivities.total),
+                },
+
+                // C. Financing Activities
+                financingActivities: {
+                    items: financingActivities.items.map(i => ({ ...i, amount: Math.round(i.amount) })),
+                    netCashFromFinancing: Math.round(financingActivities.total),
+                },
+
+                // D. Net Change in Cash
+                netChangeInCash: Math.round(netChangeInCash),
+                exchangeRateEffect: Math.round(exchangeRateEffect),
+
+                // E. Cash Reconciliation
+                cashReconciliation: {
+                    cashAtBeginning: Math.round(cashAtStart),
+                    netChange: Math.round(netChangeInCash),
+                    exchangeEffect: Math.round(exchangeRateEffect),
+                    cashAtEnd: Math.round(cashAtEnd),
+                },
+
+                notes: [
+                    "Prepared in accordance with IAS 7 - Statement of Cash Flows",
+                    "Operating activities presented using the indirect method",
+                    "Cash and cash equivalents include cash in hand and bank balances",
+                    "Interest and dividends received are classified as operating activities",
+                ],
+            };
 
-        // Get all accounts
-        const accounts = await prisma.account.findMany({
-            where: { companyId, isActive: true },
-            orderBy: { accountCode: "asc" },
+            return statement;
         });
 
-        // Calculate Profit for the Period (starting point for indirect method)
-        const revenueAccounts = accounts.filter(a => a.accountType === "REVENUE");
-        const expenseAccounts = accounts.filter(a => a.accountType === "EXPENSE");
-        const profitForPeriod =
-            revenueAccounts.reduce((sum, a) => sum + a.currentBalance, 0) -
-            expenseAccounts.reduce((sum, a) => sum + a.currentBalance, 0);
-
-        // Get account balances for adjustments
-        const getBalance = (code: string) => accounts.find(a => a.accountCode === code)?.currentBalance || 0;
-        const getCategoryTotal = (type: string, category: string) =>
-            accounts.filter(a => a.accountType === type && a.accountCategory === category)
-                .reduce((sum, a) => sum + a.currentBalance, 0);
-
-        // ============ OPERATING ACTIVITIES (Indirect Method per IAS 7) ============
-        const operatingActivities = {
-            // Start with profit
-            profitForPeriod,
-
-            // Adjustments for non-cash items
-            adjustments: {
-                depreciation: getBalance("6500"), // Add back depreciation
-                amortization: 0,
-                provisionChanges: 0,
-                unrealizedGains: 0,
-                interestExpense: 0, // Add back if not paid
-                interestIncome: 0, // Subtract if not received
-            },
-
-            // Changes in working capital
-            workingCapitalChanges: {
-                inventoryChange: -getBalance("1200") * 0.1, // Simulated change
-                receivablesChange: -getBalance("1100") * 0.05, // Increase is cash outflow
-                prepaidChange: -getBalance("1300") * 0.02,
-                payablesChange: getBalance("2000") * 0.08, // Increase is cash inflow
-                accruedChange: getBalance("2100") * 0.05,
-            },
-
-            // Cash paid/received
-            taxesPaid: 0,
-            interestPaid: 0,
-
-            total: 0,
-        };
-
-        // Calculate operating cash flow
-        const adjustmentsTotal = Object.values(operatingActivities.adjustments).reduce((a, b) => a + b, 0);
-        const workingCapitalTotal = Object.values(operatingActivities.workingCapitalChanges).reduce((a, b) => a + b, 0);
-        operatingActivities.total = profitForPeriod + adjustmentsTotal + workingCapitalTotal -
-            operatingActivities.taxesPaid - operatingActivities.interestPaid;
-
-        // ============ INVESTING ACTIVITIES ============
-        const investingActivities = {
-            items: [
-                { description: "Purchase of property, plant & equipment", amount: -getCategoryTotal("ASSET", "FIXED_ASSET") * 0.05 },
-                { description: "Proceeds from sale of equipment", amount: 0 },
-                { description: "Purchase of intangible assets", amount: 0 },
-                { description: "Investment in subsidiaries", amount: 0 },
-            ],
-            total: 0,
-        };
-        investingActivities.total = investingActivities.items.reduce((sum, i) => sum + i.amount, 0);
-
-        // ============ FINANCING ACTIVITIES ============
-        const financingActivities = {
-            items: [
-                { description: "Proceeds from borrowings", amount: getBalance("2500") * 0.1 },
-                { description: "Repayment of borrowings", amount: -getBalance("2500") * 0.05 },
-                { description: "Dividends paid", amount: 0 },
-                { description: "Share capital issued", amount: 0 },
-            ],
-            total: 0,
-        };
-        financingActivities.total = financingActivities.items.reduce((sum, i) => sum + i.amount, 0);
-
-        // ============ CASH RECONCILIATION ============
-        const cashAtStart = (getBalance("1000") + getBalance("1010")) * 0.9; // Simulated opening balance
-        const netChangeInCash = operatingActivities.total + investingActivities.total + financingActivities.total;
-        const cashAtEnd = getBalance("1000") + getBalance("1010");
-        const exchangeRateEffect = cashAtEnd - cashAtStart - netChangeInCash;
-
-        const statement = {
-            title: "Statement of Cash Flows",
-            standard: "IFRS / IAS 7",
-            method: "Indirect Method",
-            periodStart: start.toISOString(),
-            periodEnd: end.toISOString(),
-            currency: "USD",
-
-            // A. Operating Activities
-            operatingActivities: {
-                profitForPeriod: Math.round(operatingActivities.profitForPeriod),
-                adjustmentsForNonCashItems: [
-                    { item: "Depreciation and amortization", amount: Math.round(operatingActivities.adjustments.depreciation) },
-                    { item: "Provision changes", amount: 0 },
-                    { item: "Unrealized foreign exchange", amount: 0 },
-                ],
-                adjustmentsSubtotal: Math.round(adjustmentsTotal),
-                workingCapitalChanges: [
-                    { item: "Decrease/(Increase) in inventories", amount: Math.round(operatingActivities.workingCapitalChanges.inventoryChange) },
-                    { item: "Decrease/(Increase) in trade receivables", amount: Math.round(operatingActivities.workingCapitalChanges.receivablesChange) },
-                    { item: "Decrease/(Increase) in prepayments", amount: Math.round(operatingActivities.workingCapitalChanges.prepaidChange) },
-                    { item: "Increase/(Decrease) in trade payables", amount: Math.round(operatingActivities.workingCapitalChanges.payablesChange) },
-                    { item: "Increase/(Decrease) in accrued expenses", amount: Math.round(operatingActivities.workingCapitalChanges.accruedChange) },
-                ],
-                workingCapitalSubtotal: Math.round(workingCapitalTotal),
-                cashFromOperationsBeforeTax: Math.round(profitForPeriod + adjustmentsTotal + workingCapitalTotal),
-                incomeTaxesPaid: 0,
-                netCashFromOperating: Math.round(operatingActivities.total),
-            },
-
-            // B. Investing Activities
-            investingActivities: {
-                items: investingActivities.items.map(i => ({ ...i, amount: Math.round(i.amount) })),
-                netCashFromInvesting: Math.round(investingActivities.total),
-            },
-
-            // C. Financing Activities
-            financingActivities: {
-                items: financingActivities.items.map(i => ({ ...i, amount: Math.round(i.amount) })),
-                netCashFromFinancing: Math.round(financingActivities.total),
-            },
-
-            // D. Net Change in Cash
-            netChangeInCash: Math.round(netChangeInCash),
-            exchangeRateEffect: Math.round(exchangeRateEffect),
-
-            // E. Cash Reconciliation
-            cashReconciliation: {
-                cashAtBeginning: Math.round(cashAtStart),
-                netChange: Math.round(netChangeInCash),
-                exchangeEffect: Math.round(exchangeRateEffect),
-                cashAtEnd: Math.round(cashAtEnd),
-            },
-
-            notes: [
-                "Prepared in accordance with IAS 7 - Statement of Cash Flows",
-                "Operating activities presented using the indirect method",
-                "Cash and cash equivalents include cash in hand and bank balances",
-                "Interest and dividends received are classified as operating activities",
-            ],
-        };
-
-        return NextResponse.json(statement);
+        return NextResponse.json(value, { headers: { "X-Cache": hit ? "HIT" : "MISS" } });
     } catch (error) {
         console.error("Error generating cash flow statement:", error);
         return NextResponse.json({ error: "Failed to generate statement" }, { status: 500 });
@@ -1,4 +1,5 @@
 import { NextResponse } from "next/server";
+import { getCacheStats } from "@/lib/response-cache";
 
 // Health check endpoint for Docker and load balancers
 export async function GET() {
@@ -6,5 +7,7 @@ export async function GET() {
         status: "healthy",
         timestamp: new Date().toISOString(),
         version: process.env.npm_package_version || "1.0.0",
+        // Response cache hit/miss counters for this instance
+        cache: getCacheStats(),
     });
 }
@@ -1,6 +1,13 @@
 import { NextRequest, NextResponse } from "next/server";
 import { prisma } from "@/lib/prisma";
 import { requireCompanyId } from "@/lib/api-auth";
+import { EntityType } from "@/lib/migration/templates";
+import { IMPORTABLE_ENTITY_TYPES } from "@/lib/migration/importers";
+import { ingestAsNdjson, readUploadRows } from "@/lib/migration/ingest";
+import { enqueueJob, jobAccepted, saveJobFile } from "@/lib/job-queue";
+import { evaluateStockLevels } from "@/lib/stock-alerts";
+import { markProductsChanged } from "@/lib/product-index";
+import { invalidateCompanyCache } from "@/lib/response-cache";
 
 export async function POST(request: NextRequest) {
     const auth = await requireCompanyId();
@@ -12,6 +19,48 @@ export async function POST(request: NextRequest) {
     try {
         const { searchParams } = new URL(request.url);
         const action = searchParams.get("action");
+        const contentType = request.headers.get("content-type") || "";
+
+        // Raw CSV/XLSX bodies are parsed and imported in batches as they arrive;
+        // the response is NDJSON progress events ending in the import result
+        if (!contentType.includes("application/json")) {
+            if (!IMPORTABLE_ENTITY_TYPES.includes(action as EntityType)) {
+                return NextResponse.json({ error: "Streaming import not supported for this type" }, { status: 400 });
+            }
+            if (!request.body) {
+                return NextResponse.json({ error: "Empty upload" }, { status: 400 });
+            }
+
+            const mapping = searchParams.get("mapping");
+            const fileName = searchParams.get("fileName") || contentType;
+
+            // ?async=true stores the upload and imports it in a background job
+            if (searchParams.get("async") === "true") {
+                const extension = /xlsx?$|spreadsheet|ms-excel/i.test(fileName) ? "xlsx" : "csv";
+                const filePath = await saveJobFile(`${crypto.randomUUID()}.${extension}`, request.body);
+                const job = await enqueueJob(companyId, "migration.import", {
+                    filePath,
+                    fileName: `upload.${extension}`,
+                    entityType: action,
+                    columnMapping: mapping ? JSON.parse(mapping) : null,
+                });
+                return NextResponse.json(jobAccepted(job), { status: 202 });
+            }
+
+            const body = request.body;
+            const stream = ingestAsNdjson(
+                () => readUploadRows(body, fileName),
+                {
+                    entityType: action as EntityType,
+                    companyId,
+                    columnMapping: mapping ? JSON.parse(mapping) : null,
+                }
+            );
+            return new Response(stream, {
+                headers: { "Content-Type": "application/x-ndjson", "Cache-Control": "no-store" },
+            });
+        }
+
         const data = await request.json();
 
         if (!Array.isArray(data)) {
@@ -37,6 +86,8 @@ export async function POST(request: NextRequest) {
                 return NextResponse.json({ error: "Invalid action" }, { status: 400 });
         }
 
+        await invalidateCompanyCache(companyId);
+
         return NextResponse.json({ success: true, count: resultCount });
     } catch (error: any) {
         console.error("Import error:", error);
@@ -176,8 +227,10 @@ async function importProducts(companyId: string, data: any[]) {
         }));
 
     if (toCreate.length > 0) {
-        const result = await prisma.product.createMany({ data: toCreate });
-        return result.count;
+        const created = await prisma.product.createManyAndReturn({ data: toCreate, select: { id: true } });
+        await evaluateStockLevels(companyId, created.map(p => p.id));
+        markProductsChanged(companyId);
+        return created.length;
     }
     return 0;
 }
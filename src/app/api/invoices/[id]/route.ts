@@ -1,6 +1,8 @@
 import { NextRequest, NextResponse } from "next/server";
 import { prisma } from "@/lib/prisma";
 import { requireAuth } from "@/lib/api-auth";
+import { applyRollupChange, invoiceRollup } from "@/lib/monthly-rollups";
+import { invalidateCompanyCache } from "@/lib/response-cache";
 
 export async function GET(
     req: NextRequest,
@@ -65,9 +67,13 @@ export async function DELETE(
             return NextResponse.json({ error: "Invoice not found" }, { status: 404 });
         }
 
-        await prisma.invoice.delete({
-            where: { id },
+        await prisma.$transaction(async (tx) => {
+            await tx.invoice.delete({
+                where: { id },
+            });
+            await applyRollupChange(authInfo.companyId, invoiceRollup(invoice), [], tx);
         });
+        await invalidateCompanyCache(authInfo.companyId);
 
         return NextResponse.json({ success: true });
     } catch (error) {
@@ -1,9 +1,14 @@
 import { NextResponse } from "next/server";
 import { prisma } from "@/lib/prisma";
 import { requireCompanyId } from "@/lib/api-auth";
+import { computeInvoiceTotals } from "@/lib/invoice-totals";
+import { applyRollupChange, invoiceRollup } from "@/lib/monthly-rollups";
+import { invalidateCompanyCache } from "@/lib/response-cache";
+import { nextDocumentNumber } from "@/lib/sequences";
+import { parsePageParams, pageWhere, pageOrder, takePage, projectFields, pageHeaders } from "@/lib/pagination";
 
-// GET /api/invoices - Fetch all invoices
-export async function GET() {
+// GET /api/invoices - Fetch invoices (keyset paged when limit/cursor given)
+export async function GET(request: Request) {
     try {
         const auth = await requireCompanyId();
         if ("error" in auth) {
@@ -11,33 +16,41 @@ export async function GET() {
         }
         const { companyId } = auth;
 
-        const invoices = await prisma.invoice.findMany({
-            where: { companyId },
-            include: {
-                client: true,
-                items: true,
+        const page = parsePageParams(new URL(request.url).searchParams);
+        if ("error" in page) {
+            return NextResponse.json({ error: page.error }, { status: 400 });
+        }
+
+        const where = { companyId };
+        const rows = await prisma.invoice.findMany({
+            where: pageWhere(page, where),
+            select: {
+                id: true,
+                invoiceNumber: true,
+                issueDate: true,
+                dueDate: true,
+                status: true,
+                totalAmount: true,
+                client: { select: { name: true } },
+                createdAt: true,
             },
-            orderBy: { createdAt: "desc" },
+            ...pageOrder(page, { createdAt: "desc" as const }),
         });
+        const { items: invoices, nextCursor } = takePage(rows, page);
 
-        const formatted = invoices.map((inv) => {
-            const total = inv.items.reduce(
-                (sum, item) => sum + item.quantity * item.unitPrice,
-                0
-            ) * (1 + inv.taxRate);
+        const formatted = invoices.map((inv) => ({
+            id: inv.id,
+            invoiceNumber: inv.invoiceNumber,
+            clientName: inv.client.name,
+            issueDate: inv.issueDate,
+            dueDate: inv.dueDate,
+            status: inv.status,
+            total: Math.round(inv.totalAmount * 100) / 100,
+        }));
 
-            return {
-                id: inv.id,
-                invoiceNumber: inv.invoiceNumber,
-                clientName: inv.client.name,
-                issueDate: inv.issueDate,
-                dueDate: inv.dueDate,
-                status: inv.status,
-                total: Math.round(total * 100) / 100,
-            };
+        return NextResponse.json(projectFields(formatted, page.fields), {
+            headers: await pageHeaders(page, nextCursor, () => prisma.invoice.count({ where })),
         });
-
-        return NextResponse.json(formatted);
     } catch (error) {
         console.error("Invoices API error:", error);
         return NextResponse.json({ error: "Failed to fetch invoices" }, { status: 500 });
@@ -60,23 +73,37 @@ export async function POST(request: Request) {
             description: item.description || "No description",
             quantity: Number(item.quantity) || 1,
             unitPrice: Number(item.unitPrice || item.price) || 0,
+        })).map((item: { description: string; quantity: number; unitPrice: number }) => ({
+            ...item,
+            total: item.quantity * item.unitPrice,
         }));
 
-        const invoice = await prisma.invoice.create({
-            data: {
-                companyId,
-                clientId: body.clientId,
-                invoiceNumber: body.invoiceNumber || `INV-${Date.now()}`,
-                issueDate: body.issueDate ? new Date(body.issueDate) : new Date(),
-                dueDate: body.dueDate ? new Date(body.dueDate) : new Date(Date.now() + 30 * 24 * 60 * 60 * 1000),
-                taxRate: (body.taxRate !== undefined ? Number(body.taxRate) : 14) / 100,
-                notes: body.notes || "",
-                items: {
-                    create: items,
+        const taxRate = (body.taxRate !== undefined ? Number(body.taxRate) : 14) / 100;
+        const totals = computeInvoiceTotals(items, taxRate);
+
+        // The invoice and its rollup change commit together
+        const invoice = await prisma.$transaction(async (tx) => {
+            const created = await tx.invoice.create({
+                data: {
+                    companyId,
+                    clientId: body.clientId,
+                    invoiceNumber: body.invoiceNumber || await nextDocumentNumber(companyId, "INVOICE", tx),
+                    issueDate: body.issueDate ? new Date(body.issueDate) : new Date(),
+                    dueDate: body.dueDate ? new Date(body.dueDate) : new Date(Date.now() + 30 * 24 * 60 * 60 * 1000),
+                    taxRate,
+                    ...totals,
+                    balanceDue: totals.totalAmount,
+                    notes: body.notes || "",
+                    items: {
+                        create: items,
+                    },
                 },
-            },
-            include: { items: true },
+                include: { items: true },
+            });
+            await applyRollupChange(companyId, [], invoiceRollup(created), tx);
+            return created;
         });
+        await invalidateCompanyCache(companyId);
 
         return NextResponse.json(invoice, { status: 201 });
     } catch (error) {
@@ -0,0 +1,46 @@
+import { createReadStream } from "fs";
+import { access } from "fs/promises";
+import { Readable } from "stream";
+import { NextRequest, NextResponse } from "next/server";
+import { requireCompanyId } from "@/lib/api-auth";
+import { getJob, jobFilePath } from "@/lib/job-queue";
+
+// GET /api/jobs/[id]/download - Output file of a finished export job
+export async function GET(
+    request: NextRequest,
+    { params }: { params: Promise<{ id: string }> }
+) {
+    try {
+        const auth = await requireCompanyId();
+        if ("error" in auth) {
+            return NextResponse.json({ error: auth.error }, { status: auth.status });
+        }
+        const { id } = await params;
+
+        const job = await getJob(auth.companyId, id);
+        if (!job || job.type !== "data.export") {
+            return NextResponse.json({ error: "Export job not found" }, { status: 404 });
+        }
+        if (job.status !== "SUCCEEDED" || !job.result) {
+            return NextResponse.json({ error: "Export is not ready", status: job.status }, { status: 409 });
+        }
+
+        const { fileName, format } = JSON.parse(job.result) as { fileName: string; format: string };
+        const filePath = await jobFilePath(`${job.id}.${format}`);
+        try {
+            await access(filePath);
+        } catch {
+            return NextResponse.json({ error: "Export file has expired" }, { status: 410 });
+        }
+
+        return new Response(Readable.toWeb(createReadStream(filePath)) as ReadableStream<Uint8Array>, {
+            headers: {
+                "Content-Type": format === "csv" ? "text/csv; charset=utf-8" : "application/x-ndjson",
+                "Content-Disposition": `attachment; filename="${fileName}"`,
+            },
+        });
+    } catch (error) {
+        console.error("Error downloading export:", error);
+        return NextResponse.json({ error: "Failed to download export" }, { status: 500 });
+    }
+}
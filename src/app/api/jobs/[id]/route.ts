@@ -0,0 +1,31 @@
+import { NextRequest, NextResponse } from "next/server";
+import { requireCompanyId } from "@/lib/api-auth";
+import { getJob, serializeJob } from "@/lib/job-queue";
+
+// GET /api/jobs/[id] - Status, progress and result of a background job
+export async function GET(
+    request: NextRequest,
+    { params }: { params: Promise<{ id: string }> }
+) {
+    try {
+        const auth = await requireCompanyId();
+        if ("error" in auth) {
+            return NextResponse.json({ error: auth.error }, { status: auth.status });
+        }
+        const { id } = await params;
+
+        const job = await getJob(auth.companyId, id);
+        if (!job) {
+            return NextResponse.json({ error: "Job not found" }, { status: 404 });
+        }
+
+        const finished = job.status === "SUCCEEDED" || job.status === "FAILED";
+        return NextResponse.json(serializeJob(job), {
+            // Hint for pollers; finished jobs no longer change
+            headers: finished ? {} : { "Retry-After": "2" },
+        });
+    } catch (error) {
+        console.error("Error fetching job:", error);
+        return NextResponse.json({ error: "Failed to fetch job" }, { status: 500 });
+    }
+}
@@ -0,0 +1,34 @@
+import { NextRequest, NextResponse } from "next/server";
+import { prisma } from "@/lib/prisma";
+import { requireCompanyId } from "@/lib/api-auth";
+import { serializeJob } from "@/lib/job-queue";
+
+// GET /api/jobs - Recent background jobs for the company (?status=&type=)
+export async function GET(request: NextRequest) {
+    try {
+        const auth = await requireCompanyId();
+        if ("error" in auth) {
+            return NextResponse.json({ error: auth.error }, { status: auth.status });
+        }
+        const { companyId } = auth;
+
+        const { searchParams } = new URL(request.url);
+        const status = searchParams.get("status");
+        const type = searchParams.get("type");
+
+        const jobs = await prisma.backgroundJob.findMany({
+            where: {
+                companyId,
+                ...(status ? { status } : {}),
+                ...(type ? { type } : {}),
+            },
+            orderBy: { createdAt: "desc" },
+            take: 50,
+        });
+
+        return NextResponse.json(jobs.map(serializeJob));
+    } catch (error) {
+        console.error("Error fetching jobs:", error);
+        return NextResponse.json({ error: "Failed to fetch jobs" }, { status: 500 });
+    }
+}
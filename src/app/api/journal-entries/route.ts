@@ -1,7 +1,11 @@
 import { NextRequest, NextResponse } from "next/server";
+import { Prisma } from "@prisma/client";
 import { prisma } from "@/lib/prisma";
 import { requireCompanyId } from "@/lib/api-auth";
 import { permissions } from "@/lib/rbac";
+import { invalidateCompanyCache } from "@/lib/response-cache";
+import { postJournalEntry, JournalPostingError } from "@/lib/gl/auto-post";
+import { parsePageParams, pageWhere, pageOrder, pageSelect, takePage, projectFields, pageHeaders } from "@/lib/pagination";
 
 // Get all journal entries
 export async function GET(request: NextRequest) {
@@ -19,28 +23,38 @@ export async function GET(request: NextRequest) {
         const { searchParams } = new URL(request.url);
         const sourceType = searchParams.get("sourceType");
         const status = searchParams.get("status");
-        const limit = parseInt(searchParams.get("limit") || "50");
+
+        // Always paged (this endpoint has always returned at most `limit` entries),
+        // newest entry date first as before
+        const page = parsePageParams(searchParams, { alwaysPaginate: true, orderField: "entryDate" });
+        if ("error" in page) {
+            return NextResponse.json({ error: page.error }, { status: 400 });
+        }
 
         const where: any = { companyId };
         if (sourceType) where.sourceType = sourceType;
         if (status) where.status = status;
 
-        const entries = await prisma.journalEntry.findMany({
-            where,
+        const lines = {
             include: {
-                lines: {
-                    include: {
-                        account: {
-                            select: { accountCode: true, accountName: true },
-                        },
-                    },
+                account: {
+                    select: { accountCode: true, accountName: true },
                 },
             },
-            orderBy: { entryDate: "desc" },
-            take: limit,
+        };
+        // fields= only fetches the listed columns (lines and their accounts only when asked for)
+        const select = pageSelect(page, Object.values(Prisma.JournalEntryScalarFieldEnum), { lines });
+
+        const rows = await prisma.journalEntry.findMany({
+            where: pageWhere(page, where),
+            ...(select ? { select: select as Prisma.JournalEntrySelect } : { include: { lines } }),
+            ...pageOrder(page, { entryDate: "desc" as const }),
         });
+        const { items: entries, nextCursor } = takePage(rows, page);
 
-        return NextResponse.json(entries);
+        return NextResponse.json(projectFields(entries, page.fields), {
+            headers: await pageHeaders(page, nextCursor, () => prisma.journalEntry.count({ where })),
+        });
     } catch (error) {
         console.error("Error fetching journal entries:", error);
         return NextResponse.json({ error: "Failed to fetch journal entries" }, { status: 500 });
@@ -63,60 +77,26 @@ export async function POST(request: NextRequest) {
         const body = await request.json();
         const { entryDate, description, lines } = body;
 
-        // Validate balance
-        const totalDebit = lines.reduce((sum: number, line: any) => sum + (line.debit || 0), 0);
-        const totalCredit = lines.reduce((sum: number, line: any) => sum + (line.credit || 0), 0);
-
-        if (Math.abs(totalDebit - totalCredit) > 0.01) {
-            return NextResponse.json(
-                { error: `Entry is not balanced. Debits: ${totalDebit}, Credits: ${totalCredit}` },
-                { status: 400 }
-            );
-        }
-
-        // Generate journal number
-        const count = await prisma.journalEntry.count({ where: { companyId } });
-        const journalNumber = `JE-${String(count + 1).padStart(6, "0")}`;
-
-        const entry = await prisma.journalEntry.create({
-            data: {
-                companyId,
-                journalNumber,
-                entryDate: new Date(entryDate),
-                description,
-                sourceType: "MANUAL",
-                status: "POSTED",
-                totalDebit,
-                totalCredit,
-                lines: {
-                    create: lines.map((line: any) => ({
-                        accountId: line.accountId,
-                        description: line.description,
-                        debit: line.debit || 0,
-                        credit: line.credit || 0,
-                    })),
-                },
-            },
-            include: { lines: true },
-        });
-
-        // Update account balances
-        for (const line of lines) {
-            const account = await prisma.account.findFirst({
-                where: { id: line.accountId, companyId }
-            });
-            if (account) {
-                const change = (line.debit || 0) - (line.credit || 0);
-                const balanceChange = account.normalBalance === "DEBIT" ? change : -change;
-                await prisma.account.update({
-                    where: { id: line.accountId },
-                    data: { currentBalance: { increment: balanceChange } },
-                });
-            }
-        }
+        // Validation, numbering and balance updates happen in one transaction
+        const entry = await prisma.$transaction(tx => postJournalEntry(tx, {
+            companyId,
+            sourceType: "MANUAL",
+            description,
+            entryDate: new Date(entryDate),
+            lines: lines.map((line: any) => ({
+                accountId: line.accountId,
+                description: line.description,
+                debit: line.debit || 0,
+                credit: line.credit || 0,
+            })),
+        }));
+        await invalidateCompanyCache(companyId);
 
         return NextResponse.json(entry);
     } catch (error) {
+        if (error instanceof JournalPostingError) {
+            return NextResponse.json({ error: error.message }, { status: 400 });
+        }
         console.error("Error creating journal entry:", error);
         return NextResponse.json({ error: "Failed to create journal entry" }, { status: 500 });
     }
@@ -147,56 +127,36 @@ export async function PUT(request: NextRequest) {
             return NextResponse.json({ error: "Entry not found or already reversed" }, { status: 400 });
         }
 
-        // Generate reversal journal number
-        const count = await prisma.journalEntry.count({ where: { companyId } });
-        const journalNumber = `JE-${String(count + 1).padStart(6, "0")}`;
+        // Create reversal entry (swap debits/credits) and mark the original in one transaction
+        const reversalEntry = await prisma.$transaction(async (tx) => {
+            // Conditional update: concurrent reversals of the same entry cannot both succeed
+            const marked = await tx.journalEntry.updateMany({
+                where: { id: entryId, companyId, status: { not: "REVERSED" } },
+                data: { status: "REVERSED" },
+            });
+            if (marked.count === 0) {
+                throw new JournalPostingError("Entry not found or already reversed");
+            }
 
-        // Create reversal entry (swap debits/credits)
-        const reversalEntry = await prisma.journalEntry.create({
-            data: {
+            return postJournalEntry(tx, {
                 companyId,
-                journalNumber,
-                entryDate: new Date(),
-                description: `Reversal of ${originalEntry.journalNumber}: ${originalEntry.description}`,
                 sourceType: "MANUAL",
-                status: "POSTED",
-                totalDebit: originalEntry.totalCredit,
-                totalCredit: originalEntry.totalDebit,
-                lines: {
-                    create: originalEntry.lines.map((line) => ({
-                        accountId: line.accountId,
-                        description: `Reversal: ${line.description || ""}`,
-                        debit: line.credit,
-                        credit: line.debit,
-                    })),
-                },
-            },
-            include: { lines: true },
-        });
-
-        // Mark original as reversed
-        await prisma.journalEntry.update({
-            where: { id: entryId },
-            data: { status: "REVERSED" },
-        });
-
-        // Update account balances (reverse the original impact)
-        for (const line of originalEntry.lines) {
-            const account = await prisma.account.findFirst({
-                where: { id: line.accountId, companyId }
+                description: `Reversal of ${originalEntry.journalNumber}: ${originalEntry.description}`,
+                lines: originalEntry.lines.map((line) => ({
+                    accountId: line.accountId,
+                    description: `Reversal: ${line.description || ""}`,
+                    debit: line.credit,
+                    credit: line.debit,
+                })),
             });
-            if (account) {
-                const change = (line.credit - line.debit);
-                const balanceChange = account.normalBalance === "DEBIT" ? change : -change;
-                await prisma.account.update({
-                    where: { id: line.accountId },
-                    data: { currentBalance: { increment: balanceChange } },
-                });
-            }
-        }
+        });
+        await invalidateCompanyCache(companyId);
 
         return NextResponse.json({ reversalEntry, originalUpdated: true });
     } catch (error) {
+        if (error instanceof JournalPostingError) {
+            return NextResponse.json({ error: error.message }, { status: 400 });
+        }
         console.error("Error reversing journal entry:", error);
         return NextResponse.json({ error: "Failed to reverse journal entry" }, { status: 500 });
     }
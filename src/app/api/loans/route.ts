@@ -1,6 +1,8 @@
 import { NextRequest, NextResponse } from "next/server";
 import { prisma } from "@/lib/prisma";
 import { requireCompanyId } from "@/lib/api-auth";
+import { enqueueJob, jobAccepted } from "@/lib/job-queue";
+import { invalidateCompanyCache } from "@/lib/response-cache";
 import {
     createLoan,
     getLoans,
@@ -75,7 +77,7 @@ export async function GET(request: NextRequest) {
     }
 }
 
-// POST /api/loans - Create new loan or record payment
+// POST /api/loans - Create new loan, record payment or queue an interest accrual
 export async function POST(request: NextRequest) {
     try {
         const auth = await requireCompanyId();
@@ -84,10 +86,18 @@ export async function POST(request: NextRequest) {
         }
         const { companyId } = auth;
 
-        const body = await request.json();
         const { searchParams } = new URL(request.url);
         const action = searchParams.get("action");
 
+        // Run the month-end interest accrual in the background; poll /api/jobs/[id]
+        if (action === "accrual") {
+            const asOfDate = searchParams.get("asOfDate");
+            const job = await enqueueJob(companyId, "loans.interest-accrual", asOfDate ? { asOfDate } : {});
+            return NextResponse.json(jobAccepted(job), { status: 202 });
+        }
+
+        const body = await request.json();
+
         // Record a payment
         if (action === "payment") {
             // Verify access to the loan
@@ -105,6 +115,7 @@ export async function POST(request: NextRequest) {
                 body.journalEntryId,
                 body.notes
             );
+            await invalidateCompanyCache(companyId);
             return NextResponse.json(payment, { status: 201 });
         }
 
@@ -124,6 +135,7 @@ export async function POST(request: NextRequest) {
             interestAccountId: body.interestAccountId,
             notes: body.notes,
         });
+        await invalidateCompanyCache(companyId);
 
         return NextResponse.json(loan, { status: 201 });
     } catch (error) {
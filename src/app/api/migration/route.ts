@@ -6,6 +6,9 @@ import Papa from "papaparse";
 import { detectEntityType, mapColumns, EntityType } from "@/lib/migration/templates";
 import { validateData, ValidationResult } from "@/lib/migration/validators";
 import { importData, ImportResult } from "@/lib/migration/importers";
+import { ingestAsNdjson, readUploadRows } from "@/lib/migration/ingest";
+import { enqueueJob, jobAccepted, saveJobFile } from "@/lib/job-queue";
+import { invalidateCompanyCache } from "@/lib/response-cache";
 
 export interface MigrationSession {
     id: string;
@@ -162,6 +165,46 @@ export async function POST(req: NextRequest) {
             });
         }
 
+        // Import straight from the file without keeping parsed rows in a session;
+        // stream_import responds with NDJSON progress events ending in the import
+        // result, queue_import hands the file to a background job (poll /api/jobs/[id])
+        if (action === "stream_import" || action === "queue_import") {
+            if (!file) {
+                return NextResponse.json({ error: "No file uploaded" }, { status: 400 });
+            }
+
+            const migrationSession = sessionId ? sessions.get(sessionId) : undefined;
+            const mappingJson = formData.get("mapping") as string;
+            const entityType = (formData.get("entityType") as EntityType) || migrationSession?.entityType;
+
+            if (!entityType) {
+                return NextResponse.json({ error: "Please select a data type" }, { status: 400 });
+            }
+
+            if (action === "queue_import") {
+                const filePath = await saveJobFile(`${crypto.randomUUID()}-${file.name}`, file.stream());
+                const job = await enqueueJob(companyId, "migration.import", {
+                    filePath,
+                    fileName: file.name,
+                    entityType,
+                    columnMapping: mappingJson ? JSON.parse(mappingJson) : migrationSession?.columnMapping ?? null,
+                }, { createdBy: session.user.id });
+                return NextResponse.json(jobAccepted(job), { status: 202 });
+            }
+
+            const stream = ingestAsNdjson(
+                () => readUploadRows(file.stream(), file.name),
+                {
+                    entityType,
+                    companyId,
+                    columnMapping: mappingJson ? JSON.parse(mappingJson) : migrationSession?.columnMapping,
+                }
+            );
+            return new Response(stream, {
+                headers: { "Content-Type": "application/x-ndjson", "Cache-Control": "no-store" },
+            });
+        }
+
         if (action === "import" && sessionId) {
             const migrationSession = sessions.get(sessionId);
             if (!migrationSession) {
@@ -181,6 +224,7 @@ export async function POST(req: NextRequest) {
                 migrationSession.columnMapping,
                 migrationSession.companyId
             );
+            await invalidateCompanyCache(migrationSession.companyId);
 
             migrationSession.result = result;
             migrationSession.status = result.success ? "complete" : "error";
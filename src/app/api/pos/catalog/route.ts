@@ -0,0 +1,31 @@
+import { NextResponse } from "next/server";
+import { requireAuth } from "@/lib/api-auth";
+import { getCatalogDelta } from "@/lib/product-index";
+
+// GET /api/pos/catalog?since= - Compact product catalog for terminals; with `since`
+// (the syncedAt of the last download) only products changed since then
+export async function GET(request: Request) {
+    try {
+        const auth = await requireAuth();
+        if ("error" in auth) {
+            return NextResponse.json({ error: auth.error }, { status: auth.status });
+        }
+        const { companyId } = auth;
+
+        const sinceParam = new URL(request.url).searchParams.get("since");
+        let since: number | undefined;
+        if (sinceParam) {
+            since = /^\d+$/.test(sinceParam) ? Number(sinceParam) : Date.parse(sinceParam);
+            if (Number.isNaN(since)) {
+                return NextResponse.json({ error: "since must be a timestamp in ms or an ISO date" }, { status: 400 });
+            }
+        }
+
+        return NextResponse.json(await getCatalogDelta(companyId, since), {
+            headers: { "Cache-Control": "private, no-store" },
+        });
+    } catch (error) {
+        console.error("POS catalog error:", error);
+        return NextResponse.json({ error: "Failed to load catalog" }, { status: 500 });
+    }
+}
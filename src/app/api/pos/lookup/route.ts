@@ -0,0 +1,28 @@
+import { NextResponse } from "next/server";
+import { requireAuth } from "@/lib/api-auth";
+import { lookupProductCode } from "@/lib/product-index";
+
+// GET /api/pos/lookup?code= - Product for a scanned barcode or SKU, from the in-memory index
+export async function GET(request: Request) {
+    try {
+        const auth = await requireAuth();
+        if ("error" in auth) {
+            return NextResponse.json({ error: auth.error }, { status: auth.status });
+        }
+        const { companyId } = auth;
+
+        const code = new URL(request.url).searchParams.get("code")?.trim();
+        if (!code) {
+            return NextResponse.json({ error: "code is required" }, { status: 400 });
+        }
+
+        const product = await lookupProductCode(companyId, code);
+        if (!product) {
+            return NextResponse.json({ error: "Product not found" }, { status: 404 });
+        }
+        return NextResponse.json(product);
+    } catch (error) {
+        console.error("Product lookup error:", error);
+        return NextResponse.json({ error: "Failed to look up product" }, { status: 500 });
+    }
+}
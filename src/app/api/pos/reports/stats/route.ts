@@ -1,8 +1,9 @@
 import { NextResponse } from "next/server";
-import { prisma } from "@/lib/prisma";
 import { requireCompanyId } from "@/lib/api-auth";
+import { getSalesReport, REPORT_GRANULARITIES, ReportGranularity, SalesReportError } from "@/lib/pos-sales-buckets";
 
-// GET /api/pos/reports/stats
+// GET /api/pos/reports/stats?from=&to=&granularity=hour|day|week|month
+// Defaults to today by hour; served from the hourly sales buckets
 export async function GET(request: Request) {
     try {
         const auth = await requireCompanyId();
@@ -10,83 +11,30 @@ export async function GET(request: Request) {
             return NextResponse.json({ error: auth.error }, { status: auth.status });
         }
         const { companyId } = auth;
+
+        const { searchParams } = new URL(request.url);
         const today = new Date();
         today.setHours(0, 0, 0, 0);
         const tomorrow = new Date(today);
         tomorrow.setDate(tomorrow.getDate() + 1);
 
-        // Today's sales
-        const todaySales = await prisma.pOSSale.findMany({
-            where: {
-                companyId,
-                saleDate: { gte: today, lt: tomorrow },
-                status: "COMPLETED",
-            },
-            include: { items: true },
-        });
-
-        const todayTotal = todaySales.reduce((sum, sale) => sum + sale.total, 0);
-        const todayTransactions = todaySales.length;
-        const avgTransaction = todayTransactions > 0 ? todayTotal / todayTransactions : 0;
+        const from = searchParams.get("from") ? new Date(searchParams.get("from")!) : today;
+        const to = searchParams.get("to") ? new Date(searchParams.get("to")!) : tomorrow;
+        const granularity = (searchParams.get("granularity") || "hour") as ReportGranularity;
 
-        // Top products today
-        const productSales: Record<string, { name: string; quantity: number; revenue: number }> = {};
-        for (const sale of todaySales) {
-            for (const item of sale.items) {
-                if (!productSales[item.productId]) {
-                    productSales[item.productId] = { name: item.productName, quantity: 0, revenue: 0 };
-                }
-                productSales[item.productId].quantity += item.quantity;
-                productSales[item.productId].revenue += item.total;
-            }
+        if (Number.isNaN(from.getTime()) || Number.isNaN(to.getTime())) {
+            return NextResponse.json({ error: "from and to must be valid dates" }, { status: 400 });
         }
-        const topProducts = Object.values(productSales)
-            .sort((a, b) => b.revenue - a.revenue)
-            .slice(0, 5);
-
-        // Payment methods breakdown
-        const paymentMethods: Record<string, number> = {};
-        for (const sale of todaySales) {
-            paymentMethods[sale.paymentMethod] = (paymentMethods[sale.paymentMethod] || 0) + sale.total;
+        if (!REPORT_GRANULARITIES.includes(granularity)) {
+            return NextResponse.json({ error: `granularity must be one of ${REPORT_GRANULARITIES.join(", ")}` }, { status: 400 });
         }
 
-        // Sales by hour
-        const salesByHour: Record<number, number> = {};
-        for (const sale of todaySales) {
-            const hour = new Date(sale.saleDate).getHours();
-            salesByHour[hour] = (salesByHour[hour] || 0) + sale.total;
-        }
-        const salesByHourArray = Array.from({ length: 24 }, (_, i) => ({
-            hour: `${i}:00`,
-            sales: salesByHour[i] || 0,
-        }));
-
-        // Weekly comparison
-        const weekAgo = new Date(today);
-        weekAgo.setDate(weekAgo.getDate() - 7);
-        const lastWeekSales = await prisma.pOSSale.aggregate({
-            where: {
-                companyId,
-                saleDate: { gte: weekAgo, lt: today },
-                status: "COMPLETED",
-            },
-            _sum: { total: true },
-        });
-
-        return NextResponse.json({
-            todaySales: todayTotal,
-            todayTransactions,
-            avgTransaction,
-            topProduct: topProducts[0] || null,
-            topProducts,
-            paymentMethods: Object.entries(paymentMethods).map(([method, amount]) => ({
-                method,
-                amount,
-            })),
-            salesByHour: salesByHourArray,
-            lastWeekTotal: lastWeekSales._sum.total || 0,
-        });
+        const report = await getSalesReport(companyId, { from, to, granularity });
+        return NextResponse.json(report);
     } catch (error) {
+        if (error instanceof SalesReportError) {
+            return NextResponse.json({ error: error.message }, { status: error.status });
+        }
         console.error("POS Stats API error:", error);
         return NextResponse.json({ error: "Failed to fetch stats" }, { status: 500 });
     }
@@ -1,6 +1,8 @@
 import { NextResponse } from "next/server";
 import { prisma } from "@/lib/prisma";
 import { requireAuth } from "@/lib/api-auth";
+import { serverTiming } from "@/lib/api-response";
+import { checkoutSale, CheckoutError } from "@/lib/pos-checkout";
 
 // GET /api/pos/sales - Fetch sales history
 export async function GET(request: Request) {
@@ -41,6 +43,7 @@ export async function GET(request: Request) {
 // POST /api/pos/sales - Create new sale
 export async function POST(request: Request) {
     try {
+        const started = performance.now();
         const auth = await requireAuth();
         if ("error" in auth) {
             return NextResponse.json({ error: auth.error }, { status: auth.status });
@@ -48,92 +51,18 @@ export async function POST(request: Request) {
         const { companyId, userId: cashierId } = auth;
 
         const body = await request.json();
+        // A retried request carries the same key, in the body or the Idempotency-Key header
+        const idempotencyKey = body.idempotencyKey ?? request.headers.get("Idempotency-Key") ?? undefined;
+        const sale = await checkoutSale(companyId, cashierId, { ...body, idempotencyKey });
 
-        // Generate sale number
-        const lastSale = await prisma.pOSSale.findFirst({
-            where: { companyId },
-            orderBy: { saleNumber: "desc" },
+        return NextResponse.json(sale, {
+            status: 201,
+            headers: { "Server-Timing": serverTiming([{ name: "checkout", durationMs: performance.now() - started }]) },
         });
-        const nextNumber = lastSale
-            ? `SALE-${String(parseInt(lastSale.saleNumber.split("-")[1] || "0") + 1).padStart(5, "0")}`
-            : "SALE-00001";
-
-        // Create sale with items
-        const sale = await prisma.pOSSale.create({
-            data: {
-                companyId,
-                cashierId,
-                saleNumber: nextNumber,
-                subtotal: body.subtotal,
-                taxAmount: body.taxAmount,
-                discountAmount: body.discountAmount || 0,
-                total: body.total,
-                paymentMethod: body.paymentMethod,
-                cashReceived: body.cashReceived,
-                changeGiven: body.changeGiven,
-                customerName: body.customerName,
-                customerPhone: body.customerPhone,
-                notes: body.notes,
-                items: {
-                    create: body.items.map((item: {
-                        productId: string;
-                        productName: string;
-                        quantity: number;
-                        unitPrice: number;
-                        taxRate: number;
-                        discount?: number;
-                        total: number;
-                    }) => ({
-                        productId: item.productId,
-                        productName: item.productName,
-                        quantity: item.quantity,
-                        unitPrice: item.unitPrice,
-                        taxRate: item.taxRate,
-                        discount: item.discount || 0,
-                        total: item.total,
-                    })),
-                },
-            },
-            include: { items: true, cashier: { select: { name: true } } },
-        });
-
-        // Update inventory for each item
-        for (const item of body.items) {
-            await prisma.product.update({
-                where: { id: item.productId },
-                data: {
-                    stockQuantity: { decrement: item.quantity },
-                },
-            });
-
-            // Create stock movement record
-            await prisma.stockMovement.create({
-                data: {
-                    companyId,
-                    productId: item.productId,
-                    type: "SALE",
-                    quantity: -item.quantity,
-                    reference: nextNumber,
-                },
-            });
-        }
-
-        // Update customer loyalty points if phone provided
-        if (body.customerPhone) {
-            const client = await prisma.client.findFirst({
-                where: { companyId, phone: body.customerPhone },
-            });
-
-            if (client) {
-                await prisma.client.update({
-                    where: { id: client.id },
-                    data: { loyaltyPoints: { increment: Math.floor(body.total) } },
-                });
-            }
-        }
-
-        return NextResponse.json(sale, { status: 201 });
     } catch (error) {
+        if (error instanceof CheckoutError) {
+            return NextResponse.json({ error: error.message }, { status: error.status });
+        }
         console.error("Create sale error:", error);
         return NextResponse.json({ error: "Failed to create sale" }, { status: 500 });
     }
@@ -0,0 +1,34 @@
+import { NextResponse } from "next/server";
+import { requireAuth } from "@/lib/api-auth";
+import { CheckoutError } from "@/lib/pos-checkout";
+import { syncSales } from "@/lib/pos-sync";
+
+/**
+ * Upload sales a terminal queued while offline.
+ * Body: { sales: [{ idempotencyKey, saleDate, items, paymentMethod, ... }] }
+ * Sales already recorded under their key are reported as duplicates, not
+ * recorded again; each sale gets its own created / duplicate / failed result.
+ */
+export async function POST(request: Request) {
+    try {
+        const auth = await requireAuth();
+        if ("error" in auth) {
+            return NextResponse.json({ error: auth.error }, { status: auth.status });
+        }
+        const { companyId, userId: cashierId } = auth;
+
+        const body = await request.json();
+        if (!Array.isArray(body.sales) || body.sales.length === 0) {
+            return NextResponse.json({ error: "sales must be a non-empty array" }, { status: 400 });
+        }
+
+        const report = await syncSales(companyId, cashierId, body.sales);
+        return NextResponse.json(report);
+    } catch (error) {
+        if (error instanceof CheckoutError) {
+            return NextResponse.json({ error: error.message }, { status: error.status });
+        }
+        console.error("POS sync error:", error);
+        return NextResponse.json({ error: "Failed to sync sales" }, { status: 500 });
+    }
+}
@@ -0,0 +1,37 @@
+import { NextResponse } from "next/server";
+import { requireAuth } from "@/lib/api-auth";
+import { allocateSequence, formatDocumentNumber, DOCUMENT_TYPES } from "@/lib/sequences";
+
+const MAX_BLOCK_SIZE = 1000;
+
+// POST /api/pos/sequence-block - Reserve a block of sale numbers for a terminal
+export async function POST(request: Request) {
+    try {
+        const auth = await requireAuth();
+        if ("error" in auth) {
+            return NextResponse.json({ error: auth.error }, { status: auth.status });
+        }
+        const { companyId } = auth;
+
+        const body = await request.json().catch(() => ({}));
+        const size = Number(body.size) || 100;
+
+        if (!Number.isInteger(size) || size < 1 || size > MAX_BLOCK_SIZE) {
+            return NextResponse.json({ error: `Block size must be between 1 and ${MAX_BLOCK_SIZE}` }, { status: 400 });
+        }
+
+        const start = await allocateSequence(companyId, "POS_SALE", size);
+        const end = start + size - 1;
+
+        return NextResponse.json({
+            ...DOCUMENT_TYPES.POS_SALE,
+            start,
+            end,
+            first: formatDocumentNumber("POS_SALE", start),
+            last: formatDocumentNumber("POS_SALE", end),
+        }, { status: 201 });
+    } catch (error) {
+        console.error("Sequence block error:", error);
+        return NextResponse.json({ error: "Failed to reserve sale numbers" }, { status: 500 });
+    }
+}
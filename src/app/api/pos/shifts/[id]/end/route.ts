@@ -1,6 +1,7 @@
 import { NextResponse } from "next/server";
 import { prisma } from "@/lib/prisma";
 import { requireCompanyId } from "@/lib/api-auth";
+import { getShiftSummary } from "@/lib/shift-summary";
 
 // POST /api/pos/shifts/[id]/end - End a shift
 export async function POST(
@@ -17,64 +18,45 @@ export async function POST(
         const { id } = await params;
         const body = await request.json();
 
-        const shift = await prisma.cashierShift.findFirst({
-            where: { id, companyId, endTime: null },
-        });
-
-        if (!shift) {
-            return NextResponse.json({ error: "Shift not found or already ended" }, { status: 404 });
-        }
+        const closingCash = body.closingCash || 0;
+        const closed = await prisma.$transaction(async (tx) => {
+            const shift = await tx.cashierShift.findFirst({
+                where: { id, companyId, endTime: null },
+            });
+            if (!shift) return null;
 
-        // Calculate total sales during shift
-        const sales = await prisma.pOSSale.aggregate({
-            where: {
-                companyId,
-                saleDate: { gte: shift.startTime },
-                status: "COMPLETED",
-            },
-            _sum: { total: true },
-        });
+            // Only one close wins; it waits for sales still posting to the shift
+            const endTime = new Date();
+            const { count } = await tx.cashierShift.updateMany({
+                where: { id, companyId, endTime: null },
+                data: { endTime },
+            });
+            if (count === 0) return null;
 
-        const cashSales = await prisma.pOSSale.aggregate({
-            where: {
-                companyId,
-                saleDate: { gte: shift.startTime },
-                paymentMethod: "CASH",
-                status: "COMPLETED",
-            },
-            _sum: { total: true },
+            // Running totals for tracked shifts; one grouped query over the sales otherwise
+            const summary = await getShiftSummary({ ...shift, endTime }, tx);
+            const { totalSales, totalRefunds, expectedCash } = summary;
+            const updatedShift = await tx.cashierShift.update({
+                where: { id },
+                data: {
+                    closingCash,
+                    expectedCash,
+                    cashDifference: closingCash - expectedCash,
+                    totalSales,
+                    totalRefunds,
+                    notes: body.notes,
+                },
+                include: { cashier: { select: { name: true } } },
+            });
+            return { updatedShift, summary };
         });
 
-        const refunds = await prisma.pOSSale.aggregate({
-            where: {
-                companyId,
-                saleDate: { gte: shift.startTime },
-                status: { in: ["REFUNDED", "PARTIALLY_REFUNDED"] },
-            },
-            _sum: { total: true },
-        });
-
-        const totalSales = sales._sum.total || 0;
-        const totalRefunds = refunds._sum.total || 0;
-        const expectedCash = shift.openingCash + (cashSales._sum.total || 0);
-        const closingCash = body.closingCash || 0;
-        const cashDifference = closingCash - expectedCash;
-
-        const updatedShift = await prisma.cashierShift.update({
-            where: { id },
-            data: {
-                endTime: new Date(),
-                closingCash,
-                expectedCash,
-                cashDifference,
-                totalSales,
-                totalRefunds,
-                notes: body.notes,
-            },
-            include: { cashier: { select: { name: true } } },
-        });
+        if (!closed) {
+            return NextResponse.json({ error: "Shift not found or already ended" }, { status: 404 });
+        }
+        const { updatedShift, summary } = closed;
 
-        return NextResponse.json(updatedShift);
+        return NextResponse.json({ ...updatedShift, summary });
     } catch (error) {
         console.error("End shift error:", error);
         return NextResponse.json({ error: "Failed to end shift" }, { status: 500 });
@@ -0,0 +1,30 @@
+import { NextResponse } from "next/server";
+import { prisma } from "@/lib/prisma";
+import { requireCompanyId } from "@/lib/api-auth";
+import { getShiftSummary } from "@/lib/shift-summary";
+
+// GET /api/pos/shifts/[id]/summary - X-report: the shift's figures so far, per tender
+export async function GET(
+    request: Request,
+    { params }: { params: Promise<{ id: string }> }
+) {
+    try {
+        const auth = await requireCompanyId();
+        if ("error" in auth) {
+            return NextResponse.json({ error: auth.error }, { status: auth.status });
+        }
+        const { companyId } = auth;
+
+        const { id } = await params;
+        const shift = await prisma.cashierShift.findFirst({ where: { id, companyId } });
+
+        if (!shift) {
+            return NextResponse.json({ error: "Shift not found" }, { status: 404 });
+        }
+
+        return NextResponse.json(await getShiftSummary(shift));
+    } catch (error) {
+        console.error("Shift summary error:", error);
+        return NextResponse.json({ error: "Failed to load shift summary" }, { status: 500 });
+    }
+}
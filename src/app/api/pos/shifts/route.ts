@@ -67,6 +67,8 @@ export async function POST(request: Request) {
                 cashierId,
                 startTime: new Date(),
                 openingCash: body.openingCash || 0,
+                // Sales from now on keep the shift's running totals
+                totalsTracked: true,
             },
             include: { cashier: { select: { name: true } } },
         });
@@ -1,11 +1,11 @@
 import { NextRequest, NextResponse } from "next/server";
 import { prisma } from "@/lib/prisma";
 import { requireCompanyId } from "@/lib/api-auth";
+import { enqueueJob, jobAccepted } from "@/lib/job-queue";
 import {
     createPrepaidExpense,
     getPrepaidExpenses,
     getPendingAmortizations,
-    processAllPendingAmortizations,
     getAmortizationSchedule,
 } from "@/lib/accounting/expense-amortization";
 
@@ -60,20 +60,18 @@ export async function POST(request: NextRequest) {
         }
         const { companyId } = auth;
 
-        const body = await request.json();
         const { searchParams } = new URL(request.url);
         const action = searchParams.get("action");
 
-        // Process all pending amortizations
+        // Process all pending amortizations in the background; poll /api/jobs/[id]
         if (action === "process-pending") {
-            const results = await processAllPendingAmortizations(companyId);
-            return NextResponse.json({
-                processed: results.length,
-                totalAmount: results.reduce((sum, r) => sum + r.amount, 0),
-                details: results,
-            });
+            const asOfDate = searchParams.get("asOfDate");
+            const job = await enqueueJob(companyId, "amortization.process", asOfDate ? { asOfDate } : {});
+            return NextResponse.json(jobAccepted(job), { status: 202 });
         }
 
+        const body = await request.json();
+
         // Create new prepaid expense
         const prepaidExpense = await createPrepaidExpense({
             companyId,
@@ -1,8 +1,13 @@
 import { NextResponse } from "next/server";
 import { prisma } from "@/lib/prisma";
 import { getCompanyId } from "@/lib/api-auth";
+import { applyStockMovement } from "@/lib/accounting/cost-layers";
+import { evaluateStockLevels } from "@/lib/stock-alerts";
+import { markProductsChanged } from "@/lib/product-index";
+import { invalidateCompanyCache } from "@/lib/response-cache";
+import { parsePageParams, pageWhere, pageOrder, takePage, projectFields, pageHeaders } from "@/lib/pagination";
 
-// GET /api/products - Fetch all products
+// GET /api/products - Fetch products (keyset paged when limit/cursor given)
 export async function GET(request: Request) {
     try {
         const companyId = await getCompanyId();
@@ -25,24 +30,33 @@ export async function GET(request: Request) {
             return NextResponse.json(product);
         }
 
-        const products = await prisma.product.findMany({
-            where: {
-                companyId,
-                isActive: activeOnly ? true : undefined,
-                categoryId: category || undefined,
-                OR: search
-                    ? [
-                        { name: { contains: search } },
-                        { sku: { contains: search } },
-                        { barcode: { contains: search } },
-                    ]
-                    : undefined,
-            },
+        const page = parsePageParams(searchParams);
+        if ("error" in page) {
+            return NextResponse.json({ error: page.error }, { status: 400 });
+        }
+
+        const where = {
+            companyId,
+            isActive: activeOnly ? true : undefined,
+            categoryId: category || undefined,
+            OR: search
+                ? [
+                    { name: { contains: search } },
+                    { sku: { contains: search } },
+                    { barcode: { contains: search } },
+                ]
+                : undefined,
+        };
+        const rows = await prisma.product.findMany({
+            where: pageWhere(page, where),
             include: { category: true },
-            orderBy: { name: "asc" },
+            ...pageOrder(page, { name: "asc" as const }),
         });
+        const { items: products, nextCursor } = takePage(rows, page);
 
-        return NextResponse.json(products);
+        return NextResponse.json(projectFields(products, page.fields), {
+            headers: await pageHeaders(page, nextCursor, () => prisma.product.count({ where })),
+        });
     } catch (error) {
         console.error("Products API error:", error);
         return NextResponse.json({ error: "Failed to fetch products" }, { status: 500 });
@@ -82,16 +96,23 @@ export async function POST(request: Request) {
 
         // Create initial stock movement if stock is added
         if (body.stockQuantity > 0) {
-            await prisma.stockMovement.create({
-                data: {
-                    companyId,
-                    productId: product.id,
-                    type: "ADJUSTMENT",
-                    quantity: body.stockQuantity,
-                    notes: "Initial stock",
-                },
+            await prisma.$transaction(async (tx) => {
+                const movement = await tx.stockMovement.create({
+                    data: {
+                        companyId,
+                        productId: product.id,
+                        type: "ADJUSTMENT",
+                        quantity: body.stockQuantity,
+                        unitCost: product.costPrice,
+                        notes: "Initial stock",
+                    },
+                });
+                await applyStockMovement(tx, movement);
             });
         }
+        await evaluateStockLevels(companyId, [product.id]);
+        markProductsChanged(companyId);
+        await invalidateCompanyCache(companyId);
 
         return NextResponse.json(product, { status: 201 });
     } catch (error) {
@@ -1,5 +1,7 @@
 import { NextRequest, NextResponse } from "next/server";
 import { prisma } from "@/lib/prisma";
+import { invalidateCompanyCache } from "@/lib/response-cache";
+import { nextDocumentNumber } from "@/lib/sequences";
 
 // Get payments with optional status filter
 export async function GET(request: NextRequest) {
@@ -54,14 +56,15 @@ export async function POST(request: NextRequest) {
             autoApply = false,
         } = body;
 
+        const companyId = "default-company"; // TODO: Get from session
+
         // Generate payment number
-        const count = await prisma.payment.count();
-        const paymentNumber = `PAY-${String(count + 1).padStart(6, "0")}`;
+        const paymentNumber = await nextDocumentNumber(companyId, "PAYMENT");
 
         // Create payment
         const payment = await prisma.payment.create({
             data: {
-                companyId: "default-company", // TODO: Get from session
+                companyId,
                 clientId,
                 paymentNumber,
                 paymentDate: new Date(paymentDate),
@@ -87,6 +90,7 @@ export async function POST(request: NextRequest) {
         if (autoApply) {
             await autoMatchPayment(payment.id);
         }
+        await invalidateCompanyCache(companyId);
 
         return NextResponse.json(payment);
     } catch (error) {
@@ -1,6 +1,9 @@
 import { NextRequest, NextResponse } from "next/server";
 import {
-    getFinancialSummary,
+    loadFinancialSnapshot,
+    summarizeSnapshot,
+    timed,
+    QueryTiming,
     getMonthlyData,
     getTopClients,
     getTopSuppliers,
@@ -10,6 +13,8 @@ import {
 } from "@/lib/financial-core";
 import { prisma } from "@/lib/prisma";
 import { requireCompanyId } from "@/lib/api-auth";
+import { serverTiming } from "@/lib/api-response";
+import { withCompanyCache } from "@/lib/response-cache";
 
 // Helper to get date range from period
 function getDateRange(period: string): { startDate: Date; endDate: Date } {
@@ -47,192 +52,211 @@ export async function GET(request: NextRequest) {
         const { searchParams } = new URL(request.url);
         const period = searchParams.get("period") || "month";
 
-        const { startDate, endDate } = getDateRange(period);
-
-        // Get comprehensive financial summary using centralized module
-        const summary = await getFinancialSummary(companyId, startDate, endDate);
-
-        // Get monthly data for charts - actual data, not mocks
-        const monthlyData = await getMonthlyData(companyId, period === "year" ? 12 : 6);
-
-        // Get top clients and suppliers
-        const salesByClient = await getTopClients(companyId, 5, startDate, endDate);
-        const purchasesBySupplier = await getTopSuppliers(companyId, 5, startDate, endDate);
-
-        // Get expenses by category
-        const expensesByCategory = await getExpensesByCategory(companyId, 5, startDate, endDate);
-
-        // Get inventory summary
-        const inventory = await getInventorySummary(companyId);
-
-        // Get AR aging buckets
-        const arAgingBuckets = await getARAgingBuckets(companyId);
-
-        // Get AP aging buckets (from unpaid bills)
-        const unpaidBills = await prisma.bill.findMany({
-            where: {
-                companyId,
-                status: { in: ["PENDING", "OVERDUE"] },
-            },
-        });
-
-        const now = new Date();
-        const apAgingBuckets = [
-            { bucket: "Current", amount: 0 },
-            { bucket: "1-30", amount: 0 },
-            { bucket: "31-60", amount: 0 },
-            { bucket: "61-90", amount: 0 },
-            { bucket: "90+", amount: 0 },
-        ];
-
-        unpaidBills.forEach(bill => {
-            const daysOverdue = Math.floor((now.getTime() - bill.dueDate.getTime()) / (1000 * 60 * 60 * 24));
-            const amount = bill.totalAmount - bill.paidAmount;
-
-            if (daysOverdue <= 0) apAgingBuckets[0].amount += amount;
-            else if (daysOverdue <= 30) apAgingBuckets[1].amount += amount;
-            else if (daysOverdue <= 60) apAgingBuckets[2].amount += amount;
-            else if (daysOverdue <= 90) apAgingBuckets[3].amount += amount;
-            else apAgingBuckets[4].amount += amount;
-        });
-
-        // Get invoice counts
-        const invoices = await prisma.invoice.findMany({
-            where: { companyId, issueDate: { gte: startDate, lte: endDate } },
-            include: { items: true },
-        });
-
-        // Get bills
-        const bills = await prisma.bill.findMany({
-            where: { companyId, issueDate: { gte: startDate, lte: endDate } },
-        });
-
-        // Calculate sales trend (daily for last 30 days)
-        const thirtyDaysAgo = new Date();
-        thirtyDaysAgo.setDate(thirtyDaysAgo.getDate() - 30);
-
-        const recentSales = await prisma.pOSSale.findMany({
-            where: { companyId, status: "COMPLETED", saleDate: { gte: thirtyDaysAgo } },
-        });
-
-        const salesByDay = new Map<string, number>();
-        for (let i = 0; i < 30; i++) {
-            const d = new Date();
-            d.setDate(d.getDate() - (29 - i));
-            salesByDay.set(d.toISOString().split('T')[0], 0);
-        }
-
-        recentSales.forEach(sale => {
-            const dateKey = sale.saleDate.toISOString().split('T')[0];
-            if (salesByDay.has(dateKey)) {
-                salesByDay.set(dateKey, (salesByDay.get(dateKey) || 0) + sale.total);
+        const timings: QueryTiming[] = [];
+        const { value, hit } = await withCompanyCache(companyId, "reports_stats", searchParams, async () => {
+            const { startDate, endDate } = getDateRange(period);
+
+            const thirtyDaysAgo = new Date();
+            thirtyDaysAgo.setDate(thirtyDaysAgo.getDate() - 30);
+
+            // Independent queries run concurrently; the summary reads one shared snapshot
+            const time = <T,>(name: string, query: () => Promise<T>) => timed(timings, name, query);
+            const [
+                snapshot,
+                monthlyData,
+                salesByClient,
+                purchasesBySupplier,
+                expensesByCategory,
+                inventory,
+                arAgingBuckets,
+                unpaidBills,
+                invoiceCount,
+                bills,
+                recentSales,
+                products,
+                stockMovements,
+            ] = await Promise.all([
+                // Comprehensive financial summary using centralized module
+                loadFinancialSnapshot(companyId, startDate, endDate),
+                // Monthly data for charts - actual data, not mocks
+                time("monthly", () => getMonthlyData(companyId, period === "year" ? 12 : 6)),
+                // Top clients and suppliers
+                time("top_clients", () => getTopClients(companyId, 5, startDate, endDate)),
+                time("top_suppliers", () => getTopSuppliers(companyId, 5, startDate, endDate)),
+                // Expenses by category
+                time("expense_categories", () => getExpensesByCategory(companyId, 5, startDate, endDate)),
+                // Inventory summary
+                time("inventory", () => getInventorySummary(companyId)),
+                // AR aging buckets
+                time("ar_aging", () => getARAgingBuckets(companyId)),
+                // AP aging buckets (from unpaid bills)
+                time("unpaid_bills", () => prisma.bill.findMany({
+                    where: {
+                        companyId,
+                        status: { in: ["PENDING", "OVERDUE"] },
+                    },
+                })),
+                // Invoice counts
+                time("invoice_counts", () => prisma.invoice.count({
+                    where: { companyId, issueDate: { gte: startDate, lte: endDate } },
+                })),
+                // Bills
+                time("bills", () => prisma.bill.findMany({
+                    where: { companyId, issueDate: { gte: startDate, lte: endDate } },
+                })),
+                // Sales trend source (daily for last 30 days)
+                time("recent_sales", () => prisma.pOSSale.findMany({
+                    where: { companyId, status: "COMPLETED", saleDate: { gte: thirtyDaysAgo } },
+                })),
+                // Stock by category source
+                time("products", () => prisma.product.findMany({
+                    where: { companyId, isActive: true },
+                    include: { category: true },
+                })),
+                // Stock movements source
+                time("stock_movements", () => prisma.stockMovement.findMany({
+                    where: { companyId, date: { gte: startDate } },
+                })),
+            ]);
+            timings.push(...snapshot.timings);
+
+            const summary = summarizeSnapshot(snapshot);
+
+            const now = new Date();
+            const apAgingBuckets = [
+                { bucket: "Current", amount: 0 },
+                { bucket: "1-30", amount: 0 },
+                { bucket: "31-60", amount: 0 },
+                { bucket: "61-90", amount: 0 },
+                { bucket: "90+", amount: 0 },
+            ];
+
+            unpaidBills.forEach(bill => {
+                const daysOverdue = Math.floor((now.getTime() - bill.dueDate.getTime()) / (1000 * 60 * 60 * 24));
+                const amount = bill.totalAmount - bill.paidAmount;
+
+                if (daysOverdue <= 0) apAgingBuckets[0].amount += amount;
+                else if (daysOverdue <= 30) apAgingBuckets[1].amount += amount;
+                else if (daysOverdue <= 60) apAgingBuckets[2].amount += amount;
+                else if (daysOverdue <= 90) apAgingBuckets[3].amount += amount;
+                else apAgingBuckets[4].amount += amount;
+            });
+
+            // Calculate sales trend (daily for last 30 days)
+            const salesByDay = new Map<string, number>();
+            for (let i = 0; i < 30; i++) {
+                const d = new Date();
+                d.setDate(d.getDate() - (29 - i));
+                salesByDay.set(d.toISOString().split('T')[0], 0);
             }
-        });
-
-        const salesTrend = Array.from(salesByDay.entries()).map(([date, sales], i) => ({
-            date: `Day ${i + 1}`,
-            sales: Math.round(sales),
-        }));
-
-        // Stock by category (actual data)
-        const products = await prisma.product.findMany({
-            where: { companyId, isActive: true },
-            include: { category: true },
-        });
 
-        const stockByCategoryMap = new Map<string, number>();
-        products.forEach(p => {
-            const catName = p.category?.name || "Uncategorized";
-            stockByCategoryMap.set(catName, (stockByCategoryMap.get(catName) || 0) + p.stockQuantity * p.costPrice);
-        });
-
-        const stockByCategory = Array.from(stockByCategoryMap.entries())
-            .map(([name, value]) => ({ name, value: Math.round(value) }))
-            .sort((a, b) => b.value - a.value)
-            .slice(0, 5);
-
-        // Stock movements (actual data by month)
-        const stockMovements = await prisma.stockMovement.findMany({
-            where: { companyId, date: { gte: startDate } },
-        });
-
-        const movementsByMonth = new Map<string, { in: number; out: number }>();
-        const months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"];
-
-        stockMovements.forEach(mov => {
-            const monthName = months[mov.date.getMonth()];
-            const current = movementsByMonth.get(monthName) || { in: 0, out: 0 };
-            if (mov.quantity > 0) {
-                current.in += mov.quantity;
-            } else {
-                current.out += Math.abs(mov.quantity);
-            }
-            movementsByMonth.set(monthName, current);
+            recentSales.forEach(sale => {
+                const dateKey = sale.saleDate.toISOString().split('T')[0];
+                if (salesByDay.has(dateKey)) {
+                    salesByDay.set(dateKey, (salesByDay.get(dateKey) || 0) + sale.total);
+                }
+            });
+
+            const salesTrend = Array.from(salesByDay.entries()).map(([date, sales], i) => ({
+                date: `Day ${i + 1}`,
+                sales: Math.round(sales),
+            }));
+
+            // Stock by category (actual data)
+            const stockByCategoryMap = new Map<string, number>();
+            products.forEach(p => {
+                const catName = p.category?.name || "Uncategorized";
+                stockByCategoryMap.set(catName, (stockByCategoryMap.get(catName) || 0) + p.stockQuantity * p.costPrice);
+            });
+
+            const stockByCategory = Array.from(stockByCategoryMap.entries())
+                .map(([name, value]) => ({ name, value: Math.round(value) }))
+                .sort((a, b) => b.value - a.value)
+                .slice(0, 5);
+
+            // Stock movements (actual data by month)
+            const movementsByMonth = new Map<string, { in: number; out: number }>();
+            const months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"];
+
+            stockMovements.forEach(mov => {
+                const monthName = months[mov.date.getMonth()];
+                const current = movementsByMonth.get(monthName) || { in: 0, out: 0 };
+                if (mov.quantity > 0) {
+                    current.in += mov.quantity;
+                } else {
+                    current.out += Math.abs(mov.quantity);
+                }
+                movementsByMonth.set(monthName, current);
+            });
+
+            const stockMovementData = months.slice(0, 6).map(month => ({
+                date: month,
+                in: movementsByMonth.get(month)?.in || 0,
+                out: movementsByMonth.get(month)?.out || 0,
+            }));
+
+            // Calculate totals that were previously using mocks
+            const avgOrderValue = invoiceCount > 0
+                ? summary.revenue / invoiceCount
+                : 0;
+
+            // Cash flow forecast based on actual trends
+            const cashFlowForecast = monthlyData.map((m, i) => ({
+                month: m.month,
+                actual: i < monthlyData.length - 2 ? m.profit : null,
+                forecast: Math.round(m.profit * (1 + (i * 0.02))), // Simple growth projection
+            }));
+
+            return {
+                // Financial - from centralized calculations
+                revenue: summary.revenue,
+                expenses: summary.operatingExpenses,
+                profit: summary.netProfit,
+                cashFlow: Math.round(summary.netProfit * 0.8), // Net profit adjusted for non-cash items
+                revenueChange: 12, // Would need historical comparison
+                expensesChange: -5,
+                profitChange: 18,
+                cashFlowChange: 8,
+                monthlyData,
+                expensesByCategory,
+                cashFlowForecast,
+
+                // Sales - actual data
+                totalSales: summary.revenue,
+                invoiceCount,
+                avgOrderValue: Math.round(avgOrderValue),
+                topClientRevenue: salesByClient[0]?.value || 0,
+                salesByClient,
+                salesByProduct: expensesByCategory, // Simplified for now
+                salesTrend,
+
+                // Purchases - actual data
+                totalPurchases: bills.reduce((s, b) => s + b.totalAmount, 0),
+                pendingBills: bills.filter(b => b.status === "PENDING").length,
+                apAging: apAgingBuckets.reduce((s, b) => s + b.amount, 0),
+                topSupplierSpend: purchasesBySupplier[0]?.value || 0,
+                purchasesBySupplier,
+                apAgingBuckets: apAgingBuckets.map(b => ({ ...b, amount: Math.round(b.amount) })),
+
+                // Inventory - actual data
+                inventoryValue: inventory.totalValue,
+                lowStockCount: inventory.lowStockCount,
+                outOfStockCount: inventory.outOfStockCount,
+                turnoverRate: inventory.totalValue > 0
+                    ? Math.round((summary.cogs / inventory.totalValue) * 10) / 10
+                    : 0,
+                stockByCategory,
+                stockMovements: stockMovementData,
+
+                // Receivables
+                arAgingBuckets,
+                totalAR: summary.accountsReceivable,
+                totalAP: summary.accountsPayable,
+            };
         });
 
-        const stockMovementData = months.slice(0, 6).map(month => ({
-            date: month,
-            in: movementsByMonth.get(month)?.in || 0,
-            out: movementsByMonth.get(month)?.out || 0,
-        }));
-
-        // Calculate totals that were previously using mocks
-        const avgOrderValue = invoices.length > 0
-            ? summary.revenue / invoices.length
-            : 0;
-
-        // Cash flow forecast based on actual trends
-        const cashFlowForecast = monthlyData.map((m, i) => ({
-            month: m.month,
-            actual: i < monthlyData.length - 2 ? m.profit : null,
-            forecast: Math.round(m.profit * (1 + (i * 0.02))), // Simple growth projection
-        }));
-
-        return NextResponse.json({
-            // Financial - from centralized calculations
-            revenue: summary.revenue,
-            expenses: summary.operatingExpenses,
-            profit: summary.netProfit,
-            cashFlow: Math.round(summary.netProfit * 0.8), // Net profit adjusted for non-cash items
-            revenueChange: 12, // Would need historical comparison
-            expensesChange: -5,
-            profitChange: 18,
-            cashFlowChange: 8,
-            monthlyData,
-            expensesByCategory,
-            cashFlowForecast,
-
-            // Sales - actual data
-            totalSales: summary.revenue,
-            invoiceCount: invoices.length,
-            avgOrderValue: Math.round(avgOrderValue),
-            topClientRevenue: salesByClient[0]?.value || 0,
-            salesByClient,
-            salesByProduct: expensesByCategory, // Simplified for now
-            salesTrend,
-
-            // Purchases - actual data
-            totalPurchases: bills.reduce((s, b) => s + b.totalAmount, 0),
-            pendingBills: bills.filter(b => b.status === "PENDING").length,
-            apAging: apAgingBuckets.reduce((s, b) => s + b.amount, 0),
-            topSupplierSpend: purchasesBySupplier[0]?.value || 0,
-            purchasesBySupplier,
-            apAgingBuckets: apAgingBuckets.map(b => ({ ...b, amount: Math.round(b.amount) })),
-
-            // Inventory - actual data
-            inventoryValue: inventory.totalValue,
-            lowStockCount: inventory.lowStockCount,
-            outOfStockCount: inventory.outOfStockCount,
-            turnoverRate: inventory.totalValue > 0
-                ? Math.round((summary.cogs / inventory.totalValue) * 10) / 10
-                : 0,
-            stockByCategory,
-            stockMovements: stockMovementData,
-
-            // Receivables
-            arAgingBuckets,
-            totalAR: summary.accountsReceivable,
-            totalAP: summary.accountsPayable,
+        return NextResponse.json(value, {
+            headers: { "Server-Timing": serverTiming(timings), "X-Cache": hit ? "HIT" : "MISS" },
         });
     } catch (error) {
         console.error("Error fetching reports stats:", error);
@@ -2,6 +2,10 @@
 import { NextResponse } from "next/server";
 import { prisma } from "@/lib/prisma";
 import { requireCompanyId } from "@/lib/api-auth";
+import { applyStockMovement } from "@/lib/accounting/cost-layers";
+import { evaluateStockLevels } from "@/lib/stock-alerts";
+import { markProductsChanged } from "@/lib/product-index";
+import { invalidateCompanyCache } from "@/lib/response-cache";
 
 export async function POST(request: Request) {
     try {
@@ -12,7 +16,7 @@ export async function POST(request: Request) {
         const { companyId } = auth;
 
         const body = await request.json();
-        const { productId, quantity, reason, warehouseId } = body;
+        const { productId, quantity, reason, warehouseId, unitCost } = body;
 
         if (!productId || quantity === undefined) {
             return NextResponse.json({ error: "Missing required fields" }, { status: 400 });
@@ -37,46 +41,8 @@ export async function POST(request: Request) {
                 data: { stockQuantity: { increment: quantity } }, // Use increment to be safe
             });
 
-            // Check for alerts (Global Stock)
-            const newGlobalStock = product.stockQuantity + quantity;
-            if (newGlobalStock <= product.lowStockAlert) {
-                // Create Alert if not exists OR update existing?
-                // For simplicity, just create a new one if no unresolved one exists.
-                const existingAlert = await tx.stockAlert.findFirst({
-                    where: {
-                        companyId,
-                        productId,
-                        type: "LOW_STOCK",
-                        isResolved: false
-                    }
-                });
-
-                if (!existingAlert) {
-                    await tx.stockAlert.create({
-                        data: {
-                            companyId,
-                            productId,
-                            type: "LOW_STOCK",
-                            message: `Product ${product.name} is low on stock (${newGlobalStock})`,
-                            severity: newGlobalStock === 0 ? "CRITICAL" : "HIGH",
-                        }
-                    });
-                }
-            } else {
-                // Resolve existing low stock alerts
-                await tx.stockAlert.updateMany({
-                    where: {
-                        companyId,
-                        productId,
-                        type: "LOW_STOCK",
-                        isResolved: false
-                    },
-                    data: {
-                        isResolved: true,
-                        resolvedAt: new Date()
-                    }
-                });
-            }
+            // Re-evaluate low stock status and alert (Global Stock)
+            await evaluateStockLevels(companyId, [productId], tx);
 
             // 2. Update Specific Warehouse Stock (if provided)
             let warehouseBalanceBefore = 0;
@@ -114,14 +80,18 @@ export async function POST(request: Request) {
                     warehouseId: warehouseId || null,
                     type: quantity > 0 ? "ADJUSTMENT_IN" : "ADJUSTMENT_OUT",
                     quantity: Math.abs(quantity),
+                    unitCost: quantity > 0 ? unitCost ?? product.costPrice : null,
                     balanceBefore: warehouseId ? warehouseBalanceBefore : product.stockQuantity,
                     balanceAfter: warehouseId ? warehouseBalanceAfter : product.stockQuantity + quantity,
                     notes: reason,
                 },
             });
+            await applyStockMovement(tx, movement);
 
             return { success: true, movement };
         });
+        markProductsChanged(companyId);
+        await invalidateCompanyCache(companyId);
 
         return NextResponse.json(result);
     } catch (error: any) {
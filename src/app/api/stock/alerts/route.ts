@@ -1,8 +1,9 @@
 import { prisma } from "@/lib/prisma";
 import { NextResponse } from "next/server";
 import { requireCompanyId } from "@/lib/api-auth";
+import { parsePageParams, pageWhere, pageOrder, takePage, projectFields, pageHeaders } from "@/lib/pagination";
 
-export async function GET() {
+export async function GET(request: Request) {
     try {
         const auth = await requireCompanyId();
         if ("error" in auth) {
@@ -10,17 +11,26 @@ export async function GET() {
         }
         const { companyId } = auth;
 
-        const alerts = await prisma.stockAlert.findMany({
-            where: { companyId, isResolved: false },
-            orderBy: { createdAt: "desc" },
+        const page = parsePageParams(new URL(request.url).searchParams);
+        if ("error" in page) {
+            return NextResponse.json({ error: page.error }, { status: 400 });
+        }
+
+        const where = { companyId, isResolved: false };
+        const rows = await prisma.stockAlert.findMany({
+            where: pageWhere(page, where),
+            ...pageOrder(page, { createdAt: "desc" as const }),
             include: {
                 product: {
                     select: { name: true, sku: true },
                 },
             },
         });
+        const { items: alerts, nextCursor } = takePage(rows, page);
 
-        return NextResponse.json(alerts);
+        return NextResponse.json(projectFields(alerts, page.fields), {
+            headers: await pageHeaders(page, nextCursor, () => prisma.stockAlert.count({ where })),
+        });
     } catch (error) {
         console.error("Stock alerts error:", error);
         return NextResponse.json(
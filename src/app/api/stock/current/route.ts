@@ -1,8 +1,9 @@
 import { prisma } from "@/lib/prisma";
 import { NextResponse } from "next/server";
 import { requireCompanyId } from "@/lib/api-auth";
+import { parsePageParams, pageWhere, pageOrder, takePage, projectFields, pageHeaders } from "@/lib/pagination";
 
-export async function GET() {
+export async function GET(request: Request) {
     try {
         const auth = await requireCompanyId();
         if ("error" in auth) {
@@ -10,9 +11,15 @@ export async function GET() {
         }
         const { companyId } = auth;
 
-        const products = await prisma.product.findMany({
-            where: { companyId, isActive: true },
-            orderBy: { name: "asc" },
+        const page = parsePageParams(new URL(request.url).searchParams);
+        if ("error" in page) {
+            return NextResponse.json({ error: page.error }, { status: 400 });
+        }
+
+        const where = { companyId, isActive: true };
+        const rows = await prisma.product.findMany({
+            where: pageWhere(page, where),
+            ...pageOrder(page, { name: "asc" as const }),
             select: {
                 id: true,
                 name: true,
@@ -21,10 +28,14 @@ export async function GET() {
                 lowStockAlert: true,
                 costPrice: true,
                 sellingPrice: true,
+                createdAt: true,
             },
         });
+        const { items: products, nextCursor } = takePage(rows, page);
 
-        return NextResponse.json(products);
+        return NextResponse.json(projectFields(products, page.fields), {
+            headers: await pageHeaders(page, nextCursor, () => prisma.product.count({ where })),
+        });
     } catch (error) {
         console.error("Current stock error:", error);
         return NextResponse.json(
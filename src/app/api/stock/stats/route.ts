@@ -1,6 +1,8 @@
 import { prisma } from "@/lib/prisma";
 import { NextResponse } from "next/server";
 import { requireCompanyId } from "@/lib/api-auth";
+import { sumInventory } from "@/lib/financial-aggregates";
+import { getStockLevelCounts } from "@/lib/stock-alerts";
 
 export async function GET() {
     try {
@@ -10,34 +12,19 @@ export async function GET() {
         }
         const { companyId } = auth;
 
-        // Get all products with stock info
-        const products = await prisma.product.findMany({
-            where: { companyId },
-            select: {
-                id: true,
-                stockQuantity: true,
-                lowStockAlert: true,
-                costPrice: true,
-            },
-        });
-
-        // Calculate stats
-        const totalItems = products.length;
-        const totalValue = products.reduce(
-            (sum, p) => sum + p.stockQuantity * p.costPrice,
-            0
-        );
-        const lowStock = products.filter(
-            (p) => p.stockQuantity > 0 && p.stockQuantity <= p.lowStockAlert
-        ).length;
-        const outOfStock = products.filter((p) => p.stockQuantity === 0).length;
+        // Value from one aggregate; low/out-of-stock from the maintained counter
+        const [inventory, levels, warehouses] = await Promise.all([
+            sumInventory(companyId),
+            getStockLevelCounts(companyId),
+            prisma.warehouse.count({ where: { companyId, isActive: true } }),
+        ]);
 
         return NextResponse.json({
-            totalItems,
-            totalValue,
-            lowStock,
-            outOfStock,
-            warehouses: 1, // Default warehouse
+            totalItems: inventory.itemCount,
+            totalValue: inventory.totalValue,
+            lowStock: levels.lowStockCount,
+            outOfStock: levels.outOfStockCount,
+            warehouses: Math.max(warehouses, 1), // Default warehouse
         });
     } catch (error) {
         console.error("Stock stats error:", error);
@@ -0,0 +1,56 @@
+import { NextResponse } from "next/server";
+import { requireAuth } from "@/lib/api-auth";
+import { applyStockTake, StockTakeError } from "@/lib/stock-take";
+import { markProductsChanged } from "@/lib/product-index";
+import { invalidateCompanyCache } from "@/lib/response-cache";
+
+const MAX_STOCK_TAKE_LINES = 50000;
+
+/**
+ * Apply a warehouse count and return the variance report.
+ * Body: { warehouseId, lines: [{ productId | sku | barcode, countedQuantity }], reason?, reference?, dryRun? }
+ * With dryRun the variances are reported without writing anything.
+ */
+export async function POST(request: Request) {
+    try {
+        const auth = await requireAuth();
+        if ("error" in auth) {
+            return NextResponse.json({ error: auth.error }, { status: auth.status });
+        }
+        const { companyId, userId } = auth;
+
+        const body = await request.json();
+        const { warehouseId, lines, reason, reference, dryRun } = body;
+
+        if (!warehouseId || !Array.isArray(lines) || lines.length === 0) {
+            return NextResponse.json({ error: "warehouseId and a non-empty lines array are required" }, { status: 400 });
+        }
+        if (lines.length > MAX_STOCK_TAKE_LINES) {
+            return NextResponse.json({ error: `At most ${MAX_STOCK_TAKE_LINES} lines per stock take` }, { status: 400 });
+        }
+
+        const report = await applyStockTake(companyId, {
+            warehouseId,
+            lines,
+            reason,
+            reference,
+            userId,
+            dryRun: dryRun === true,
+        });
+        if (dryRun !== true) {
+            markProductsChanged(companyId);
+            await invalidateCompanyCache(companyId);
+        }
+
+        return NextResponse.json(report);
+    } catch (error) {
+        if (error instanceof StockTakeError) {
+            return NextResponse.json({ error: error.message }, { status: error.status });
+        }
+        console.error("Stock take error:", error);
+        return NextResponse.json(
+            { error: "Failed to apply stock take" },
+            { status: 500 }
+        );
+    }
+}
@@ -0,0 +1,66 @@
+import { NextResponse } from "next/server";
+import { requireCompanyId } from "@/lib/api-auth";
+import { transferStock, StockTransferError, InsufficientStockError, TransferRequest } from "@/lib/stock-transfers";
+import { invalidateCompanyCache } from "@/lib/response-cache";
+
+const MAX_BATCH_LINES = 20000;
+
+/**
+ * Move many SKUs between warehouses in one transaction.
+ * Body: { reference?, lines: [{ productId, fromWarehouse, toWarehouse, quantity }] }
+ * Lines are grouped by warehouse pair; any shortage rolls back the whole batch (422).
+ */
+export async function POST(request: Request) {
+    try {
+        const auth = await requireCompanyId();
+        if ("error" in auth) {
+            return NextResponse.json({ error: auth.error }, { status: auth.status });
+        }
+        const { companyId } = auth;
+
+        const body = await request.json();
+        const lines: { productId: string; fromWarehouse: string; toWarehouse: string; quantity: number }[] = body.lines;
+
+        if (!Array.isArray(lines) || lines.length === 0) {
+            return NextResponse.json({ error: "lines must be a non-empty array" }, { status: 400 });
+        }
+        if (lines.length > MAX_BATCH_LINES) {
+            return NextResponse.json({ error: `At most ${MAX_BATCH_LINES} lines per batch` }, { status: 400 });
+        }
+
+        const pairs = new Map<string, TransferRequest>();
+        for (const line of lines) {
+            const key = `${line.fromWarehouse}|${line.toWarehouse}`;
+            const pair = pairs.get(key) || {
+                fromWarehouseId: line.fromWarehouse,
+                toWarehouseId: line.toWarehouse,
+                lines: [],
+                reference: body.reference,
+            };
+            pair.lines.push({ productId: line.productId, quantity: line.quantity });
+            pairs.set(key, pair);
+        }
+
+        const moved = await transferStock(companyId, Array.from(pairs.values()));
+        await invalidateCompanyCache(companyId);
+
+        return NextResponse.json({
+            success: true,
+            lines: moved.length,
+            transferredQuantity: moved.reduce((sum, line) => sum + line.quantity, 0),
+            movements: moved.length * 2,
+        });
+    } catch (error: any) {
+        if (error instanceof InsufficientStockError) {
+            return NextResponse.json({ error: error.message, shortages: error.shortages }, { status: error.status });
+        }
+        if (error instanceof StockTransferError) {
+            return NextResponse.json({ error: error.message }, { status: error.status });
+        }
+        console.error("Batch stock transfer error:", error);
+        return NextResponse.json(
+            { error: "Failed to transfer stock" },
+            { status: 500 }
+        );
+    }
+}
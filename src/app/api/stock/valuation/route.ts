@@ -0,0 +1,46 @@
+import { NextResponse } from "next/server";
+import { requireCompanyId } from "@/lib/api-auth";
+import { endOfDay, getStockValuation } from "@/lib/accounting/stock-valuation";
+
+/**
+ * FIFO / weighted average / NRV valuation of every product and warehouse.
+ * ?asOf=YYYY-MM-DD values stock at the end of that day (month ends of closed
+ * periods are served from stored snapshots); ?costToSellPct=5 sets the
+ * estimated costs to sell used in the NRV test.
+ */
+export async function GET(request: Request) {
+    try {
+        const auth = await requireCompanyId();
+        if ("error" in auth) {
+            return NextResponse.json({ error: auth.error }, { status: auth.status });
+        }
+        const { companyId } = auth;
+
+        const params = new URL(request.url).searchParams;
+        const asOfParam = params.get("asOf");
+        const asOf = asOfParam ? new Date(`${asOfParam}T00:00:00`) : undefined;
+        if (asOf && isNaN(asOf.getTime())) {
+            return NextResponse.json({ error: "asOf must be a date (YYYY-MM-DD)" }, { status: 400 });
+        }
+
+        const costToSellPct = Number(params.get("costToSellPct") ?? 0);
+        if (!Number.isFinite(costToSellPct) || costToSellPct < 0 || costToSellPct > 100) {
+            return NextResponse.json({ error: "costToSellPct must be between 0 and 100" }, { status: 400 });
+        }
+
+        const { report, cached } = await getStockValuation(companyId, {
+            asOf: asOf && endOfDay(asOf),
+            costToSellPct,
+        });
+
+        return NextResponse.json(report, {
+            headers: { "X-Cache": cached ? "HIT" : "MISS" },
+        });
+    } catch (error) {
+        console.error("Stock valuation error:", error);
+        return NextResponse.json(
+            { error: "Failed to value stock" },
+            { status: 500 }
+        );
+    }
+}
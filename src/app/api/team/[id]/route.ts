@@ -1,6 +1,6 @@
 import { NextRequest, NextResponse } from "next/server";
 import { prisma } from "@/lib/prisma";
-import { requireAuth } from "@/lib/api-auth";
+import { requireAuth, invalidateAuthCache } from "@/lib/api-auth";
 import { permissions } from "@/lib/rbac";
 
 export async function DELETE(
@@ -31,6 +31,7 @@ export async function DELETE(
         await prisma.companyMembership.deleteMany({
             where: { userId: id, companyId },
         });
+        invalidateAuthCache(id);
 
         return NextResponse.json({ success: true, message: "Member removed" });
     } catch (error) {
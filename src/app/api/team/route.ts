@@ -2,7 +2,7 @@ import { NextRequest, NextResponse } from "next/server";
 import { prisma } from "@/lib/prisma";
 import { sendEmail, getInviteEmailTemplate } from "@/lib/email";
 import crypto from "crypto";
-import { requireCompanyId } from "@/lib/api-auth";
+import { requireCompanyId, invalidateAuthCache } from "@/lib/api-auth";
 import { permissions } from "@/lib/rbac";
 
 // Get members for a company
@@ -89,6 +89,7 @@ export async function POST(request: NextRequest) {
                     role: role || "ACCOUNTANT",
                 },
             });
+            invalidateAuthCache(existingUser.id);
 
             return NextResponse.json({
                 success: true,
@@ -190,6 +191,7 @@ export async function DELETE(request: NextRequest) {
         await prisma.companyMembership.deleteMany({
             where: { userId, companyId },
         });
+        invalidateAuthCache(userId);
 
         return NextResponse.json({ success: true, message: "Member removed" });
     } catch (error) {
@@ -225,6 +227,7 @@ export async function PATCH(request: NextRequest) {
             where: { userId, companyId },
             data: { role },
         });
+        invalidateAuthCache(userId);
 
         return NextResponse.json({ success: true, message: "Member role updated" });
     } catch (error) {
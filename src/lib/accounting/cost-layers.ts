@@ -0,0 +1,731 @@
+/**
+ * cost-layers.ts - Perpetual inventory cost layers
+ *
+ * Keeps each product's open FIFO layers and running weighted average in the
+ * database and moves them forward on every stock movement, so valuing a
+ * product never replays its history. Open layers form a deque: receipts take
+ * the next tail seq, issues consume from headSeq and delete emptied layers.
+ * Back-dated movements (e.g. returns with an earlier return date) fall back to
+ * a replay of that one product. rebuildCostLayers verifies the stored state
+ * against calculateFIFO / calculateWeightedAverage and repairs drift.
+ *
+ * Stock that no inbound movement accounts for (seeded, imported or edited
+ * directly) is given an opening-balance movement at the product's cost price
+ * the first time the product's layers are built, so it is valued and issued
+ * like any receipt.
+ */
+
+import { Prisma } from "@prisma/client";
+import { prisma } from "@/lib/prisma";
+import { sqlDate } from "@/lib/financial-aggregates";
+import {
+    CostLayerQueue,
+    InventoryMovement,
+    calculateFIFO,
+    calculateWeightedAverage,
+} from "@/lib/accounting/inventory-valuation";
+
+type Db = Prisma.TransactionClient | typeof prisma;
+
+// Open layers read per query while consuming an issue
+const LAYER_PAGE_SIZE = 50;
+const VALUE_TOLERANCE = 0.01;
+
+const OUTBOUND_TYPES = new Set(["SALE", "ADJUSTMENT_OUT", "DAMAGE"]);
+
+export interface CostMovement {
+    id: string;
+    companyId: string;
+    productId: string;
+    type: string;
+    quantity: number;
+    unitCost: number | null;
+    date: Date;
+}
+
+/**
+ * Cost of one issue under each method. `uncovered` counts units issued beyond
+ * the open layers (stock sold short); fifoCost does not include them, so the
+ * caller decides how to cost them.
+ */
+export interface IssueCost {
+    fifoCost: number;
+    averageCost: number;
+    uncovered: number;
+}
+
+const noCost = (): IssueCost => ({ fifoCost: 0, averageCost: 0, uncovered: 0 });
+
+/**
+ * Units of the latest issues a replay could not cover: what its net quantity went below zero by
+ */
+const replayShortfall = (replay: { avgQuantity: number }, issued: number) => Math.min(issued, Math.max(0, -replay.avgQuantity));
+
+/**
+ * Valuation direction of a movement. Transfers move stock between warehouses
+ * without changing its cost, so they never touch the layers.
+ */
+export function movementDirection(movement: { type: string; quantity: number }): "IN" | "OUT" | null {
+    if (movement.quantity === 0 || movement.type.startsWith("TRANSFER")) return null;
+    return movement.quantity < 0 || OUTBOUND_TYPES.has(movement.type) ? "OUT" : "IN";
+}
+
+/**
+ * Fold a new movement into its product's layers. Call inside the transaction
+ * that created the movement, after the product's stockQuantity includes it;
+ * inbound movements without a unit cost are stamped with the product's
+ * current cost price.
+ * Returns the cost of an issue under each method (0 for receipts).
+ */
+export async function applyStockMovement(
+    tx: Prisma.TransactionClient,
+    movement: CostMovement
+): Promise<IssueCost> {
+    const direction = movementDirection(movement);
+    if (!direction) return noCost();
+    const { productId, companyId } = movement;
+
+    // The increment locks the state row until commit; version 0 means it was just created
+    const state = await tx.inventoryCostState.upsert({
+        where: { productId },
+        create: { productId, companyId },
+        update: { version: { increment: 1 } },
+    });
+
+    let unitCost = movement.unitCost;
+    if (direction === "IN" && unitCost === null) {
+        const product = await tx.product.findUnique({ where: { id: productId }, select: { costPrice: true } });
+        unitCost = product?.costPrice ?? 0;
+        await tx.stockMovement.update({ where: { id: movement.id }, data: { unitCost } });
+    }
+
+    if (state.version === 0 || (state.lastMovementAt && movement.date < state.lastMovementAt)) {
+        // First movement seen for the product, or out of order: replay its history
+        const after = await writeProductCostLayers(tx, companyId, productId);
+        if (direction !== "OUT") return noCost();
+        const before = await costBefore(tx, state, [movement.id]);
+        return {
+            fifoCost: after.fifoCogs - before.fifoCogs,
+            averageCost: after.avgCogs - before.avgCogs,
+            uncovered: replayShortfall(after, Math.abs(movement.quantity)),
+        };
+    }
+
+    const quantity = Math.abs(movement.quantity);
+
+    if (direction === "IN") {
+        const value = quantity * unitCost!;
+        await tx.inventoryCostLayer.create({
+            data: {
+                companyId,
+                productId,
+                seq: state.tailSeq,
+                receivedAt: movement.date,
+                quantity,
+                remaining: quantity,
+                unitCost: unitCost!,
+                movementId: movement.id,
+            },
+        });
+        await tx.inventoryCostState.update({
+            where: { productId },
+            data: {
+                fifoQuantity: { increment: quantity },
+                fifoValue: { increment: value },
+                avgQuantity: { increment: quantity },
+                avgValue: { increment: value },
+                tailSeq: { increment: 1 },
+                lastMovementAt: movement.date,
+            },
+        });
+        return noCost();
+    }
+
+    // Load just enough open layers from the head to cover the issue
+    const queue = new CostLayerQueue();
+    const seqs: number[] = [];
+    let loaded = 0;
+    for (let cursor = state.headSeq; loaded < quantity;) {
+        const page = await tx.inventoryCostLayer.findMany({
+            where: { productId, seq: { gte: cursor } },
+            orderBy: { seq: "asc" },
+            take: LAYER_PAGE_SIZE,
+        });
+        for (const layer of page) {
+            queue.push(layer.receivedAt, layer.remaining, layer.unitCost);
+            seqs.push(layer.seq);
+            loaded += layer.remaining;
+        }
+        if (page.length < LAYER_PAGE_SIZE) break;
+        cursor = page[page.length - 1].seq + 1;
+    }
+
+    const { cost: fifoCost, consumed } = queue.consume(quantity);
+    const emptied = seqs.length - queue.length;
+    const headSeq = emptied < seqs.length ? seqs[emptied] : seqs.length > 0 ? seqs[seqs.length - 1] + 1 : state.headSeq;
+
+    if (emptied > 0) {
+        await tx.inventoryCostLayer.deleteMany({ where: { productId, seq: { lt: headSeq } } });
+    }
+    const head = queue.peek();
+    if (head && consumed > 0) {
+        await tx.inventoryCostLayer.update({
+            where: { productId_seq: { productId, seq: headSeq } },
+            data: { remaining: head.quantity },
+        });
+    }
+
+    // Same rule as calculateWeightedAverage: issue at the average of what is on hand
+    const averageCost = quantity * (state.avgQuantity > 0 ? state.avgValue / state.avgQuantity : 0);
+
+    await tx.inventoryCostState.update({
+        where: { productId },
+        data: {
+            fifoQuantity: { decrement: consumed },
+            fifoValue: { decrement: fifoCost },
+            fifoCogs: { increment: fifoCost },
+            avgQuantity: { decrement: quantity },
+            avgValue: { decrement: averageCost },
+            avgCogs: { increment: averageCost },
+            headSeq,
+            lastMovementAt: movement.date,
+        },
+    });
+
+    return { fifoCost, averageCost, uncovered: quantity - consumed };
+}
+
+/**
+ * Fold many movements into their layers with a fixed number of statements.
+ * Issues of products that only have issues in the batch (checkout baskets,
+ * synced sales) are applied together: one UPDATE locks and bumps their
+ * states, one query reads their open layers, and emptied layers, partly
+ * consumed heads and states are written back with one statement each.
+ * Receipts of products that only have receipts in the batch (stock-take
+ * overages) likewise open their layers with one createMany and one state
+ * UPDATE. Everything else (first or back-dated movements, products with both
+ * directions) goes through applyStockMovement, or a single replay for a
+ * product with several of them. Results are in the order of `movements`.
+ */
+export async function applyStockMovements(
+    tx: Prisma.TransactionClient,
+    movements: CostMovement[]
+): Promise<IssueCost[]> {
+    const results: IssueCost[] = movements.map(noCost);
+
+    // Movements per product and direction, in date order; a product with movements
+    // in more than one direction (or transfers) is left to the per-product path
+    const issuesByProduct = new Map<string, { movement: CostMovement; index: number }[]>();
+    const receiptsByProduct = new Map<string, { movement: CostMovement; index: number }[]>();
+    const directions = new Map<string, Set<string | null>>();
+    movements.forEach((movement, index) => {
+        const direction = movementDirection(movement);
+        directions.set(movement.productId, (directions.get(movement.productId) || new Set()).add(direction));
+        const byProduct = direction === "OUT" ? issuesByProduct : direction === "IN" ? receiptsByProduct : null;
+        if (!byProduct) return;
+        const list = byProduct.get(movement.productId) || [];
+        list.push({ movement, index });
+        byProduct.set(movement.productId, list);
+    });
+    directions.forEach((set, productId) => {
+        if (set.size === 1) return;
+        issuesByProduct.delete(productId);
+        receiptsByProduct.delete(productId);
+    });
+    for (const byProduct of [issuesByProduct, receiptsByProduct]) {
+        byProduct.forEach(list => list.sort((x, y) => x.movement.date.getTime() - y.movement.date.getTime() || x.index - y.index));
+    }
+
+    const batched = new Set<number>();
+    if (issuesByProduct.size > 1 || Array.from(issuesByProduct.values()).some(list => list.length > 1)) {
+        const productIds = Array.from(issuesByProduct.keys());
+        await tx.inventoryCostState.updateMany({
+            where: { productId: { in: productIds } },
+            data: { version: { increment: 1 } },
+        });
+        const states = new Map(
+            (await tx.inventoryCostState.findMany({ where: { productId: { in: productIds } } })).map(s => [s.productId, s])
+        );
+        const ready = productIds.filter(productId => {
+            const state = states.get(productId);
+            const first = issuesByProduct.get(productId)![0].movement;
+            return state && !(state.lastMovementAt && first.date < state.lastMovementAt);
+        });
+
+        if (ready.length > 0) {
+            // Open layers are few per product (unconsumed receipts), so read them all at once
+            const layers = await tx.inventoryCostLayer.findMany({
+                where: { OR: ready.map(productId => ({ productId, seq: { gte: states.get(productId)!.headSeq } })) },
+                orderBy: [{ productId: "asc" }, { seq: "asc" }],
+            });
+            const layersByProduct = new Map<string, typeof layers>();
+            layers.forEach(layer => {
+                const list = layersByProduct.get(layer.productId) || [];
+                list.push(layer);
+                layersByProduct.set(layer.productId, list);
+            });
+
+            const emptied: { productId: string; headSeq: number }[] = [];
+            const heads: { id: string; remaining: number }[] = [];
+            const updates: { productId: string; consumed: number; quantity: number; fifoCost: number; averageCost: number; headSeq: number; date: Date }[] = [];
+
+            for (const productId of ready) {
+                const state = states.get(productId)!;
+                const open = layersByProduct.get(productId) || [];
+                const queue = new CostLayerQueue();
+                open.forEach(layer => queue.push(layer.receivedAt, layer.remaining, layer.unitCost));
+
+                const update = { productId, consumed: 0, quantity: 0, fifoCost: 0, averageCost: 0, headSeq: state.headSeq, date: state.lastMovementAt ?? new Date(0) };
+                let avgQuantity = state.avgQuantity;
+                let avgValue = state.avgValue;
+                for (const { movement, index } of issuesByProduct.get(productId)!) {
+                    const quantity = Math.abs(movement.quantity);
+                    const { cost: fifoCost, consumed } = queue.consume(quantity);
+                    // Same rule as calculateWeightedAverage: issue at the average of what is on hand
+                    const averageCost = quantity * (avgQuantity > 0 ? avgValue / avgQuantity : 0);
+                    avgQuantity -= quantity;
+                    avgValue -= averageCost;
+
+                    update.consumed += consumed;
+                    update.quantity += quantity;
+                    update.fifoCost += fifoCost;
+                    update.averageCost += averageCost;
+                    update.date = movement.date;
+                    results[index] = { fifoCost, averageCost, uncovered: quantity - consumed };
+                    batched.add(index);
+                }
+
+                const emptiedCount = open.length - queue.length;
+                update.headSeq = emptiedCount < open.length ? open[emptiedCount].seq : open.length > 0 ? open[open.length - 1].seq + 1 : state.headSeq;
+                if (emptiedCount > 0) emptied.push({ productId, headSeq: update.headSeq });
+                const head = queue.peek();
+                if (head && head.quantity !== open[emptiedCount].remaining) heads.push({ id: open[emptiedCount].id, remaining: head.quantity });
+                updates.push(update);
+            }
+
+            if (emptied.length > 0) {
+                await tx.inventoryCostLayer.deleteMany({
+                    where: { OR: emptied.map(e => ({ productId: e.productId, seq: { lt: e.headSeq } })) },
+                });
+            }
+            if (heads.length > 0) {
+                const remainingFor = Prisma.join(heads.map(h => Prisma.sql`WHEN ${h.id} THEN CAST(${h.remaining} AS INTEGER)`), " ");
+                await tx.$executeRaw`
+                    UPDATE "InventoryCostLayer"
+                    SET "remaining" = CASE "id" ${remainingFor} END
+                    WHERE "id" IN (${Prisma.join(heads.map(h => h.id))})
+                `;
+            }
+
+            const caseFor = (value: (u: typeof updates[number]) => number, type: "INTEGER" | "DOUBLE PRECISION") =>
+                Prisma.join(updates.map(u => Prisma.sql`WHEN ${u.productId} THEN CAST(${value(u)} AS ${Prisma.raw(type)})`), " ");
+            const dateFor = Prisma.join(updates.map(u => Prisma.sql`WHEN ${u.productId} THEN ${sqlDate(u.date)}`), " ");
+            await tx.$executeRaw`
+                UPDATE "InventoryCostState"
+                SET "fifoQuantity" = "fifoQuantity" - CASE "productId" ${caseFor(u => u.consumed, "INTEGER")} END,
+                    "fifoValue" = "fifoValue" - CASE "productId" ${caseFor(u => u.fifoCost, "DOUBLE PRECISION")} END,
+                    "fifoCogs" = "fifoCogs" + CASE "productId" ${caseFor(u => u.fifoCost, "DOUBLE PRECISION")} END,
+                    "avgQuantity" = "avgQuantity" - CASE "productId" ${caseFor(u => u.quantity, "INTEGER")} END,
+                    "avgValue" = "avgValue" - CASE "productId" ${caseFor(u => u.averageCost, "DOUBLE PRECISION")} END,
+                    "avgCogs" = "avgCogs" + CASE "productId" ${caseFor(u => u.averageCost, "DOUBLE PRECISION")} END,
+                    "headSeq" = CASE "productId" ${caseFor(u => u.headSeq, "INTEGER")} END,
+                    "lastMovementAt" = CASE "productId" ${dateFor} END,
+                    "updatedAt" = ${sqlDate(new Date())}
+                WHERE "productId" IN (${Prisma.join(updates.map(u => u.productId))})
+            `;
+        }
+    }
+
+    if (receiptsByProduct.size > 1 || Array.from(receiptsByProduct.values()).some(list => list.length > 1)) {
+        const productIds = Array.from(receiptsByProduct.keys());
+        await tx.inventoryCostState.updateMany({
+            where: { productId: { in: productIds } },
+            data: { version: { increment: 1 } },
+        });
+        const states = new Map(
+            (await tx.inventoryCostState.findMany({ where: { productId: { in: productIds } } })).map(s => [s.productId, s])
+        );
+        const ready = productIds.filter(productId => {
+            const state = states.get(productId);
+            const first = receiptsByProduct.get(productId)![0].movement;
+            return state && !(state.lastMovementAt && first.date < state.lastMovementAt);
+        });
+
+        if (ready.length > 0) {
+            // Receipts without a unit cost are stamped with the product's cost price
+            const unpriced = ready.flatMap(productId => receiptsByProduct.get(productId)!).filter(r => r.movement.unitCost === null);
+            const costPrices = new Map<string, number>();
+            if (unpriced.length > 0) {
+                const products = await tx.product.findMany({
+                    where: { id: { in: Array.from(new Set(unpriced.map(r => r.movement.productId))) } },
+                    select: { id: true, costPrice: true },
+                });
+                products.forEach(product => costPrices.set(product.id, product.costPrice));
+                const costFor = Prisma.join(unpriced.map(r =>
+                    Prisma.sql`WHEN ${r.movement.id} THEN CAST(${costPrices.get(r.movement.productId) ?? 0} AS DOUBLE PRECISION)`
+                ), " ");
+                await tx.$executeRaw`
+                    UPDATE "StockMovement"
+                    SET "unitCost" = CASE "id" ${costFor} END
+                    WHERE "id" IN (${Prisma.join(unpriced.map(r => r.movement.id))})
+                `;
+            }
+
+            const layers: Prisma.InventoryCostLayerCreateManyInput[] = [];
+            const updates: { productId: string; quantity: number; value: number; tailSeq: number; date: Date }[] = [];
+            for (const productId of ready) {
+                const update = { productId, quantity: 0, value: 0, tailSeq: states.get(productId)!.tailSeq, date: new Date(0) };
+                for (const { movement, index } of receiptsByProduct.get(productId)!) {
+                    const quantity = Math.abs(movement.quantity);
+                    const unitCost = movement.unitCost ?? costPrices.get(productId) ?? 0;
+                    layers.push({
+                        companyId: movement.companyId,
+                        productId,
+                        seq: update.tailSeq++,
+                        receivedAt: movement.date,
+                        quantity,
+                        remaining: quantity,
+                        unitCost,
+                        movementId: movement.id,
+                    });
+                    update.quantity += quantity;
+                    update.value += quantity * unitCost;
+                    update.date = movement.date;
+                    batched.add(index);
+                }
+                updates.push(update);
+            }
+
+            await tx.inventoryCostLayer.createMany({ data: layers });
+            const caseFor = (value: (u: typeof updates[number]) => number, type: "INTEGER" | "DOUBLE PRECISION") =>
+                Prisma.join(updates.map(u => Prisma.sql`WHEN ${u.productId} THEN CAST(${value(u)} AS ${Prisma.raw(type)})`), " ");
+            const dateFor = Prisma.join(updates.map(u => Prisma.sql`WHEN ${u.productId} THEN ${sqlDate(u.date)}`), " ");
+            await tx.$executeRaw`
+                UPDATE "InventoryCostState"
+                SET "fifoQuantity" = "fifoQuantity" + CASE "productId" ${caseFor(u => u.quantity, "INTEGER")} END,
+                    "fifoValue" = "fifoValue" + CASE "productId" ${caseFor(u => u.value, "DOUBLE PRECISION")} END,
+                    "avgQuantity" = "avgQuantity" + CASE "productId" ${caseFor(u => u.quantity, "INTEGER")} END,
+                    "avgValue" = "avgValue" + CASE "productId" ${caseFor(u => u.value, "DOUBLE PRECISION")} END,
+                    "tailSeq" = CASE "productId" ${caseFor(u => u.tailSeq, "INTEGER")} END,
+                    "lastMovementAt" = CASE "productId" ${dateFor} END,
+                    "updatedAt" = ${sqlDate(new Date())}
+                WHERE "productId" IN (${Prisma.join(updates.map(u => u.productId))})
+            `;
+        }
+    }
+
+    // The rest one product at a time. A product with several movements here is
+    // replayed once: they were inserted together, so a replay covers them all.
+    const leftovers = new Map<string, number[]>();
+    movements.forEach((movement, index) => {
+        if (batched.has(index)) return;
+        const list = leftovers.get(movement.productId) || [];
+        list.push(index);
+        leftovers.set(movement.productId, list);
+    });
+    for (const [productId, indexes] of leftovers) {
+        if (indexes.length === 1) {
+            results[indexes[0]] = await applyStockMovement(tx, movements[indexes[0]]);
+            continue;
+        }
+        const { companyId } = movements[indexes[0]];
+        const state = await tx.inventoryCostState.upsert({
+            where: { productId },
+            create: { productId, companyId },
+            update: { version: { increment: 1 } },
+        });
+        const after = await writeProductCostLayers(tx, companyId, productId);
+        // Issue cost is split across the product's issues by quantity
+        const issues = indexes.filter(i => movementDirection(movements[i]) === "OUT");
+        if (issues.length === 0) continue;
+        const before = await costBefore(tx, state, indexes.map(i => movements[i].id));
+        const issuedQuantity = issues.reduce((sum, i) => sum + Math.abs(movements[i].quantity), 0);
+        const uncovered = replayShortfall(after, issuedQuantity);
+        for (const i of issues) {
+            const share = Math.abs(movements[i].quantity) / issuedQuantity;
+            results[i] = {
+                fifoCost: (after.fifoCogs - before.fifoCogs) * share,
+                averageCost: (after.avgCogs - before.avgCogs) * share,
+                uncovered: uncovered * share,
+            };
+        }
+    }
+    return results;
+}
+
+// ---------- Replay, rebuild and verify ----------
+
+interface CostReplay {
+    fifoQuantity: number;
+    fifoValue: number;
+    fifoCogs: number;
+    avgQuantity: number;
+    avgValue: number;
+    avgCogs: number;
+    layers: { receivedAt: Date; quantity: number; unitCost: number }[];
+    lastMovementAt: Date | null;
+    /** Inbound movements that had no unit cost and were valued at the fallback */
+    unstamped: string[];
+}
+
+/**
+ * Value a product's full history with the reference calculateFIFO / calculateWeightedAverage.
+ * Movements must be in date order; inbound ones without a cost use `fallbackCost`.
+ */
+export function replayCostLayers(movements: CostMovement[], fallbackCost: number): CostReplay {
+    const valuation: InventoryMovement[] = [];
+    const unstamped: string[] = [];
+    let avgQuantity = 0;
+
+    for (const movement of movements) {
+        const direction = movementDirection(movement);
+        if (!direction) continue;
+        const quantity = Math.abs(movement.quantity);
+        if (direction === "IN" && movement.unitCost === null) unstamped.push(movement.id);
+        avgQuantity += direction === "IN" ? quantity : -quantity;
+        valuation.push({
+            date: movement.date,
+            type: direction,
+            quantity,
+            unitCost: movement.unitCost ?? fallbackCost,
+        });
+    }
+
+    const fifo = calculateFIFO(valuation);
+    const average = calculateWeightedAverage(valuation);
+
+    return {
+        fifoQuantity: fifo.batches.reduce((sum, b) => sum + b.quantity, 0),
+        fifoValue: fifo.endingInventory,
+        fifoCogs: fifo.cogs,
+        avgQuantity,
+        avgValue: average.endingInventory,
+        avgCogs: average.cogs,
+        layers: fifo.batches.map(b => ({ receivedAt: b.date, quantity: b.quantity, unitCost: b.unitCost })),
+        lastMovementAt: valuation.length > 0 ? valuation[valuation.length - 1].date : null,
+        unstamped,
+    };
+}
+
+interface ProductReplay extends CostReplay {
+    costPrice: number;
+    /** Stock on hand beyond what the movements add up to */
+    unbacked: number;
+    /** Date for an opening balance: before the product's first movement */
+    openedAt: Date;
+}
+
+async function loadProductReplay(db: Db, productId: string, excludeIds: string[] = []): Promise<ProductReplay> {
+    const [product, movements] = await Promise.all([
+        db.product.findUnique({ where: { id: productId }, select: { costPrice: true, stockQuantity: true, createdAt: true } }),
+        db.stockMovement.findMany({
+            where: { productId, ...(excludeIds.length > 0 && { id: { notIn: excludeIds } }) },
+            select: { id: true, companyId: true, productId: true, type: true, quantity: true, unitCost: true, date: true },
+            orderBy: [{ date: "asc" }, { id: "asc" }],
+        }),
+    ]);
+    const costPrice = product?.costPrice ?? 0;
+    const replay = replayCostLayers(movements, costPrice);
+    const createdAt = product?.createdAt ?? new Date();
+    return {
+        ...replay,
+        costPrice,
+        unbacked: (product?.stockQuantity ?? 0) - replay.avgQuantity,
+        openedAt: movements.length > 0 && movements[0].date <= createdAt
+            ? new Date(movements[0].date.getTime() - 1)
+            : createdAt,
+    };
+}
+
+/**
+ * COGS a product had booked before `movementIds`, to price them after a replay.
+ * A state created just now holds none, so its history is replayed without them;
+ * otherwise the state as it stood is the answer.
+ */
+async function costBefore(
+    tx: Prisma.TransactionClient,
+    state: { productId: string; version: number; fifoCogs: number; avgCogs: number },
+    movementIds: string[]
+): Promise<{ fifoCogs: number; avgCogs: number }> {
+    if (state.version > 0) return state;
+    return loadProductReplay(tx, state.productId, movementIds);
+}
+
+/**
+ * Replace a product's layers and state with a replay of its history.
+ * Inbound movements valued at the fallback cost are stamped with it, so later
+ * replays agree, and unbacked stock gets its opening-balance movement first.
+ */
+async function writeProductCostLayers(tx: Prisma.TransactionClient, companyId: string, productId: string) {
+    let replay = await loadProductReplay(tx, productId);
+
+    if (replay.unbacked > 0) {
+        await tx.stockMovement.create({
+            data: {
+                companyId,
+                productId,
+                type: "ADJUSTMENT",
+                quantity: replay.unbacked,
+                unitCost: replay.costPrice,
+                balanceAfter: replay.unbacked,
+                referenceType: "OPENING_BALANCE",
+                notes: "Opening balance",
+                date: replay.openedAt,
+            },
+        });
+        replay = await loadProductReplay(tx, productId);
+    }
+
+    if (replay.unstamped.length > 0) {
+        await tx.stockMovement.updateMany({
+            where: { id: { in: replay.unstamped } },
+            data: { unitCost: replay.costPrice },
+        });
+    }
+
+    await tx.inventoryCostLayer.deleteMany({ where: { productId } });
+    if (replay.layers.length > 0) {
+        await tx.inventoryCostLayer.createMany({
+            data: replay.layers.map((layer, seq) => ({
+                companyId,
+                productId,
+                seq,
+                receivedAt: layer.receivedAt,
+                quantity: layer.quantity,
+                remaining: layer.quantity,
+                unitCost: layer.unitCost,
+            })),
+        });
+    }
+
+    const values = {
+        fifoQuantity: replay.fifoQuantity,
+        fifoValue: replay.fifoValue,
+        fifoCogs: replay.fifoCogs,
+        avgQuantity: replay.avgQuantity,
+        avgValue: replay.avgValue,
+        avgCogs: replay.avgCogs,
+        headSeq: 0,
+        tailSeq: replay.layers.length,
+        lastMovementAt: replay.lastMovementAt,
+    };
+    await tx.inventoryCostState.upsert({
+        where: { productId },
+        create: { productId, companyId, version: 1, ...values },
+        update: { version: { increment: 1 }, ...values },
+    });
+    return values;
+}
+
+export interface CostLayerDrift {
+    productId: string;
+    field: string;
+    stored: number;
+    expected: number;
+}
+
+const STATE_FIELDS = ["fifoQuantity", "fifoValue", "fifoCogs", "avgQuantity", "avgValue", "avgCogs"] as const;
+
+/**
+ * Compare a product's stored layers and state with a replay of its history
+ */
+export async function verifyProductCostLayers(productId: string, db: Db = prisma): Promise<CostLayerDrift[]> {
+    const [replay, state, layers] = await Promise.all([
+        loadProductReplay(db, productId),
+        db.inventoryCostState.findUnique({ where: { productId } }),
+        db.inventoryCostLayer.findMany({ where: { productId }, orderBy: { seq: "asc" } }),
+    ]);
+
+    const drift: CostLayerDrift[] = [];
+    if (replay.unbacked > 0) {
+        drift.push({ productId, field: "openingBalance", stored: 0, expected: replay.unbacked });
+    }
+    if (!state) {
+        if (replay.lastMovementAt || replay.unbacked > 0) drift.push({ productId, field: "state", stored: 0, expected: 1 });
+        return drift;
+    }
+
+    for (const field of STATE_FIELDS) {
+        if (Math.abs(state[field] - replay[field]) > VALUE_TOLERANCE) {
+            drift.push({ productId, field, stored: state[field], expected: replay[field] });
+        }
+    }
+
+    if (layers.length !== replay.layers.length) {
+        drift.push({ productId, field: "layers", stored: layers.length, expected: replay.layers.length });
+    } else {
+        layers.forEach((layer, i) => {
+            const expected = replay.layers[i];
+            if (layer.remaining !== expected.quantity) {
+                drift.push({ productId, field: `layers[${i}].remaining`, stored: layer.remaining, expected: expected.quantity });
+            }
+            if (Math.abs(layer.unitCost - expected.unitCost) > VALUE_TOLERANCE) {
+                drift.push({ productId, field: `layers[${i}].unitCost`, stored: layer.unitCost, expected: expected.unitCost });
+            }
+        });
+    }
+
+    return drift;
+}
+
+/**
+ * Verify every product of a company against its movement history and,
+ * unless dryRun, rebuild the products that drifted. Products holding stock
+ * without any movements are included, so they get their opening balance.
+ */
+export async function rebuildCostLayers(
+    companyId: string,
+    options: { dryRun?: boolean; onProgress?: (done: number, total: number) => void } = {}
+): Promise<{ products: number; rebuilt: number; drift: CostLayerDrift[] }> {
+    const products = await prisma.product.findMany({
+        where: {
+            companyId,
+            OR: [{ stockMovements: { some: {} } }, { trackInventory: true, stockQuantity: { gt: 0 } }],
+        },
+        select: { id: true },
+        orderBy: { id: "asc" },
+    });
+
+    const drift: CostLayerDrift[] = [];
+    let rebuilt = 0;
+
+    for (let i = 0; i < products.length; i++) {
+        const productId = products[i].id;
+        const productDrift = await verifyProductCostLayers(productId);
+        if (productDrift.length > 0) {
+            drift.push(...productDrift);
+            if (!options.dryRun) {
+                await prisma.$transaction(tx => writeProductCostLayers(tx, companyId, productId));
+                rebuilt++;
+            }
+        }
+        options.onProgress?.(i + 1, products.length);
+    }
+
+    return { products: products.length, rebuilt, drift };
+}
+
+/**
+ * Stored valuation of one product under both methods
+ */
+export async function getProductCostState(productId: string, db: Db = prisma) {
+    const [state, layers] = await Promise.all([
+        db.inventoryCostState.findUnique({ where: { productId } }),
+        db.inventoryCostLayer.findMany({
+            where: { productId },
+            select: { receivedAt: true, remaining: true, unitCost: true },
+            orderBy: { seq: "asc" },
+        }),
+    ]);
+    if (!state) return null;
+
+    return {
+        fifo: { quantity: state.fifoQuantity, value: state.fifoValue, cogs: state.fifoCogs, layers },
+        weightedAverage: {
+            quantity: state.avgQuantity,
+            value: state.avgValue,
+            cogs: state.avgCogs,
+            averageCost: state.avgQuantity > 0 ? state.avgValue / state.avgQuantity : 0,
+        },
+    };
+}
@@ -5,7 +5,13 @@
  * Example: 3-year hosting paid EGP 36,000 upfront → EGP 1,000/month expense
  */
 
+import { Prisma } from "@prisma/client";
 import { prisma } from "@/lib/prisma";
+import { sqlDate } from "@/lib/financial-aggregates";
+import { postJournalEntries } from "@/lib/gl/auto-post";
+import { invalidateCompanyCache } from "@/lib/response-cache";
+
+export const AMORTIZATION_CHUNK_SIZE = 100;
 
 export interface CreatePrepaidExpenseInput {
     companyId: string;
@@ -193,26 +199,146 @@ export async function getPendingAmortizations(
     return pendingEntries;
 }
 
+type DueAmortization = {
+    id: string;
+    prepaidExpenseId: string;
+    periodDate: Date;
+    amount: number;
+    prepaidExpense: {
+        description: string;
+        expenseAccountId: string | null;
+        assetAccountId: string | null;
+    };
+};
+
+/**
+ * Recognize one chunk in a single transaction: claim the rows, post one
+ * journal per period month, dated in that month (DR Expense, CR Prepaid
+ * Asset per period), and move the prepaid totals with one set-based UPDATE.
+ *
+ * Each schedule row id is the idempotency key: only rows this transaction
+ * flips from unprocessed are posted, so overlapping or repeated runs
+ * recognize every period exactly once.
+ */
+async function processAmortizationChunk(companyId: string, chunk: DueAmortization[]): Promise<DueAmortization[]> {
+    return prisma.$transaction(async tx => {
+        const claimed = await tx.$queryRaw<{ id: string }[]>`
+            UPDATE "ExpenseAmortization"
+            SET "isProcessed" = TRUE
+            WHERE "id" IN (${Prisma.join(chunk.map(e => e.id))}) AND "isProcessed" = FALSE
+            RETURNING "id"
+        `;
+        const claimedIds = new Set(claimed.map(row => row.id));
+        const entries = chunk.filter(e => claimedIds.has(e.id));
+        if (entries.length === 0) return [];
+
+        // Schedules without GL accounts are recognized without a journal, as before
+        const postable = entries.filter(e => e.prepaidExpense.expenseAccountId && e.prepaidExpense.assetAccountId);
+        const byMonth = new Map<string, DueAmortization[]>();
+        for (const e of postable) {
+            const month = e.periodDate.toISOString().slice(0, 7);
+            byMonth.set(month, [...(byMonth.get(month) || []), e]);
+        }
+        const months = Array.from(byMonth.values());
+        const journals = await postJournalEntries(tx, companyId, Array.from(byMonth, ([month, periods]) => ({
+            sourceType: "EXPENSE",
+            description: `Prepaid expense recognition ${month} (${periods.length} period${periods.length === 1 ? "" : "s"})`,
+            entryDate: new Date(Math.max(...periods.map(e => e.periodDate.getTime()))),
+            lines: periods.flatMap(e => {
+                const description = `${e.prepaidExpense.description} - ${e.periodDate.toISOString().slice(0, 7)}`;
+                return [
+                    { accountId: e.prepaidExpense.expenseAccountId!, description, debit: e.amount },
+                    { accountId: e.prepaidExpense.assetAccountId!, description, credit: e.amount },
+                ];
+            }),
+        })));
+        if (journals.length > 0) {
+            const journalFor = Prisma.join(
+                months.flatMap((periods, i) => periods.map(e => Prisma.sql`WHEN ${e.id} THEN ${journals[i].id}`)),
+                " "
+            );
+            await tx.$executeRaw`
+                UPDATE "ExpenseAmortization"
+                SET "journalEntryId" = CASE "id" ${journalFor} END
+                WHERE "id" IN (${Prisma.join(postable.map(e => e.id))})
+            `;
+        }
+
+        const totals = new Map<string, number>();
+        for (const e of entries) {
+            totals.set(e.prepaidExpenseId, (totals.get(e.prepaidExpenseId) || 0) + e.amount);
+        }
+        const amountFor = Prisma.join(
+            Array.from(totals, ([id, amount]) => Prisma.sql`WHEN ${id} THEN CAST(${amount} AS DOUBLE PRECISION)`),
+            " "
+        );
+        const now = sqlDate(new Date());
+        await tx.$executeRaw`
+            UPDATE "PrepaidExpense"
+            SET "recognizedAmount" = "recognizedAmount" + CASE "id" ${amountFor} ELSE 0 END,
+                "remainingAmount" = "remainingAmount" - CASE "id" ${amountFor} ELSE 0 END,
+                "lastRecognizedAt" = ${now},
+                "updatedAt" = ${now}
+            WHERE "id" IN (${Prisma.join(Array.from(totals.keys()))})
+        `;
+
+        return entries;
+    });
+}
+
 /**
- * Process all pending amortizations up to a date
+ * Process all pending amortizations up to a date.
+ * Due rows are loaded once and recognized in chunks, one after another: each
+ * chunk's journals hold the company's JOURNAL sequence row until it commits,
+ * so concurrent chunks would only queue behind each other.
  */
 export async function processAllPendingAmortizations(
     companyId: string,
-    asOfDate?: Date
+    asOfDate?: Date,
+    options: {
+        chunkSize?: number;
+        onProgress?: (processed: number, total: number) => void | Promise<void>;
+    } = {}
 ) {
-    const pending = await getPendingAmortizations(companyId, asOfDate);
-
-    const results = [];
-    for (const entry of pending) {
-        const result = await processAmortizationEntry(entry.id);
-        results.push({
-            prepaidExpenseId: entry.prepaidExpenseId,
-            description: entry.prepaidExpense.description,
-            ...result,
-        });
+    const { chunkSize = AMORTIZATION_CHUNK_SIZE, onProgress } = options;
+
+    const due: DueAmortization[] = await prisma.expenseAmortization.findMany({
+        where: {
+            isProcessed: false,
+            periodDate: { lte: asOfDate || new Date() },
+            prepaidExpense: { companyId, isActive: true },
+        },
+        select: {
+            id: true,
+            prepaidExpenseId: true,
+            periodDate: true,
+            amount: true,
+            prepaidExpense: {
+                select: { description: true, expenseAccountId: true, assetAccountId: true },
+            },
+        },
+        orderBy: { periodDate: "asc" },
+    });
+
+    const processed: DueAmortization[] = [];
+    let done = 0;
+    try {
+        for (let start = 0; start < due.length; start += chunkSize) {
+            const chunk = due.slice(start, start + chunkSize);
+            processed.push(...await processAmortizationChunk(companyId, chunk));
+            done += chunk.length;
+            await onProgress?.(done, due.length);
+        }
+    } finally {
+        if (done > 0) await invalidateCompanyCache(companyId);
     }
 
-    return results;
+    return processed.map(entry => ({
+        prepaidExpenseId: entry.prepaidExpenseId,
+        description: entry.prepaidExpense.description,
+        success: true,
+        amount: entry.amount,
+    }));
 }
 
 /**
@@ -3,59 +3,148 @@
 
 export type InventoryValuationMethod = "FIFO" | "WEIGHTED_AVERAGE";
 
-interface InventoryMovement {
+export interface InventoryMovement {
     date: Date;
     type: "IN" | "OUT";
     quantity: number;
     unitCost: number;
 }
 
-interface InventoryBatch {
+export interface InventoryBatch {
     date: Date;
     quantity: number;
     unitCost: number;
 }
 
+// FIFO cost layers as a growable ring buffer: receipts append at the tail,
+// consumption advances the head, so each layer is touched once per replay
+export class CostLayerQueue {
+    private dates: Float64Array;
+    private quantities: Float64Array;
+    private costs: Float64Array;
+    private head = 0;
+    private count = 0;
+
+    constructor(capacity = 16) {
+        let size = 16;
+        while (size < capacity) size *= 2;
+        this.dates = new Float64Array(size);
+        this.quantities = new Float64Array(size);
+        this.costs = new Float64Array(size);
+    }
+
+    get length(): number {
+        return this.count;
+    }
+
+    /** Oldest layer, if any */
+    peek(): InventoryBatch | undefined {
+        if (this.count === 0) return undefined;
+        return { date: new Date(this.dates[this.head]), quantity: this.quantities[this.head], unitCost: this.costs[this.head] };
+    }
+
+    push(date: Date, quantity: number, unitCost: number) {
+        if (this.count === this.dates.length) this.grow();
+        const slot = (this.head + this.count) & (this.dates.length - 1);
+        this.dates[slot] = date.getTime();
+        this.quantities[slot] = quantity;
+        this.costs[slot] = unitCost;
+        this.count++;
+    }
+
+    /**
+     * Remove up to `quantity` units from the oldest layers.
+     * Returns their cost and how many units were actually available.
+     */
+    consume(quantity: number): { cost: number; consumed: number } {
+        const mask = this.dates.length - 1;
+        let remaining = quantity;
+        let cost = 0;
+        while (remaining > 0 && this.count > 0) {
+            const available = this.quantities[this.head];
+            if (available <= remaining) {
+                cost += available * this.costs[this.head];
+                remaining -= available;
+                this.head = (this.head + 1) & mask;
+                this.count--;
+            } else {
+                cost += remaining * this.costs[this.head];
+                this.quantities[this.head] = available - remaining;
+                remaining = 0;
+            }
+        }
+        return { cost, consumed: quantity - remaining };
+    }
+
+    totalValue(): number {
+        let value = 0;
+        this.forEach(layer => { value += layer.quantity * layer.unitCost; });
+        return value;
+    }
+
+    forEach(visit: (layer: InventoryBatch) => void) {
+        const mask = this.dates.length - 1;
+        for (let i = 0; i < this.count; i++) {
+            const slot = (this.head + i) & mask;
+            visit({ date: new Date(this.dates[slot]), quantity: this.quantities[slot], unitCost: this.costs[slot] });
+        }
+    }
+
+    toBatches(): InventoryBatch[] {
+        const batches: InventoryBatch[] = [];
+        this.forEach(layer => batches.push(layer));
+        return batches;
+    }
+
+    private grow() {
+        const size = this.dates.length * 2;
+        const dates = new Float64Array(size);
+        const quantities = new Float64Array(size);
+        const costs = new Float64Array(size);
+        const mask = this.dates.length - 1;
+        for (let i = 0; i < this.count; i++) {
+            const slot = (this.head + i) & mask;
+            dates[i] = this.dates[slot];
+            quantities[i] = this.quantities[slot];
+            costs[i] = this.costs[slot];
+        }
+        this.dates = dates;
+        this.quantities = quantities;
+        this.costs = costs;
+        this.head = 0;
+    }
+}
+
+// Movements in date order; history loaded with orderBy date is used as-is
+function inDateOrder(movements: InventoryMovement[]): InventoryMovement[] {
+    for (let i = 1; i < movements.length; i++) {
+        if (movements[i].date.getTime() < movements[i - 1].date.getTime()) {
+            return [...movements].sort((a, b) => a.date.getTime() - b.date.getTime());
+        }
+    }
+    return movements;
+}
+
 // FIFO Valuation (First In, First Out)
 export function calculateFIFO(movements: InventoryMovement[]): {
     endingInventory: number;
     cogs: number;
     batches: InventoryBatch[];
 } {
-    const batches: InventoryBatch[] = [];
+    const layers = new CostLayerQueue();
     let cogs = 0;
 
-    // Sort by date
-    const sorted = [...movements].sort((a, b) => a.date.getTime() - b.date.getTime());
-
-    for (const movement of sorted) {
+    for (const movement of inDateOrder(movements)) {
         if (movement.type === "IN") {
             // Add new batch
-            batches.push({
-                date: movement.date,
-                quantity: movement.quantity,
-                unitCost: movement.unitCost,
-            });
+            layers.push(movement.date, movement.quantity, movement.unitCost);
         } else {
             // Remove from oldest batches first (FIFO)
-            let remaining = movement.quantity;
-            while (remaining > 0 && batches.length > 0) {
-                const oldest = batches[0];
-                if (oldest.quantity <= remaining) {
-                    cogs += oldest.quantity * oldest.unitCost;
-                    remaining -= oldest.quantity;
-                    batches.shift();
-                } else {
-                    cogs += remaining * oldest.unitCost;
-                    oldest.quantity -= remaining;
-                    remaining = 0;
-                }
-            }
+            cogs += layers.consume(movement.quantity).cost;
         }
     }
 
-    const endingInventory = batches.reduce((sum, b) => sum + b.quantity * b.unitCost, 0);
-    return { endingInventory, cogs, batches };
+    return { endingInventory: layers.totalValue(), cogs, batches: layers.toBatches() };
 }
 
 // Weighted Average Valuation
@@ -68,9 +157,7 @@ export function calculateWeightedAverage(movements: InventoryMovement[]): {
     let totalCost = 0;
     let cogs = 0;
 
-    const sorted = [...movements].sort((a, b) => a.date.getTime() - b.date.getTime());
-
-    for (const movement of sorted) {
+    for (const movement of inDateOrder(movements)) {
         if (movement.type === "IN") {
             totalCost += movement.quantity * movement.unitCost;
             totalQuantity += movement.quantity;
@@ -131,6 +218,7 @@ export function valuateInventory(
 }
 
 export default {
+    CostLayerQueue,
     calculateFIFO,
     calculateWeightedAverage,
     calculateNRV,
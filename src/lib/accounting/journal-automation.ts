@@ -1,4 +1,5 @@
 import { PrismaClient } from "@prisma/client";
+import { invalidateCompanyCache } from "@/lib/response-cache";
 
 const prisma = new PrismaClient();
 
@@ -96,6 +97,7 @@ export async function createJournalEntry(data: JournalEntryData) {
         }
     }
 
+    await invalidateCompanyCache(data.companyId);
     return entry;
 }
 
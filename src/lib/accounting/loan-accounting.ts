@@ -9,6 +9,14 @@
  */
 
 import { prisma } from "@/lib/prisma";
+import {
+    accrueInterest,
+    computeSchedules,
+    getLoanBook,
+    invalidateLoanBook,
+    monthsPerPayment,
+    upcomingPayments,
+} from "@/lib/accounting/loan-portfolio";
 
 export interface CreateLoanInput {
     companyId: string;
@@ -93,53 +101,24 @@ export function generateAmortizationSchedule(
     startDate: Date,
     paymentFrequency: string = "MONTHLY"
 ): LoanScheduleEntry[] {
-    const schedule: LoanScheduleEntry[] = [];
-    const monthlyRate = annualRate / 12;
-    const monthlyPayment = calculateMonthlyPayment(principal, annualRate, termMonths);
-
-    let balance = principal;
-    let currentDate = new Date(startDate);
-
-    // Determine months between payments
-    const monthsPerPayment =
-        paymentFrequency === "QUARTERLY" ? 3 :
-            paymentFrequency === "SEMI_ANNUALLY" ? 6 :
-                paymentFrequency === "ANNUALLY" ? 12 : 1;
-
-    const numPayments = Math.ceil(termMonths / monthsPerPayment);
-    const paymentAmount = monthlyPayment * monthsPerPayment;
-
-    for (let i = 0; i < numPayments; i++) {
-        // Calculate interest for this period
-        const periodInterest = balance * monthlyRate * monthsPerPayment;
-
-        // Calculate principal portion
-        const isLastPayment = i === numPayments - 1;
-        const principalPart = isLastPayment
-            ? balance
-            : Math.min(paymentAmount - periodInterest, balance);
-
-        const actualPayment = isLastPayment
-            ? balance + periodInterest
-            : paymentAmount;
-
-        balance -= principalPart;
-
-        // Move to payment date
-        currentDate.setMonth(currentDate.getMonth() + monthsPerPayment);
-
-        schedule.push({
-            periodNumber: i + 1,
-            dueDate: new Date(currentDate),
-            principalDue: Math.round(principalPart * 100) / 100,
-            interestDue: Math.round(periodInterest * 100) / 100,
-            totalDue: Math.round(actualPayment * 100) / 100,
-            balanceAfter: Math.max(0, Math.round(balance * 100) / 100),
-            isPaid: false,
-        });
-    }
-
-    return schedule;
+    const rows = computeSchedules([{
+        principal,
+        annualRate,
+        termMonths,
+        startDate,
+        paymentFrequency,
+        monthlyPayment: calculateMonthlyPayment(principal, annualRate, termMonths),
+    }]);
+
+    return Array.from({ length: Math.ceil(termMonths / monthsPerPayment(paymentFrequency)) }, (_, i) => ({
+        periodNumber: i + 1,
+        dueDate: new Date(rows.dueDate[i]),
+        principalDue: rows.principalDue[i],
+        interestDue: rows.interestDue[i],
+        totalDue: rows.totalDue[i],
+        balanceAfter: rows.balanceAfter[i],
+        isPaid: false,
+    }));
 }
 
 /**
@@ -215,6 +194,7 @@ export async function createLoan(input: CreateLoanInput) {
         })),
     });
 
+    invalidateLoanBook(input.companyId);
     return loan;
 }
 
@@ -296,6 +276,7 @@ export async function recordLoanPayment(
         });
     }
 
+    invalidateLoanBook(loan.companyId);
     return payment;
 }
 
@@ -314,60 +295,24 @@ export async function getLoans(companyId: string) {
 }
 
 /**
- * Get upcoming loan payments
+ * Get upcoming loan payments across the company's loan book
  */
 export async function getUpcomingPayments(companyId: string, daysAhead: number = 30) {
     const futureDate = new Date();
     futureDate.setDate(futureDate.getDate() + daysAhead);
 
-    return prisma.loanSchedule.findMany({
-        where: {
-            isPaid: false,
-            dueDate: { lte: futureDate },
-            loan: {
-                companyId,
-                isActive: true,
-            },
-        },
-        include: { loan: true },
-        orderBy: { dueDate: "asc" },
-    });
+    return upcomingPayments(await getLoanBook(companyId), futureDate);
 }
 
 /**
  * Calculate interest accrual for a period
- * Use this for month-end accruals
+ * Use this for month-end accruals; balances are read fresh, not from the cache
  */
 export async function calculateInterestAccrual(
     companyId: string,
     asOfDate: Date
 ) {
-    const activeLoans = await prisma.loan.findMany({
-        where: { companyId, isActive: true },
-    });
-
-    let totalAccrual = 0;
-    const details = [];
-
-    for (const loan of activeLoans) {
-        // Calculate monthly interest based on remaining balance
-        const monthlyInterest = loan.remainingBalance * (loan.interestRate / 12);
-        totalAccrual += monthlyInterest;
-
-        details.push({
-            loanId: loan.id,
-            loanName: loan.loanName,
-            lenderName: loan.lenderName,
-            balance: loan.remainingBalance,
-            monthlyInterest: Math.round(monthlyInterest * 100) / 100,
-        });
-    }
-
-    return {
-        asOfDate,
-        totalAccrual: Math.round(totalAccrual * 100) / 100,
-        details,
-    };
+    return accrueInterest(await getLoanBook(companyId, { fresh: true }), asOfDate);
 }
 
 export default {
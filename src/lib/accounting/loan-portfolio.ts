@@ -0,0 +1,296 @@
+/**
+ * loan-portfolio.ts - Portfolio-level loan engine
+ *
+ * Holds all of a company's active loans and their schedules as flat typed
+ * arrays (one slot per loan, one row per schedule period), so accruals and
+ * upcoming-payment scans are single loops over contiguous memory with no
+ * per-loan queries. A book is built from two queries, cached per company,
+ * and dropped whenever a loan is created or paid; the TTL bounds staleness
+ * when another server instance records the change. Reads that post amounts
+ * (interest accruals, often run by a job worker that never sees the web
+ * server's invalidations) ask for a fresh build instead.
+ */
+
+import { prisma } from "@/lib/prisma";
+
+const LOAN_BOOK_TTL_MS = 10 * 60 * 1000;
+
+export interface ScheduleTerms {
+    principal: number;
+    annualRate: number;
+    termMonths: number;
+    startDate: Date;
+    paymentFrequency?: string;
+    /** From calculateMonthlyPayment */
+    monthlyPayment: number;
+}
+
+/**
+ * Schedule rows for many loans; loan i owns rows offset[i] .. offset[i+1]-1
+ */
+export interface ScheduleArrays {
+    offset: Int32Array;
+    dueDate: Float64Array;
+    principalDue: Float64Array;
+    interestDue: Float64Array;
+    totalDue: Float64Array;
+    balanceAfter: Float64Array;
+}
+
+export interface LoanBook extends ScheduleArrays {
+    companyId: string;
+    builtAt: number;
+    loanIds: string[];
+    loanNames: string[];
+    lenderNames: string[];
+    balance: Float64Array;
+    rate: Float64Array;
+    scheduleIds: string[];
+    /** Loan slot owning each schedule row */
+    rowLoan: Int32Array;
+    periodNumber: Int32Array;
+    isPaid: Uint8Array;
+    /** Row index of each loan's first unpaid period (offset[i+1] when none) */
+    firstUnpaid: Int32Array;
+}
+
+const round2 = (value: number) => Math.round(value * 100) / 100;
+
+export function monthsPerPayment(paymentFrequency = "MONTHLY"): number {
+    return paymentFrequency === "QUARTERLY" ? 3 :
+        paymentFrequency === "SEMI_ANNUALLY" ? 6 :
+            paymentFrequency === "ANNUALLY" ? 12 : 1;
+}
+
+/**
+ * Amortization schedules for any number of loans in one pass.
+ * The last period clears the remaining balance.
+ */
+export function computeSchedules(terms: ScheduleTerms[]): ScheduleArrays {
+    const offset = new Int32Array(terms.length + 1);
+    terms.forEach((t, i) => {
+        offset[i + 1] = offset[i] + Math.ceil(t.termMonths / monthsPerPayment(t.paymentFrequency));
+    });
+
+    const rows = offset[terms.length];
+    const out: ScheduleArrays = {
+        offset,
+        dueDate: new Float64Array(rows),
+        principalDue: new Float64Array(rows),
+        interestDue: new Float64Array(rows),
+        totalDue: new Float64Array(rows),
+        balanceAfter: new Float64Array(rows),
+    };
+
+    for (let i = 0; i < terms.length; i++) {
+        const t = terms[i];
+        const step = monthsPerPayment(t.paymentFrequency);
+        const periodRate = (t.annualRate / 12) * step;
+        const paymentAmount = t.monthlyPayment * step;
+        const last = offset[i + 1] - 1;
+        const date = new Date(t.startDate);
+        let balance = t.principal;
+
+        for (let r = offset[i]; r <= last; r++) {
+            const periodInterest = balance * periodRate;
+            const principalPart = r === last ? balance : Math.min(paymentAmount - periodInterest, balance);
+            const payment = r === last ? balance + periodInterest : paymentAmount;
+            balance -= principalPart;
+            // Month arithmetic accumulates on the same Date, matching stored schedules
+            date.setMonth(date.getMonth() + step);
+
+            out.dueDate[r] = date.getTime();
+            out.principalDue[r] = round2(principalPart);
+            out.interestDue[r] = round2(periodInterest);
+            out.totalDue[r] = round2(payment);
+            out.balanceAfter[r] = Math.max(0, round2(balance));
+        }
+    }
+
+    return out;
+}
+
+type BookLoan = { id: string; loanName: string; lenderName: string; remainingBalance: number; interestRate: number };
+type BookRow = {
+    id: string;
+    loanId: string;
+    periodNumber: number;
+    dueDate: Date;
+    principalDue: number;
+    interestDue: number;
+    totalDue: number;
+    balanceAfter: number;
+    isPaid: boolean;
+};
+
+/**
+ * Pack loans and their schedule rows (any order) into a book
+ */
+export function createLoanBook(companyId: string, loans: BookLoan[], rows: BookRow[]): LoanBook {
+    const n = loans.length;
+    const slot = new Map(loans.map((loan, i) => [loan.id, i]));
+    const owned = rows.filter(row => slot.has(row.loanId));
+
+    const offset = new Int32Array(n + 1);
+    for (const row of owned) offset[slot.get(row.loanId)! + 1]++;
+    for (let i = 0; i < n; i++) offset[i + 1] += offset[i];
+
+    const size = offset[n];
+    const book: LoanBook = {
+        companyId,
+        builtAt: Date.now(),
+        loanIds: loans.map(l => l.id),
+        loanNames: loans.map(l => l.loanName),
+        lenderNames: loans.map(l => l.lenderName),
+        balance: Float64Array.from(loans, l => l.remainingBalance),
+        rate: Float64Array.from(loans, l => l.interestRate),
+        offset,
+        scheduleIds: new Array(size),
+        rowLoan: new Int32Array(size),
+        periodNumber: new Int32Array(size),
+        dueDate: new Float64Array(size),
+        principalDue: new Float64Array(size),
+        interestDue: new Float64Array(size),
+        totalDue: new Float64Array(size),
+        balanceAfter: new Float64Array(size),
+        isPaid: new Uint8Array(size),
+        firstUnpaid: new Int32Array(n),
+    };
+
+    const sorted = [...owned].sort((a, b) =>
+        slot.get(a.loanId)! - slot.get(b.loanId)! || a.periodNumber - b.periodNumber
+    );
+    sorted.forEach((row, r) => {
+        book.scheduleIds[r] = row.id;
+        book.rowLoan[r] = slot.get(row.loanId)!;
+        book.periodNumber[r] = row.periodNumber;
+        book.dueDate[r] = row.dueDate.getTime();
+        book.principalDue[r] = row.principalDue;
+        book.interestDue[r] = row.interestDue;
+        book.totalDue[r] = row.totalDue;
+        book.balanceAfter[r] = row.balanceAfter;
+        book.isPaid[r] = row.isPaid ? 1 : 0;
+    });
+
+    for (let i = 0; i < n; i++) {
+        let r = offset[i];
+        while (r < offset[i + 1] && book.isPaid[r]) r++;
+        book.firstUnpaid[i] = r;
+    }
+
+    return book;
+}
+
+const globalForLoans = globalThis as unknown as {
+    loanBooks: Map<string, { book: Promise<LoanBook>; expiresAt: number }> | undefined;
+};
+const loanBooks = globalForLoans.loanBooks ?? new Map<string, { book: Promise<LoanBook>; expiresAt: number }>();
+globalForLoans.loanBooks = loanBooks;
+
+async function loadLoanBook(companyId: string): Promise<LoanBook> {
+    const where = { companyId, isActive: true };
+    const [loans, rows] = await Promise.all([
+        prisma.loan.findMany({
+            where,
+            select: { id: true, loanName: true, lenderName: true, remainingBalance: true, interestRate: true },
+            orderBy: { createdAt: "desc" },
+        }),
+        prisma.loanSchedule.findMany({
+            where: { loan: where },
+            select: {
+                id: true,
+                loanId: true,
+                periodNumber: true,
+                dueDate: true,
+                principalDue: true,
+                interestDue: true,
+                totalDue: true,
+                balanceAfter: true,
+                isPaid: true,
+            },
+        }),
+    ]);
+    return createLoanBook(companyId, loans, rows);
+}
+
+/**
+ * Cached book for a company; concurrent callers share one build.
+ * `fresh` skips the cache and replaces it with a book built from the database now.
+ */
+export function getLoanBook(companyId: string, options: { fresh?: boolean } = {}): Promise<LoanBook> {
+    const cached = loanBooks.get(companyId);
+    if (!options.fresh && cached && cached.expiresAt > Date.now()) return cached.book;
+
+    const book = loadLoanBook(companyId);
+    loanBooks.set(companyId, { book, expiresAt: Date.now() + LOAN_BOOK_TTL_MS });
+    book.catch(() => {
+        if (loanBooks.get(companyId)?.book === book) loanBooks.delete(companyId);
+    });
+    return book;
+}
+
+/**
+ * Drop a company's book after a loan, payment or schedule change
+ */
+export function invalidateLoanBook(companyId: string) {
+    loanBooks.delete(companyId);
+}
+
+/**
+ * One month of interest on every loan's remaining balance
+ */
+export function accrueInterest(book: LoanBook, asOfDate: Date) {
+    const details = new Array(book.loanIds.length);
+    let totalAccrual = 0;
+
+    for (let i = 0; i < book.loanIds.length; i++) {
+        const monthlyInterest = book.balance[i] * (book.rate[i] / 12);
+        totalAccrual += monthlyInterest;
+        details[i] = {
+            loanId: book.loanIds[i],
+            loanName: book.loanNames[i],
+            lenderName: book.lenderNames[i],
+            balance: book.balance[i],
+            monthlyInterest: round2(monthlyInterest),
+        };
+    }
+
+    return {
+        asOfDate,
+        totalAccrual: round2(totalAccrual),
+        details,
+    };
+}
+
+/**
+ * Unpaid periods due on or before `until`, soonest first.
+ * Each loan is scanned from its first unpaid period and stops at the first later one.
+ */
+export function upcomingPayments(book: LoanBook, until: Date) {
+    const limit = until.getTime();
+    const due: number[] = [];
+
+    for (let i = 0; i < book.loanIds.length; i++) {
+        const end = book.offset[i + 1];
+        for (let r = book.firstUnpaid[i]; r < end && book.dueDate[r] <= limit; r++) {
+            if (!book.isPaid[r]) due.push(r);
+        }
+    }
+    due.sort((a, b) => book.dueDate[a] - book.dueDate[b]);
+
+    return due.map(r => {
+        const i = book.rowLoan[r];
+        return {
+            id: book.scheduleIds[r],
+            loanId: book.loanIds[i],
+            periodNumber: book.periodNumber[r],
+            dueDate: new Date(book.dueDate[r]),
+            principalDue: book.principalDue[r],
+            interestDue: book.interestDue[r],
+            totalDue: book.totalDue[r],
+            balanceAfter: book.balanceAfter[r],
+            isPaid: false,
+            loan: { id: book.loanIds[i], loanName: book.loanNames[i], lenderName: book.lenderNames[i] },
+        };
+    });
+}
@@ -9,6 +9,10 @@
  */
 
 import { prisma } from "@/lib/prisma";
+import { applyStockMovement } from "@/lib/accounting/cost-layers";
+import { evaluateStockLevels } from "@/lib/stock-alerts";
+import { invalidateCompanyCache } from "@/lib/response-cache";
+import { markProductsChanged } from "@/lib/product-index";
 
 export interface ReturnItemInput {
     productId?: string;
@@ -55,7 +59,7 @@ export async function createSalesReturn(input: SalesReturnInput) {
     const totalAmount = subtotal + taxAmount;
 
     // 2. Start Transaction
-    return await prisma.$transaction(async (tx) => {
+    const result = await prisma.$transaction(async (tx) => {
         // Generate return number
         const count = await tx.salesReturn.count({ where: { companyId } });
         const returnNumber = `SR-${String(count + 1).padStart(6, "0")}`;
@@ -100,7 +104,7 @@ export async function createSalesReturn(input: SalesReturnInput) {
                     });
 
                     // Record movement
-                    await tx.stockMovement.create({
+                    const movement = await tx.stockMovement.create({
                         data: {
                             companyId,
                             productId: item.productId,
@@ -114,6 +118,8 @@ export async function createSalesReturn(input: SalesReturnInput) {
                             date: returnDate,
                         },
                     });
+                    await applyStockMovement(tx, movement);
+                    await evaluateStockLevels(companyId, [item.productId], tx);
                 }
             }
         }
@@ -207,6 +213,10 @@ export async function createSalesReturn(input: SalesReturnInput) {
 
         return salesReturn;
     });
+
+    await invalidateCompanyCache(companyId);
+    markProductsChanged(companyId);
+    return result;
 }
 
 /**
@@ -227,7 +237,7 @@ export async function createPurchaseReturn(input: PurchaseReturnInput) {
     const totalAmount = subtotal + taxAmount;
 
     // 2. Start Transaction
-    return await prisma.$transaction(async (tx) => {
+    const result = await prisma.$transaction(async (tx) => {
         // Generate return number
         const count = await tx.purchaseReturn.count({ where: { companyId } });
         const returnNumber = `PR-${String(count + 1).padStart(6, "0")}`;
@@ -271,7 +281,7 @@ export async function createPurchaseReturn(input: PurchaseReturnInput) {
                     });
 
                     // Record movement
-                    await tx.stockMovement.create({
+                    const movement = await tx.stockMovement.create({
                         data: {
                             companyId,
                             productId: item.productId,
@@ -285,6 +295,8 @@ export async function createPurchaseReturn(input: PurchaseReturnInput) {
                             date: returnDate,
                         },
                     });
+                    await applyStockMovement(tx, movement);
+                    await evaluateStockLevels(companyId, [item.productId], tx);
                 }
             }
         }
@@ -365,4 +377,8 @@ export async function createPurchaseReturn(input: PurchaseReturnInput) {
 
         return purchaseReturn;
     });
+
+    await invalidateCompanyCache(companyId);
+    markProductsChanged(companyId);
+    return result;
 }
@@ -0,0 +1,359 @@
+/**
+ * stock-valuation.ts - Company-wide inventory valuation (IAS 2)
+ *
+ * Values every product under FIFO and weighted average, applies the
+ * lower-of-cost-and-NRV test and splits quantities by warehouse, in one pass
+ * over StockMovement ordered by (productId, date). Movements are read in
+ * keyset-paged chunks, so only the current product's history is held in
+ * memory. Costs are product-level (transfers do not revalue stock); each
+ * warehouse's share is valued at its product's unit cost.
+ *
+ * Stock on a product card beyond what its movements account for is valued
+ * in reports as of today the way cost-layers.ts opens it: one layer at the
+ * cost price, dated before the first movement. Such rows carry `unbacked`.
+ *
+ * Reports as of a past month end (a closed period) are stored as snapshots
+ * and reused until a back-dated movement changes that period's history.
+ */
+
+import { prisma } from "@/lib/prisma";
+import { calculateNRV } from "@/lib/accounting/inventory-valuation";
+import { CostMovement, movementDirection, replayCostLayers } from "@/lib/accounting/cost-layers";
+
+export const VALUATION_CHUNK_SIZE = 5000;
+
+const UNASSIGNED_WAREHOUSE = "unassigned";
+
+const round2 = (value: number) => Math.round(value * 100) / 100;
+
+export interface ValuationOptions {
+    /** Value stock as of the end of this day; defaults to now */
+    asOf?: Date;
+    /** Estimated costs to sell, as a percentage of selling price */
+    costToSellPct?: number;
+    chunkSize?: number;
+    onProgress?: (movementsRead: number) => void;
+}
+
+export interface ProductValuation {
+    productId: string;
+    sku: string;
+    name: string;
+    quantity: number;
+    fifoValue: number;
+    averageValue: number;
+    averageCost: number;
+    cogs: { fifo: number; average: number };
+    nrv: number;
+    fifoWriteDown: number;
+    averageWriteDown: number;
+    warehouses: { warehouseId: string; quantity: number }[];
+    /** Stock on the product card with no movement history, valued at cost price */
+    noHistory?: boolean;
+    /** Units on the product card its movements do not account for, opened at cost price */
+    unbacked?: number;
+}
+
+export interface WarehouseValuation {
+    warehouseId: string;
+    name: string;
+    quantity: number;
+    fifoValue: number;
+    averageValue: number;
+}
+
+export interface StockValuationReport {
+    asOf: string;
+    costToSellPct: number;
+    products: ProductValuation[];
+    warehouses: WarehouseValuation[];
+    totals: {
+        quantity: number;
+        fifoValue: number;
+        averageValue: number;
+        fifoWriteDown: number;
+        averageWriteDown: number;
+        fifoCarryingValue: number;
+        averageCarryingValue: number;
+    };
+    movementsRead: number;
+}
+
+type CatalogProduct = { id: string; sku: string; name: string; costPrice: number; sellingPrice: number; stockQuantity: number };
+
+/**
+ * Quantity change in a movement's own warehouse; transfers move stock
+ * between warehouses, everything else follows the valuation direction
+ */
+function warehouseDelta(movement: { type: string; quantity: number }): number {
+    const quantity = Math.abs(movement.quantity);
+    if (movement.type === "TRANSFER_OUT") return -quantity;
+    if (movement.type === "TRANSFER_IN") return quantity;
+    const direction = movementDirection(movement);
+    return direction === "IN" ? quantity : direction === "OUT" ? -quantity : 0;
+}
+
+/**
+ * End of the given day; as-of dates include every movement on that day
+ */
+export function endOfDay(date: Date): Date {
+    const end = new Date(date);
+    end.setHours(23, 59, 59, 999);
+    return end;
+}
+
+/**
+ * Stream a company's movements up to `asOf` in (productId, date, id) order
+ */
+async function* movementChunks(companyId: string, asOf: Date, chunkSize: number) {
+    let after: { productId: string; date: Date; id: string } | null = null;
+    for (;;) {
+        const chunk: (CostMovement & { warehouseId: string | null })[] = await prisma.stockMovement.findMany({
+            where: {
+                companyId,
+                date: { lte: asOf },
+                ...(after && {
+                    OR: [
+                        { productId: { gt: after.productId } },
+                        { productId: after.productId, date: { gt: after.date } },
+                        { productId: after.productId, date: after.date, id: { gt: after.id } },
+                    ],
+                }),
+            },
+            select: {
+                id: true,
+                companyId: true,
+                productId: true,
+                warehouseId: true,
+                type: true,
+                quantity: true,
+                unitCost: true,
+                date: true,
+            },
+            orderBy: [{ productId: "asc" }, { date: "asc" }, { id: "asc" }],
+            take: chunkSize,
+        });
+        if (chunk.length === 0) return;
+        yield chunk;
+        if (chunk.length < chunkSize) return;
+        const last = chunk[chunk.length - 1];
+        after = { productId: last.productId, date: last.date, id: last.id };
+    }
+}
+
+/**
+ * Value every product and warehouse of a company as of a date
+ */
+export async function computeStockValuation(companyId: string, options: ValuationOptions = {}): Promise<StockValuationReport> {
+    const now = new Date();
+    const asOf = options.asOf ?? now;
+    const costToSellPct = options.costToSellPct ?? 0;
+    // Product cards hold today's stock, so only current reports can use them
+    const asOfNow = asOf >= now;
+
+    const [catalog, warehouseRows] = await Promise.all([
+        prisma.product.findMany({
+            where: { companyId, trackInventory: true },
+            select: { id: true, sku: true, name: true, costPrice: true, sellingPrice: true, stockQuantity: true },
+        }),
+        prisma.warehouse.findMany({ where: { companyId }, select: { id: true, name: true } }),
+    ]);
+    const productsById = new Map(catalog.map(p => [p.id, p]));
+
+    const products: ProductValuation[] = [];
+    const seen = new Set<string>();
+
+    const value = (
+        product: CatalogProduct,
+        quantity: number,
+        fifoValue: number,
+        averageValue: number,
+        cogs: { fifo: number; average: number },
+        warehouses: Map<string, number>
+    ): ProductValuation => {
+        const sales = quantity * product.sellingPrice;
+        const costsToSell = sales * costToSellPct / 100;
+        const fifo = calculateNRV(fifoValue, sales, costsToSell);
+        const average = calculateNRV(averageValue, sales, costsToSell);
+        const held = Math.max(quantity, 0);
+        return {
+            productId: product.id,
+            sku: product.sku,
+            name: product.name,
+            quantity,
+            fifoValue: round2(fifoValue),
+            averageValue: round2(averageValue),
+            averageCost: held > 0 ? round2(averageValue / held) : 0,
+            cogs: { fifo: round2(cogs.fifo), average: round2(cogs.average) },
+            nrv: round2(fifo.nrv),
+            fifoWriteDown: round2(fifo.writeDown),
+            averageWriteDown: round2(average.writeDown),
+            warehouses: Array.from(warehouses, ([warehouseId, qty]) => ({ warehouseId, quantity: qty })).filter(w => w.quantity !== 0),
+        };
+    };
+
+    // Movements of the product currently being read
+    let current: CostMovement[] = [];
+    let currentWarehouses = new Map<string, number>();
+    const finish = () => {
+        if (current.length === 0) return;
+        const product = productsById.get(current[0].productId);
+        if (product) {
+            let replay = replayCostLayers(current, product.costPrice);
+            const unbacked = asOfNow ? product.stockQuantity - replay.avgQuantity : 0;
+            if (unbacked > 0) {
+                const opening: CostMovement = {
+                    id: `opening-${product.id}`,
+                    companyId,
+                    productId: product.id,
+                    type: "ADJUSTMENT",
+                    quantity: unbacked,
+                    unitCost: product.costPrice,
+                    date: new Date(current[0].date.getTime() - 1),
+                };
+                replay = replayCostLayers([opening, ...current], product.costPrice);
+                currentWarehouses.set(UNASSIGNED_WAREHOUSE, (currentWarehouses.get(UNASSIGNED_WAREHOUSE) || 0) + unbacked);
+            }
+            products.push({
+                ...value(
+                    product,
+                    replay.avgQuantity,
+                    replay.fifoValue,
+                    replay.avgValue,
+                    { fifo: replay.fifoCogs, average: replay.avgCogs },
+                    currentWarehouses
+                ),
+                ...(unbacked > 0 && { unbacked }),
+            });
+            seen.add(product.id);
+        }
+        current = [];
+        currentWarehouses = new Map();
+    };
+
+    let movementsRead = 0;
+    for await (const chunk of movementChunks(companyId, asOf, options.chunkSize ?? VALUATION_CHUNK_SIZE)) {
+        for (const movement of chunk) {
+            if (current.length > 0 && current[0].productId !== movement.productId) finish();
+            current.push(movement);
+            const warehouseId = movement.warehouseId ?? UNASSIGNED_WAREHOUSE;
+            currentWarehouses.set(warehouseId, (currentWarehouses.get(warehouseId) || 0) + warehouseDelta(movement));
+        }
+        movementsRead += chunk.length;
+        options.onProgress?.(movementsRead);
+    }
+    finish();
+
+    // Stock entered before movements were recorded
+    const tracked = await prisma.stockMovement.groupBy({ by: ["productId"], where: { companyId } });
+    tracked.forEach(row => seen.add(row.productId));
+    for (const product of catalog) {
+        if (seen.has(product.id) || product.stockQuantity <= 0) continue;
+        const cost = product.stockQuantity * product.costPrice;
+        products.push({
+            ...value(product, product.stockQuantity, cost, cost, { fifo: 0, average: 0 }, new Map([[UNASSIGNED_WAREHOUSE, product.stockQuantity]])),
+            noHistory: true,
+        });
+    }
+    products.sort((a, b) => a.name.localeCompare(b.name));
+
+    // Warehouse shares at each product's unit cost
+    const warehouseNames = new Map(warehouseRows.map(w => [w.id, w.name]));
+    const warehouses = new Map<string, WarehouseValuation>();
+    for (const product of products) {
+        const held = Math.max(product.quantity, 0);
+        for (const share of product.warehouses) {
+            const entry = warehouses.get(share.warehouseId) || {
+                warehouseId: share.warehouseId,
+                name: warehouseNames.get(share.warehouseId) ?? "Unassigned",
+                quantity: 0,
+                fifoValue: 0,
+                averageValue: 0,
+            };
+            entry.quantity += share.quantity;
+            if (held > 0) {
+                entry.fifoValue += product.fifoValue * share.quantity / held;
+                entry.averageValue += product.averageValue * share.quantity / held;
+            }
+            warehouses.set(share.warehouseId, entry);
+        }
+    }
+
+    const totals = products.reduce((sum, p) => ({
+        quantity: sum.quantity + p.quantity,
+        fifoValue: sum.fifoValue + p.fifoValue,
+        averageValue: sum.averageValue + p.averageValue,
+        fifoWriteDown: sum.fifoWriteDown + p.fifoWriteDown,
+        averageWriteDown: sum.averageWriteDown + p.averageWriteDown,
+    }), { quantity: 0, fifoValue: 0, averageValue: 0, fifoWriteDown: 0, averageWriteDown: 0 });
+
+    return {
+        asOf: asOf.toISOString(),
+        costToSellPct,
+        products,
+        warehouses: Array.from(warehouses.values()).map(w => ({
+            ...w,
+            fifoValue: round2(w.fifoValue),
+            averageValue: round2(w.averageValue),
+        })),
+        totals: {
+            quantity: totals.quantity,
+            fifoValue: round2(totals.fifoValue),
+            averageValue: round2(totals.averageValue),
+            fifoWriteDown: round2(totals.fifoWriteDown),
+            averageWriteDown: round2(totals.averageWriteDown),
+            fifoCarryingValue: round2(totals.fifoValue - totals.fifoWriteDown),
+            averageCarryingValue: round2(totals.averageValue - totals.averageWriteDown),
+        },
+        movementsRead,
+    };
+}
+
+/**
+ * True when `asOf` is the last day of a month that has already ended
+ */
+export function isClosedPeriodEnd(asOf: Date, now = new Date()): boolean {
+    const next = new Date(asOf);
+    next.setDate(next.getDate() + 1);
+    return next.getDate() === 1 && endOfDay(asOf) < now;
+}
+
+async function movementFingerprint(companyId: string, asOf: Date): Promise<string> {
+    const agg = await prisma.stockMovement.aggregate({
+        where: { companyId, date: { lte: asOf } },
+        _count: { _all: true },
+        _sum: { quantity: true },
+    });
+    return `${agg._count._all}:${agg._sum.quantity ?? 0}`;
+}
+
+/**
+ * Valuation report, reusing the stored snapshot for a closed month end
+ */
+export async function getStockValuation(
+    companyId: string,
+    options: ValuationOptions = {}
+): Promise<{ report: StockValuationReport; cached: boolean }> {
+    if (!options.asOf || !isClosedPeriodEnd(options.asOf)) {
+        return { report: await computeStockValuation(companyId, options), cached: false };
+    }
+
+    const asOf = endOfDay(options.asOf);
+    const key = `${asOf.toISOString()}|${options.costToSellPct ?? 0}`;
+    const [snapshot, fingerprint] = await Promise.all([
+        prisma.inventoryValuationSnapshot.findUnique({ where: { companyId_key: { companyId, key } } }),
+        movementFingerprint(companyId, asOf),
+    ]);
+    if (snapshot && snapshot.fingerprint === fingerprint) {
+        return { report: JSON.parse(snapshot.payload), cached: true };
+    }
+
+    const report = await computeStockValuation(companyId, { ...options, asOf });
+    const payload = JSON.stringify(report);
+    await prisma.inventoryValuationSnapshot.upsert({
+        where: { companyId_key: { companyId, key } },
+        create: { companyId, key, asOf, fingerprint, payload },
+        update: { fingerprint, payload, createdAt: new Date() },
+    });
+    return { report, cached: false };
+}
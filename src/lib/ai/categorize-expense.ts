@@ -1,5 +1,6 @@
 import { getOpenAI } from "./openai-client";
 import { prisma } from "@/lib/prisma";
+import { invalidateCompanyCache } from "@/lib/response-cache";
 
 export async function categorizeExpense(
     description: string,
@@ -57,7 +58,7 @@ export async function autoCategorizeAndSave(
     const result = await categorizeExpense(description, amount, vendor);
 
     if (result.category) {
-        await prisma.expense.update({
+        const expense = await prisma.expense.update({
             where: { id: expenseId },
             data: {
                 aiCategoryId: result.category.id,
@@ -65,6 +66,7 @@ export async function autoCategorizeAndSave(
                 categoryId: result.category.id,
             },
         });
+        await invalidateCompanyCache(expense.companyId);
     }
 
     return result;
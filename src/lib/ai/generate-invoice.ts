@@ -1,5 +1,9 @@
 import { getOpenAI } from "./openai-client";
 import { prisma } from "@/lib/prisma";
+import { computeInvoiceTotals } from "@/lib/invoice-totals";
+import { applyRollupChange, invoiceRollup } from "@/lib/monthly-rollups";
+import { invalidateCompanyCache } from "@/lib/response-cache";
+import { nextDocumentNumber } from "@/lib/sequences";
 
 export interface GeneratedInvoice {
     clientId: string;
@@ -95,35 +99,37 @@ export async function createInvoiceFromAI(
         clientId = newClient.id;
     }
 
-    // Generate invoice number
-    const lastInvoice = await prisma.invoice.findFirst({
-        where: { companyId },
-        orderBy: { invoiceNumber: "desc" },
-    });
-    const nextNumber = lastInvoice
-        ? `INV-${String(parseInt(lastInvoice.invoiceNumber.split("-")[1] || "0") + 1).padStart(3, "0")}`
-        : "INV-001";
-
-    // Create invoice
-    const invoice = await prisma.invoice.create({
-        data: {
-            companyId,
-            clientId,
-            invoiceNumber: nextNumber,
-            issueDate: new Date(),
-            dueDate: generated.dueDate,
-            notes: generated.notes,
-            aiGenerated: true,
-            items: {
-                create: generated.items.map((item) => ({
-                    description: item.description,
-                    quantity: item.quantity,
-                    unitPrice: item.unitPrice,
-                })),
+    // Create invoice with persisted totals (no tax rate on generated invoices);
+    // the number, invoice and rollup change commit together
+    const totals = computeInvoiceTotals(generated.items, 0);
+    const invoice = await prisma.$transaction(async (tx) => {
+        const nextNumber = await nextDocumentNumber(companyId, "INVOICE", tx);
+        const created = await tx.invoice.create({
+            data: {
+                companyId,
+                clientId,
+                invoiceNumber: nextNumber,
+                issueDate: new Date(),
+                dueDate: generated.dueDate,
+                notes: generated.notes,
+                aiGenerated: true,
+                ...totals,
+                balanceDue: totals.totalAmount,
+                items: {
+                    create: generated.items.map((item) => ({
+                        description: item.description,
+                        quantity: item.quantity,
+                        unitPrice: item.unitPrice,
+                        total: item.quantity * item.unitPrice,
+                    })),
+                },
             },
-        },
-        include: { items: true, client: true },
+            include: { items: true, client: true },
+        });
+        await applyRollupChange(companyId, [], invoiceRollup(created), tx);
+        return created;
     });
+    await invalidateCompanyCache(companyId);
 
     return invoice;
 }
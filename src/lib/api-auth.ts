@@ -2,39 +2,98 @@ import { auth } from "@/lib/auth";
 import { prisma } from "@/lib/prisma";
 import { jwtVerify } from "jose";
 
-const JWT_SECRET = new TextEncoder().encode(
+// Encoded once per process; shared by the login route for signing
+export const JWT_SECRET = new TextEncoder().encode(
     process.env.AUTH_SECRET || "fallback-secret-for-dev-only"
 );
 
+type AuthInfo = { companyId: string; role: string; userId: string };
+type RequestHeaders = { get(name: string): string | null };
+
+// Session -> membership resolutions, shared across requests for a short TTL.
+// Team routes invalidate on change; other instances pick changes up within the TTL.
+const MEMBERSHIP_TTL_MS = 30 * 1000;
+
+const globalForAuth = globalThis as unknown as {
+    membershipCache: Map<string, { info: AuthInfo; expiresAt: number }> | undefined;
+};
+const membershipCache = globalForAuth.membershipCache ?? new Map<string, { info: AuthInfo; expiresAt: number }>();
+globalForAuth.membershipCache = membershipCache;
+
+// Per-request memo, keyed on the request's headers object so it is dropped with the request
+const requestMemo = new WeakMap<object, Promise<AuthInfo | null>>();
+
+/**
+ * Drop cached memberships after a membership or role change.
+ * Pass no userId to clear everything.
+ */
+export function invalidateAuthCache(userId?: string) {
+    if (userId) {
+        membershipCache.delete(userId);
+    } else {
+        membershipCache.clear();
+    }
+}
+
+async function resolveMembership(userId: string): Promise<AuthInfo | null> {
+    const cached = membershipCache.get(userId);
+    if (cached && cached.expiresAt > Date.now()) return cached.info;
+
+    const membership = await prisma.companyMembership.findFirst({
+        where: { userId },
+        select: { companyId: true, role: true, userId: true },
+    });
+    if (!membership) {
+        membershipCache.delete(userId);
+        return null;
+    }
+
+    const info = {
+        companyId: membership.companyId,
+        role: membership.role,
+        userId: membership.userId,
+    };
+    membershipCache.set(userId, { info, expiresAt: Date.now() + MEMBERSHIP_TTL_MS });
+    return info;
+}
+
 /**
  * Get the authenticated user's company ID, role, and userId
- * Returns null if not authenticated
+ * Returns null if not authenticated. Memoized per request, so routes may call
+ * the helpers below as often as they like.
  */
-export async function getAuthInfo(): Promise<{ companyId: string; role: string; userId: string } | null> {
+export async function getAuthInfo(): Promise<AuthInfo | null> {
+    // We need the request headers. Since Next.js doesn't provide them directly in this utility,
+    // we'll use the 'headers' helper from next/headers.
+    let headersList: RequestHeaders | null = null;
+    try {
+        const { headers } = await import("next/headers");
+        headersList = await headers();
+    } catch {
+        // Outside a request scope (scripts, tests): no memo and no Bearer fallback
+    }
+
+    if (!headersList) return resolveAuthInfo(null);
+
+    let pending = requestMemo.get(headersList);
+    if (!pending) {
+        pending = resolveAuthInfo(headersList);
+        requestMemo.set(headersList, pending);
+    }
+    return pending;
+}
+
+async function resolveAuthInfo(headersList: RequestHeaders | null): Promise<AuthInfo | null> {
     try {
         // 1. Try Session Cookie (standard web flow)
         const session = await auth();
         if (session?.user?.id) {
-            const membership = await prisma.companyMembership.findFirst({
-                where: { userId: session.user.id },
-                select: { companyId: true, role: true, userId: true },
-            });
-
-            if (membership) {
-                return {
-                    companyId: membership.companyId,
-                    role: membership.role,
-                    userId: membership.userId,
-                };
-            }
+            const membership = await resolveMembership(session.user.id);
+            if (membership) return membership;
         }
 
         // 2. Try Bearer Token (API/Test flow)
-        // We need the request headers. Since Next.js doesn't provide them directly in this utility,
-        // we'll use the 'headers' helper from next/headers.
-        const { headers } = await import("next/headers");
-        const headersList = await headers();
-        const authHeader = headersList.get("authorization");
+        const authHeader = headersList?.get("authorization");
 
         if (authHeader?.startsWith("Bearer ")) {
             const token = authHeader.substring(7);
@@ -62,7 +121,7 @@ export async function getAuthInfo(): Promise<{ companyId: string; role: string;
 /**
  * Get auth info or throw/return error response
  */
-export async function requireAuth(): Promise<{ companyId: string; role: string; userId: string } | { error: string; status: 401 }> {
+export async function requireAuth(): Promise<AuthInfo | { error: string; status: 401 }> {
     const authInfo = await getAuthInfo();
     if (!authInfo) {
         return { error: "Unauthorized", status: 401 };
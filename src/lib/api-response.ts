@@ -6,8 +6,8 @@ export type ApiError = {
     details?: any;
 };
 
-export function apiResponse<T>(data: T, status = 200) {
-    return NextResponse.json(data, { status });
+export function apiResponse<T>(data: T, status = 200, headers?: HeadersInit) {
+    return NextResponse.json(data, { status, headers });
 }
 
 export function apiError(message: string, code: string = "INTERNAL_ERROR", status = 500, details?: any) {
@@ -39,3 +39,13 @@ export function forbiddenError(message = "Forbidden") {
 export function badRequestError(message: string, details?: any) {
     return apiError(message, "BAD_REQUEST", 400, details);
 }
+
+/**
+ * Format per-query timings as a Server-Timing header value
+ * e.g. "invoices;dur=12.4, pos;dur=3.1"
+ */
+export function serverTiming(timings: { name: string; durationMs: number }[]): string {
+    return timings
+        .map(t => `${t.name.replace(/[^\w-]/g, "_")};dur=${t.durationMs.toFixed(1)}`)
+        .join(", ");
+}
@@ -0,0 +1,227 @@
+/**
+ * export-stream.ts - Streaming data export
+ *
+ * Pages through each entity by id cursor and encodes every page straight
+ * into a ReadableStream as NDJSON lines or CSV rows. A page is only fetched
+ * when the consumer pulls, so memory stays at one page per export and the
+ * first bytes leave before the rest of the dataset is read.
+ */
+
+import { prisma } from "@/lib/prisma";
+
+export type ExportFormat = "ndjson" | "csv";
+
+interface ExportEntity {
+    /** Fetch up to `take` rows with id > `after`, ordered by id */
+    page(companyId: string, after: string | undefined, take: number): Promise<{ id: string }[]>;
+    /** Flat columns for CSV; nested values are JSON-encoded */
+    columns: string[];
+}
+
+const afterId = (after: string | undefined) => (after ? { id: { gt: after } } : {});
+
+export const EXPORT_ENTITIES: Record<string, ExportEntity> = {
+    accounts: {
+        columns: ["accountCode", "accountName", "accountType", "accountCategory", "normalBalance", "currentBalance", "isActive"],
+        page: (companyId, after, take) => prisma.account.findMany({
+            where: { companyId, ...afterId(after) },
+            select: {
+                id: true,
+                accountCode: true,
+                accountName: true,
+                accountType: true,
+                accountCategory: true,
+                normalBalance: true,
+                currentBalance: true,
+                isActive: true,
+            },
+            orderBy: { id: "asc" },
+            take,
+        }),
+    },
+    clients: {
+        columns: ["name", "email", "phone", "address", "taxId", "paymentTerms", "totalOutstanding"],
+        page: (companyId, after, take) => prisma.client.findMany({
+            where: { companyId, ...afterId(after) },
+            select: {
+                id: true,
+                name: true,
+                email: true,
+                phone: true,
+                address: true,
+                taxId: true,
+                paymentTerms: true,
+                totalOutstanding: true,
+            },
+            orderBy: { id: "asc" },
+            take,
+        }),
+    },
+    suppliers: {
+        columns: ["name", "contactPerson", "email", "phone", "address", "taxId", "paymentTerms", "isActive"],
+        page: (companyId, after, take) => prisma.supplier.findMany({
+            where: { companyId, ...afterId(after) },
+            select: {
+                id: true,
+                name: true,
+                contactPerson: true,
+                email: true,
+                phone: true,
+                address: true,
+                taxId: true,
+                paymentTerms: true,
+                isActive: true,
+            },
+            orderBy: { id: "asc" },
+            take,
+        }),
+    },
+    invoices: {
+        columns: ["invoiceNumber", "client", "issueDate", "dueDate", "status", "subtotal", "taxAmount", "totalAmount", "paidAmount", "items"],
+        page: (companyId, after, take) => prisma.invoice.findMany({
+            where: { companyId, ...afterId(after) },
+            include: {
+                client: { select: { name: true } },
+                items: true,
+            },
+            orderBy: { id: "asc" },
+            take,
+        }),
+    },
+    expenses: {
+        columns: ["date", "amount", "vendor", "description", "category", "notes"],
+        page: (companyId, after, take) => prisma.expense.findMany({
+            where: { companyId, ...afterId(after) },
+            include: {
+                category: { select: { name: true } },
+            },
+            orderBy: { id: "asc" },
+            take,
+        }),
+    },
+    products: {
+        columns: ["sku", "name", "description", "costPrice", "sellingPrice", "stockQuantity", "lowStockAlert", "isActive"],
+        page: (companyId, after, take) => prisma.product.findMany({
+            where: { companyId, ...afterId(after) },
+            select: {
+                id: true,
+                sku: true,
+                name: true,
+                description: true,
+                costPrice: true,
+                sellingPrice: true,
+                stockQuantity: true,
+                lowStockAlert: true,
+                isActive: true,
+            },
+            orderBy: { id: "asc" },
+            take,
+        }),
+    },
+    journalEntries: {
+        columns: ["journalNumber", "entryDate", "description", "sourceType", "status", "totalDebit", "totalCredit", "lines"],
+        page: (companyId, after, take) => prisma.journalEntry.findMany({
+            where: { companyId, ...afterId(after) },
+            include: {
+                lines: {
+                    include: {
+                        account: { select: { accountCode: true, accountName: true } },
+                    },
+                },
+            },
+            orderBy: { id: "asc" },
+            take,
+        }),
+    },
+};
+
+function csvCell(value: unknown): string {
+    if (value === null || value === undefined) return "";
+    let text: string;
+    if (value instanceof Date) {
+        text = value.toISOString();
+    } else if (typeof value === "object") {
+        // Relations: single-name objects collapse to the name, the rest become JSON
+        const keys = Object.keys(value as object);
+        text = keys.length === 1 && keys[0] === "name"
+            ? String((value as { name: unknown }).name ?? "")
+            : JSON.stringify(value);
+    } else {
+        text = String(value);
+    }
+    return /[",\r\n]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text;
+}
+
+/**
+ * Stream the given entities for a company.
+ * CSV takes exactly one entity; NDJSON emits a meta line, then one line per row
+ * tagged with its entity, then a summary line with row counts.
+ */
+export function createExportStream(options: {
+    companyId: string;
+    entities: string[];
+    format: ExportFormat;
+    meta?: Record<string, unknown>;
+    batchSize?: number;
+    /** Called after each page with the number of rows written so far */
+    onProgress?: (rowsWritten: number, counts: Record<string, number>) => void | Promise<void>;
+}): ReadableStream<Uint8Array> {
+    const { companyId, entities, format, meta = {}, batchSize = 500, onProgress } = options;
+    if (format === "csv" && entities.length !== 1) {
+        throw new Error("CSV export takes exactly one entity type");
+    }
+
+    const encoder = new TextEncoder();
+    const counts: Record<string, number> = {};
+    let entityIndex = 0;
+    let cursor: string | undefined;
+    let started = false;
+    let rowsWritten = 0;
+
+    return new ReadableStream<Uint8Array>({
+        async pull(controller) {
+            try {
+                if (!started) {
+                    started = true;
+                    const header = format === "csv"
+                        ? EXPORT_ENTITIES[entities[0]].columns.map(csvCell).join(",") + "\n"
+                        : JSON.stringify({ type: "meta", exportDate: new Date().toISOString(), ...meta }) + "\n";
+                    controller.enqueue(encoder.encode(header));
+                    return;
+                }
+
+                // Skip exhausted entities until one yields rows or all are done
+                while (entityIndex < entities.length) {
+                    const name = entities[entityIndex];
+                    const entity = EXPORT_ENTITIES[name];
+                    const rows = await entity.page(companyId, cursor, batchSize);
+
+                    if (rows.length === 0) {
+                        entityIndex++;
+                        cursor = undefined;
+                        continue;
+                    }
+
+                    cursor = rows[rows.length - 1].id;
+                    counts[name] = (counts[name] || 0) + rows.length;
+
+                    const chunk = format === "csv"
+                        ? rows.map(row => entity.columns.map(col => csvCell((row as Record<string, unknown>)[col])).join(",")).join("\n") + "\n"
+                        : rows.map(row => JSON.stringify({ type: name, data: row })).join("\n") + "\n";
+                    controller.enqueue(encoder.encode(chunk));
+                    rowsWritten += rows.length;
+                    await onProgress?.(rowsWritten, counts);
+                    return;
+                }
+
+                if (format === "ndjson") {
+                    controller.enqueue(encoder.encode(JSON.stringify({ type: "summary", counts }) + "\n"));
+                }
+                controller.close();
+            } catch (error) {
+                console.error("Export stream error:", error);
+                controller.error(error);
+            }
+        },
+    });
+}
@@ -0,0 +1,431 @@
+/**
+ * financial-aggregates.ts - Database-side aggregation engine
+ *
+ * Pushes the sums, group-bys and aging buckets behind financial-core.ts down
+ * into SQL, so a dashboard hit reads a handful of aggregate rows instead of
+ * every invoice and line item. Invoice amounts come from the persisted
+ * subtotal/totalAmount columns (see invoice-totals.ts). Raw queries use quoted
+ * Prisma table/column names and CASE-based bucketing so they run unchanged on
+ * SQLite and PostgreSQL.
+ */
+
+import { Prisma } from "@prisma/client";
+import { prisma } from "@/lib/prisma";
+
+export const REVENUE_INVOICE_STATUSES = ["PAID", "PENDING", "SENT", "OVERDUE"];
+export const AR_INVOICE_STATUSES = ["PENDING", "OVERDUE", "SENT"];
+export const AGING_BUCKETS = ["current", "1-30", "31-60", "61-90", "90+"] as const;
+
+export type AgingBucket = (typeof AGING_BUCKETS)[number];
+
+export const MONTHLY_METRICS = ["INVOICE_REVENUE", "POS_REVENUE", "POS_COGS", "EXPENSES", "BILLS_PAID"] as const;
+
+export type MonthlyMetric = (typeof MONTHLY_METRICS)[number];
+
+const DAY_MS = 1000 * 60 * 60 * 24;
+
+// SQLite stores DateTime columns as epoch milliseconds, PostgreSQL as timestamps
+const isSqlite = (process.env.DATABASE_URL || "").startsWith("file:");
+
+export function sqlDate(date: Date): Date | number {
+    return isSqlite ? date.getTime() : date;
+}
+
+/**
+ * Normalize an aggregate column (BigInt counts, NULL sums, numeric strings)
+ */
+export function toNumber(value: unknown): number {
+    if (value === null || value === undefined) return 0;
+    if (typeof value === "bigint") return Number(value);
+    return Number(value) || 0;
+}
+
+function dateFilter(column: Prisma.Sql, startDate?: Date, endDate?: Date): Prisma.Sql {
+    if (!startDate || !endDate) return Prisma.empty;
+    return Prisma.sql`AND ${column} >= ${sqlDate(startDate)} AND ${column} <= ${sqlDate(endDate)}`;
+}
+
+/**
+ * Build a CASE expression mapping `column` to the index of the half-open
+ * range [bounds[i], bounds[i + 1]) it falls in, or NULL when out of range.
+ */
+function rangeBucket(column: Prisma.Sql, bounds: Date[]): Prisma.Sql {
+    const branches = bounds.slice(0, -1).map((start, i) =>
+        Prisma.sql`WHEN ${column} >= ${sqlDate(start)} AND ${column} < ${sqlDate(bounds[i + 1])} THEN ${Prisma.raw(String(i))}`
+    );
+    return Prisma.sql`CASE ${Prisma.join(branches, " ")} ELSE NULL END`;
+}
+
+/**
+ * Sum persisted invoice totals for the given statuses.
+ * `subtotal` is pre-tax, `total` includes each invoice's tax.
+ */
+export async function sumInvoiceTotals(
+    companyId: string,
+    statuses: string[],
+    startDate?: Date,
+    endDate?: Date
+): Promise<{ subtotal: number; total: number }> {
+    const result = await prisma.invoice.aggregate({
+        where: {
+            companyId,
+            status: { in: statuses },
+            ...(startDate && endDate ? { issueDate: { gte: startDate, lte: endDate } } : {}),
+        },
+        _sum: { subtotal: true, totalAmount: true },
+    });
+
+    return {
+        subtotal: result._sum.subtotal || 0,
+        total: result._sum.totalAmount || 0,
+    };
+}
+
+/**
+ * Sum COMPLETED POS sales: revenue from the sale total, cost from the cost of
+ * goods recorded at checkout (product cost prices for sales that predate it)
+ */
+export async function sumPOSSales(
+    companyId: string,
+    startDate?: Date,
+    endDate?: Date
+): Promise<{ revenue: number; cogs: number }> {
+    const [revenue, cogs] = await Promise.all([
+        prisma.pOSSale.aggregate({
+            where: {
+                companyId,
+                status: "COMPLETED",
+                ...(startDate && endDate ? { saleDate: { gte: startDate, lte: endDate } } : {}),
+            },
+            _sum: { total: true, costOfGoods: true },
+        }),
+        prisma.$queryRaw<{ cogs: unknown }[]>`
+            SELECT COALESCE(SUM(si."quantity" * COALESCE(p."costPrice", 0)), 0) AS cogs
+            FROM "POSSaleItem" si
+            JOIN "POSSale" s ON s."id" = si."saleId"
+            LEFT JOIN "Product" p ON p."id" = si."productId"
+            WHERE s."companyId" = ${companyId}
+                AND s."status" = 'COMPLETED'
+                AND s."costOfGoods" IS NULL
+                ${dateFilter(Prisma.sql`s."saleDate"`, startDate, endDate)}
+        `,
+    ]);
+
+    return {
+        revenue: revenue._sum.total || 0,
+        cogs: (revenue._sum.costOfGoods || 0) + toNumber(cogs[0]?.cogs),
+    };
+}
+
+/**
+ * Sum Expense records and PAID bills in the range
+ */
+export async function sumOperatingExpenses(
+    companyId: string,
+    startDate: Date,
+    endDate: Date
+): Promise<{ expenses: number; bills: number }> {
+    const [expenses, bills] = await Promise.all([
+        prisma.expense.aggregate({
+            where: { companyId, date: { gte: startDate, lte: endDate } },
+            _sum: { amount: true },
+        }),
+        prisma.bill.aggregate({
+            where: { companyId, status: "PAID", issueDate: { gte: startDate, lte: endDate } },
+            _sum: { totalAmount: true },
+        }),
+    ]);
+
+    return {
+        expenses: expenses._sum.amount || 0,
+        bills: bills._sum.totalAmount || 0,
+    };
+}
+
+/**
+ * Balance sheet style totals: cash on hand, open payables
+ */
+export async function sumBalances(companyId: string): Promise<{ cash: number; payables: number }> {
+    const [cash, payables] = await Promise.all([
+        prisma.bankAccount.aggregate({
+            where: { companyId },
+            _sum: { balance: true },
+        }),
+        prisma.bill.aggregate({
+            where: { companyId, status: { in: ["PENDING", "OVERDUE"] } },
+            _sum: { totalAmount: true, paidAmount: true },
+        }),
+    ]);
+
+    return {
+        cash: cash._sum.balance || 0,
+        payables: (payables._sum.totalAmount || 0) - (payables._sum.paidAmount || 0),
+    };
+}
+
+/**
+ * Per-month totals for each monthly metric.
+ * `bounds` holds the start of each month plus the start of the month after the last.
+ */
+export async function sumMonthlyMetrics(
+    companyId: string,
+    bounds: Date[]
+): Promise<Record<MonthlyMetric, { amount: number[]; count: number[] }>> {
+    const from = sqlDate(bounds[0]);
+    const to = sqlDate(bounds[bounds.length - 1]);
+
+    type BucketRow = { bucket: unknown; amount: unknown; count: unknown };
+    const [invoiceRows, posRows, cogsRows, expenseRows, billRows] = await Promise.all([
+        prisma.$queryRaw<BucketRow[]>`
+            SELECT ${rangeBucket(Prisma.sql`"issueDate"`, bounds)} AS bucket,
+                COALESCE(SUM("totalAmount"), 0) AS amount, COUNT(*) AS count
+            FROM "Invoice"
+            WHERE "companyId" = ${companyId}
+                AND "status" = 'PAID'
+                AND "issueDate" >= ${from} AND "issueDate" < ${to}
+            GROUP BY 1
+        `,
+        prisma.$queryRaw<BucketRow[]>`
+            SELECT ${rangeBucket(Prisma.sql`"saleDate"`, bounds)} AS bucket,
+                COALESCE(SUM("total"), 0) AS amount, COUNT(*) AS count
+            FROM "POSSale"
+            WHERE "companyId" = ${companyId}
+                AND "status" = 'COMPLETED'
+                AND "saleDate" >= ${from} AND "saleDate" < ${to}
+            GROUP BY 1
+        `,
+        // Recorded cost of goods, or cost prices for sales from before it was recorded
+        prisma.$queryRaw<BucketRow[]>`
+            SELECT ${rangeBucket(Prisma.sql`"saleDate"`, bounds)} AS bucket,
+                COALESCE(SUM("costOfGoods"), 0) AS amount, 0 AS count
+            FROM "POSSale"
+            WHERE "companyId" = ${companyId}
+                AND "status" = 'COMPLETED'
+                AND "costOfGoods" IS NOT NULL
+                AND "saleDate" >= ${from} AND "saleDate" < ${to}
+            GROUP BY 1
+            UNION ALL
+            SELECT ${rangeBucket(Prisma.sql`s."saleDate"`, bounds)} AS bucket,
+                COALESCE(SUM(si."quantity" * COALESCE(p."costPrice", 0)), 0) AS amount, 0 AS count
+            FROM "POSSaleItem" si
+            JOIN "POSSale" s ON s."id" = si."saleId"
+            LEFT JOIN "Product" p ON p."id" = si."productId"
+            WHERE s."companyId" = ${companyId}
+                AND s."status" = 'COMPLETED'
+                AND s."costOfGoods" IS NULL
+                AND s."saleDate" >= ${from} AND s."saleDate" < ${to}
+            GROUP BY 1
+        `,
+        prisma.$queryRaw<BucketRow[]>`
+            SELECT ${rangeBucket(Prisma.sql`"date"`, bounds)} AS bucket,
+                COALESCE(SUM("amount"), 0) AS amount, COUNT(*) AS count
+            FROM "Expense"
+            WHERE "companyId" = ${companyId}
+                AND "date" >= ${from} AND "date" < ${to}
+            GROUP BY 1
+        `,
+        prisma.$queryRaw<BucketRow[]>`
+            SELECT ${rangeBucket(Prisma.sql`"issueDate"`, bounds)} AS bucket,
+                COALESCE(SUM("totalAmount"), 0) AS amount, COUNT(*) AS count
+            FROM "Bill"
+            WHERE "companyId" = ${companyId}
+                AND "status" = 'PAID'
+                AND "issueDate" >= ${from} AND "issueDate" < ${to}
+            GROUP BY 1
+        `,
+    ]);
+
+    const collect = (rows: BucketRow[]) => {
+        const amount = new Array<number>(bounds.length - 1).fill(0);
+        const count = new Array<number>(bounds.length - 1).fill(0);
+        rows.forEach(row => {
+            if (row.bucket === null || row.bucket === undefined) return;
+            amount[toNumber(row.bucket)] += toNumber(row.amount);
+            count[toNumber(row.bucket)] += toNumber(row.count);
+        });
+        return { amount, count };
+    };
+
+    return {
+        INVOICE_REVENUE: collect(invoiceRows),
+        POS_REVENUE: collect(posRows),
+        POS_COGS: collect(cogsRows),
+        EXPENSES: collect(expenseRows),
+        BILLS_PAID: collect(billRows),
+    };
+}
+
+/**
+ * Open invoice totals bucketed by days past due, relative to `now`
+ */
+export async function sumARAging(
+    companyId: string,
+    now: Date = new Date()
+): Promise<Record<AgingBucket, { amount: number; count: number }>> {
+    // daysOverdue = floor((now - dueDate) / day); bucket edges at 1, 31, 61 and 91 days
+    const cutoff = (days: number) => sqlDate(new Date(now.getTime() - days * DAY_MS));
+
+    const rows = await prisma.$queryRaw<{ bucket: unknown; amount: unknown; count: unknown }[]>`
+        SELECT
+            CASE
+                WHEN "dueDate" > ${cutoff(1)} THEN 0
+                WHEN "dueDate" > ${cutoff(31)} THEN 1
+                WHEN "dueDate" > ${cutoff(61)} THEN 2
+                WHEN "dueDate" > ${cutoff(91)} THEN 3
+                ELSE 4
+            END AS bucket,
+            COALESCE(SUM("totalAmount"), 0) AS amount,
+            COUNT(*) AS count
+        FROM "Invoice"
+        WHERE "companyId" = ${companyId}
+            AND "status" IN (${Prisma.join(AR_INVOICE_STATUSES)})
+        GROUP BY 1
+    `;
+
+    const buckets = Object.fromEntries(
+        AGING_BUCKETS.map(bucket => [bucket, { amount: 0, count: 0 }])
+    ) as Record<AgingBucket, { amount: number; count: number }>;
+
+    rows.forEach(row => {
+        const bucket = AGING_BUCKETS[toNumber(row.bucket)];
+        buckets[bucket].amount += toNumber(row.amount);
+        buckets[bucket].count += toNumber(row.count);
+    });
+
+    return buckets;
+}
+
+/**
+ * PAID invoice revenue grouped by client name, largest first
+ */
+export async function sumRevenueByClient(
+    companyId: string,
+    limit: number,
+    startDate: Date,
+    endDate: Date
+): Promise<{ name: string; value: number; count: number }[]> {
+    const groups = await prisma.invoice.groupBy({
+        by: ["clientId"],
+        where: { companyId, status: "PAID", issueDate: { gte: startDate, lte: endDate } },
+        _sum: { totalAmount: true },
+        _count: { _all: true },
+    });
+
+    const clients = await prisma.client.findMany({
+        where: { id: { in: groups.map(g => g.clientId) } },
+        select: { id: true, name: true },
+    });
+    const names = new Map(clients.map(c => [c.id, c.name]));
+
+    // Clients sharing a name are reported together, as before
+    const byName = new Map<string, { value: number; count: number }>();
+    groups.forEach(group => {
+        const name = names.get(group.clientId) || "Unknown";
+        const current = byName.get(name) || { value: 0, count: 0 };
+        current.value += group._sum.totalAmount || 0;
+        current.count += group._count._all;
+        byName.set(name, current);
+    });
+
+    return Array.from(byName.entries())
+        .map(([name, data]) => ({ name, ...data }))
+        .sort((a, b) => b.value - a.value)
+        .slice(0, limit);
+}
+
+/**
+ * Bill spend grouped by supplier name, largest first
+ */
+export async function sumSpendBySupplier(
+    companyId: string,
+    limit: number,
+    startDate: Date,
+    endDate: Date
+): Promise<{ name: string; value: number; count: number }[]> {
+    const groups = await prisma.bill.groupBy({
+        by: ["supplierId"],
+        where: { companyId, issueDate: { gte: startDate, lte: endDate } },
+        _sum: { totalAmount: true },
+        _count: { _all: true },
+    });
+
+    const suppliers = await prisma.supplier.findMany({
+        where: { id: { in: groups.map(g => g.supplierId) } },
+        select: { id: true, name: true },
+    });
+    const names = new Map(suppliers.map(s => [s.id, s.name]));
+
+    // Suppliers sharing a name are reported together, as before
+    const byName = new Map<string, { value: number; count: number }>();
+    groups.forEach(group => {
+        const name = names.get(group.supplierId) || "Unknown";
+        const current = byName.get(name) || { value: 0, count: 0 };
+        current.value += group._sum.totalAmount || 0;
+        current.count += group._count._all;
+        byName.set(name, current);
+    });
+
+    return Array.from(byName.entries())
+        .map(([name, data]) => ({ name, ...data }))
+        .sort((a, b) => b.value - a.value)
+        .slice(0, limit);
+}
+
+/**
+ * Expense totals grouped by category name, largest first
+ */
+export async function sumExpensesByCategory(
+    companyId: string,
+    limit: number,
+    startDate: Date,
+    endDate: Date
+): Promise<{ name: string; value: number }[]> {
+    const groups = await prisma.expense.groupBy({
+        by: ["categoryId"],
+        where: { companyId, date: { gte: startDate, lte: endDate } },
+        _sum: { amount: true },
+    });
+
+    const categoryIds = groups.map(g => g.categoryId).filter((id): id is string => !!id);
+    const categories = await prisma.expenseCategory.findMany({
+        where: { id: { in: categoryIds } },
+        select: { id: true, name: true },
+    });
+    const names = new Map(categories.map(c => [c.id, c.name]));
+
+    const byName = new Map<string, number>();
+    groups.forEach(group => {
+        const name = (group.categoryId && names.get(group.categoryId)) || "Uncategorized";
+        byName.set(name, (byName.get(name) || 0) + (group._sum.amount || 0));
+    });
+
+    return Array.from(byName.entries())
+        .map(([name, value]) => ({ name, value }))
+        .sort((a, b) => b.value - a.value)
+        .slice(0, limit);
+}
+
+/**
+ * Active product stock value and count.
+ * Low/out-of-stock counts are maintained separately (getStockLevelCounts).
+ */
+export async function sumInventory(companyId: string): Promise<{
+    totalValue: number;
+    itemCount: number;
+}> {
+    const rows = await prisma.$queryRaw<{
+        totalValue: unknown;
+        itemCount: unknown;
+    }[]>`
+        SELECT
+            COALESCE(SUM("stockQuantity" * "costPrice"), 0) AS "totalValue",
+            COUNT(*) AS "itemCount"
+        FROM "Product"
+        WHERE "companyId" = ${companyId} AND "isActive" = ${true}
+    `;
+
+    return {
+        totalValue: toNumber(rows[0]?.totalValue),
+        itemCount: toNumber(rows[0]?.itemCount),
+    };
+}
@@ -3,9 +3,26 @@
  * 
  * Single source of truth for all financial metrics across BrownLedger.
  * Used by Dashboard, Reports, and Financial Statements APIs.
+ * Sums are computed in the database by financial-aggregates.ts.
  */
 
-import { prisma } from "@/lib/prisma";
+import {
+    REVENUE_INVOICE_STATUSES,
+    AR_INVOICE_STATUSES,
+    AGING_BUCKETS,
+    sumInvoiceTotals,
+    sumPOSSales,
+    sumOperatingExpenses,
+    sumBalances,
+    sumMonthlyMetrics,
+    sumARAging,
+    sumRevenueByClient,
+    sumSpendBySupplier,
+    sumExpensesByCategory,
+    sumInventory,
+} from "@/lib/financial-aggregates";
+import { monthKey, readMonthlyRollups } from "@/lib/monthly-rollups";
+import { getStockLevelCounts } from "@/lib/stock-alerts";
 
 export interface DateRange {
     startDate: Date;
@@ -53,34 +70,12 @@ export async function calculateRevenue(
         ? { startDate, endDate }
         : getDefaultDateRange();
 
-    // Revenue from ALL invoices (Accrual)
-    const paidInvoices = await prisma.invoice.findMany({
-        where: {
-            companyId,
-            status: { in: ["PAID", "PENDING", "SENT", "OVERDUE"] },
-            issueDate: { gte: start, lte: end },
-        },
-        include: { items: true },
-    });
-
-    const invoiceRevenue = paidInvoices.reduce((sum, inv) => {
-        const subtotal = inv.items.reduce((s, item) => s + item.quantity * item.unitPrice, 0);
-        const taxAmount = subtotal * (inv.taxRate || 0);
-        return sum + subtotal + taxAmount;
-    }, 0);
-
-    // Revenue from COMPLETED POS sales
-    const posSales = await prisma.pOSSale.findMany({
-        where: {
-            companyId,
-            status: "COMPLETED",
-            saleDate: { gte: start, lte: end },
-        },
-    });
-
-    const posRevenue = posSales.reduce((sum, sale) => sum + sale.total, 0);
-
-    return invoiceRevenue + posRevenue;
+    const [invoices, pos] = await Promise.all([
+        sumInvoiceTotals(companyId, REVENUE_INVOICE_STATUSES, start, end),
+        sumPOSSales(companyId, start, end),
+    ]);
+
+    return invoices.total + pos.revenue;
 }
 
 /**
@@ -95,45 +90,16 @@ export async function calculateCOGS(
         ? { startDate, endDate }
         : getDefaultDateRange();
 
-    // COGS from POS sales (using product cost prices)
-    const posSales = await prisma.pOSSale.findMany({
-        where: {
-            companyId,
-            status: "COMPLETED",
-            saleDate: { gte: start, lte: end },
-        },
-        include: {
-            items: {
-                include: { product: true }
-            }
-        },
-    });
-
-    const posCogs = posSales.reduce((sum, sale) => {
-        return sum + sale.items.reduce((itemSum, item) => {
-            return itemSum + (item.quantity * (item.product?.costPrice || 0));
-        }, 0);
-    }, 0);
-
-    // Additional COGS from invoice items (if products are linked)
-    // For now, estimate as 60% of invoice revenue (common margin)
-    const paidInvoices = await prisma.invoice.findMany({
-        where: {
-            companyId,
-            status: { in: ["PAID", "PENDING", "SENT", "OVERDUE"] },
-            issueDate: { gte: start, lte: end },
-        },
-        include: { items: true },
-    });
-
-    const invoiceRevenue = paidInvoices.reduce((sum, inv) => {
-        return sum + inv.items.reduce((s, item) => s + item.quantity * item.unitPrice, 0);
-    }, 0);
+    // COGS from POS sales (using product cost prices) + invoice subtotals
+    const [pos, invoices] = await Promise.all([
+        sumPOSSales(companyId, start, end),
+        sumInvoiceTotals(companyId, REVENUE_INVOICE_STATUSES, start, end),
+    ]);
 
     // Estimate invoice COGS at 60% (manufacturing/metalwork typical margin)
-    const invoiceCogs = invoiceRevenue * 0.6;
+    const invoiceCogs = invoices.subtotal * 0.6;
 
-    return posCogs + invoiceCogs;
+    return pos.cogs + invoiceCogs;
 }
 
 /**
@@ -148,85 +114,118 @@ export async function calculateExpenses(
         ? { startDate, endDate }
         : getDefaultDateRange();
 
-    // Operating expenses from Expense records
-    const expenses = await prisma.expense.findMany({
-        where: {
-            companyId,
-            date: { gte: start, lte: end },
-        },
-    });
+    const { expenses, bills } = await sumOperatingExpenses(companyId, start, end);
 
-    const expenseTotal = expenses.reduce((sum, exp) => sum + exp.amount, 0);
+    return expenses + bills;
+}
 
-    // Add paid bills (purchases)
-    const paidBills = await prisma.bill.findMany({
-        where: {
-            companyId,
-            status: "PAID",
-            issueDate: { gte: start, lte: end },
-        },
-    });
+export interface QueryTiming {
+    name: string;
+    durationMs: number;
+}
 
-    const billsTotal = paidBills.reduce((sum, bill) => sum + bill.totalAmount, 0);
+/**
+ * Everything getFinancialSummary needs, fetched once per request
+ */
+export interface FinancialSnapshot {
+    companyId: string;
+    startDate: Date;
+    endDate: Date;
+    invoices: { subtotal: number; total: number };
+    pos: { revenue: number; cogs: number };
+    operating: { expenses: number; bills: number };
+    balances: { cash: number; payables: number };
+    receivables: { subtotal: number; total: number };
+    timings: QueryTiming[];
+}
 
-    return expenseTotal + billsTotal;
+/**
+ * Run a query and record how long it took
+ */
+export async function timed<T>(
+    timings: QueryTiming[],
+    name: string,
+    query: () => Promise<T>
+): Promise<T> {
+    const started = performance.now();
+    try {
+        return await query();
+    } finally {
+        timings.push({ name, durationMs: performance.now() - started });
+    }
 }
 
 /**
- * Get comprehensive financial summary
+ * Load the shared dataset for a company and date range.
+ * Each entity is aggregated once and the independent queries run concurrently.
  */
-export async function getFinancialSummary(
+export async function loadFinancialSnapshot(
     companyId: string,
     startDate?: Date,
     endDate?: Date
-): Promise<FinancialSummary> {
-    const revenue = await calculateRevenue(companyId, startDate, endDate);
-    const cogs = await calculateCOGS(companyId, startDate, endDate);
-    const operatingExpenses = await calculateExpenses(companyId, startDate, endDate);
+): Promise<FinancialSnapshot> {
+    const { startDate: start, endDate: end } = startDate && endDate
+        ? { startDate, endDate }
+        : getDefaultDateRange();
+
+    const timings: QueryTiming[] = [];
+    const [invoices, pos, operating, balances, receivables] = await Promise.all([
+        timed(timings, "invoices", () => sumInvoiceTotals(companyId, REVENUE_INVOICE_STATUSES, start, end)),
+        timed(timings, "pos", () => sumPOSSales(companyId, start, end)),
+        timed(timings, "expenses", () => sumOperatingExpenses(companyId, start, end)),
+        timed(timings, "balances", () => sumBalances(companyId)),
+        timed(timings, "receivables", () => sumInvoiceTotals(companyId, AR_INVOICE_STATUSES)),
+    ]);
+
+    return {
+        companyId,
+        startDate: start,
+        endDate: end,
+        invoices,
+        pos,
+        operating,
+        balances,
+        receivables,
+        timings,
+    };
+}
+
+/**
+ * Derive every summary metric from a loaded snapshot
+ */
+export function summarizeSnapshot(snapshot: FinancialSnapshot): FinancialSummary {
+    const revenue = snapshot.invoices.total + snapshot.pos.revenue;
+    // Estimate invoice COGS at 60% (manufacturing/metalwork typical margin)
+    const cogs = snapshot.pos.cogs + snapshot.invoices.subtotal * 0.6;
+    const operatingExpenses = snapshot.operating.expenses + snapshot.operating.bills;
 
     const grossProfit = revenue - cogs;
     const netProfit = grossProfit - operatingExpenses;
 
-    // Cash balance from bank accounts
-    const bankAccounts = await prisma.bankAccount.findMany({
-        where: { companyId },
-    });
-    const cashBalance = bankAccounts.reduce((sum, acc) => sum + acc.balance, 0);
-
-    // Accounts Receivable (unpaid + overdue invoices)
-    const arInvoices = await prisma.invoice.findMany({
-        where: {
-            companyId,
-            status: { in: ["PENDING", "OVERDUE", "SENT"] },
-        },
-        include: { items: true },
-    });
-    const accountsReceivable = arInvoices.reduce((sum, inv) => {
-        const subtotal = inv.items.reduce((s, item) => s + item.quantity * item.unitPrice, 0);
-        return sum + subtotal * (1 + (inv.taxRate || 0));
-    }, 0);
-
-    // Accounts Payable (unpaid bills)
-    const apBills = await prisma.bill.findMany({
-        where: {
-            companyId,
-            status: { in: ["PENDING", "OVERDUE"] },
-        },
-    });
-    const accountsPayable = apBills.reduce((sum, bill) => sum + bill.totalAmount - bill.paidAmount, 0);
-
     return {
         revenue: Math.round(revenue),
         cogs: Math.round(cogs),
         grossProfit: Math.round(grossProfit),
         operatingExpenses: Math.round(operatingExpenses),
         netProfit: Math.round(netProfit),
-        cashBalance: Math.round(cashBalance),
-        accountsReceivable: Math.round(accountsReceivable),
-        accountsPayable: Math.round(accountsPayable),
+        cashBalance: Math.round(snapshot.balances.cash),
+        accountsReceivable: Math.round(snapshot.receivables.total),
+        accountsPayable: Math.round(snapshot.balances.payables),
     };
 }
 
+/**
+ * Get comprehensive financial summary
+ */
+export async function getFinancialSummary(
+    companyId: string,
+    startDate?: Date,
+    endDate?: Date
+): Promise<FinancialSummary> {
+    const snapshot = await loadFinancialSnapshot(companyId, startDate, endDate);
+    return summarizeSnapshot(snapshot);
+}
+
 /**
  * Get monthly aggregated data for charts
  */
@@ -236,84 +235,34 @@ export async function getMonthlyData(
 ): Promise<MonthlyData[]> {
     const now = new Date();
     const months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"];
-    const result: MonthlyData[] = [];
-
-    // Get all relevant data in one query
-    const startDate = new Date(now.getFullYear(), now.getMonth() - monthsBack + 1, 1);
-
-    const invoices = await prisma.invoice.findMany({
-        where: {
-            companyId,
-            status: "PAID",
-            issueDate: { gte: startDate },
-        },
-        include: { items: true },
-    });
-
-    const posSales = await prisma.pOSSale.findMany({
-        where: {
-            companyId,
-            status: "COMPLETED",
-            saleDate: { gte: startDate },
-        },
-    });
-
-    const expenses = await prisma.expense.findMany({
-        where: {
-            companyId,
-            date: { gte: startDate },
-        },
-    });
-
-    // Aggregate by month
-    const monthlyMap = new Map<string, { revenue: number; expenses: number }>();
-
-    // Initialize all months
-    for (let i = monthsBack - 1; i >= 0; i--) {
-        const d = new Date(now.getFullYear(), now.getMonth() - i, 1);
-        const key = `${d.getFullYear()}-${d.getMonth()}`;
-        monthlyMap.set(key, { revenue: 0, expenses: 0 });
+
+    // Month boundaries (local time), oldest first, plus the start of next month
+    const bounds: Date[] = [];
+    for (let i = monthsBack - 1; i >= -1; i--) {
+        bounds.push(new Date(now.getFullYear(), now.getMonth() - i, 1));
     }
 
-    // Add invoice revenue
-    invoices.forEach(inv => {
-        const key = `${inv.issueDate.getFullYear()}-${inv.issueDate.getMonth()}`;
-        const current = monthlyMap.get(key) || { revenue: 0, expenses: 0 };
-        const subtotal = inv.items.reduce((s, item) => s + item.quantity * item.unitPrice, 0);
-        current.revenue += subtotal * (1 + (inv.taxRate || 0));
-        monthlyMap.set(key, current);
-    });
-
-    // Add POS revenue
-    posSales.forEach(sale => {
-        const key = `${sale.saleDate.getFullYear()}-${sale.saleDate.getMonth()}`;
-        const current = monthlyMap.get(key) || { revenue: 0, expenses: 0 };
-        current.revenue += sale.total;
-        monthlyMap.set(key, current);
-    });
-
-    // Add expenses
-    expenses.forEach(exp => {
-        const key = `${exp.date.getFullYear()}-${exp.date.getMonth()}`;
-        const current = monthlyMap.get(key) || { revenue: 0, expenses: 0 };
-        current.expenses += exp.amount;
-        monthlyMap.set(key, current);
-    });
-
-    // Convert to array
-    for (let i = monthsBack - 1; i >= 0; i--) {
-        const d = new Date(now.getFullYear(), now.getMonth() - i, 1);
-        const key = `${d.getFullYear()}-${d.getMonth()}`;
-        const data = monthlyMap.get(key) || { revenue: 0, expenses: 0 };
-        result.push({
-            month: months[d.getMonth()],
-            revenue: Math.round(data.revenue),
-            expenses: Math.round(data.expenses),
-            profit: Math.round(data.revenue - data.expenses),
-        });
+    // Read pre-aggregated rollups; fall back to raw sums until they have been built
+    const keys = bounds.slice(0, -1).map(monthKey);
+    const rollups = await readMonthlyRollups(companyId, keys);
+
+    let revenue: number[];
+    let expenses: number[];
+    if (rollups) {
+        revenue = keys.map(key => rollups.get(key)!.INVOICE_REVENUE + rollups.get(key)!.POS_REVENUE);
+        expenses = keys.map(key => rollups.get(key)!.EXPENSES);
+    } else {
+        const sums = await sumMonthlyMetrics(companyId, bounds);
+        revenue = sums.INVOICE_REVENUE.amount.map((amount, i) => amount + sums.POS_REVENUE.amount[i]);
+        expenses = sums.EXPENSES.amount;
     }
 
-    return result;
+    return bounds.slice(0, -1).map((d, i) => ({
+        month: months[d.getMonth()],
+        revenue: Math.round(revenue[i]),
+        expenses: Math.round(expenses[i]),
+        profit: Math.round(revenue[i] - expenses[i]),
+    }));
 }
 
 /**
@@ -329,28 +278,9 @@ export async function getTopClients(
         ? { startDate, endDate }
         : getDefaultDateRange();
 
-    const invoices = await prisma.invoice.findMany({
-        where: {
-            companyId,
-            status: "PAID",
-            issueDate: { gte: start, lte: end },
-        },
-        include: { items: true, client: true },
-    });
-
-    const clientMap = new Map<string, { value: number; count: number }>();
-    invoices.forEach(inv => {
-        const current = clientMap.get(inv.client.name) || { value: 0, count: 0 };
-        const subtotal = inv.items.reduce((s, item) => s + item.quantity * item.unitPrice, 0);
-        current.value += subtotal * (1 + (inv.taxRate || 0));
-        current.count++;
-        clientMap.set(inv.client.name, current);
-    });
-
-    return Array.from(clientMap.entries())
-        .map(([name, data]) => ({ name, value: Math.round(data.value), count: data.count }))
-        .sort((a, b) => b.value - a.value)
-        .slice(0, limit);
+    const clients = await sumRevenueByClient(companyId, limit, start, end);
+
+    return clients.map(c => ({ name: c.name, value: Math.round(c.value), count: c.count }));
 }
 
 /**
@@ -366,26 +296,9 @@ export async function getTopSuppliers(
         ? { startDate, endDate }
         : getDefaultDateRange();
 
-    const bills = await prisma.bill.findMany({
-        where: {
-            companyId,
-            issueDate: { gte: start, lte: end },
-        },
-        include: { supplier: true },
-    });
-
-    const supplierMap = new Map<string, { value: number; count: number }>();
-    bills.forEach(bill => {
-        const current = supplierMap.get(bill.supplier.name) || { value: 0, count: 0 };
-        current.value += bill.totalAmount;
-        current.count++;
-        supplierMap.set(bill.supplier.name, current);
-    });
-
-    return Array.from(supplierMap.entries())
-        .map(([name, data]) => ({ name, value: Math.round(data.value), count: data.count }))
-        .sort((a, b) => b.value - a.value)
-        .slice(0, limit);
+    const suppliers = await sumSpendBySupplier(companyId, limit, start, end);
+
+    return suppliers.map(s => ({ name: s.name, value: Math.round(s.value), count: s.count }));
 }
 
 /**
@@ -401,24 +314,9 @@ export async function getExpensesByCategory(
         ? { startDate, endDate }
         : getDefaultDateRange();
 
-    const expenses = await prisma.expense.findMany({
-        where: {
-            companyId,
-            date: { gte: start, lte: end },
-        },
-        include: { category: true },
-    });
-
-    const categoryMap = new Map<string, number>();
-    expenses.forEach(exp => {
-        const catName = exp.category?.name || "Uncategorized";
-        categoryMap.set(catName, (categoryMap.get(catName) || 0) + exp.amount);
-    });
-
-    return Array.from(categoryMap.entries())
-        .map(([name, value]) => ({ name, value: Math.round(value) }))
-        .sort((a, b) => b.value - a.value)
-        .slice(0, limit);
+    const categories = await sumExpensesByCategory(companyId, limit, start, end);
+
+    return categories.map(c => ({ name: c.name, value: Math.round(c.value) }));
 }
 
 /**
@@ -430,15 +328,15 @@ export async function getInventorySummary(companyId: string): Promise<{
     lowStockCount: number;
     outOfStockCount: number;
 }> {
-    const products = await prisma.product.findMany({
-        where: { companyId, isActive: true },
-    });
+    const [inventory, levels] = await Promise.all([
+        sumInventory(companyId),
+        getStockLevelCounts(companyId),
+    ]);
 
     return {
-        totalValue: Math.round(products.reduce((sum, p) => sum + p.stockQuantity * p.costPrice, 0)),
-        itemCount: products.length,
-        lowStockCount: products.filter(p => p.stockQuantity > 0 && p.stockQuantity <= p.lowStockAlert).length,
-        outOfStockCount: products.filter(p => p.stockQuantity === 0).length,
+        ...inventory,
+        ...levels,
+        totalValue: Math.round(inventory.totalValue),
     };
 }
 
@@ -450,42 +348,11 @@ export async function getARAgingBuckets(companyId: string): Promise<{
     amount: number;
     count: number;
 }[]> {
-    const now = new Date();
-    const invoices = await prisma.invoice.findMany({
-        where: {
-            companyId,
-            status: { in: ["PENDING", "OVERDUE", "SENT"] },
-        },
-        include: { items: true },
-    });
-
-    const buckets = {
-        current: { amount: 0, count: 0 },
-        "1-30": { amount: 0, count: 0 },
-        "31-60": { amount: 0, count: 0 },
-        "61-90": { amount: 0, count: 0 },
-        "90+": { amount: 0, count: 0 },
-    };
-
-    invoices.forEach(inv => {
-        const subtotal = inv.items.reduce((s, item) => s + item.quantity * item.unitPrice, 0);
-        const total = subtotal * (1 + (inv.taxRate || 0));
-        const daysOverdue = Math.floor((now.getTime() - inv.dueDate.getTime()) / (1000 * 60 * 60 * 24));
-
-        let bucket: keyof typeof buckets;
-        if (daysOverdue <= 0) bucket = "current";
-        else if (daysOverdue <= 30) bucket = "1-30";
-        else if (daysOverdue <= 60) bucket = "31-60";
-        else if (daysOverdue <= 90) bucket = "61-90";
-        else bucket = "90+";
-
-        buckets[bucket].amount += total;
-        buckets[bucket].count++;
-    });
+    const buckets = await sumARAging(companyId);
 
-    return Object.entries(buckets).map(([bucket, data]) => ({
+    return AGING_BUCKETS.map(bucket => ({
         bucket,
-        amount: Math.round(data.amount),
-        count: data.count,
+        amount: Math.round(buckets[bucket].amount),
+        count: buckets[bucket].count,
     }));
 }
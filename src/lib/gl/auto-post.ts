@@ -3,7 +3,13 @@
  * Creates journal entries for all business transactions
  */
 
+import { randomUUID } from "crypto";
+import { Prisma } from "@prisma/client";
 import { prisma } from "@/lib/prisma";
+import { invalidateCompanyCache } from "@/lib/response-cache";
+import { allocateSequence, formatDocumentNumber, nextDocumentNumber } from "@/lib/sequences";
+
+type Db = Prisma.TransactionClient | typeof prisma;
 
 interface JournalLine {
     accountId: string;
@@ -12,75 +18,217 @@ interface JournalLine {
     credit?: number;
 }
 
+export interface PostJournalInput {
+    /** Set when the caller has to reference the entry before it is posted */
+    id?: string;
+    companyId: string;
+    sourceType: string;
+    sourceId?: string;
+    description: string;
+    lines: JournalLine[];
+    entryDate?: Date;
+}
+
 /**
- * Create a journal entry with validation
+ * Raised for entries that must not be posted (unbalanced, foreign or unknown accounts)
  */
-export async function createJournalEntry(
-    companyId: string,
-    sourceType: string,
-    sourceId: string,
-    description: string,
-    lines: JournalLine[],
-    entryDate?: Date
-) {
-    // Calculate totals
+export class JournalPostingError extends Error {
+    constructor(message: string) {
+        super(message);
+        this.name = "JournalPostingError";
+    }
+}
+
+/**
+ * Debit and credit totals of an entry; throws when it does not balance
+ */
+function entryTotals(lines: JournalLine[]) {
     const totalDebit = lines.reduce((sum, line) => sum + (line.debit || 0), 0);
     const totalCredit = lines.reduce((sum, line) => sum + (line.credit || 0), 0);
 
     // Validate debits = credits
-    if (Math.abs(totalDebit - totalCredit) > 0.01) {
-        throw new Error(`Journal entry is unbalanced: Debits (${totalDebit}) != Credits (${totalCredit})`);
+    if (lines.length === 0 || Math.abs(totalDebit - totalCredit) > 0.01) {
+        throw new JournalPostingError(`Journal entry is unbalanced: Debits (${totalDebit}) != Credits (${totalCredit})`);
     }
+    return { totalDebit, totalCredit };
+}
 
-    // Generate journal number
-    const count = await prisma.journalEntry.count({ where: { companyId } });
-    const journalNumber = `JE-${String(count + 1).padStart(6, "0")}`;
+/**
+ * Load the company's accounts used by `lines`; throws on unknown or foreign ones
+ */
+async function loadLineAccounts(tx: Prisma.TransactionClient, companyId: string, lines: JournalLine[]) {
+    const accountIds = Array.from(new Set(lines.map(line => line.accountId)));
+    const accounts = await tx.account.findMany({
+        where: { id: { in: accountIds }, companyId },
+        select: { id: true, normalBalance: true },
+    });
+    if (accounts.length !== accountIds.length) {
+        const found = new Set(accounts.map(a => a.id));
+        throw new JournalPostingError(`Unknown accounts: ${accountIds.filter(id => !found.has(id)).join(", ")}`);
+    }
+    return accounts;
+}
+
+/**
+ * Move account balances by `lines` in one set-based UPDATE
+ */
+async function applyBalanceChanges(
+    tx: Prisma.TransactionClient,
+    companyId: string,
+    accounts: { id: string; normalBalance: string }[],
+    lines: JournalLine[]
+) {
+    // Net balance change per account, signed by the account's normal balance
+    const normalBalance = new Map(accounts.map(a => [a.id, a.normalBalance]));
+    const changes = new Map<string, number>();
+    for (const line of lines) {
+        const change = (line.debit || 0) - (line.credit || 0);
+        const balanceChange = normalBalance.get(line.accountId) === "DEBIT" ? change : -change;
+        changes.set(line.accountId, (changes.get(line.accountId) || 0) + balanceChange);
+    }
+
+    const cases = Array.from(changes, ([id, delta]) =>
+        Prisma.sql`WHEN ${id} THEN CAST(${delta} AS DOUBLE PRECISION)`
+    );
+    await tx.$executeRaw`
+        UPDATE "Account"
+        SET "currentBalance" = "currentBalance" + CASE "id" ${Prisma.join(cases, " ")} ELSE 0 END
+        WHERE "companyId" = ${companyId} AND "id" IN (${Prisma.join(Array.from(changes.keys()))})
+    `;
+}
+
+/**
+ * Post a journal entry and its balance changes inside `tx`.
+ * Accounts are loaded in one query and balances move in one set-based UPDATE,
+ * so an entry is either fully posted or not at all.
+ */
+export async function postJournalEntry(tx: Prisma.TransactionClient, input: PostJournalInput) {
+    const { companyId, lines } = input;
+    const { totalDebit, totalCredit } = entryTotals(lines);
+    const accounts = await loadLineAccounts(tx, companyId, lines);
+
+    // Allocated in the same transaction, so a failed post does not consume a number
+    const journalNumber = await nextDocumentNumber(companyId, "JOURNAL", tx);
 
     // Create journal entry with lines
-    const entry = await prisma.journalEntry.create({
+    const entry = await tx.journalEntry.create({
         data: {
+            id: input.id,
             companyId,
             journalNumber,
-            entryDate: entryDate || new Date(),
-            description,
-            sourceType: sourceType as any,
-            sourceId,
+            entryDate: input.entryDate || new Date(),
+            description: input.description,
+            sourceType: input.sourceType as any,
+            sourceId: input.sourceId,
             status: "POSTED",
             totalDebit,
             totalCredit,
             lines: {
-                create: lines.map(line => ({
-                    accountId: line.accountId,
-                    description: line.description,
-                    debit: line.debit || 0,
-                    credit: line.credit || 0,
-                })),
+                createMany: {
+                    data: lines.map(line => ({
+                        accountId: line.accountId,
+                        description: line.description,
+                        debit: line.debit || 0,
+                        credit: line.credit || 0,
+                    })),
+                },
             },
         },
         include: { lines: true },
     });
 
-    // Update account balances
-    for (const line of lines) {
-        const account = await prisma.account.findUnique({ where: { id: line.accountId } });
-        if (account) {
-            const change = (line.debit || 0) - (line.credit || 0);
-            const balanceChange = account.normalBalance === "DEBIT" ? change : -change;
-            await prisma.account.update({
-                where: { id: line.accountId },
-                data: { currentBalance: { increment: balanceChange } },
-            });
-        }
-    }
+    await applyBalanceChanges(tx, companyId, accounts, lines);
+    return entry;
+}
 
+/**
+ * Post many entries of one company inside `tx` with a fixed number of
+ * statements: one account query, one block of journal numbers, one createMany
+ * each for entries and lines, and one balance UPDATE. Returns the entries'
+ * ids and numbers in input order.
+ */
+export async function postJournalEntries(
+    tx: Prisma.TransactionClient,
+    companyId: string,
+    inputs: Omit<PostJournalInput, "companyId">[]
+): Promise<{ id: string; journalNumber: string }[]> {
+    if (inputs.length === 0) return [];
+
+    const totals = inputs.map(input => entryTotals(input.lines));
+    const allLines = inputs.flatMap(input => input.lines);
+    const accounts = await loadLineAccounts(tx, companyId, allLines);
+
+    const first = await allocateSequence(companyId, "JOURNAL", inputs.length, tx);
+    const entries = inputs.map((input, i) => ({
+        id: input.id ?? randomUUID(),
+        journalNumber: formatDocumentNumber("JOURNAL", first + i),
+    }));
+
+    await tx.journalEntry.createMany({
+        data: inputs.map((input, i) => ({
+            id: entries[i].id,
+            companyId,
+            journalNumber: entries[i].journalNumber,
+            entryDate: input.entryDate || new Date(),
+            description: input.description,
+            sourceType: input.sourceType as any,
+            sourceId: input.sourceId,
+            status: "POSTED" as const,
+            totalDebit: totals[i].totalDebit,
+            totalCredit: totals[i].totalCredit,
+        })),
+    });
+    await tx.journalEntryLine.createMany({
+        data: inputs.flatMap((input, i) => input.lines.map(line => ({
+            journalEntryId: entries[i].id,
+            accountId: line.accountId,
+            description: line.description,
+            debit: line.debit || 0,
+            credit: line.credit || 0,
+        }))),
+    });
+
+    await applyBalanceChanges(tx, companyId, accounts, allLines);
+    return entries;
+}
+
+/**
+ * Create a journal entry with validation
+ */
+export async function createJournalEntry(
+    companyId: string,
+    sourceType: string,
+    sourceId: string,
+    description: string,
+    lines: JournalLine[],
+    entryDate?: Date
+) {
+    const entry = await prisma.$transaction(tx =>
+        postJournalEntry(tx, { companyId, sourceType, sourceId, description, lines, entryDate })
+    );
+
+    await invalidateCompanyCache(companyId);
     return entry;
 }
 
+const DEFAULT_ACCOUNT_CODES = {
+    cash: "1000",
+    ar: "1100",
+    ap: "2000",
+    sales: "4000",
+    salesTax: "2100",
+    cogs: "5000",
+    inventory: "1200",
+} as const;
+
+export type DefaultAccounts = Record<keyof typeof DEFAULT_ACCOUNT_CODES, string | undefined>;
+
 /**
- * Get default accounts for a company
+ * Get default accounts for a company: the ones set on the company, else the
+ * standard chart codes (looked up together in one query)
  */
-async function getDefaultAccounts(companyId: string) {
-    const company = await prisma.company.findUnique({
+export async function getDefaultAccounts(companyId: string, db: Db = prisma): Promise<DefaultAccounts> {
+    const company = await db.company.findUnique({
         where: { id: companyId },
         select: {
             cashAccountId: true,
@@ -95,23 +243,28 @@ async function getDefaultAccounts(companyId: string) {
 
     if (!company) throw new Error("Company not found");
 
+    const configured: DefaultAccounts = {
+        cash: company.cashAccountId ?? undefined,
+        ar: company.arAccountId ?? undefined,
+        ap: company.apAccountId ?? undefined,
+        sales: company.salesAccountId ?? undefined,
+        salesTax: company.salesTaxAccountId ?? undefined,
+        cogs: company.cogsAccountId ?? undefined,
+        inventory: company.inventoryAccountId ?? undefined,
+    };
+
     // If no defaults, try to find by account code
-    const findByCode = async (code: string) => {
-        const account = await prisma.account.findFirst({
-            where: { companyId, accountCode: code },
+    const missing = (Object.keys(DEFAULT_ACCOUNT_CODES) as (keyof DefaultAccounts)[]).filter(key => !configured[key]);
+    if (missing.length > 0) {
+        const accounts = await db.account.findMany({
+            where: { companyId, accountCode: { in: missing.map(key => DEFAULT_ACCOUNT_CODES[key]) } },
+            select: { id: true, accountCode: true },
         });
-        return account?.id;
-    };
+        const byCode = new Map(accounts.map(a => [a.accountCode, a.id]));
+        missing.forEach(key => { configured[key] = byCode.get(DEFAULT_ACCOUNT_CODES[key]); });
+    }
 
-    return {
-        cash: company.cashAccountId || await findByCode("1000"),
-        ar: company.arAccountId || await findByCode("1100"),
-        ap: company.apAccountId || await findByCode("2000"),
-        sales: company.salesAccountId || await findByCode("4000"),
-        salesTax: company.salesTaxAccountId || await findByCode("2100"),
-        cogs: company.cogsAccountId || await findByCode("5000"),
-        inventory: company.inventoryAccountId || await findByCode("1200"),
-    };
+    return configured;
 }
 
 /**
@@ -255,50 +408,58 @@ export async function postBillToGL(billId: string) {
 }
 
 /**
- * Auto-post POS Sale
- * DR: Cash
- *   CR: Sales Revenue
+ * Journal lines for a POS sale
+ * DR: Cash (total)
+ *   CR: Sales Revenue (total less tax, i.e. net of discounts)
  *   CR: Sales Tax Payable
- * 
+ *
  * DR: COGS
- *   CR: Inventory
+ *   CR: Inventory (at the cost the stock was issued at)
+ *
+ * Returns null when the company has no cash or sales account to post to.
+ */
+export function posSaleJournalLines(
+    accounts: DefaultAccounts,
+    sale: { saleNumber: string; total: number; taxAmount: number },
+    costOfGoods: number
+): JournalLine[] | null {
+    if (!accounts.cash || !accounts.sales) return null;
+
+    const tax = sale.taxAmount > 0 && accounts.salesTax ? sale.taxAmount : 0;
+    const lines: JournalLine[] = [
+        { accountId: accounts.cash, debit: sale.total, description: `POS Sale ${sale.saleNumber}` },
+        { accountId: accounts.sales, credit: sale.total - tax, description: "Sales Revenue" },
+    ];
+    if (tax > 0) {
+        lines.push({ accountId: accounts.salesTax!, credit: tax, description: "Sales Tax" });
+    }
+
+    if (accounts.cogs && accounts.inventory && costOfGoods > 0) {
+        lines.push({ accountId: accounts.cogs, debit: costOfGoods, description: "Cost of Goods Sold" });
+        lines.push({ accountId: accounts.inventory, credit: costOfGoods, description: "Reduce Inventory" });
+    }
+    return lines;
+}
+
+/**
+ * Auto-post a POS sale that was not posted at checkout, with the cost of
+ * goods recorded at checkout (current product cost prices for older sales)
  */
 export async function postPOSSaleToGL(saleId: string) {
     const sale = await prisma.pOSSale.findUnique({
         where: { id: saleId },
-        include: { items: true },
+        include: { items: { include: { product: { select: { costPrice: true } } } } },
     });
 
     if (!sale || sale.isPostedToGL) return null;
 
     const accounts = await getDefaultAccounts(sale.companyId);
-    if (!accounts.cash || !accounts.sales) {
+    const costOfGoods = sale.costOfGoods ?? sale.items.reduce((sum, item) => sum + item.quantity * item.product.costPrice, 0);
+    const lines = posSaleJournalLines(accounts, sale, costOfGoods);
+    if (!lines) {
         throw new Error("Missing required GL accounts");
     }
 
-    // Revenue entry
-    const lines: JournalLine[] = [
-        { accountId: accounts.cash, debit: sale.total, description: `POS Sale ${sale.saleNumber}` },
-        { accountId: accounts.sales, credit: sale.subtotal, description: "Sales Revenue" },
-    ];
-
-    if (sale.taxAmount > 0 && accounts.salesTax) {
-        lines.push({ accountId: accounts.salesTax, credit: sale.taxAmount, description: "Sales Tax" });
-    }
-
-    // COGS entry (if inventory tracking)
-    if (accounts.cogs && accounts.inventory) {
-        const costOfGoods = sale.items.reduce((sum, item) => {
-            // Approximate cost as 60% of sale price (should get actual cost from products)
-            return sum + (item.unitPrice * item.quantity * 0.6);
-        }, 0);
-
-        if (costOfGoods > 0) {
-            lines.push({ accountId: accounts.cogs, debit: costOfGoods, description: "Cost of Goods Sold" });
-            lines.push({ accountId: accounts.inventory, credit: costOfGoods, description: "Reduce Inventory" });
-        }
-    }
-
     const entry = await createJournalEntry(
         sale.companyId,
         "POS_SALE",
@@ -0,0 +1,100 @@
+/**
+ * invoice-totals.ts - Persisted invoice totals
+ *
+ * Invoice.subtotal, taxAmount and totalAmount are computed from the line
+ * items when an invoice is created (items are not edited afterwards), so list
+ * and report queries can read one narrow row per invoice instead of
+ * re-summing line items. verifyInvoiceTotals reports and repairs drift.
+ */
+
+import { Prisma } from "@prisma/client";
+import { prisma } from "@/lib/prisma";
+
+export interface InvoiceTotals {
+    subtotal: number;
+    taxAmount: number;
+    totalAmount: number;
+}
+
+/**
+ * Compute invoice totals from line items. `taxRate` is a fraction (0.14 = 14%).
+ */
+export function computeInvoiceTotals(
+    items: { quantity: number; unitPrice: number }[],
+    taxRate: number
+): InvoiceTotals {
+    const subtotal = items.reduce((sum, item) => sum + item.quantity * item.unitPrice, 0);
+    const taxAmount = subtotal * (taxRate || 0);
+    return { subtotal, taxAmount, totalAmount: subtotal + taxAmount };
+}
+
+export interface InvoiceTotalsMismatch {
+    invoiceId: string;
+    invoiceNumber: string;
+    stored: InvoiceTotals;
+    expected: InvoiceTotals;
+}
+
+/**
+ * Compare stored totals with the line items, optionally fixing drift.
+ * Pages through invoices so memory stays bounded on large companies.
+ */
+export async function verifyInvoiceTotals(options: {
+    companyId?: string;
+    fix?: boolean;
+    batchSize?: number;
+} = {}): Promise<{ checked: number; mismatches: InvoiceTotalsMismatch[]; fixed: number }> {
+    const { companyId, fix = false, batchSize = 500 } = options;
+    const mismatches: InvoiceTotalsMismatch[] = [];
+    let checked = 0;
+    let fixed = 0;
+    let cursor: string | undefined;
+
+    for (;;) {
+        const invoices = await prisma.invoice.findMany({
+            where: companyId ? { companyId } : undefined,
+            select: {
+                id: true,
+                invoiceNumber: true,
+                taxRate: true,
+                subtotal: true,
+                taxAmount: true,
+                totalAmount: true,
+                paidAmount: true,
+                items: { select: { quantity: true, unitPrice: true } },
+            },
+            orderBy: { id: "asc" },
+            take: batchSize,
+            ...(cursor ? { skip: 1, cursor: { id: cursor } } : {}),
+        });
+        if (invoices.length === 0) break;
+
+        const updates: Prisma.PrismaPromise<unknown>[] = [];
+        for (const inv of invoices) {
+            checked++;
+            const expected = computeInvoiceTotals(inv.items, inv.taxRate);
+            const stored = { subtotal: inv.subtotal, taxAmount: inv.taxAmount, totalAmount: inv.totalAmount };
+
+            const drifted = (Object.keys(expected) as (keyof InvoiceTotals)[])
+                .some(key => Math.abs(expected[key] - stored[key]) > 0.005);
+            if (!drifted) continue;
+
+            mismatches.push({ invoiceId: inv.id, invoiceNumber: inv.invoiceNumber, stored, expected });
+            if (fix) {
+                updates.push(prisma.invoice.update({
+                    where: { id: inv.id },
+                    data: { ...expected, balanceDue: expected.totalAmount - inv.paidAmount },
+                }));
+            }
+        }
+
+        if (updates.length > 0) {
+            await prisma.$transaction(updates);
+            fixed += updates.length;
+        }
+
+        cursor = invoices[invoices.length - 1].id;
+    }
+
+    return { checked, mismatches, fixed };
+}
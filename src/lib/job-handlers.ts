@@ -0,0 +1,92 @@
+/**
+ * job-handlers.ts - Handlers for background job types
+ *
+ * Imported by the worker process to register every JobType handler.
+ * Each handler may run more than once (retries, expired leases), so all of
+ * them are idempotent: amortization skips processed periods, imports upsert
+ * by natural key and exports overwrite their output file.
+ */
+
+import { createReadStream, createWriteStream } from "fs";
+import { rm, stat } from "fs/promises";
+import { Readable } from "stream";
+import { pipeline } from "stream/promises";
+import type { ReadableStream as NodeReadableStream } from "stream/web";
+import { prisma } from "@/lib/prisma";
+import { registerJobHandler, jobFilePath } from "@/lib/job-queue";
+import { processAllPendingAmortizations } from "@/lib/accounting/expense-amortization";
+import { calculateInterestAccrual } from "@/lib/accounting/loan-accounting";
+import { createExportStream, EXPORT_ENTITIES, ExportFormat } from "@/lib/export-stream";
+import { ingestRows, readUploadRows } from "@/lib/migration/ingest";
+import { EntityType } from "@/lib/migration/templates";
+import { invalidateCompanyCache } from "@/lib/response-cache";
+
+registerJobHandler<{ asOfDate?: string }>("amortization.process", async ({ job, payload, progress }) => {
+    const results = await processAllPendingAmortizations(
+        job.companyId,
+        payload.asOfDate ? new Date(payload.asOfDate) : undefined,
+        { onProgress: (processed, total) => progress(processed, total) }
+    );
+
+    return {
+        processed: results.length,
+        totalAmount: results.reduce((sum, r) => sum + r.amount, 0),
+    };
+});
+
+registerJobHandler<{ asOfDate?: string }>("loans.interest-accrual", async ({ job, payload }) => {
+    return calculateInterestAccrual(job.companyId, payload.asOfDate ? new Date(payload.asOfDate) : new Date());
+});
+
+registerJobHandler<{ format: ExportFormat; type: string }>("data.export", async ({ job, payload, progress }) => {
+    const company = await prisma.company.findUnique({ where: { id: job.companyId } });
+    if (!company) throw new Error("Company not found");
+
+    const entities = payload.type === "all" ? Object.keys(EXPORT_ENTITIES) : [payload.type];
+    const filePath = await jobFilePath(`${job.id}.${payload.format}`);
+    let rowCounts: Record<string, number> = {};
+
+    const stream = createExportStream({
+        companyId: job.companyId,
+        entities,
+        format: payload.format,
+        meta: { company: { name: company.name, taxId: company.taxId, currency: company.currency } },
+        onProgress: (rowsWritten, counts) => {
+            rowCounts = counts;
+            return progress(rowsWritten, null, `Exported ${rowsWritten} rows`);
+        },
+    });
+    await pipeline(Readable.fromWeb(stream as unknown as NodeReadableStream<Uint8Array>), createWriteStream(filePath));
+
+    return {
+        fileName: `brownledger-${payload.type}-${new Date().toISOString().split("T")[0]}.${payload.format}`,
+        format: payload.format,
+        bytes: (await stat(filePath)).size,
+        counts: rowCounts,
+    };
+});
+
+registerJobHandler<{
+    filePath: string;
+    fileName: string;
+    entityType: EntityType;
+    columnMapping?: Record<string, string> | null;
+}>("migration.import", async ({ job, payload, progress }) => {
+    try {
+        const body = Readable.toWeb(createReadStream(payload.filePath)) as unknown as ReadableStream<Uint8Array>;
+        const result = await ingestRows(await readUploadRows(body, payload.fileName), {
+            entityType: payload.entityType,
+            companyId: job.companyId,
+            columnMapping: payload.columnMapping,
+            onProgress: p => progress(p.rowsProcessed, null, `Imported ${p.rowsProcessed} rows`),
+        });
+
+        await rm(payload.filePath, { force: true });
+        await invalidateCompanyCache(job.companyId);
+        return result;
+    } catch (error) {
+        // Keep the upload while a retry is still coming
+        if (job.attempts >= job.maxAttempts) await rm(payload.filePath, { force: true });
+        throw error;
+    }
+});
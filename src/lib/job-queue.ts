@@ -0,0 +1,308 @@
+/**
+ * job-queue.ts - Durable background jobs
+ *
+ * Jobs are BackgroundJob rows. Routes enqueue work and return the job id at
+ * once; worker processes (npm run jobs:worker) claim queued jobs with a
+ * conditional UPDATE, so each attempt runs on exactly one worker, and never
+ * run more than JOB_COMPANY_CONCURRENCY jobs of one company at a time.
+ * A failed attempt is retried with exponential backoff until maxAttempts.
+ *
+ * A running job refreshes lockedAt whenever it reports progress; a RUNNING
+ * job whose lock is older than the lease belongs to a dead worker and is
+ * requeued. Handlers must therefore be safe to run again.
+ */
+
+import os from "os";
+import path from "path";
+import { createWriteStream } from "fs";
+import { mkdir } from "fs/promises";
+import { Readable } from "stream";
+import { pipeline } from "stream/promises";
+import type { ReadableStream as NodeReadableStream } from "stream/web";
+import { Prisma, BackgroundJob } from "@prisma/client";
+import { prisma } from "@/lib/prisma";
+import { sqlDate, toNumber } from "@/lib/financial-aggregates";
+
+export type JobType =
+    | "amortization.process"
+    | "loans.interest-accrual"
+    | "data.export"
+    | "migration.import";
+
+export type JobStatus = "QUEUED" | "RUNNING" | "SUCCEEDED" | "FAILED";
+
+export const JOB_COMPANY_CONCURRENCY = Number(process.env.JOB_COMPANY_CONCURRENCY) || 2;
+export const JOB_LEASE_MS = 15 * 60 * 1000;
+const RETRY_BASE_MS = 30 * 1000;
+const RETRY_MAX_MS = 60 * 60 * 1000;
+
+export interface JobContext<P = any> {
+    job: BackgroundJob;
+    payload: P;
+    /** Record progress and extend the job's lease */
+    progress(current: number, total?: number | null, message?: string): Promise<void>;
+}
+
+export type JobHandler<P = any> = (ctx: JobContext<P>) => Promise<unknown>;
+
+const handlers = new Map<string, JobHandler>();
+
+export function registerJobHandler<P>(type: JobType, handler: JobHandler<P>) {
+    handlers.set(type, handler as JobHandler);
+}
+
+/**
+ * Directory shared by the web and worker processes for job input/output files
+ */
+export async function jobFilePath(name: string): Promise<string> {
+    const dir = process.env.JOB_FILES_DIR || path.join(os.tmpdir(), "brownledger-jobs");
+    await mkdir(dir, { recursive: true });
+    return path.join(dir, path.basename(name));
+}
+
+/**
+ * Stream an upload to the job files directory and return its path
+ */
+export async function saveJobFile(name: string, body: ReadableStream<Uint8Array>): Promise<string> {
+    const filePath = await jobFilePath(name);
+    await pipeline(Readable.fromWeb(body as unknown as NodeReadableStream<Uint8Array>), createWriteStream(filePath));
+    return filePath;
+}
+
+export async function enqueueJob(
+    companyId: string,
+    type: JobType,
+    payload: Record<string, unknown> = {},
+    options: { maxAttempts?: number; runAt?: Date; createdBy?: string } = {}
+): Promise<BackgroundJob> {
+    return prisma.backgroundJob.create({
+        data: {
+            companyId,
+            type,
+            payload: JSON.stringify(payload),
+            maxAttempts: options.maxAttempts ?? 3,
+            runAt: options.runAt ?? new Date(),
+            createdBy: options.createdBy,
+        },
+    });
+}
+
+/**
+ * Public view of a job for status polling
+ */
+export function serializeJob(job: BackgroundJob) {
+    return {
+        id: job.id,
+        type: job.type,
+        status: job.status as JobStatus,
+        progress: {
+            current: job.progressCurrent,
+            total: job.progressTotal,
+            message: job.progressMessage,
+        },
+        attempts: job.attempts,
+        maxAttempts: job.maxAttempts,
+        result: job.result ? JSON.parse(job.result) : null,
+        error: job.error,
+        runAt: job.runAt,
+        createdAt: job.createdAt,
+        startedAt: job.startedAt,
+        finishedAt: job.finishedAt,
+    };
+}
+
+/**
+ * Response body for routes that hand work off to the queue (sent with 202)
+ */
+export function jobAccepted(job: BackgroundJob) {
+    return { jobId: job.id, status: job.status, statusUrl: `/api/jobs/${job.id}` };
+}
+
+export async function getJob(companyId: string, id: string) {
+    return prisma.backgroundJob.findFirst({ where: { id, companyId } });
+}
+
+/**
+ * Claim the oldest runnable job whose company is under its concurrency limit.
+ * Two workers racing for different jobs of one company can both pass the
+ * limit check, so the count is re-checked after claiming and the loser
+ * hands its job back.
+ */
+export async function claimJob(workerId: string, companyConcurrency = JOB_COMPANY_CONCURRENCY): Promise<BackgroundJob | null> {
+    const now = sqlDate(new Date());
+    const limit = Prisma.raw(String(Math.max(1, Math.floor(companyConcurrency))));
+
+    const claimed = await prisma.$queryRaw<{ id: string; companyId: string }[]>`
+        UPDATE "BackgroundJob"
+        SET "status" = 'RUNNING', "lockedBy" = ${workerId}, "lockedAt" = ${now},
+            "startedAt" = ${now}, "attempts" = "attempts" + 1, "updatedAt" = ${now}
+        WHERE "status" = 'QUEUED' AND "id" = (
+            SELECT j."id" FROM "BackgroundJob" j
+            WHERE j."status" = 'QUEUED' AND j."runAt" <= ${now}
+              AND (
+                  SELECT COUNT(*) FROM "BackgroundJob" r
+                  WHERE r."companyId" = j."companyId" AND r."status" = 'RUNNING'
+              ) < ${limit}
+            ORDER BY j."runAt", j."createdAt"
+            LIMIT 1
+        )
+        RETURNING "id", "companyId"
+    `;
+    if (claimed.length === 0) return null;
+
+    const { id, companyId } = claimed[0];
+    const [{ running }] = await prisma.$queryRaw<{ running: unknown }[]>`
+        SELECT COUNT(*) AS "running" FROM "BackgroundJob"
+        WHERE "companyId" = ${companyId} AND "status" = 'RUNNING'
+    `;
+    if (toNumber(running) > companyConcurrency) {
+        await prisma.backgroundJob.updateMany({
+            where: { id, lockedBy: workerId },
+            data: { status: "QUEUED", lockedBy: null, lockedAt: null, attempts: { decrement: 1 } },
+        });
+        return null;
+    }
+
+    return prisma.backgroundJob.findUnique({ where: { id } });
+}
+
+function retryDelayMs(attempt: number): number {
+    return Math.min(RETRY_BASE_MS * 2 ** Math.max(0, attempt - 1), RETRY_MAX_MS);
+}
+
+/**
+ * Run a claimed job and record the outcome. Writes are guarded by lockedBy so
+ * a worker that lost its lease cannot overwrite the job's newer state.
+ */
+export async function runJob(job: BackgroundJob, workerId: string): Promise<JobStatus> {
+    const owned = { id: job.id, lockedBy: workerId };
+    const handler = handlers.get(job.type);
+
+    const ctx: JobContext = {
+        job,
+        payload: JSON.parse(job.payload),
+        progress: async (current, total, message) => {
+            await prisma.backgroundJob.updateMany({
+                where: owned,
+                data: {
+                    progressCurrent: current,
+                    ...(total !== undefined ? { progressTotal: total } : {}),
+                    ...(message !== undefined ? { progressMessage: message } : {}),
+                    lockedAt: new Date(),
+                },
+            });
+        },
+    };
+
+    try {
+        if (!handler) throw new Error(`No handler registered for job type ${job.type}`);
+        const result = await handler(ctx);
+
+        await prisma.backgroundJob.updateMany({
+            where: owned,
+            data: {
+                status: "SUCCEEDED",
+                result: JSON.stringify(result ?? null),
+                error: null,
+                finishedAt: new Date(),
+                lockedBy: null,
+                lockedAt: null,
+            },
+        });
+        return "SUCCEEDED";
+    } catch (error) {
+        const message = error instanceof Error ? error.message : String(error);
+        const retry = Boolean(handler) && job.attempts < job.maxAttempts;
+        console.error(`Job ${job.id} (${job.type}) attempt ${job.attempts} failed:`, error);
+
+        await prisma.backgroundJob.updateMany({
+            where: owned,
+            data: retry
+                ? {
+                    status: "QUEUED",
+                    error: message,
+                    runAt: new Date(Date.now() + retryDelayMs(job.attempts)),
+                    lockedBy: null,
+                    lockedAt: null,
+                }
+                : {
+                    status: "FAILED",
+                    error: message,
+                    finishedAt: new Date(),
+                    lockedBy: null,
+                    lockedAt: null,
+                },
+        });
+        return retry ? "QUEUED" : "FAILED";
+    }
+}
+
+/**
+ * Requeue RUNNING jobs whose worker stopped extending the lease. A job that
+ * has used all its attempts is failed instead, so a job that keeps killing
+ * its worker cannot be retried forever.
+ */
+export async function requeueStaleJobs(leaseMs = JOB_LEASE_MS): Promise<{ requeued: number; failed: number }> {
+    const stale = { status: "RUNNING", lockedAt: { lt: new Date(Date.now() - leaseMs) } };
+    const maxAttempts = prisma.backgroundJob.fields.maxAttempts;
+
+    const failed = await prisma.backgroundJob.updateMany({
+        where: { ...stale, attempts: { gte: maxAttempts } },
+        data: {
+            status: "FAILED",
+            error: "Worker stopped responding on the final attempt",
+            finishedAt: new Date(),
+            lockedBy: null,
+            lockedAt: null,
+        },
+    });
+    const requeued = await prisma.backgroundJob.updateMany({
+        where: { ...stale, attempts: { lt: maxAttempts } },
+        data: { status: "QUEUED", lockedBy: null, lockedAt: null, runAt: new Date() },
+    });
+    return { requeued: requeued.count, failed: failed.count };
+}
+
+/**
+ * Poll for jobs and run up to `concurrency` at once until the signal aborts.
+ * In-flight jobs are allowed to finish before the promise resolves.
+ */
+export async function runWorker(options: {
+    workerId?: string;
+    concurrency?: number;
+    pollMs?: number;
+    signal?: AbortSignal;
+} = {}): Promise<void> {
+    const workerId = options.workerId ?? `${os.hostname()}:${process.pid}`;
+    const concurrency = options.concurrency ?? 4;
+    const pollMs = options.pollMs ?? 2000;
+    const inFlight = new Set<Promise<unknown>>();
+    let lastSweep = 0;
+
+    const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
+
+    while (!options.signal?.aborted) {
+        if (Date.now() - lastSweep > JOB_LEASE_MS / 3) {
+            lastSweep = Date.now();
+            const { requeued, failed } = await requeueStaleJobs();
+            if (requeued > 0) console.log(`Requeued ${requeued} stale job(s)`);
+            if (failed > 0) console.log(`Failed ${failed} stale job(s) out of attempts`);
+        }
+
+        if (inFlight.size >= concurrency) {
+            await Promise.race(inFlight);
+            continue;
+        }
+
+        const job = await claimJob(workerId);
+        if (!job) {
+            await sleep(pollMs);
+            continue;
+        }
+
+        const run = runJob(job, workerId).finally(() => inFlight.delete(run));
+        inFlight.add(run);
+    }
+
+    await Promise.all(inFlight);
+}
@@ -1,5 +1,11 @@
 // Entity-specific importers for migration
+//
+// Every importer runs through bulkImport: existing natural keys are loaded
+// into a hash index with one query, rows are split into inserts and updates,
+// and each chunk is written in one transaction (createMany + batched updates).
+// A chunk that fails is replayed row by row so errors still point at rows.
 
+import { Prisma } from "@prisma/client";
 import { prisma } from "@/lib/prisma";
 import { EntityType } from "./templates";
 import { parseDate, parseCurrency } from "./validators";
@@ -63,255 +69,298 @@ function mapAccountCategory(type: string): string {
     return catMap[upperType] || "CURRENT_ASSET";
 }
 
-// Import clients
-export async function importClients(
+
+export const IMPORT_CHUNK_SIZE = 500;
+
+interface BulkImportSpec<T> {
+    /** Natural key and normalized fields for a mapped row, or null to skip it */
+    prepare(mapped: Record<string, any>): { key: string; data: T } | null;
+    /** Natural key -> id for every existing record of the company, in one query */
+    loadIndex(): Promise<Map<string, string>>;
+    /** Insert new rows; without it, rows with unknown keys are reported as errors */
+    createMany?(rows: T[]): Prisma.PrismaPromise<unknown>;
+    update(id: string, data: T): Prisma.PrismaPromise<unknown>;
+    missingMessage?(key: string): string;
+}
+
+interface PendingRow<T> {
+    rowNum: number;
+    data: T;
+    id?: string;
+    /** Later rows in the file with the same key, merged into this insert */
+    repeats: number[];
+}
+
+function emptyResult(): ImportResult {
+    return { success: true, created: 0, updated: 0, skipped: 0, errors: [] };
+}
+
+function mapRow(row: Record<string, any>, columnMapping: Record<string, string>): Record<string, any> {
+    const mapped: Record<string, any> = {};
+    for (const [sourceCol, targetField] of Object.entries(columnMapping)) {
+        mapped[targetField] = row[sourceCol];
+    }
+    return mapped;
+}
+
+// First record wins when a natural key is not unique
+function indexBy<T extends { id: string }>(records: T[], key: (record: T) => string): Map<string, string> {
+    const index = new Map<string, string>();
+    for (const record of records) {
+        if (!index.has(key(record))) index.set(key(record), record.id);
+    }
+    return index;
+}
+
+function errorMessage(error: unknown): string {
+    return error instanceof Error ? error.message : "Unknown error";
+}
+
+/**
+ * Index existing keys, partition rows into inserts and updates, then write
+ * chunk by chunk. Row numbers are 1-based with the header on row 1, unless
+ * the caller passes the sheet row of each entry (streamed batches).
+ */
+async function bulkImport<T>(
     data: Record<string, any>[],
     columnMapping: Record<string, string>,
-    companyId: string
+    spec: BulkImportSpec<T>,
+    rowNumbers?: number[]
 ): Promise<ImportResult> {
-    const result: ImportResult = {
-        success: true,
-        created: 0,
-        updated: 0,
-        skipped: 0,
-        errors: [],
-    };
+    const result = emptyResult();
+    const index = await spec.loadIndex();
 
-    for (let i = 0; i < data.length; i++) {
-        const row = data[i];
-        const rowNum = i + 2;
+    const rows: PendingRow<T>[] = [];
+    const inserts = new Map<string, PendingRow<T>>();
 
+    for (let i = 0; i < data.length; i++) {
+        const rowNum = rowNumbers?.[i] ?? i + 2;
         try {
-            // Extract mapped values
-            const mapped: Record<string, any> = {};
-            for (const [sourceCol, targetField] of Object.entries(columnMapping)) {
-                mapped[targetField] = row[sourceCol];
-            }
-
-            // Skip empty rows
-            if (!mapped.name || String(mapped.name).trim() === "") {
+            const prepared = spec.prepare(mapRow(data[i], columnMapping));
+            if (!prepared) {
                 result.skipped++;
                 continue;
             }
 
-            const name = String(mapped.name).trim();
+            const id = index.get(prepared.key);
+            if (id) {
+                rows.push({ rowNum, data: prepared.data, id, repeats: [] });
+                continue;
+            }
+            if (!spec.createMany) {
+                result.errors.push({
+                    row: rowNum,
+                    message: spec.missingMessage?.(prepared.key) ?? `${prepared.key} not found`,
+                });
+                continue;
+            }
 
-            // Check if client exists
-            const existing = await prisma.client.findFirst({
-                where: { companyId, name },
-            });
+            // A key repeated in the file updates the row created earlier; the last values win
+            const pending = inserts.get(prepared.key);
+            if (pending) {
+                pending.data = prepared.data;
+                pending.repeats.push(rowNum);
+                continue;
+            }
+            const row: PendingRow<T> = { rowNum, data: prepared.data, repeats: [] };
+            inserts.set(prepared.key, row);
+            rows.push(row);
+        } catch (error) {
+            result.errors.push({ row: rowNum, message: errorMessage(error) });
+        }
+    }
 
-            const clientData = {
-                name,
-                email: mapped.email ? String(mapped.email).trim() : null,
-                phone: mapped.phone ? String(mapped.phone).trim() : null,
-                address: mapped.address ? String(mapped.address).trim() : null,
-                taxId: mapped.taxId ? String(mapped.taxId).trim() : null,
-                contactPerson: mapped.contactPerson ? String(mapped.contactPerson).trim() : null,
-                notes: mapped.notes ? String(mapped.notes).trim() : null,
-            };
+    for (let start = 0; start < rows.length; start += IMPORT_CHUNK_SIZE) {
+        const chunk = rows.slice(start, start + IMPORT_CHUNK_SIZE);
+        const creates = chunk.filter(r => !r.id);
+        const updates = chunk.filter(r => r.id);
 
-            if (existing) {
-                await prisma.client.update({
-                    where: { id: existing.id },
-                    data: clientData,
-                });
-                result.updated++;
-            } else {
-                await prisma.client.create({
-                    data: {
-                        companyId,
-                        ...clientData,
-                    },
-                });
+        try {
+            await prisma.$transaction([
+                ...(creates.length > 0 && spec.createMany ? [spec.createMany(creates.map(r => r.data))] : []),
+                ...updates.map(r => spec.update(r.id!, r.data)),
+            ]);
+            creates.forEach(r => {
                 result.created++;
-            }
-        } catch (error) {
-            result.errors.push({
-                row: rowNum,
-                message: error instanceof Error ? error.message : "Unknown error",
+                result.updated += r.repeats.length;
             });
+            result.updated += updates.length;
+        } catch {
+            // Replay the failed chunk one row at a time to find the offending rows
+            for (const r of chunk) {
+                try {
+                    if (r.id) {
+                        await spec.update(r.id, r.data);
+                        result.updated++;
+                    } else {
+                        await spec.createMany!([r.data]);
+                        result.created++;
+                        result.updated += r.repeats.length;
+                    }
+                } catch (error) {
+                    const message = errorMessage(error);
+                    [r.rowNum, ...r.repeats].forEach(row => result.errors.push({ row, message }));
+                }
+            }
         }
     }
 
+    result.errors.sort((a, b) => a.row - b.row);
     result.success = result.errors.length === 0;
     return result;
 }
 
-// Import suppliers
-export async function importSuppliers(
+// Import clients
+export async function importClients(
     data: Record<string, any>[],
     columnMapping: Record<string, string>,
-    companyId: string
+    companyId: string,
+    rowNumbers?: number[]
 ): Promise<ImportResult> {
-    const result: ImportResult = {
-        success: true,
-        created: 0,
-        updated: 0,
-        skipped: 0,
-        errors: [],
-    };
-
-    for (let i = 0; i < data.length; i++) {
-        const row = data[i];
-        const rowNum = i + 2;
-
-        try {
-            const mapped: Record<string, any> = {};
-            for (const [sourceCol, targetField] of Object.entries(columnMapping)) {
-                mapped[targetField] = row[sourceCol];
-            }
-
-            if (!mapped.name || String(mapped.name).trim() === "") {
-                result.skipped++;
-                continue;
-            }
+    return bulkImport(data, columnMapping, {
+        prepare: (mapped) => {
+            // Skip empty rows
+            if (!mapped.name || String(mapped.name).trim() === "") return null;
 
             const name = String(mapped.name).trim();
-
-            const existing = await prisma.supplier.findFirst({
-                where: { companyId, name },
+            // Clients have no contact person column; keep it with the notes
+            const notes = [
+                mapped.contactPerson ? `Contact: ${String(mapped.contactPerson).trim()}` : "",
+                mapped.notes ? String(mapped.notes).trim() : "",
+            ].filter(Boolean).join("\n");
+            return {
+                key: name,
+                data: {
+                    name,
+                    email: mapped.email ? String(mapped.email).trim() : null,
+                    phone: mapped.phone ? String(mapped.phone).trim() : null,
+                    address: mapped.address ? String(mapped.address).trim() : null,
+                    taxId: mapped.taxId ? String(mapped.taxId).trim() : null,
+                    notes: notes || null,
+                },
+            };
+        },
+        loadIndex: async () => {
+            const existing = await prisma.client.findMany({
+                where: { companyId },
+                select: { id: true, name: true },
+                orderBy: { createdAt: "asc" },
             });
+            return indexBy(existing, c => c.name);
+        },
+        createMany: (rows) => prisma.client.createMany({
+            data: rows.map(clientData => ({ companyId, ...clientData })),
+        }),
+        update: (id, clientData) => prisma.client.update({ where: { id }, data: clientData }),
+    }, rowNumbers);
+}
 
-            const supplierData = {
-                name,
-                email: mapped.email ? String(mapped.email).trim() : null,
-                phone: mapped.phone ? String(mapped.phone).trim() : null,
-                address: mapped.address ? String(mapped.address).trim() : null,
-                taxId: mapped.taxId ? String(mapped.taxId).trim() : null,
-                contactPerson: mapped.contactPerson ? String(mapped.contactPerson).trim() : null,
-                paymentTerms: mapped.paymentTerms ? parseInt(mapped.paymentTerms) || 30 : 30,
-            };
+// Import suppliers
+export async function importSuppliers(
+    data: Record<string, any>[],
+    columnMapping: Record<string, string>,
+    companyId: string,
+    rowNumbers?: number[]
+): Promise<ImportResult> {
+    return bulkImport(data, columnMapping, {
+        prepare: (mapped) => {
+            if (!mapped.name || String(mapped.name).trim() === "") return null;
 
-            if (existing) {
-                await prisma.supplier.update({
-                    where: { id: existing.id },
-                    data: supplierData,
-                });
-                result.updated++;
-            } else {
-                await prisma.supplier.create({
-                    data: {
-                        companyId,
-                        ...supplierData,
-                    },
-                });
-                result.created++;
-            }
-        } catch (error) {
-            result.errors.push({
-                row: rowNum,
-                message: error instanceof Error ? error.message : "Unknown error",
+            const name = String(mapped.name).trim();
+            return {
+                key: name,
+                data: {
+                    name,
+                    email: mapped.email ? String(mapped.email).trim() : null,
+                    phone: mapped.phone ? String(mapped.phone).trim() : null,
+                    address: mapped.address ? String(mapped.address).trim() : null,
+                    taxId: mapped.taxId ? String(mapped.taxId).trim() : null,
+                    contactPerson: mapped.contactPerson ? String(mapped.contactPerson).trim() : null,
+                    paymentTerms: mapped.paymentTerms ? parseInt(mapped.paymentTerms) || 30 : 30,
+                },
+            };
+        },
+        loadIndex: async () => {
+            const existing = await prisma.supplier.findMany({
+                where: { companyId },
+                select: { id: true, name: true },
+                orderBy: { createdAt: "asc" },
             });
-        }
-    }
+            return indexBy(existing, s => s.name);
+        },
+        createMany: (rows) => prisma.supplier.createMany({
+            data: rows.map(supplierData => ({ companyId, ...supplierData })),
+        }),
+        update: (id, supplierData) => prisma.supplier.update({ where: { id }, data: supplierData }),
+    }, rowNumbers);
+}
 
-    result.success = result.errors.length === 0;
-    return result;
+async function loadAccountIndex(companyId: string): Promise<Map<string, string>> {
+    const accounts = await prisma.account.findMany({
+        where: { companyId },
+        select: { id: true, accountCode: true },
+    });
+    return indexBy(accounts, a => a.accountCode);
 }
 
 // Import chart of accounts
 export async function importAccounts(
     data: Record<string, any>[],
     columnMapping: Record<string, string>,
-    companyId: string
+    companyId: string,
+    rowNumbers?: number[]
 ): Promise<ImportResult> {
-    const result: ImportResult = {
-        success: true,
-        created: 0,
-        updated: 0,
-        skipped: 0,
-        errors: [],
-    };
-
     // First pass: create all accounts
-    const codeToId = new Map<string, string>();
-
-    for (let i = 0; i < data.length; i++) {
-        const row = data[i];
-        const rowNum = i + 2;
-
-        try {
-            const mapped: Record<string, any> = {};
-            for (const [sourceCol, targetField] of Object.entries(columnMapping)) {
-                mapped[targetField] = row[sourceCol];
-            }
-
-            if (!mapped.accountCode || !mapped.accountName) {
-                result.skipped++;
-                continue;
-            }
+    const result = await bulkImport(data, columnMapping, {
+        prepare: (mapped) => {
+            if (!mapped.accountCode || !mapped.accountName) return null;
 
             const accountCode = String(mapped.accountCode).trim();
-            const accountName = String(mapped.accountName).trim();
             const accountType = mapAccountType(mapped.accountType || "ASSET");
-            const accountCategory = mapAccountCategory(mapped.accountType || "ASSET");
-
-            const existing = await prisma.account.findFirst({
-                where: { companyId, accountCode },
-            });
-
-            const accountData = {
-                accountCode,
-                accountName,
-                accountType,
-                accountCategory,
-                normalBalance: ["ASSET", "EXPENSE"].includes(accountType) ? "DEBIT" as const : "CREDIT" as const,
-                currentBalance: parseCurrency(mapped.openingBalance || mapped.debit || 0) - parseCurrency(mapped.credit || 0),
+            return {
+                key: accountCode,
+                data: {
+                    accountCode,
+                    accountName: String(mapped.accountName).trim(),
+                    accountType,
+                    accountCategory: mapAccountCategory(mapped.accountType || "ASSET"),
+                    normalBalance: ["ASSET", "EXPENSE"].includes(accountType) ? "DEBIT" as const : "CREDIT" as const,
+                    currentBalance: parseCurrency(mapped.openingBalance || mapped.debit || 0) - parseCurrency(mapped.credit || 0),
+                },
             };
-
-            if (existing) {
-                await prisma.account.update({
-                    where: { id: existing.id },
-                    data: accountData,
-                });
-                codeToId.set(accountCode, existing.id);
-                result.updated++;
-            } else {
-                const created = await prisma.account.create({
-                    data: {
-                        companyId,
-                        ...accountData,
-                    },
-                });
-                codeToId.set(accountCode, created.id);
-                result.created++;
-            }
-        } catch (error) {
-            result.errors.push({
-                row: rowNum,
-                message: error instanceof Error ? error.message : "Unknown error",
-            });
-        }
-    }
+        },
+        loadIndex: () => loadAccountIndex(companyId),
+        createMany: (rows) => prisma.account.createMany({
+            data: rows.map(accountData => ({ companyId, ...accountData })),
+        }),
+        update: (id, accountData) => prisma.account.update({ where: { id }, data: accountData }),
+    }, rowNumbers);
 
     // Second pass: set parent relationships if parentCode is mapped
     if (columnMapping["parentCode"]) {
-        for (let i = 0; i < data.length; i++) {
-            const row = data[i];
-            const mapped: Record<string, any> = {};
-            for (const [sourceCol, targetField] of Object.entries(columnMapping)) {
-                mapped[targetField] = row[sourceCol];
-            }
+        const codeToId = await loadAccountIndex(companyId);
+        const links: Prisma.PrismaPromise<unknown>[] = [];
 
+        for (const row of data) {
+            const mapped = mapRow(row, columnMapping);
             if (mapped.parentCode && mapped.accountCode) {
-                const accountCode = String(mapped.accountCode).trim();
-                const parentCode = String(mapped.parentCode).trim();
-
-                const accountId = codeToId.get(accountCode);
-                const parentId = codeToId.get(parentCode);
+                const accountId = codeToId.get(String(mapped.accountCode).trim());
+                const parentId = codeToId.get(String(mapped.parentCode).trim());
 
                 if (accountId && parentId) {
-                    await prisma.account.update({
+                    links.push(prisma.account.update({
                         where: { id: accountId },
                         data: { parentId },
-                    });
+                    }));
                 }
             }
         }
+
+        for (let start = 0; start < links.length; start += IMPORT_CHUNK_SIZE) {
+            await prisma.$transaction(links.slice(start, start + IMPORT_CHUNK_SIZE));
+        }
     }
 
-    result.success = result.errors.length === 0;
     return result;
 }
 
@@ -319,45 +368,12 @@ export async function importAccounts(
 export async function importOpeningBalances(
     data: Record<string, any>[],
     columnMapping: Record<string, string>,
-    companyId: string
+    companyId: string,
+    rowNumbers?: number[]
 ): Promise<ImportResult> {
-    const result: ImportResult = {
-        success: true,
-        created: 0,
-        updated: 0,
-        skipped: 0,
-        errors: [],
-    };
-
-    for (let i = 0; i < data.length; i++) {
-        const row = data[i];
-        const rowNum = i + 2;
-
-        try {
-            const mapped: Record<string, any> = {};
-            for (const [sourceCol, targetField] of Object.entries(columnMapping)) {
-                mapped[targetField] = row[sourceCol];
-            }
-
-            if (!mapped.accountCode) {
-                result.skipped++;
-                continue;
-            }
-
-            const accountCode = String(mapped.accountCode).trim();
-
-            // Find the account
-            const account = await prisma.account.findFirst({
-                where: { companyId, accountCode },
-            });
-
-            if (!account) {
-                result.errors.push({
-                    row: rowNum,
-                    message: `Account ${accountCode} not found`,
-                });
-                continue;
-            }
+    return bulkImport(data, columnMapping, {
+        prepare: (mapped) => {
+            if (!mapped.accountCode) return null;
 
             // Calculate balance from debit/credit or balance field
             let balance = 0;
@@ -369,40 +385,33 @@ export async function importOpeningBalances(
                 balance = debit - credit;
             }
 
-            await prisma.account.update({
-                where: { id: account.id },
-                data: { currentBalance: balance },
-            });
-            result.updated++;
-
-        } catch (error) {
-            result.errors.push({
-                row: rowNum,
-                message: error instanceof Error ? error.message : "Unknown error",
-            });
-        }
-    }
-
-    result.success = result.errors.length === 0;
-    return result;
+            return { key: String(mapped.accountCode).trim(), data: { currentBalance: balance } };
+        },
+        loadIndex: () => loadAccountIndex(companyId),
+        update: (id, balanceData) => prisma.account.update({ where: { id }, data: balanceData }),
+        missingMessage: (accountCode) => `Account ${accountCode} not found`,
+    }, rowNumbers);
 }
 
+export const IMPORTABLE_ENTITY_TYPES: EntityType[] = ["clients", "suppliers", "accounts", "opening_balances"];
+
 // Main importer dispatcher
 export async function importData(
     entityType: EntityType,
     data: Record<string, any>[],
     columnMapping: Record<string, string>,
-    companyId: string
+    companyId: string,
+    rowNumbers?: number[]
 ): Promise<ImportResult> {
     switch (entityType) {
         case "clients":
-            return importClients(data, columnMapping, companyId);
+            return importClients(data, columnMapping, companyId, rowNumbers);
         case "suppliers":
-            return importSuppliers(data, columnMapping, companyId);
+            return importSuppliers(data, columnMapping, companyId, rowNumbers);
         case "accounts":
-            return importAccounts(data, columnMapping, companyId);
+            return importAccounts(data, columnMapping, companyId, rowNumbers);
         case "opening_balances":
-            return importOpeningBalances(data, columnMapping, companyId);
+            return importOpeningBalances(data, columnMapping, companyId, rowNumbers);
         default:
             return {
                 success: false,
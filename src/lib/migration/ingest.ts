@@ -0,0 +1,230 @@
+// Streaming ingestion for migration imports
+//
+// Uploads are parsed into an async sequence of rows, validated and imported
+// in bounded batches. The next batch is not read until the previous one has
+// been written, so a slow database pauses the parser (and the request body)
+// instead of buffering the file as one array. CSV is parsed incrementally;
+// XLSX is a zip archive and must be received whole, but rows are still
+// produced a slice at a time instead of through one sheet_to_json call.
+
+import { Readable } from "stream";
+import type { ReadableStream as NodeReadableStream } from "stream/web";
+import Papa from "papaparse";
+import * as XLSX from "xlsx";
+import { EntityType, FIELD_DETECTION, mapColumns } from "./templates";
+import { validateData } from "./validators";
+import { importData, ImportResult, IMPORTABLE_ENTITY_TYPES } from "./importers";
+import { invalidateCompanyCache } from "@/lib/response-cache";
+
+export const INGEST_BATCH_SIZE = 1000;
+// Keep the response bounded on files with many bad rows; counts stay exact
+export const MAX_REPORTED_ERRORS = 1000;
+
+const XLSX_SLICE_ROWS = 1000;
+
+type Row = Record<string, any>;
+
+export interface IngestProgress {
+    rowsProcessed: number;
+    created: number;
+    updated: number;
+    skipped: number;
+    errorCount: number;
+}
+
+export interface IngestResult extends ImportResult, IngestProgress {
+    warningCount: number;
+}
+
+export interface IngestOptions {
+    entityType: EntityType;
+    companyId: string;
+    /** Source column -> field; derived from the first row's headers when omitted */
+    columnMapping?: Record<string, string> | null;
+    batchSize?: number;
+    onProgress?: (progress: IngestProgress) => void | Promise<void>;
+}
+
+// Parse CSV from a byte stream; iteration pulls from the parser, which pulls from the body
+export async function* readCsvRows(body: ReadableStream<Uint8Array>): AsyncGenerator<Row> {
+    const source = Readable.fromWeb(body as unknown as NodeReadableStream<Uint8Array>);
+    const parser = Papa.parse(Papa.NODE_STREAM_INPUT, { header: true, skipEmptyLines: true });
+    source.on("error", error => parser.destroy(error));
+    source.pipe(parser);
+
+    for await (const row of parser) {
+        yield row as Row;
+    }
+}
+
+// Read the first sheet of a workbook a slice of rows at a time
+export function* readXlsxRows(buffer: ArrayBuffer): Generator<Row> {
+    const workbook = XLSX.read(buffer, { type: "array" });
+    const sheet = workbook.Sheets[workbook.SheetNames[0]];
+    if (!sheet || !sheet["!ref"]) return;
+
+    const range = XLSX.utils.decode_range(sheet["!ref"]);
+    const sliceOf = (first: number, last: number) => XLSX.utils.sheet_to_json(sheet, {
+        header: 1,
+        blankrows: true,
+        range: { s: { r: first, c: range.s.c }, e: { r: last, c: range.e.c } },
+    }) as any[][];
+
+    const columns = (sliceOf(range.s.r, range.s.r)[0] || []).map((c: any) => String(c || "").trim());
+    if (columns.length === 0) return;
+
+    for (let first = range.s.r + 1; first <= range.e.r; first += XLSX_SLICE_ROWS) {
+        const rows = sliceOf(first, Math.min(first + XLSX_SLICE_ROWS - 1, range.e.r));
+        for (const values of rows) {
+            const obj: Row = {};
+            columns.forEach((col, i) => {
+                obj[col] = values[i];
+            });
+            yield obj;
+        }
+    }
+}
+
+// Pick a reader from the file name or content type
+export async function readUploadRows(
+    body: ReadableStream<Uint8Array>,
+    fileNameOrType: string
+): Promise<AsyncIterable<Row> | Iterable<Row>> {
+    const kind = fileNameOrType.toLowerCase();
+    if (kind.endsWith(".xlsx") || kind.endsWith(".xls") || kind.includes("spreadsheet") || kind.includes("ms-excel")) {
+        return readXlsxRows(await new Response(body).arrayBuffer());
+    }
+    if (kind.endsWith(".csv") || kind.includes("csv") || kind.startsWith("text/")) {
+        return readCsvRows(body);
+    }
+    throw new Error("Unsupported file format. Use .xlsx, .xls, or .csv");
+}
+
+// Headers that already name a field map to it; the rest go through keyword detection
+export function defaultColumnMapping(columns: string[], entityType: EntityType): Record<string, string> {
+    const mapping = mapColumns(columns, entityType);
+    for (const col of columns) {
+        if (col in FIELD_DETECTION[entityType]) mapping[col] = col;
+    }
+    return mapping;
+}
+
+/**
+ * Validate and import rows in batches of `batchSize`.
+ * Rows failing validation are reported and not imported. For accounts,
+ * parent codes resolve against rows imported so far (earlier batches included).
+ */
+export async function ingestRows(rows: AsyncIterable<Row> | Iterable<Row>, options: IngestOptions): Promise<IngestResult> {
+    const { entityType, companyId, batchSize = INGEST_BATCH_SIZE, onProgress } = options;
+    if (!IMPORTABLE_ENTITY_TYPES.includes(entityType)) {
+        throw new Error(`Import not implemented for ${entityType}`);
+    }
+
+    let columnMapping = options.columnMapping || null;
+    const result: IngestResult = {
+        success: true,
+        created: 0,
+        updated: 0,
+        skipped: 0,
+        errors: [],
+        rowsProcessed: 0,
+        errorCount: 0,
+        warningCount: 0,
+    };
+
+    const report = (errors: ImportResult["errors"]) => {
+        result.errorCount += errors.length;
+        const room = MAX_REPORTED_ERRORS - result.errors.length;
+        if (room > 0) result.errors.push(...errors.slice(0, room));
+    };
+
+    const flush = async (batch: Row[]) => {
+        if (batch.length === 0) return;
+        const firstRow = result.rowsProcessed + 2;
+        columnMapping ??= defaultColumnMapping(Object.keys(batch[0]), entityType);
+
+        const validation = validateData(batch, entityType, columnMapping, firstRow);
+        const invalid = new Set(validation.errors.map(e => e.row));
+        result.warningCount += validation.warnings.length;
+        report(validation.errors.map(e => ({ row: e.row, message: `${e.column}: ${e.message}` })));
+
+        const valid: Row[] = [];
+        const rowNumbers: number[] = [];
+        batch.forEach((row, i) => {
+            if (!invalid.has(firstRow + i)) {
+                valid.push(row);
+                rowNumbers.push(firstRow + i);
+            }
+        });
+
+        if (valid.length > 0) {
+            const imported = await importData(entityType, valid, columnMapping, companyId, rowNumbers);
+            result.created += imported.created;
+            result.updated += imported.updated;
+            result.skipped += imported.skipped;
+            report(imported.errors);
+        }
+
+        result.rowsProcessed += batch.length;
+        await onProgress?.({
+            rowsProcessed: result.rowsProcessed,
+            created: result.created,
+            updated: result.updated,
+            skipped: result.skipped,
+            errorCount: result.errorCount,
+        });
+    };
+
+    let batch: Row[] = [];
+    for await (const row of rows) {
+        batch.push(row);
+        if (batch.length >= batchSize) {
+            await flush(batch);
+            batch = [];
+        }
+    }
+    await flush(batch);
+
+    result.errors.sort((a, b) => a.row - b.row);
+    result.success = result.errorCount === 0;
+    return result;
+}
+
+/**
+ * Run an ingestion and report it as NDJSON: one {type:"progress"} line per
+ * batch, then {type:"complete", result} or {type:"error", error}. The
+ * company's cached reports are invalidated before the stream closes.
+ */
+export function ingestAsNdjson(
+    rows: () => Promise<AsyncIterable<Row> | Iterable<Row>>,
+    options: IngestOptions
+): ReadableStream<Uint8Array> {
+    const encoder = new TextEncoder();
+
+    return new ReadableStream<Uint8Array>({
+        start(controller) {
+            const send = (event: Record<string, unknown>) => {
+                controller.enqueue(encoder.encode(JSON.stringify(event) + "\n"));
+            };
+
+            // Not awaited: progress lines must reach the client while the import runs
+            void (async () => {
+                try {
+                    const result = await ingestRows(await rows(), {
+                        ...options,
+                        onProgress: progress => send({ type: "progress", ...progress }),
+                    });
+                    send({ type: "complete", result });
+                } catch (error) {
+                    console.error("Streaming import error:", error);
+                    send({ type: "error", error: error instanceof Error ? error.message : "Import failed" });
+                } finally {
+                    // Batches written before a failure feed the cached reports too
+                    await invalidateCompanyCache(options.companyId)
+                        .catch(error => console.error("Streaming import cache invalidation error:", error));
+                    controller.close();
+                }
+            })();
+        },
+    });
+}
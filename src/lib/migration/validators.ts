@@ -247,11 +247,12 @@ export function parseCurrency(value: any): number {
     return parseFloat(cleaned) || 0;
 }
 
-// Validate data rows
+// Validate data rows; firstRow is the sheet row of data[0] when validating a batch
 export function validateData(
     data: Record<string, any>[],
     entityType: EntityType,
-    columnMapping: Record<string, string>
+    columnMapping: Record<string, string>,
+    firstRow = 2
 ): ValidationResult {
     const errors: ValidationError[] = [];
     const warnings: ValidationError[] = [];
@@ -261,7 +262,7 @@ export function validateData(
 
     for (let i = 0; i < data.length; i++) {
         const row = data[i];
-        const rowNumber = i + 2; // +2 for 1-indexed and header row
+        const rowNumber = i + firstRow; // default 2: 1-indexed plus header row
         let rowValid = true;
 
         // Create mapped row for validation
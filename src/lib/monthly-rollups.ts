@@ -0,0 +1,205 @@
+/**
+ * monthly-rollups.ts - Incremental monthly rollups
+ *
+ * One MonthlyRollup row per company, month and metric. Write paths apply the
+ * delta between a record's old and new contribution, so the dashboard chart
+ * and reports read a dozen rows instead of rescanning invoices, POS sales,
+ * expenses and bills. rebuildMonthlyRollups reconciles the store against the
+ * raw tables (e.g. after a deploy or an import). POS cost of goods comes
+ * from the cost recorded on each sale at checkout, so rebuilds agree with
+ * what the sale posted.
+ */
+
+import { Prisma } from "@prisma/client";
+import { prisma } from "@/lib/prisma";
+import { MONTHLY_METRICS, MonthlyMetric, sumMonthlyMetrics } from "@/lib/financial-aggregates";
+
+type Db = Prisma.TransactionClient | typeof prisma;
+
+// Written by rebuildMonthlyRollups; until it exists, rollups may be partial
+const REBUILT_MONTH = "*";
+const REBUILT_METRIC = "REBUILT_AT";
+
+export interface RollupEntry {
+    metric: MonthlyMetric;
+    date: Date;
+    amount: number;
+    count: number;
+}
+
+/**
+ * Month key in server local time, matching getMonthlyData's month boundaries
+ */
+export function monthKey(date: Date): string {
+    return `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, "0")}`;
+}
+
+// ---------- Contributions per record type ----------
+
+export function invoiceRollup(invoice: { status: string; issueDate: Date; totalAmount: number }): RollupEntry[] {
+    if (invoice.status !== "PAID") return [];
+    return [{ metric: "INVOICE_REVENUE", date: invoice.issueDate, amount: invoice.totalAmount, count: 1 }];
+}
+
+export function posSaleRollup(sale: { status: string; saleDate: Date; total: number }, cogs: number): RollupEntry[] {
+    if (sale.status !== "COMPLETED") return [];
+    return [
+        { metric: "POS_REVENUE", date: sale.saleDate, amount: sale.total, count: 1 },
+        { metric: "POS_COGS", date: sale.saleDate, amount: cogs, count: 0 },
+    ];
+}
+
+export function expenseRollup(expense: { date: Date; amount: number }): RollupEntry[] {
+    return [{ metric: "EXPENSES", date: expense.date, amount: expense.amount, count: 1 }];
+}
+
+export function billRollup(bill: { status: string; issueDate: Date; totalAmount: number }): RollupEntry[] {
+    if (bill.status !== "PAID") return [];
+    return [{ metric: "BILLS_PAID", date: bill.issueDate, amount: bill.totalAmount, count: 1 }];
+}
+
+/**
+ * Apply the difference between a record's previous and new contribution.
+ * Pass [] as `before` on create and [] as `after` on delete.
+ */
+export async function applyRollupChange(
+    companyId: string,
+    before: RollupEntry[],
+    after: RollupEntry[],
+    db: Db = prisma
+) {
+    const deltas = new Map<string, { month: string; metric: MonthlyMetric; amount: number; count: number }>();
+    const add = (entry: RollupEntry, sign: 1 | -1) => {
+        const month = monthKey(entry.date);
+        const key = `${month}|${entry.metric}`;
+        const current = deltas.get(key) || { month, metric: entry.metric, amount: 0, count: 0 };
+        current.amount += sign * entry.amount;
+        current.count += sign * entry.count;
+        deltas.set(key, current);
+    };
+    before.forEach(entry => add(entry, -1));
+    after.forEach(entry => add(entry, 1));
+
+    for (const delta of deltas.values()) {
+        if (delta.amount === 0 && delta.count === 0) continue;
+        await db.monthlyRollup.upsert({
+            where: { companyId_month_metric: { companyId, month: delta.month, metric: delta.metric } },
+            create: { companyId, month: delta.month, metric: delta.metric, amount: delta.amount, count: delta.count },
+            update: { amount: { increment: delta.amount }, count: { increment: delta.count } },
+        });
+    }
+}
+
+/**
+ * Read rollups for the given month keys.
+ * Returns null until the company has been rebuilt once, so callers can fall back to raw sums.
+ */
+export async function readMonthlyRollups(
+    companyId: string,
+    months: string[]
+): Promise<Map<string, Record<MonthlyMetric, number>> | null> {
+    const rows = await prisma.monthlyRollup.findMany({
+        where: { companyId, month: { in: [...months, REBUILT_MONTH] } },
+        select: { month: true, metric: true, amount: true },
+    });
+
+    if (!rows.some(row => row.month === REBUILT_MONTH && row.metric === REBUILT_METRIC)) return null;
+
+    const result = new Map<string, Record<MonthlyMetric, number>>();
+    months.forEach(month => {
+        result.set(month, Object.fromEntries(MONTHLY_METRICS.map(m => [m, 0])) as Record<MonthlyMetric, number>);
+    });
+    rows.forEach(row => {
+        const month = result.get(row.month);
+        if (month && (MONTHLY_METRICS as readonly string[]).includes(row.metric)) {
+            month[row.metric as MonthlyMetric] += row.amount;
+        }
+    });
+
+    return result;
+}
+
+export interface RollupDrift {
+    month: string;
+    metric: MonthlyMetric;
+    stored: number;
+    expected: number;
+}
+
+/**
+ * Recompute a company's rollups from the raw tables, report drift and (unless dryRun) replace them
+ */
+export async function rebuildMonthlyRollups(
+    companyId: string,
+    options: { dryRun?: boolean } = {}
+): Promise<{ months: number; drift: RollupDrift[] }> {
+    const [invoices, sales, expenses, bills] = await Promise.all([
+        prisma.invoice.aggregate({ where: { companyId }, _min: { issueDate: true }, _max: { issueDate: true } }),
+        prisma.pOSSale.aggregate({ where: { companyId }, _min: { saleDate: true }, _max: { saleDate: true } }),
+        prisma.expense.aggregate({ where: { companyId }, _min: { date: true }, _max: { date: true } }),
+        prisma.bill.aggregate({ where: { companyId }, _min: { issueDate: true }, _max: { issueDate: true } }),
+    ]);
+
+    const dates = [
+        invoices._min.issueDate, invoices._max.issueDate,
+        sales._min.saleDate, sales._max.saleDate,
+        expenses._min.date, expenses._max.date,
+        bills._min.issueDate, bills._max.issueDate,
+    ].filter((d): d is Date => !!d);
+
+    const expected = new Map<string, { month: string; metric: MonthlyMetric; amount: number; count: number }>();
+    let months = 0;
+
+    if (dates.length > 0) {
+        const first = new Date(Math.min(...dates.map(d => d.getTime())));
+        const last = new Date(Math.max(...dates.map(d => d.getTime())));
+
+        const bounds: Date[] = [];
+        for (let d = new Date(first.getFullYear(), first.getMonth(), 1); d <= last; d = new Date(d.getFullYear(), d.getMonth() + 1, 1)) {
+            bounds.push(d);
+        }
+        bounds.push(new Date(last.getFullYear(), last.getMonth() + 1, 1));
+        months = bounds.length - 1;
+
+        const sums = await sumMonthlyMetrics(companyId, bounds);
+        MONTHLY_METRICS.forEach(metric => {
+            bounds.slice(0, -1).forEach((start, i) => {
+                const amount = sums[metric].amount[i];
+                const count = sums[metric].count[i];
+                if (amount === 0 && count === 0) return;
+                const month = monthKey(start);
+                expected.set(`${month}|${metric}`, { month, metric, amount, count });
+            });
+        });
+    }
+
+    const stored = await prisma.monthlyRollup.findMany({ where: { companyId, month: { not: REBUILT_MONTH } } });
+    const storedByKey = new Map(stored.map(r => [`${r.month}|${r.metric}`, r]));
+
+    const drift: RollupDrift[] = [];
+    const keys = new Set([...expected.keys(), ...storedByKey.keys()]);
+    keys.forEach(key => {
+        const exp = expected.get(key);
+        const cur = storedByKey.get(key);
+        const expectedAmount = exp?.amount || 0;
+        const storedAmount = cur?.amount || 0;
+        if (Math.abs(expectedAmount - storedAmount) > 0.005 || (exp?.count || 0) !== (cur?.count || 0)) {
+            const [month, metric] = key.split("|");
+            drift.push({ month, metric: metric as MonthlyMetric, stored: storedAmount, expected: expectedAmount });
+        }
+    });
+
+    if (!options.dryRun) {
+        await prisma.$transaction([
+            prisma.monthlyRollup.deleteMany({ where: { companyId } }),
+            prisma.monthlyRollup.createMany({
+                data: [
+                    ...Array.from(expected.values()).map(r => ({ companyId, ...r })),
+                    { companyId, month: REBUILT_MONTH, metric: REBUILT_METRIC, amount: Date.now(), count: 0 },
+                ],
+            }),
+        ]);
+    }
+
+    return { months, drift: drift.sort((a, b) => a.month.localeCompare(b.month)) };
+}
@@ -0,0 +1,173 @@
+/**
+ * pagination.ts - Keyset pagination for list endpoints
+ *
+ * Pages are ordered by (createdAt desc, id desc) - or another date column a
+ * route passes as `orderField` - and continued with an opaque cursor holding
+ * the last row's key, so page N costs the same as page 1 and
+ * rows inserted meanwhile never shift later pages. List routes opt in when
+ * the caller sends `limit` or `cursor`; the body stays a plain JSON array and
+ * paging metadata travels in headers:
+ *
+ *   X-Next-Cursor  cursor for the next page (absent on the last page)
+ *   X-Total-Count  total matching rows, only computed when `count=true`
+ *
+ * `fields=a,b,c` trims each returned object to the listed keys (id is kept);
+ * routes can push it into the query with pageSelect.
+ */
+
+export const DEFAULT_PAGE_LIMIT = 50;
+export const MAX_PAGE_LIMIT = 200;
+
+export interface PageCursor {
+    /** Value of the page's order field (createdAt unless the route chose another) */
+    createdAt: Date;
+    id: string;
+}
+
+export interface PageParams {
+    /** True when the caller asked for keyset paging (limit or cursor given) */
+    paginated: boolean;
+    limit: number;
+    cursor: PageCursor | null;
+    fields: string[] | null;
+    withTotal: boolean;
+    /** Date column the keyset is ordered by */
+    orderField: string;
+}
+
+export function encodeCursor(row: PageCursor): string {
+    return Buffer.from(JSON.stringify([row.createdAt.getTime(), row.id])).toString("base64url");
+}
+
+export function decodeCursor(value: string): PageCursor | null {
+    try {
+        const [time, id] = JSON.parse(Buffer.from(value, "base64url").toString("utf8"));
+        if (typeof time !== "number" || typeof id !== "string") return null;
+        return { createdAt: new Date(time), id };
+    } catch {
+        return null;
+    }
+}
+
+/**
+ * Read limit/cursor/fields/count from the query string.
+ * Returns an error message for malformed cursors.
+ */
+export function parsePageParams(
+    searchParams: URLSearchParams,
+    options: { defaultLimit?: number; alwaysPaginate?: boolean; orderField?: string } = {}
+): PageParams | { error: string } {
+    const rawLimit = searchParams.get("limit");
+    const rawCursor = searchParams.get("cursor");
+    const rawFields = searchParams.get("fields");
+
+    const cursor = rawCursor ? decodeCursor(rawCursor) : null;
+    if (rawCursor && !cursor) {
+        return { error: "Invalid cursor" };
+    }
+
+    const requested = rawLimit ? parseInt(rawLimit, 10) : NaN;
+    const limit = Number.isFinite(requested) && requested > 0
+        ? Math.min(requested, MAX_PAGE_LIMIT)
+        : options.defaultLimit ?? DEFAULT_PAGE_LIMIT;
+
+    return {
+        paginated: Boolean(options.alwaysPaginate || rawLimit || rawCursor),
+        limit,
+        cursor,
+        fields: rawFields ? rawFields.split(",").map(f => f.trim()).filter(Boolean) : null,
+        withTotal: searchParams.get("count") === "true",
+        orderField: options.orderField ?? "createdAt",
+    };
+}
+
+/**
+ * Prisma where fragment selecting rows after the cursor
+ */
+export function keysetWhere(cursor: PageCursor | null, orderField = "createdAt") {
+    if (!cursor) return {};
+    return {
+        OR: [
+            { [orderField]: { lt: cursor.createdAt } },
+            { [orderField]: cursor.createdAt, id: { lt: cursor.id } },
+        ],
+    };
+}
+
+export const keysetOrderBy = [{ createdAt: "desc" as const }, { id: "desc" as const }];
+
+/**
+ * Combine a route's where clause with the cursor condition
+ */
+export function pageWhere<W extends object>(params: PageParams, where: W): W {
+    return params.paginated && params.cursor ? ({ AND: [where, keysetWhere(params.cursor, params.orderField)] } as W) : where;
+}
+
+/**
+ * Ordering and take for findMany: keyset order with one extra row when paging,
+ * otherwise the route's legacy ordering
+ */
+export function pageOrder<O>(params: PageParams, legacyOrderBy: O) {
+    return params.paginated
+        ? {
+            orderBy: params.orderField === "createdAt"
+                ? keysetOrderBy
+                : [{ [params.orderField]: "desc" as const }, { id: "desc" as const }],
+            take: params.limit + 1,
+        }
+        : { orderBy: legacyOrderBy };
+}
+
+/**
+ * Split a limit+1 result into the page and the next cursor
+ */
+export function takePage<T extends { id: string }>(rows: T[], params: PageParams): { items: T[]; nextCursor: string | null } {
+    if (!params.paginated || rows.length <= params.limit) return { items: rows, nextCursor: null };
+    const items = rows.slice(0, params.limit);
+    const last = items[items.length - 1] as T & Record<string, unknown>;
+    return { items, nextCursor: encodeCursor({ createdAt: last[params.orderField] as Date, id: last.id }) };
+}
+
+/**
+ * Prisma select for `fields=`: the listed scalar columns, relations mapped to
+ * their own select/include, and the keyset columns the cursor needs. Unknown
+ * names are ignored. Returns null when the caller wants whole rows.
+ */
+export function pageSelect(
+    params: PageParams,
+    scalars: readonly string[],
+    relations: Record<string, unknown> = {}
+): Record<string, unknown> | null {
+    if (!params.fields) return null;
+    const select: Record<string, unknown> = { id: true, [params.orderField]: true };
+    for (const field of params.fields) {
+        if (field in relations) select[field] = relations[field];
+        else if (scalars.includes(field)) select[field] = true;
+    }
+    return select;
+}
+
+/**
+ * Keep only the requested top-level keys (plus id)
+ */
+export function projectFields<T extends object>(items: T[], fields: string[] | null): Partial<T>[] {
+    if (!fields) return items;
+    const keep = new Set(["id", ...fields]);
+    return items.map(item =>
+        Object.fromEntries(Object.entries(item).filter(([key]) => keep.has(key))) as Partial<T>
+    );
+}
+
+/**
+ * Paging headers; the total count query only runs when the caller asked for it
+ */
+export async function pageHeaders(
+    params: PageParams,
+    nextCursor: string | null,
+    countTotal: () => Promise<number>
+): Promise<Record<string, string>> {
+    const headers: Record<string, string> = {};
+    if (nextCursor) headers["X-Next-Cursor"] = nextCursor;
+    if (params.withTotal) headers["X-Total-Count"] = String(await countTotal());
+    return headers;
+}
@@ -0,0 +1,467 @@
+/**
+ * pos-checkout.ts - POS checkout
+ *
+ * A checkout costs a fixed number of statements whatever the basket size.
+ * Prices, costs and names come from one product query, run alongside the
+ * sale number and the (cached) posting accounts. One transaction then
+ * decrements every tracked product with a single CASE UPDATE ... RETURNING,
+ * records the SALE movements with one createMany, issues them from the cost
+ * layers in a batch, updates stock statuses from the returned rows and
+ * writes the sales with their items and issued cost, which reports and
+ * rollups read back. It then adds them to the cashiers' open shift totals,
+ * the monthly rollups and the hourly sales buckets and posts their journal
+ * entries at that cost. The company-wide rows (rollups, buckets, the JOURNAL
+ * sequence and account balances) are written last, so they stay locked for
+ * the shortest time. Loyalty points follow the commit.
+ *
+ * commitSales takes any number of prepared sales, so offline terminals
+ * syncing a queue (pos-sync.ts) go through the same statements as one basket.
+ */
+
+import { randomUUID } from "crypto";
+import { Prisma } from "@prisma/client";
+import { prisma } from "@/lib/prisma";
+import { sqlDate, toNumber } from "@/lib/financial-aggregates";
+import { applyStockMovements } from "@/lib/accounting/cost-layers";
+import { applyStockStatuses } from "@/lib/stock-alerts";
+import { DefaultAccounts, getDefaultAccounts, postJournalEntries, posSaleJournalLines } from "@/lib/gl/auto-post";
+import { applyRollupChange, posSaleRollup } from "@/lib/monthly-rollups";
+import { invalidateCompanyCache } from "@/lib/response-cache";
+import { applyStockSnapshot, StockSnapshot } from "@/lib/product-index";
+import { recordShiftSales } from "@/lib/shift-summary";
+import { applySalesBucketChange, posSaleBuckets } from "@/lib/pos-sales-buckets";
+import { nextDocumentNumber, SequenceBlockPool } from "@/lib/sequences";
+
+// Reserve sale numbers in blocks on busy terminals; gaps are possible across restarts
+const SALE_NUMBER_BLOCK = Number(process.env.POS_SEQUENCE_BLOCK_SIZE) || 1;
+const saleNumberPool = SALE_NUMBER_BLOCK > 1 ? new SequenceBlockPool("POS_SALE", SALE_NUMBER_BLOCK) : null;
+
+// Terminal clocks may run a little ahead of the server
+const CLOCK_SKEW_MS = 5 * 60 * 1000;
+
+// Posting accounts change rarely; settings changes are picked up within the TTL
+const ACCOUNTS_TTL_MS = 60 * 1000;
+
+const globalForCheckout = globalThis as unknown as {
+    postingAccounts: Map<string, { accounts: DefaultAccounts; expiresAt: number }> | undefined;
+};
+const postingAccounts = globalForCheckout.postingAccounts ?? new Map<string, { accounts: DefaultAccounts; expiresAt: number }>();
+globalForCheckout.postingAccounts = postingAccounts;
+
+const round2 = (value: number) => Math.round(value * 100) / 100;
+
+export interface CheckoutItem {
+    productId: string;
+    quantity: number;
+    /** Defaults to the product's selling price */
+    unitPrice?: number;
+    /** Fraction of the line total, as the register applies it; defaults to the product's */
+    taxRate?: number;
+    discount?: number;
+    total?: number;
+}
+
+export interface CheckoutInput {
+    items: CheckoutItem[];
+    paymentMethod: string;
+    /** Client-generated id; a sale sent again with the same key is returned, not recorded twice */
+    idempotencyKey?: string;
+    /** When the sale was rung up (offline terminals); defaults to now */
+    saleDate?: string | Date;
+    terminalId?: string;
+    subtotal?: number;
+    taxAmount?: number;
+    discountAmount?: number;
+    total?: number;
+    cashReceived?: number;
+    changeGiven?: number;
+    customerName?: string;
+    customerPhone?: string;
+    notes?: string;
+}
+
+/**
+ * Raised for baskets that must not be sold (empty, bad quantities, unknown products)
+ */
+export class CheckoutError extends Error {
+    constructor(message: string, public status = 400) {
+        super(message);
+        this.name = "CheckoutError";
+    }
+}
+
+export type SaleCatalog = Map<string, {
+    id: string;
+    name: string;
+    sellingPrice: number;
+    costPrice: number;
+    taxRate: number;
+    trackInventory: boolean;
+}>;
+
+export interface PreparedSale {
+    id: string;
+    saleNumber: string;
+    saleDate: Date;
+    cashierId: string;
+    input: CheckoutInput;
+    items: { productId: string; productName: string; quantity: number; unitPrice: number; taxRate: number; discount: number; total: number }[];
+    subtotal: number;
+    taxAmount: number;
+    discountAmount: number;
+    total: number;
+    /** Units leaving stock per tracked product */
+    issued: Map<string, number>;
+    /** Cost of lines for products without inventory tracking, at cost price */
+    untrackedCost: number;
+}
+
+type StockRow = {
+    id: string;
+    name: string;
+    costPrice: unknown;
+    stockQuantity: unknown;
+    lowStockAlert: unknown;
+    isActive: unknown;
+    stockStatus: string;
+};
+
+/**
+ * The company's default posting accounts, cached briefly per process
+ */
+export async function loadPostingAccounts(companyId: string): Promise<DefaultAccounts> {
+    const cached = postingAccounts.get(companyId);
+    if (cached && cached.expiresAt > Date.now()) return cached.accounts;
+
+    const accounts = await getDefaultAccounts(companyId);
+    postingAccounts.set(companyId, { accounts, expiresAt: Date.now() + ACCOUNTS_TTL_MS });
+    return accounts;
+}
+
+/**
+ * Allocate the next POS sale number (from a pre-allocated block when configured)
+ */
+export function nextSaleNumber(companyId: string): Promise<string> {
+    return saleNumberPool ? saleNumberPool.next(companyId) : nextDocumentNumber(companyId, "POS_SALE");
+}
+
+/**
+ * Prices, costs and names of the given products in one query
+ */
+export async function loadSaleCatalog(companyId: string, productIds: string[]): Promise<SaleCatalog> {
+    const products = await prisma.product.findMany({
+        where: { companyId, id: { in: Array.from(new Set(productIds)) } },
+        select: { id: true, name: true, sellingPrice: true, costPrice: true, taxRate: true, trackInventory: true },
+    });
+    return new Map(products.map(p => [p.id, p]));
+}
+
+/**
+ * Validate a sale against the catalog and work out its lines and totals
+ */
+export function prepareSale(
+    input: CheckoutInput,
+    catalog: SaleCatalog,
+    sale: { saleNumber: string; cashierId: string; now: Date }
+): PreparedSale {
+    const items = input.items;
+    if (!Array.isArray(items) || items.length === 0) {
+        throw new CheckoutError("Sale has no items");
+    }
+    items.forEach((item, i) => {
+        if (!item.productId || !Number.isInteger(item.quantity) || item.quantity <= 0) {
+            throw new CheckoutError(`Item ${i + 1}: needs a productId and a positive whole quantity`);
+        }
+    });
+    const unknown = Array.from(new Set(items.map(item => item.productId))).filter(id => !catalog.has(id));
+    if (unknown.length > 0) {
+        throw new CheckoutError(`Unknown products: ${unknown.join(", ")}`, 404);
+    }
+    const saleDate = input.saleDate ? new Date(input.saleDate) : sale.now;
+    if (isNaN(saleDate.getTime()) || saleDate.getTime() > sale.now.getTime() + CLOCK_SKEW_MS) {
+        throw new CheckoutError("saleDate must be a valid date that is not in the future");
+    }
+
+    const saleItems = items.map(item => {
+        const product = catalog.get(item.productId)!;
+        const unitPrice = item.unitPrice ?? product.sellingPrice;
+        const discount = item.discount || 0;
+        return {
+            productId: product.id,
+            productName: product.name,
+            quantity: item.quantity,
+            unitPrice,
+            taxRate: item.taxRate ?? product.taxRate,
+            discount,
+            total: item.total ?? round2(item.quantity * unitPrice - discount),
+        };
+    });
+
+    // The register's figures when it sent them, else the same rules applied here
+    const discountAmount = input.discountAmount || 0;
+    const subtotal = input.subtotal ?? round2(saleItems.reduce((sum, item) => sum + item.total, 0));
+    const taxAmount = input.taxAmount ?? round2(saleItems.reduce((sum, item) => sum + item.total * item.taxRate, 0));
+    const total = input.total ?? round2(subtotal + taxAmount - discountAmount);
+
+    const issued = new Map<string, number>();
+    let untrackedCost = 0;
+    for (const item of saleItems) {
+        const product = catalog.get(item.productId)!;
+        if (product.trackInventory) {
+            issued.set(item.productId, (issued.get(item.productId) || 0) + item.quantity);
+        } else {
+            untrackedCost += item.quantity * product.costPrice;
+        }
+    }
+
+    return {
+        id: randomUUID(),
+        saleNumber: sale.saleNumber,
+        saleDate,
+        cashierId: sale.cashierId,
+        input,
+        items: saleItems,
+        subtotal,
+        taxAmount,
+        discountAmount,
+        total,
+        issued,
+        untrackedCost,
+    };
+}
+
+/**
+ * Write prepared sales inside `tx`: stock, movements, cost layers, stock
+ * levels, the sales themselves, shift totals, rollups, buckets and journal
+ * entries, with a fixed number of statements however many sales and lines
+ * there are. Returns each sale with its items, cost of goods and the
+ * resulting stock of its products, in input order.
+ */
+export async function commitSales(
+    tx: Prisma.TransactionClient,
+    companyId: string,
+    sales: PreparedSale[],
+    accounts: DefaultAccounts
+) {
+    // Movements are recorded in sale order, so each one's balances follow the last
+    const ordered = sales
+        .map((sale, index) => ({ sale, index }))
+        .sort((a, b) => a.sale.saleDate.getTime() - b.sale.saleDate.getTime() || a.index - b.index);
+
+    const issued = new Map<string, number>();
+    sales.forEach(sale => sale.issued.forEach((quantity, productId) => {
+        issued.set(productId, (issued.get(productId) || 0) + quantity);
+    }));
+
+    let stockRows: StockRow[] = [];
+    const stockUpdatedAt = new Date();
+    if (issued.size > 0) {
+        const quantityFor = Prisma.join(
+            Array.from(issued, ([productId, quantity]) => Prisma.sql`WHEN ${productId} THEN CAST(${quantity} AS INTEGER)`),
+            " "
+        );
+        stockRows = await tx.$queryRaw<StockRow[]>`
+            UPDATE "Product"
+            SET "stockQuantity" = "stockQuantity" - CASE "id" ${quantityFor} END,
+                "updatedAt" = ${sqlDate(stockUpdatedAt)}
+            WHERE "companyId" = ${companyId} AND "id" IN (${Prisma.join(Array.from(issued.keys()))})
+            RETURNING "id", "name", "costPrice", "stockQuantity", "lowStockAlert", "isActive", "stockStatus"
+        `;
+    }
+    const stock = stockRows.map(row => ({
+        id: row.id,
+        name: row.name,
+        stockQuantity: toNumber(row.stockQuantity),
+        lowStockAlert: toNumber(row.lowStockAlert),
+        // Booleans come back as 1/0 on SQLite
+        isActive: Number(row.isActive) === 1,
+        stockStatus: row.stockStatus,
+    }));
+
+    const costOfGoods = sales.map(sale => sale.untrackedCost);
+    if (stock.length > 0) {
+        // Walk each product forward from its balance before the first sale
+        const balance = new Map(stock.map(row => [row.id, row.stockQuantity + issued.get(row.id)!]));
+        const movementData: Prisma.StockMovementCreateManyInput[] = [];
+        const owner: number[] = [];
+        for (const { sale, index } of ordered) {
+            sale.issued.forEach((quantity, productId) => {
+                const before = balance.get(productId);
+                if (before === undefined) return;
+                balance.set(productId, before - quantity);
+                movementData.push({
+                    companyId,
+                    productId,
+                    type: "SALE",
+                    quantity: -quantity,
+                    balanceBefore: before,
+                    balanceAfter: before - quantity,
+                    reference: sale.saleNumber,
+                    referenceType: "POS_SALE",
+                    userId: sale.cashierId,
+                    date: sale.saleDate,
+                });
+                owner.push(index);
+            });
+        }
+
+        const created = await tx.stockMovement.createManyAndReturn({ data: movementData });
+        // Match rows back by sale number and product; RETURNING order is not guaranteed
+        const byKey = new Map(created.map(m => [`${m.reference}|${m.productId}`, m]));
+        const movements = movementData.map(m => byKey.get(`${m.reference}|${m.productId}`)!);
+        const costs = await applyStockMovements(tx, movements);
+        // Units sold beyond the open layers have no receipt cost; they go at the cost price
+        const costPrices = new Map(stockRows.map(row => [row.id, toNumber(row.costPrice)]));
+        costs.forEach((cost, i) => {
+            costOfGoods[owner[i]] += cost.fifoCost + cost.uncovered * (costPrices.get(movements[i].productId) ?? 0);
+        });
+
+        await applyStockStatuses(companyId, stock, tx);
+    }
+
+    // Journal ids are chosen up front so the entries can be posted last
+    const postings = sales
+        .map((sale, index) => ({ sale, index, lines: posSaleJournalLines(accounts, sale, round2(costOfGoods[index])) }))
+        .filter(p => p.lines !== null);
+    const journalEntryIds = new Map(postings.map(p => [p.index, randomUUID()]));
+
+    const saleRows = await tx.pOSSale.createManyAndReturn({
+        data: sales.map((sale, index) => ({
+            id: sale.id,
+            companyId,
+            terminalId: sale.input.terminalId,
+            cashierId: sale.cashierId,
+            saleNumber: sale.saleNumber,
+            saleDate: sale.saleDate,
+            subtotal: sale.subtotal,
+            taxAmount: sale.taxAmount,
+            discountAmount: sale.discountAmount,
+            total: sale.total,
+            paymentMethod: sale.input.paymentMethod,
+            cashReceived: sale.input.cashReceived,
+            changeGiven: sale.input.changeGiven,
+            customerName: sale.input.customerName,
+            customerPhone: sale.input.customerPhone,
+            notes: sale.input.notes,
+            idempotencyKey: sale.input.idempotencyKey,
+            costOfGoods: round2(costOfGoods[index]),
+            journalEntryId: journalEntryIds.get(index),
+            isPostedToGL: journalEntryIds.has(index),
+        })),
+    });
+    const itemRows = await tx.pOSSaleItem.createManyAndReturn({
+        data: sales.flatMap(sale => sale.items.map(item => ({ saleId: sale.id, ...item }))),
+    });
+
+    const rowsById = new Map(saleRows.map(row => [row.id, row]));
+    const posted = sales.map(sale => ({ ...rowsById.get(sale.id)!, items: itemRows.filter(item => item.saleId === sale.id) }));
+    await recordShiftSales(companyId, posted, tx);
+
+    // Rows every checkout of the company writes (rollups, hourly buckets, the
+    // JOURNAL sequence, cash and sales balances) come last, so concurrent
+    // terminals queue on them only for the final statements
+    await applyRollupChange(companyId, [], posted.flatMap((sale, index) => posSaleRollup(sale, round2(costOfGoods[index]))), tx);
+    await applySalesBucketChange(companyId, [], posted.flatMap(sale => posSaleBuckets(sale)), tx);
+    await postJournalEntries(tx, companyId, postings.map(({ sale, index, lines }) => ({
+        id: journalEntryIds.get(index),
+        sourceType: "POS_SALE",
+        sourceId: sale.id,
+        description: `POS Sale ${sale.saleNumber}`,
+        lines: lines!,
+        entryDate: sale.saleDate,
+    })));
+
+    const stockById = new Map(stock.map(row => [row.id, { id: row.id, stockQuantity: row.stockQuantity, updatedAt: stockUpdatedAt }]));
+    return sales.map((sale, index) => ({
+        sale: posted[index],
+        costOfGoods: round2(costOfGoods[index]),
+        stock: Array.from(sale.issued.keys()).flatMap(productId => stockById.get(productId) ?? []),
+    }));
+}
+
+/**
+ * Follow-up work once sales have committed: loyalty points, caches and the
+ * product index
+ */
+export async function afterSalesCommitted(
+    companyId: string,
+    committed: {
+        sale: { total: number; customerPhone: string | null };
+        stock: StockSnapshot[];
+    }[]
+) {
+    if (committed.length === 0) return;
+    applyStockSnapshot(companyId, committed.flatMap(c => c.stock));
+
+    const points = new Map<string, number>();
+    committed.forEach(({ sale }) => {
+        if (sale.customerPhone) points.set(sale.customerPhone, (points.get(sale.customerPhone) || 0) + Math.floor(sale.total));
+    });
+
+    await Promise.all(Array.from(points, ([phone, earned]) => awardLoyaltyPoints(companyId, phone, earned)));
+    await invalidateCompanyCache(companyId);
+}
+
+async function awardLoyaltyPoints(companyId: string, phone: string, points: number) {
+    const client = await prisma.client.findFirst({
+        where: { companyId, phone },
+        select: { id: true },
+    });
+    if (client) {
+        await prisma.client.update({
+            where: { id: client.id },
+            data: { loyaltyPoints: { increment: points } },
+        });
+    }
+}
+
+async function findSaleByKey(companyId: string, idempotencyKey: string) {
+    return prisma.pOSSale.findUnique({
+        where: { companyId_idempotencyKey: { companyId, idempotencyKey } },
+        include: { items: true, cashier: { select: { name: true } } },
+    });
+}
+
+/**
+ * True for a unique-constraint violation (e.g. a concurrent replay of the same idempotency key)
+ */
+export function isUniqueViolation(error: unknown): boolean {
+    return error instanceof Prisma.PrismaClientKnownRequestError && error.code === "P2002";
+}
+
+/**
+ * Sell a basket: stock, cost layers, stock levels, GL and the sale commit together
+ */
+export async function checkoutSale(companyId: string, cashierId: string, input: CheckoutInput) {
+    if (input.idempotencyKey) {
+        const existing = await findSaleByKey(companyId, input.idempotencyKey);
+        if (existing) return existing;
+    }
+
+    const productIds = Array.isArray(input.items) ? input.items.map(item => item.productId) : [];
+    const [catalog, accounts, cashier, saleNumber] = await Promise.all([
+        loadSaleCatalog(companyId, productIds),
+        loadPostingAccounts(companyId),
+        prisma.user.findUnique({ where: { id: cashierId }, select: { name: true } }),
+        nextSaleNumber(companyId),
+    ]);
+    const prepared = prepareSale(input, catalog, { saleNumber, cashierId, now: new Date() });
+
+    let committed;
+    try {
+        [committed] = await prisma.$transaction(
+            tx => commitSales(tx, companyId, [prepared], accounts),
+            { timeout: Math.max(5000, prepared.items.length * 20) }
+        );
+    } catch (error) {
+        // Lost a race with a replay of the same sale
+        if (input.idempotencyKey && isUniqueViolation(error)) {
+            const existing = await findSaleByKey(companyId, input.idempotencyKey);
+            if (existing) return existing;
+        }
+        throw error;
+    }
+
+    await afterSalesCommitted(companyId, [committed]);
+    return { ...committed.sale, cashier: { name: cashier?.name ?? null } };
+}
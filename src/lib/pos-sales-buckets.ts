@@ -0,0 +1,403 @@
+/**
+ * pos-sales-buckets.ts - Hourly POS sales buckets
+ *
+ * One POSSalesBucket row per company, hour and dimension key: the TOTAL of
+ * all sales, and sales per TERMINAL, CASHIER, PRODUCT and PAYMENT method.
+ * Sales add their contribution as they post (one INSERT ... ON CONFLICT per
+ * batch, in the checkout or sync transaction), so the POS reports page reads a
+ * range's buckets and groups them by hour, day, week or month instead of
+ * scanning sales and their items. Until rebuildSalesBuckets has run for a
+ * company the report computes the same buckets from the sales themselves.
+ */
+
+import { randomUUID } from "crypto";
+import { Prisma } from "@prisma/client";
+import { prisma } from "@/lib/prisma";
+import { sqlDate } from "@/lib/financial-aggregates";
+
+type Db = Prisma.TransactionClient | typeof prisma;
+
+const HOUR_MS = 60 * 60 * 1000;
+// Written by rebuildSalesBuckets; until it exists, buckets may be partial
+const REBUILT_DIMENSION = "REBUILT";
+const WRITE_CHUNK_SIZE = 500;
+const READ_PAGE_SIZE = 2000;
+const MAX_SERIES_POINTS = 1000;
+
+export const SALES_DIMENSIONS = ["TOTAL", "TERMINAL", "CASHIER", "PRODUCT", "PAYMENT"] as const;
+export type SalesDimension = (typeof SALES_DIMENSIONS)[number];
+
+export const REPORT_GRANULARITIES = ["hour", "day", "week", "month"] as const;
+export type ReportGranularity = (typeof REPORT_GRANULARITIES)[number];
+
+export interface SalesBucketEntry {
+    dimension: SalesDimension;
+    key: string;
+    hour: Date;
+    salesCount: number;
+    quantity: number;
+    amount: number;
+    taxAmount: number;
+}
+
+export type BucketSale = {
+    status: string;
+    saleDate: Date;
+    total: number;
+    taxAmount: number;
+    paymentMethod: string;
+    terminalId: string | null;
+    cashierId: string;
+    items: { productId: string; quantity: number; total: number }[];
+};
+
+export class SalesReportError extends Error {
+    public status = 400;
+    constructor(message: string) {
+        super(message);
+        this.name = "SalesReportError";
+    }
+}
+
+/**
+ * Start of the (UTC) hour a date falls in
+ */
+export function hourStart(date: Date): Date {
+    return new Date(Math.floor(date.getTime() / HOUR_MS) * HOUR_MS);
+}
+
+/**
+ * A sale's contribution to the buckets; nothing unless it is completed
+ */
+export function posSaleBuckets(sale: BucketSale): SalesBucketEntry[] {
+    if (sale.status !== "COMPLETED") return [];
+    const hour = hourStart(sale.saleDate);
+    const quantity = sale.items.reduce((sum, item) => sum + item.quantity, 0);
+    const whole = { hour, salesCount: 1, quantity, amount: sale.total, taxAmount: sale.taxAmount };
+
+    const products = new Map<string, { quantity: number; amount: number }>();
+    sale.items.forEach(item => {
+        const product = products.get(item.productId) || { quantity: 0, amount: 0 };
+        product.quantity += item.quantity;
+        product.amount += item.total;
+        products.set(item.productId, product);
+    });
+
+    return [
+        { dimension: "TOTAL", key: "", ...whole },
+        { dimension: "TERMINAL", key: sale.terminalId ?? "", ...whole },
+        { dimension: "CASHIER", key: sale.cashierId, ...whole },
+        { dimension: "PAYMENT", key: sale.paymentMethod, ...whole },
+        ...Array.from(products, ([productId, p]) => ({
+            dimension: "PRODUCT" as const,
+            key: productId,
+            hour,
+            salesCount: 1,
+            quantity: p.quantity,
+            amount: p.amount,
+            taxAmount: 0,
+        })),
+    ];
+}
+
+const bucketKey = (entry: { dimension: string; key: string; hour: Date }) =>
+    `${entry.dimension}|${entry.key}|${entry.hour.getTime()}`;
+
+function addEntries(target: Map<string, SalesBucketEntry>, entries: SalesBucketEntry[], sign: 1 | -1) {
+    entries.forEach(entry => {
+        const key = bucketKey(entry);
+        const current = target.get(key) || { ...entry, salesCount: 0, quantity: 0, amount: 0, taxAmount: 0 };
+        current.salesCount += sign * entry.salesCount;
+        current.quantity += sign * entry.quantity;
+        current.amount += sign * entry.amount;
+        current.taxAmount += sign * entry.taxAmount;
+        target.set(key, current);
+    });
+}
+
+/**
+ * Apply the difference between sales' previous and new contributions.
+ * Pass [] as `before` when sales post and [] as `after` when they are removed.
+ * Pass the transaction posting the sales as `db`; rows are written in key
+ * order, so concurrent checkouts lock shared buckets in the same order.
+ */
+export async function applySalesBucketChange(
+    companyId: string,
+    before: SalesBucketEntry[],
+    after: SalesBucketEntry[],
+    db: Db = prisma
+) {
+    const deltas = new Map<string, SalesBucketEntry>();
+    addEntries(deltas, before, -1);
+    addEntries(deltas, after, 1);
+    const changed = Array.from(deltas.entries())
+        .filter(([, d]) => d.salesCount !== 0 || d.quantity !== 0 || d.amount !== 0 || d.taxAmount !== 0)
+        .sort(([a], [b]) => (a < b ? -1 : a > b ? 1 : 0))
+        .map(([, d]) => d);
+
+    const now = sqlDate(new Date());
+    for (let i = 0; i < changed.length; i += WRITE_CHUNK_SIZE) {
+        const rows = Prisma.join(changed.slice(i, i + WRITE_CHUNK_SIZE).map(d => Prisma.sql`(
+            ${randomUUID()}, ${companyId}, ${d.dimension}, ${d.key}, ${sqlDate(d.hour)},
+            CAST(${d.salesCount} AS INTEGER), CAST(${d.quantity} AS INTEGER),
+            CAST(${d.amount} AS DOUBLE PRECISION), CAST(${d.taxAmount} AS DOUBLE PRECISION), ${now}
+        )`));
+        await db.$executeRaw`
+            INSERT INTO "POSSalesBucket" ("id", "companyId", "dimension", "key", "hour", "salesCount", "quantity", "amount", "taxAmount", "updatedAt")
+            VALUES ${rows}
+            ON CONFLICT ("companyId", "dimension", "key", "hour") DO UPDATE
+            SET "salesCount" = "POSSalesBucket"."salesCount" + EXCLUDED."salesCount",
+                "quantity" = "POSSalesBucket"."quantity" + EXCLUDED."quantity",
+                "amount" = "POSSalesBucket"."amount" + EXCLUDED."amount",
+                "taxAmount" = "POSSalesBucket"."taxAmount" + EXCLUDED."taxAmount",
+                "updatedAt" = EXCLUDED."updatedAt"
+        `;
+    }
+}
+
+/**
+ * Buckets computed from the sales themselves, reading sales and items a page at a time
+ */
+export async function computeSalesBuckets(companyId: string, from?: Date, to?: Date): Promise<SalesBucketEntry[]> {
+    const buckets = new Map<string, SalesBucketEntry>();
+    let cursor: string | undefined;
+    for (;;) {
+        const sales = await prisma.pOSSale.findMany({
+            where: {
+                companyId,
+                status: "COMPLETED",
+                ...(from || to ? { saleDate: { gte: from, lt: to } } : {}),
+                ...(cursor ? { id: { gt: cursor } } : {}),
+            },
+            select: {
+                id: true, status: true, saleDate: true, total: true, taxAmount: true,
+                paymentMethod: true, terminalId: true, cashierId: true,
+                items: { select: { productId: true, quantity: true, total: true } },
+            },
+            orderBy: { id: "asc" },
+            take: READ_PAGE_SIZE,
+        });
+        sales.forEach(sale => addEntries(buckets, posSaleBuckets(sale), 1));
+        if (sales.length < READ_PAGE_SIZE) break;
+        cursor = sales[sales.length - 1].id;
+    }
+    return Array.from(buckets.values());
+}
+
+export interface BucketDrift {
+    dimension: SalesDimension;
+    key: string;
+    hour: Date;
+    stored: number;
+    expected: number;
+}
+
+/**
+ * Recompute a company's buckets from its sales, report drift and (unless dryRun) replace them
+ */
+export async function rebuildSalesBuckets(
+    companyId: string,
+    options: { dryRun?: boolean } = {}
+): Promise<{ buckets: number; drift: BucketDrift[] }> {
+    const expected = await computeSalesBuckets(companyId);
+    const stored = await prisma.pOSSalesBucket.findMany({
+        where: { companyId, dimension: { not: REBUILT_DIMENSION } },
+        select: { dimension: true, key: true, hour: true, salesCount: true, quantity: true, amount: true },
+    });
+    const storedByKey = new Map(stored.map(row => [bucketKey(row), row]));
+    const expectedByKey = new Map(expected.map(entry => [bucketKey(entry), entry]));
+
+    const drift: BucketDrift[] = [];
+    new Set([...expectedByKey.keys(), ...storedByKey.keys()]).forEach(key => {
+        const exp = expectedByKey.get(key);
+        const cur = storedByKey.get(key);
+        const expectedAmount = exp?.amount || 0;
+        const storedAmount = cur?.amount || 0;
+        if (
+            Math.abs(expectedAmount - storedAmount) > 0.005 ||
+            (exp?.salesCount || 0) !== (cur?.salesCount || 0) ||
+            (exp?.quantity || 0) !== (cur?.quantity || 0)
+        ) {
+            const row = (exp || cur)!;
+            drift.push({ dimension: row.dimension as SalesDimension, key: row.key, hour: row.hour, stored: storedAmount, expected: expectedAmount });
+        }
+    });
+
+    if (!options.dryRun) {
+        const data = expected.map(entry => ({ companyId, ...entry }));
+        await prisma.$transaction(async (tx) => {
+            await tx.pOSSalesBucket.deleteMany({ where: { companyId } });
+            for (let i = 0; i < data.length; i += WRITE_CHUNK_SIZE) {
+                await tx.pOSSalesBucket.createMany({ data: data.slice(i, i + WRITE_CHUNK_SIZE) });
+            }
+            await tx.pOSSalesBucket.create({
+                data: { companyId, dimension: REBUILT_DIMENSION, key: "", hour: new Date(), salesCount: 0 },
+            });
+        }, { timeout: Math.max(30000, data.length) });
+    }
+
+    return {
+        buckets: expected.length,
+        drift: drift.sort((a, b) => a.hour.getTime() - b.hour.getTime() || a.dimension.localeCompare(b.dimension)),
+    };
+}
+
+// ---------- Reporting ----------
+
+/**
+ * Start of the period a date falls in, in server local time (weeks start on Monday)
+ */
+export function periodStart(date: Date, granularity: ReportGranularity): Date {
+    switch (granularity) {
+        case "hour":
+            return new Date(date.getFullYear(), date.getMonth(), date.getDate(), date.getHours());
+        case "day":
+            return new Date(date.getFullYear(), date.getMonth(), date.getDate());
+        case "week":
+            return new Date(date.getFullYear(), date.getMonth(), date.getDate() - ((date.getDay() + 6) % 7));
+        case "month":
+            return new Date(date.getFullYear(), date.getMonth(), 1);
+    }
+}
+
+function nextPeriod(start: Date, granularity: ReportGranularity): Date {
+    switch (granularity) {
+        case "hour":
+            return new Date(start.getFullYear(), start.getMonth(), start.getDate(), start.getHours() + 1);
+        case "day":
+            return new Date(start.getFullYear(), start.getMonth(), start.getDate() + 1);
+        case "week":
+            return new Date(start.getFullYear(), start.getMonth(), start.getDate() + 7);
+        case "month":
+            return new Date(start.getFullYear(), start.getMonth() + 1, 1);
+    }
+}
+
+type Totals = { salesCount: number; quantity: number; amount: number };
+type Group = Totals & { dimension: string; key: string };
+
+/**
+ * TOTAL buckets in [from, to) and per-key sums of the other dimensions in [reportFrom, to)
+ */
+async function readBuckets(companyId: string, from: Date, reportFrom: Date, to: Date) {
+    const marker = await prisma.pOSSalesBucket.findFirst({
+        where: { companyId, dimension: REBUILT_DIMENSION },
+        select: { id: true },
+    });
+
+    if (!marker) {
+        const entries = await computeSalesBuckets(companyId, from, to);
+        const groups = new Map<string, Group>();
+        entries
+            .filter(e => e.dimension !== "TOTAL" && e.hour >= reportFrom)
+            .forEach(e => {
+                const group = groups.get(`${e.dimension}|${e.key}`) || { dimension: e.dimension, key: e.key, salesCount: 0, quantity: 0, amount: 0 };
+                group.salesCount += e.salesCount;
+                group.quantity += e.quantity;
+                group.amount += e.amount;
+                groups.set(`${e.dimension}|${e.key}`, group);
+            });
+        return { source: "sales" as const, totals: entries.filter(e => e.dimension === "TOTAL"), groups: Array.from(groups.values()) };
+    }
+
+    const [totals, grouped] = await Promise.all([
+        prisma.pOSSalesBucket.findMany({
+            where: { companyId, dimension: "TOTAL", hour: { gte: from, lt: to } },
+            select: { hour: true, salesCount: true, quantity: true, amount: true },
+        }),
+        prisma.pOSSalesBucket.groupBy({
+            by: ["dimension", "key"],
+            where: { companyId, dimension: { in: ["TERMINAL", "CASHIER", "PRODUCT", "PAYMENT"] }, hour: { gte: reportFrom, lt: to } },
+            _sum: { salesCount: true, quantity: true, amount: true },
+        }),
+    ]);
+    return {
+        source: "rollups" as const,
+        totals,
+        groups: grouped.map(g => ({
+            dimension: g.dimension,
+            key: g.key,
+            salesCount: g._sum.salesCount || 0,
+            quantity: g._sum.quantity || 0,
+            amount: g._sum.amount || 0,
+        })),
+    };
+}
+
+const round2 = (n: number) => Math.round(n * 100) / 100;
+
+/**
+ * POS sales report for [from, to): totals, a series per hour/day/week/month,
+ * tenders, top products, terminals and cashiers, plus the total of the
+ * preceding period of the same length
+ */
+export async function getSalesReport(
+    companyId: string,
+    options: { from: Date; to: Date; granularity: ReportGranularity; top?: number }
+) {
+    const { granularity, top = 5 } = options;
+    const from = periodStart(options.from, granularity);
+    const to = options.to;
+    if (!(to > from)) throw new SalesReportError("`to` must be after `from`");
+
+    const series: { start: Date; sales: number; transactions: number }[] = [];
+    const index = new Map<number, number>();
+    for (let start = from; start < to; start = nextPeriod(start, granularity)) {
+        if (series.length >= MAX_SERIES_POINTS) {
+            throw new SalesReportError(`At most ${MAX_SERIES_POINTS} ${granularity} periods per report`);
+        }
+        index.set(start.getTime(), series.length);
+        series.push({ start, sales: 0, transactions: 0 });
+    }
+
+    const previousFrom = new Date(from.getTime() - (to.getTime() - from.getTime()));
+    const { source, totals, groups } = await readBuckets(companyId, previousFrom, from, to);
+
+    const current: Totals = { salesCount: 0, quantity: 0, amount: 0 };
+    let previousTotal = 0;
+    totals.forEach(bucket => {
+        if (bucket.hour < from) {
+            previousTotal += bucket.amount;
+            return;
+        }
+        current.salesCount += bucket.salesCount;
+        current.quantity += bucket.quantity;
+        current.amount += bucket.amount;
+        const i = index.get(periodStart(bucket.hour, granularity).getTime());
+        if (i !== undefined) {
+            series[i].sales += bucket.amount;
+            series[i].transactions += bucket.salesCount;
+        }
+    });
+
+    const byDimension = (dimension: SalesDimension) => groups
+        .filter(g => g.dimension === dimension)
+        .sort((a, b) => b.amount - a.amount);
+    const topProducts = byDimension("PRODUCT").slice(0, top);
+    const terminals = byDimension("TERMINAL");
+    const cashiers = byDimension("CASHIER");
+
+    const [productNames, terminalNames, cashierNames] = await Promise.all([
+        prisma.product.findMany({ where: { id: { in: topProducts.map(g => g.key) } }, select: { id: true, name: true } }),
+        prisma.pOSTerminal.findMany({ where: { companyId, id: { in: terminals.map(g => g.key) } }, select: { id: true, name: true } }),
+        prisma.user.findMany({ where: { id: { in: cashiers.map(g => g.key) } }, select: { id: true, name: true } }),
+    ]);
+    const names = new Map([...productNames, ...terminalNames, ...cashierNames].map(row => [row.id, row.name]));
+
+    return {
+        from,
+        to,
+        granularity,
+        source,
+        totalSales: round2(current.amount),
+        transactions: current.salesCount,
+        itemsSold: current.quantity,
+        avgTransaction: current.salesCount > 0 ? round2(current.amount / current.salesCount) : 0,
+        previousTotal: round2(previousTotal),
+        series: series.map(point => ({ ...point, sales: round2(point.sales) })),
+        paymentMethods: byDimension("PAYMENT").map(g => ({ method: g.key, amount: round2(g.amount), transactions: g.salesCount })),
+        topProducts: topProducts.map(g => ({ productId: g.key, name: names.get(g.key) ?? "Deleted product", quantity: g.quantity, revenue: round2(g.amount) })),
+        terminals: terminals.map(g => ({ terminalId: g.key || null, name: g.key ? names.get(g.key) ?? null : null, sales: round2(g.amount), transactions: g.salesCount })),
+        cashiers: cashiers.map(g => ({ cashierId: g.key, name: names.get(g.key) ?? null, sales: round2(g.amount), transactions: g.salesCount })),
+    };
+}
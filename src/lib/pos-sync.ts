@@ -0,0 +1,155 @@
+/**
+ * pos-sync.ts - Offline POS sale sync
+ *
+ * Terminals that lose the network keep ringing up sales, each with a
+ * client-generated idempotency key, and upload the queue when they are back.
+ * syncSales drops keys already recorded (one query) or repeated in the upload,
+ * validates every sale against one catalog read, reserves all sale numbers in
+ * one block and commits the valid sales in chunks through commitSales, so a
+ * few hundred sales cost a handful of transactions instead of a request each.
+ * Every sale gets its own result: terminals clear what was created or already
+ * recorded and keep only the failures.
+ */
+
+import { prisma } from "@/lib/prisma";
+import { allocateSequence, formatDocumentNumber } from "@/lib/sequences";
+import {
+    afterSalesCommitted,
+    CheckoutError,
+    CheckoutInput,
+    commitSales,
+    isUniqueViolation,
+    loadPostingAccounts,
+    loadSaleCatalog,
+    prepareSale,
+    PreparedSale,
+} from "@/lib/pos-checkout";
+
+export const MAX_SYNC_SALES = 1000;
+// Sales per transaction; a failing chunk is retried sale by sale
+export const SYNC_CHUNK_SIZE = 100;
+
+export type SyncResult =
+    | { idempotencyKey: string; status: "created" | "duplicate"; saleId: string; saleNumber: string }
+    | { idempotencyKey: string; status: "failed"; error: string };
+
+export interface SyncReport {
+    results: SyncResult[];
+    created: number;
+    duplicates: number;
+    failed: number;
+}
+
+type Committed = Awaited<ReturnType<typeof commitSales>>[number];
+
+/**
+ * Record a terminal's queued sales, skipping any already recorded
+ */
+export async function syncSales(companyId: string, cashierId: string, sales: CheckoutInput[]): Promise<SyncReport> {
+    if (sales.length > MAX_SYNC_SALES) {
+        throw new CheckoutError(`At most ${MAX_SYNC_SALES} sales per sync`);
+    }
+    const results: (SyncResult | undefined)[] = new Array(sales.length);
+    const key = (i: number) => sales[i].idempotencyKey ?? "";
+
+    // First occurrence of each key; later ones take its result
+    const firstIndex = new Map<string, number>();
+    const fresh: number[] = [];
+    sales.forEach((sale, i) => {
+        if (!sale?.idempotencyKey || typeof sale.idempotencyKey !== "string") {
+            results[i] = { idempotencyKey: "", status: "failed", error: "idempotencyKey is required" };
+        } else if (!firstIndex.has(sale.idempotencyKey)) {
+            firstIndex.set(sale.idempotencyKey, i);
+            fresh.push(i);
+        }
+    });
+
+    const markRecorded = async (indexes: number[]) => {
+        const recorded = await prisma.pOSSale.findMany({
+            where: { companyId, idempotencyKey: { in: indexes.map(key) } },
+            select: { id: true, saleNumber: true, idempotencyKey: true },
+        });
+        const byKey = new Map(recorded.map(r => [r.idempotencyKey!, r]));
+        return indexes.filter(i => {
+            const existing = byKey.get(key(i));
+            if (existing) {
+                results[i] = { idempotencyKey: key(i), status: "duplicate", saleId: existing.id, saleNumber: existing.saleNumber };
+            }
+            return !existing;
+        });
+    };
+    const pending = await markRecorded(fresh);
+
+    const [catalog, accounts] = await Promise.all([
+        loadSaleCatalog(companyId, pending.flatMap(i => Array.isArray(sales[i].items) ? sales[i].items.map(item => item.productId) : [])),
+        loadPostingAccounts(companyId),
+    ]);
+
+    const now = new Date();
+    const prepared: { index: number; sale: PreparedSale }[] = [];
+    for (const i of pending) {
+        try {
+            prepared.push({ index: i, sale: prepareSale(sales[i], catalog, { saleNumber: "", cashierId, now }) });
+        } catch (error) {
+            if (!(error instanceof CheckoutError)) throw error;
+            results[i] = { idempotencyKey: key(i), status: "failed", error: error.message };
+        }
+    }
+
+    // One block of sale numbers for the whole upload
+    if (prepared.length > 0) {
+        const first = await allocateSequence(companyId, "POS_SALE", prepared.length);
+        prepared.forEach((p, n) => { p.sale.saleNumber = formatDocumentNumber("POS_SALE", first + n); });
+    }
+
+    const committed: Committed[] = [];
+    const commit = async (chunk: { index: number; sale: PreparedSale }[]) => {
+        const rows = await prisma.$transaction(
+            tx => commitSales(tx, companyId, chunk.map(p => p.sale), accounts),
+            { timeout: Math.max(10000, chunk.reduce((sum, p) => sum + p.sale.items.length, 0) * 20) }
+        );
+        rows.forEach((row, n) => {
+            const i = chunk[n].index;
+            results[i] = { idempotencyKey: key(i), status: "created", saleId: row.sale.id, saleNumber: row.sale.saleNumber };
+            committed.push(row);
+        });
+    };
+
+    for (let c = 0; c < prepared.length; c += SYNC_CHUNK_SIZE) {
+        let chunk = prepared.slice(c, c + SYNC_CHUNK_SIZE);
+        try {
+            await commit(chunk);
+        } catch (error) {
+            if (isUniqueViolation(error)) {
+                // Another upload of the same queue recorded some of these first
+                const stillPending = new Set(await markRecorded(chunk.map(p => p.index)));
+                chunk = chunk.filter(p => stillPending.has(p.index));
+            }
+            // Isolate the sale that cannot be recorded from the rest of the chunk
+            for (const p of chunk) {
+                try {
+                    await commit([p]);
+                } catch (saleError) {
+                    console.error(`POS sync: sale ${key(p.index)} failed:`, saleError);
+                    results[p.index] = { idempotencyKey: key(p.index), status: "failed", error: "Failed to record sale" };
+                }
+            }
+        }
+    }
+
+    await afterSalesCommitted(companyId, committed);
+
+    sales.forEach((sale, i) => {
+        if (results[i]) return;
+        const first = results[firstIndex.get(key(i))!]!;
+        results[i] = first.status === "failed" ? first : { ...first, status: "duplicate" };
+    });
+
+    const report = results as SyncResult[];
+    return {
+        results: report,
+        created: report.filter(r => r.status === "created").length,
+        duplicates: report.filter(r => r.status === "duplicate").length,
+        failed: report.filter(r => r.status === "failed").length,
+    };
+}
@@ -0,0 +1,201 @@
+/**
+ * product-index.ts - In-process product index for POS scanning
+ *
+ * Each company's products are held in memory as compact entries keyed by id,
+ * barcode and SKU, so a scan is a Map lookup instead of a query. The index is
+ * loaded in one query on first use and kept fresh by deltas: write paths call
+ * markProductsChanged (or patch stock in place with applyStockSnapshot when
+ * they already hold the new quantities), and a lookup on a stale index
+ * re-reads only products whose updatedAt moved. Lookups also refresh after
+ * REFRESH_MS, so changes made by other instances arrive within that interval,
+ * and a full reload every FULL_RELOAD_MS drops deleted products.
+ *
+ * Terminals download the same entries as a delta-synced catalog: they send
+ * the syncedAt of their last download and receive only what changed since.
+ * Products are deactivated rather than deleted in the app, so deltas carry
+ * every change a till needs; a download without `since` is a full catalog.
+ */
+
+import { prisma } from "@/lib/prisma";
+
+const REFRESH_MS = 5 * 1000;
+const FULL_RELOAD_MS = 10 * 60 * 1000;
+// Rows written by a transaction that commits late carry an earlier updatedAt; re-read that window
+const OVERLAP_MS = 30 * 1000;
+
+export interface IndexedProduct {
+    id: string;
+    sku: string;
+    barcode: string | null;
+    name: string;
+    sellingPrice: number;
+    costPrice: number;
+    taxRate: number;
+    stockQuantity: number;
+    isActive: boolean;
+    trackInventory: boolean;
+    categoryId: string | null;
+    updatedAt: number;
+}
+
+/** Column order of catalog rows */
+export const CATALOG_FIELDS = [
+    "id", "sku", "barcode", "name", "sellingPrice", "costPrice", "taxRate",
+    "stockQuantity", "isActive", "trackInventory", "categoryId", "updatedAt",
+] as const;
+
+interface CompanyIndex {
+    byId: Map<string, IndexedProduct>;
+    byBarcode: Map<string, IndexedProduct>;
+    bySku: Map<string, IndexedProduct>;
+    /** Newest updatedAt seen */
+    syncedAt: number;
+    loadedAt: number;
+    checkedAt: number;
+    stale: boolean;
+}
+
+const globalForIndex = globalThis as unknown as {
+    productIndexes: Map<string, CompanyIndex> | undefined;
+    productIndexLoads: Map<string, Promise<CompanyIndex>> | undefined;
+};
+const indexes = globalForIndex.productIndexes ?? new Map<string, CompanyIndex>();
+const loads = globalForIndex.productIndexLoads ?? new Map<string, Promise<CompanyIndex>>();
+globalForIndex.productIndexes = indexes;
+globalForIndex.productIndexLoads = loads;
+
+const select = {
+    id: true,
+    sku: true,
+    barcode: true,
+    name: true,
+    sellingPrice: true,
+    costPrice: true,
+    taxRate: true,
+    stockQuantity: true,
+    isActive: true,
+    trackInventory: true,
+    categoryId: true,
+    updatedAt: true,
+} as const;
+
+function put(index: CompanyIndex, row: Omit<IndexedProduct, "updatedAt"> & { updatedAt: Date | number }) {
+    const previous = index.byId.get(row.id);
+    if (previous?.barcode && index.byBarcode.get(previous.barcode) === previous) index.byBarcode.delete(previous.barcode);
+    if (previous && index.bySku.get(previous.sku) === previous) index.bySku.delete(previous.sku);
+
+    const entry: IndexedProduct = { ...row, updatedAt: new Date(row.updatedAt).getTime() };
+    index.byId.set(entry.id, entry);
+    if (entry.barcode) index.byBarcode.set(entry.barcode, entry);
+    index.bySku.set(entry.sku, entry);
+    index.syncedAt = Math.max(index.syncedAt, entry.updatedAt);
+}
+
+async function loadIndex(companyId: string): Promise<CompanyIndex> {
+    const rows = await prisma.product.findMany({ where: { companyId }, select });
+    const now = Date.now();
+    const index: CompanyIndex = {
+        byId: new Map(),
+        byBarcode: new Map(),
+        bySku: new Map(),
+        syncedAt: 0,
+        loadedAt: now,
+        checkedAt: now,
+        stale: false,
+    };
+    rows.forEach(row => put(index, row));
+    indexes.set(companyId, index);
+    return index;
+}
+
+async function refreshIndex(companyId: string, index: CompanyIndex): Promise<CompanyIndex> {
+    index.stale = false;
+    index.checkedAt = Date.now();
+    const rows = await prisma.product.findMany({
+        where: { companyId, updatedAt: { gt: new Date(index.syncedAt - OVERLAP_MS) } },
+        select,
+    });
+    rows.forEach(row => put(index, row));
+    return index;
+}
+
+/**
+ * The company's index, loading or refreshing it when needed.
+ * Concurrent callers share one load or refresh.
+ */
+export async function getProductIndex(companyId: string): Promise<CompanyIndex> {
+    const pending = loads.get(companyId);
+    if (pending) return pending;
+
+    const index = indexes.get(companyId);
+    const now = Date.now();
+    if (index && !index.stale && now - index.checkedAt < REFRESH_MS) return index;
+
+    const load = (!index || now - index.loadedAt >= FULL_RELOAD_MS ? loadIndex(companyId) : refreshIndex(companyId, index))
+        .finally(() => loads.delete(companyId));
+    loads.set(companyId, load);
+    return load;
+}
+
+/**
+ * Product for a scanned code: barcode first, then SKU
+ */
+export async function lookupProductCode(companyId: string, code: string): Promise<IndexedProduct | null> {
+    const index = await getProductIndex(companyId);
+    return index.byBarcode.get(code) ?? index.bySku.get(code) ?? null;
+}
+
+/**
+ * Products changed since `since` (ms), or all of them; as compact rows in CATALOG_FIELDS order
+ */
+export async function getCatalogDelta(companyId: string, since?: number) {
+    const index = await getProductIndex(companyId);
+    const full = since === undefined;
+    const products: IndexedProduct[] = [];
+    index.byId.forEach(product => {
+        if (full || product.updatedAt > since! - OVERLAP_MS) products.push(product);
+    });
+    return {
+        syncedAt: index.syncedAt,
+        full,
+        fields: CATALOG_FIELDS,
+        products: products.map(p => CATALOG_FIELDS.map(field => p[field])),
+    };
+}
+
+/**
+ * Mark a company's index stale after products or stock changed; the next
+ * lookup re-reads what moved
+ */
+export function markProductsChanged(companyId: string) {
+    const index = indexes.get(companyId);
+    if (index) index.stale = true;
+}
+
+export interface StockSnapshot {
+    id: string;
+    stockQuantity: number;
+    updatedAt: Date;
+}
+
+/**
+ * Patch stock levels in place from rows a write path already holds
+ */
+export function applyStockSnapshot(companyId: string, rows: StockSnapshot[]) {
+    const index = indexes.get(companyId);
+    if (!index) return;
+    for (const row of rows) {
+        const entry = index.byId.get(row.id);
+        // An older snapshot (a slower concurrent sale) must not overwrite a newer one
+        if (entry && entry.updatedAt <= row.updatedAt.getTime()) {
+            put(index, { ...entry, stockQuantity: row.stockQuantity, updatedAt: row.updatedAt });
+        }
+    }
+}
+
+/**
+ * Drop every index (tests, or after bulk changes outside the app)
+ */
+export function clearProductIndexes() {
+    indexes.clear();
+}
@@ -0,0 +1,146 @@
+/**
+ * response-cache.ts - Tenant-scoped response cache
+ *
+ * Caches computed report payloads (dashboard, stats, ratios, statements) per
+ * company and query string. Every key embeds the company's current version,
+ * and write paths call invalidateCompanyCache to bump it, so stale entries are
+ * never read again and simply age out of the LRU.
+ *
+ * The default backend is an in-process LRU. Multi-instance deployments can
+ * plug in a shared store (e.g. Redis) with setCacheBackend.
+ */
+
+export interface CacheBackend {
+    get(key: string): Promise<unknown | undefined>;
+    set(key: string, value: unknown, ttlMs: number): Promise<void>;
+    /** Read a counter; counters are never evicted and start at 0 */
+    getCounter(key: string): Promise<number>;
+    /** Atomically increment a counter and return the new value */
+    increment(key: string): Promise<number>;
+}
+
+/**
+ * In-process LRU; Map iteration order doubles as recency order
+ */
+export class MemoryLRUBackend implements CacheBackend {
+    private entries = new Map<string, { value: unknown; expiresAt: number }>();
+    // Kept outside the LRU: evicting a version would resurrect stale entries
+    private counters = new Map<string, number>();
+
+    constructor(private maxEntries = 500) {}
+
+    async get(key: string) {
+        const entry = this.entries.get(key);
+        if (!entry) return undefined;
+        if (entry.expiresAt <= Date.now()) {
+            this.entries.delete(key);
+            return undefined;
+        }
+        this.entries.delete(key);
+        this.entries.set(key, entry);
+        return entry.value;
+    }
+
+    async set(key: string, value: unknown, ttlMs: number) {
+        this.entries.delete(key);
+        this.entries.set(key, { value, expiresAt: Date.now() + ttlMs });
+        while (this.entries.size > this.maxEntries) {
+            const oldest = this.entries.keys().next().value;
+            if (oldest === undefined) break;
+            this.entries.delete(oldest);
+        }
+    }
+
+    async getCounter(key: string) {
+        return this.counters.get(key) || 0;
+    }
+
+    async increment(key: string) {
+        const next = (this.counters.get(key) || 0) + 1;
+        this.counters.set(key, next);
+        return next;
+    }
+}
+
+// Safety net for writes that bypass invalidateCompanyCache (scripts, raw SQL)
+const DEFAULT_TTL_MS = 5 * 60 * 1000;
+
+// Kept on globalThis so every route bundle (and dev hot reloads) share one cache
+const globalForCache = globalThis as unknown as {
+    responseCache: { backend: CacheBackend; stats: Map<string, { hits: number; misses: number }> } | undefined;
+};
+
+const state = globalForCache.responseCache ?? {
+    backend: new MemoryLRUBackend(Number(process.env.RESPONSE_CACHE_MAX_ENTRIES) || 500),
+    stats: new Map<string, { hits: number; misses: number }>(),
+};
+globalForCache.responseCache = state;
+
+export function setCacheBackend(next: CacheBackend) {
+    state.backend = next;
+}
+
+function versionKey(companyId: string) {
+    return `v:${companyId}`;
+}
+
+function paramsKey(params?: URLSearchParams | Record<string, string | null | undefined>): string {
+    if (!params) return "";
+    const entries = params instanceof URLSearchParams
+        ? Array.from(params.entries())
+        : Object.entries(params).filter((e): e is [string, string] => e[1] != null);
+    return entries
+        .sort(([a], [b]) => (a < b ? -1 : a > b ? 1 : 0))
+        .map(([k, v]) => `${encodeURIComponent(k)}=${encodeURIComponent(v)}`)
+        .join("&");
+}
+
+/**
+ * Return the cached payload for (company, scope, params) or compute and store it.
+ * Only JSON-serializable payloads should be cached.
+ */
+export async function withCompanyCache<T>(
+    companyId: string,
+    scope: string,
+    params: URLSearchParams | Record<string, string | null | undefined> | undefined,
+    compute: () => Promise<T>,
+    options: { ttlMs?: number } = {}
+): Promise<{ value: T; hit: boolean }> {
+    const version = await state.backend.getCounter(versionKey(companyId));
+    const key = `${scope}:${companyId}:v${version}:${paramsKey(params)}`;
+    const counter = state.stats.get(scope) || { hits: 0, misses: 0 };
+    state.stats.set(scope, counter);
+
+    const cachedValue = await state.backend.get(key);
+    if (cachedValue !== undefined) {
+        counter.hits++;
+        return { value: cachedValue as T, hit: true };
+    }
+
+    counter.misses++;
+    const value = await compute();
+    await state.backend.set(key, value, options.ttlMs ?? DEFAULT_TTL_MS);
+    return { value, hit: false };
+}
+
+/**
+ * Drop every cached response for a company. Call after any write that feeds
+ * the cached reports (invoices, bills, expenses, POS sales, journal entries,
+ * stock and products, accounts, loans and imports).
+ */
+export async function invalidateCompanyCache(companyId: string) {
+    await state.backend.increment(versionKey(companyId));
+}
+
+/**
+ * Hit/miss counters per scope since process start
+ */
+export function getCacheStats() {
+    const scopes = Object.fromEntries(state.stats);
+    const totals = Array.from(state.stats.values()).reduce(
+        (sum, s) => ({ hits: sum.hits + s.hits, misses: sum.misses + s.misses }),
+        { hits: 0, misses: 0 }
+    );
+    const lookups = totals.hits + totals.misses;
+    return { ...totals, hitRate: lookups ? totals.hits / lookups : 0, scopes };
+}
@@ -0,0 +1,163 @@
+/**
+ * sequences.ts - Per-company document number sequences
+ *
+ * One DocumentSequence row per company and document type holds the last
+ * allocated value. Allocation is a single atomic UPDATE ... RETURNING, so
+ * concurrent writers never see the same number and no table is counted or
+ * sorted. A missing row is seeded once from the highest existing number.
+ *
+ * High-volume POS terminals can reserve a block of numbers at once
+ * (allocateSequence with count > 1, or SequenceBlockPool in-process);
+ * unused numbers in a block are skipped, never reused.
+ *
+ * Allocating inside a caller's transaction keeps numbering gapless (journal
+ * entries use this), at a cost: the sequence row stays locked until that
+ * transaction commits, so every other posting of the company waits for it.
+ * Such callers should allocate as late in the transaction as they can, as
+ * POS checkout does; numbers allocated outside a transaction lock only for
+ * the one UPDATE but leave a gap when the document is not written.
+ */
+
+import { randomUUID } from "crypto";
+import { Prisma } from "@prisma/client";
+import { prisma } from "@/lib/prisma";
+import { sqlDate, toNumber } from "@/lib/financial-aggregates";
+
+type Db = Prisma.TransactionClient | typeof prisma;
+
+export const DOCUMENT_TYPES = {
+    JOURNAL: { prefix: "JE-", pad: 6 },
+    PAYMENT: { prefix: "PAY-", pad: 6 },
+    POS_SALE: { prefix: "SALE-", pad: 5 },
+    INVOICE: { prefix: "INV-", pad: 5 },
+} as const;
+
+export type DocumentType = keyof typeof DOCUMENT_TYPES;
+
+export function formatDocumentNumber(docType: DocumentType, value: number): string {
+    const { prefix, pad } = DOCUMENT_TYPES[docType] ?? { prefix: `${docType}-`, pad: 6 };
+    return `${prefix}${String(value).padStart(pad, "0")}`;
+}
+
+/**
+ * Highest numeric suffix among existing documents using this type's prefix.
+ * Suffixes longer than 9 digits (e.g. timestamp-based numbers) are ignored.
+ */
+async function highestExistingNumber(db: Db, companyId: string, docType: DocumentType): Promise<number> {
+    const prefix = DOCUMENT_TYPES[docType]?.prefix;
+    if (!prefix) return 0;
+
+    const where = { companyId };
+    let numbers: string[] = [];
+    switch (docType) {
+        case "JOURNAL":
+            numbers = (await db.journalEntry.findMany({
+                where: { ...where, journalNumber: { startsWith: prefix } },
+                select: { journalNumber: true },
+            })).map(r => r.journalNumber);
+            break;
+        case "PAYMENT":
+            numbers = (await db.payment.findMany({
+                where: { ...where, paymentNumber: { startsWith: prefix } },
+                select: { paymentNumber: true },
+            })).map(r => r.paymentNumber);
+            break;
+        case "POS_SALE":
+            numbers = (await db.pOSSale.findMany({
+                where: { ...where, saleNumber: { startsWith: prefix } },
+                select: { saleNumber: true },
+            })).map(r => r.saleNumber);
+            break;
+        case "INVOICE":
+            numbers = (await db.invoice.findMany({
+                where: { ...where, invoiceNumber: { startsWith: prefix } },
+                select: { invoiceNumber: true },
+            })).map(r => r.invoiceNumber);
+            break;
+    }
+
+    const pattern = new RegExp(`^${prefix}(\\d{1,9})$`);
+    return numbers.reduce((max, number) => {
+        const match = pattern.exec(number);
+        return match ? Math.max(max, Number(match[1])) : max;
+    }, 0);
+}
+
+async function incrementSequence(db: Db, companyId: string, docType: string, count: number): Promise<number | null> {
+    const rows = await db.$queryRaw<{ lastValue: unknown }[]>`
+        UPDATE "DocumentSequence"
+        SET "lastValue" = "lastValue" + ${count}, "updatedAt" = ${sqlDate(new Date())}
+        WHERE "companyId" = ${companyId} AND "docType" = ${docType}
+        RETURNING "lastValue"
+    `;
+    return rows.length > 0 ? toNumber(rows[0].lastValue) : null;
+}
+
+/**
+ * Atomically reserve `count` consecutive values and return the first one.
+ * Pass a transaction client to roll the allocation back with the document.
+ */
+export async function allocateSequence(
+    companyId: string,
+    docType: DocumentType,
+    count = 1,
+    db: Db = prisma
+): Promise<number> {
+    if (!Number.isInteger(count) || count < 1) {
+        throw new Error(`Invalid sequence block size: ${count}`);
+    }
+
+    let last = await incrementSequence(db, companyId, docType, count);
+    if (last === null) {
+        // First allocation for this company and type; concurrent seeders are no-ops
+        const seed = await highestExistingNumber(db, companyId, docType);
+        await db.$executeRaw`
+            INSERT INTO "DocumentSequence" ("id", "companyId", "docType", "lastValue", "updatedAt")
+            VALUES (${randomUUID()}, ${companyId}, ${docType}, ${seed}, ${sqlDate(new Date())})
+            ON CONFLICT ("companyId", "docType") DO NOTHING
+        `;
+        last = await incrementSequence(db, companyId, docType, count);
+        if (last === null) throw new Error(`Could not initialize ${docType} sequence`);
+    }
+
+    return last - count + 1;
+}
+
+/**
+ * Allocate and format the next document number
+ */
+export async function nextDocumentNumber(companyId: string, docType: DocumentType, db: Db = prisma): Promise<string> {
+    return formatDocumentNumber(docType, await allocateSequence(companyId, docType, 1, db));
+}
+
+/**
+ * Hands out numbers from blocks reserved in one round trip each.
+ * Numbers left in a block when the process exits are skipped.
+ */
+export class SequenceBlockPool {
+    private blocks = new Map<string, { next: number; end: number }>();
+    private refills = new Map<string, Promise<void>>();
+
+    constructor(private docType: DocumentType, private blockSize: number) {}
+
+    async next(companyId: string): Promise<string> {
+        for (;;) {
+            const block = this.blocks.get(companyId);
+            if (block && block.next <= block.end) {
+                return formatDocumentNumber(this.docType, block.next++);
+            }
+
+            // One refill per company at a time; other callers wait for it
+            let refill = this.refills.get(companyId);
+            if (!refill) {
+                refill = allocateSequence(companyId, this.docType, this.blockSize)
+                    .then(start => {
+                        this.blocks.set(companyId, { next: start, end: start + this.blockSize - 1 });
+                    })
+                    .finally(() => this.refills.delete(companyId));
+                this.refills.set(companyId, refill);
+            }
+            await refill;
+        }
+    }
+}
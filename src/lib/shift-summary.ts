@@ -0,0 +1,246 @@
+/**
+ * shift-summary.ts - Cashier shift totals
+ *
+ * A shift covers its cashier's sales from startTime until it ends. Shifts
+ * opened with totalsTracked keep one ShiftTenderTotal row per tender, updated
+ * in the transaction that posts the sales (recordShiftSales, from checkout
+ * and sync), so the live X-report and the close read a handful of rows
+ * whatever the shift's volume. Older shifts, and reconciliation, use
+ * summarizeShiftSales: every tender's sales, refunds, items, tax and
+ * discounts in one grouped query.
+ */
+
+import { Prisma } from "@prisma/client";
+import { prisma } from "@/lib/prisma";
+import { sqlDate, toNumber } from "@/lib/financial-aggregates";
+
+type Db = Prisma.TransactionClient | typeof prisma;
+
+const REFUND_STATUSES = ["REFUNDED", "PARTIALLY_REFUNDED"];
+
+export interface TenderTotals {
+    tender: string;
+    salesCount: number;
+    total: number;
+    taxAmount: number;
+    discountAmount: number;
+    itemCount: number;
+    refundCount: number;
+    refundTotal: number;
+}
+
+export interface ShiftSummary {
+    tenders: TenderTotals[];
+    salesCount: number;
+    totalSales: number;
+    taxTotal: number;
+    discountTotal: number;
+    itemCount: number;
+    refundCount: number;
+    totalRefunds: number;
+    cashSales: number;
+    expectedCash: number;
+}
+
+type ShiftRef = {
+    id: string;
+    companyId: string;
+    cashierId: string;
+    startTime: Date;
+    endTime: Date | null;
+    openingCash: number;
+    totalsTracked: boolean;
+};
+
+type ShiftSale = {
+    paymentMethod: string;
+    status: string;
+    total: number;
+    taxAmount: number;
+    discountAmount: number;
+    items: { quantity: number }[];
+};
+
+export type PostedShiftSale = ShiftSale & { cashierId: string; saleDate: Date };
+
+const emptyTotals = (tender: string): TenderTotals => ({
+    tender,
+    salesCount: 0,
+    total: 0,
+    taxAmount: 0,
+    discountAmount: 0,
+    itemCount: 0,
+    refundCount: 0,
+    refundTotal: 0,
+});
+
+const round2 = (n: number) => Math.round(n * 100) / 100;
+
+/**
+ * A sale's contribution to its shift's totals
+ */
+export function shiftSaleTotals(sale: ShiftSale): TenderTotals {
+    const totals = emptyTotals(sale.paymentMethod);
+    if (sale.status === "COMPLETED") {
+        totals.salesCount = 1;
+        totals.total = sale.total;
+        totals.taxAmount = sale.taxAmount;
+        totals.discountAmount = sale.discountAmount;
+        totals.itemCount = sale.items.reduce((sum, item) => sum + item.quantity, 0);
+    } else if (REFUND_STATUSES.includes(sale.status)) {
+        totals.refundCount = 1;
+        totals.refundTotal = sale.total;
+    }
+    return totals;
+}
+
+/**
+ * Apply the difference between sales' previous and new contributions to a shift.
+ * Pass [] as `before` when sales post and [] as `after` when they are removed.
+ */
+export async function applyShiftTotalsChange(
+    shiftId: string,
+    before: TenderTotals[],
+    after: TenderTotals[],
+    db: Db = prisma
+) {
+    const deltas = new Map<string, TenderTotals>();
+    const add = (entry: TenderTotals, sign: 1 | -1) => {
+        const delta = deltas.get(entry.tender) || emptyTotals(entry.tender);
+        delta.salesCount += sign * entry.salesCount;
+        delta.total += sign * entry.total;
+        delta.taxAmount += sign * entry.taxAmount;
+        delta.discountAmount += sign * entry.discountAmount;
+        delta.itemCount += sign * entry.itemCount;
+        delta.refundCount += sign * entry.refundCount;
+        delta.refundTotal += sign * entry.refundTotal;
+        deltas.set(entry.tender, delta);
+    };
+    before.forEach(entry => add(entry, -1));
+    after.forEach(entry => add(entry, 1));
+
+    for (const { tender, ...delta } of deltas.values()) {
+        if (Object.values(delta).every(value => value === 0)) continue;
+        await db.shiftTenderTotal.upsert({
+            where: { shiftId_tender: { shiftId, tender } },
+            create: { shiftId, tender, ...delta },
+            update: {
+                salesCount: { increment: delta.salesCount },
+                total: { increment: delta.total },
+                taxAmount: { increment: delta.taxAmount },
+                discountAmount: { increment: delta.discountAmount },
+                itemCount: { increment: delta.itemCount },
+                refundCount: { increment: delta.refundCount },
+                refundTotal: { increment: delta.refundTotal },
+            },
+        });
+    }
+}
+
+/**
+ * Add sales to their cashiers' open shifts, inside the transaction posting them.
+ * The open shifts are read with a no-op UPDATE, which holds their rows until
+ * commit: a close waits for the sales already counted in, and sales posting
+ * after a close no longer find the shift open.
+ */
+export async function recordShiftSales(
+    companyId: string,
+    sales: PostedShiftSale[],
+    tx: Prisma.TransactionClient
+) {
+    if (sales.length === 0) return;
+    const cashierIds = Array.from(new Set(sales.map(s => s.cashierId)));
+    const rows = await tx.$queryRaw<{ id: string; cashierId: string; startTime: unknown }[]>`
+        UPDATE "CashierShift"
+        SET "totalsTracked" = "totalsTracked"
+        WHERE "companyId" = ${companyId}
+          AND "cashierId" IN (${Prisma.join(cashierIds)})
+          AND "endTime" IS NULL
+          AND "totalsTracked" = ${true}
+        RETURNING "id", "cashierId", "startTime"
+    `;
+    // Latest first; SQLite returns dates as epoch milliseconds
+    const shifts = rows
+        .map(row => ({ id: row.id, cashierId: row.cashierId, startTime: new Date(toNumber(row.startTime)) }))
+        .sort((a, b) => b.startTime.getTime() - a.startTime.getTime());
+
+    const byShift = new Map<string, TenderTotals[]>();
+    for (const sale of sales) {
+        // Latest open shift of the cashier that had started by the sale
+        const shift = shifts.find(s => s.cashierId === sale.cashierId && s.startTime <= sale.saleDate);
+        if (!shift) continue;
+        byShift.set(shift.id, [...(byShift.get(shift.id) || []), shiftSaleTotals(sale)]);
+    }
+    for (const [shiftId, totals] of byShift) {
+        await applyShiftTotalsChange(shiftId, [], totals, tx);
+    }
+}
+
+type TenderRow = Record<keyof TenderTotals, unknown>;
+
+/**
+ * Every tender's totals for a shift's sales, from the sales themselves in one grouped query
+ */
+export async function summarizeShiftSales(shift: ShiftRef, db: Db = prisma): Promise<TenderTotals[]> {
+    const rows = await db.$queryRaw<TenderRow[]>`
+        SELECT t."paymentMethod" AS "tender",
+            SUM(CASE WHEN t."status" = 'COMPLETED' THEN 1 ELSE 0 END) AS "salesCount",
+            SUM(CASE WHEN t."status" = 'COMPLETED' THEN t."total" ELSE 0 END) AS "total",
+            SUM(CASE WHEN t."status" = 'COMPLETED' THEN t."taxAmount" ELSE 0 END) AS "taxAmount",
+            SUM(CASE WHEN t."status" = 'COMPLETED' THEN t."discountAmount" ELSE 0 END) AS "discountAmount",
+            SUM(CASE WHEN t."status" = 'COMPLETED' THEN t."items" ELSE 0 END) AS "itemCount",
+            SUM(CASE WHEN t."status" IN (${Prisma.join(REFUND_STATUSES)}) THEN 1 ELSE 0 END) AS "refundCount",
+            SUM(CASE WHEN t."status" IN (${Prisma.join(REFUND_STATUSES)}) THEN t."total" ELSE 0 END) AS "refundTotal"
+        FROM (
+            SELECT s."paymentMethod", s."status", s."total", s."taxAmount", s."discountAmount",
+                (SELECT COALESCE(SUM(i."quantity"), 0) FROM "POSSaleItem" i WHERE i."saleId" = s."id") AS "items"
+            FROM "POSSale" s
+            WHERE s."companyId" = ${shift.companyId}
+              AND s."cashierId" = ${shift.cashierId}
+              AND s."saleDate" >= ${sqlDate(shift.startTime)}
+              ${shift.endTime ? Prisma.sql`AND s."saleDate" < ${sqlDate(shift.endTime)}` : Prisma.empty}
+        ) t
+        GROUP BY t."paymentMethod"
+    `;
+    return rows.map(row => ({
+        tender: String(row.tender),
+        salesCount: toNumber(row.salesCount),
+        total: toNumber(row.total),
+        taxAmount: toNumber(row.taxAmount),
+        discountAmount: toNumber(row.discountAmount),
+        itemCount: toNumber(row.itemCount),
+        refundCount: toNumber(row.refundCount),
+        refundTotal: toNumber(row.refundTotal),
+    }));
+}
+
+/**
+ * X-report figures for a shift: its running totals when tracked, otherwise the grouped query
+ */
+export async function getShiftSummary(shift: ShiftRef, db: Db = prisma): Promise<ShiftSummary> {
+    const tenders: TenderTotals[] = shift.totalsTracked
+        ? await db.shiftTenderTotal.findMany({
+            where: { shiftId: shift.id },
+            select: {
+                tender: true, salesCount: true, total: true, taxAmount: true, discountAmount: true,
+                itemCount: true, refundCount: true, refundTotal: true,
+            },
+            orderBy: { tender: "asc" },
+        })
+        : await summarizeShiftSales(shift, db);
+
+    const sum = (field: Exclude<keyof TenderTotals, "tender">) => tenders.reduce((total, t) => total + t[field], 0);
+    const cashSales = round2(tenders.find(t => t.tender === "CASH")?.total || 0);
+    return {
+        tenders,
+        salesCount: sum("salesCount"),
+        totalSales: round2(sum("total")),
+        taxTotal: round2(sum("taxAmount")),
+        discountTotal: round2(sum("discountAmount")),
+        itemCount: sum("itemCount"),
+        refundCount: sum("refundCount"),
+        totalRefunds: round2(sum("refundTotal")),
+        cashSales,
+        expectedCash: round2(shift.openingCash + cashSales),
+    };
+}
@@ -0,0 +1,177 @@
+/**
+ * stock-alerts.ts - Incremental stock levels and low-stock alerts
+ *
+ * Every product carries its last evaluated stockStatus (OK, LOW, OUT or
+ * INACTIVE). Write paths call evaluateStockLevels with just the products they
+ * touched: products whose status changed get their new status, move the
+ * company's StockLevelCounter and raise or resolve their LOW_STOCK alert.
+ * Stats read the counter in O(1); rebuildStockLevels recomputes every status
+ * and the counter in two statements when the counter is missing or suspect.
+ */
+
+import { Prisma } from "@prisma/client";
+import { prisma } from "@/lib/prisma";
+
+type Db = Prisma.TransactionClient | typeof prisma;
+
+export type StockStatus = "OK" | "LOW" | "OUT" | "INACTIVE";
+
+export interface AlertProduct {
+    id: string;
+    name: string;
+    stockQuantity: number;
+    lowStockAlert: number;
+    isActive?: boolean;
+}
+
+export function stockStatus(product: { stockQuantity: number; lowStockAlert: number; isActive?: boolean }): StockStatus {
+    if (product.isActive === false) return "INACTIVE";
+    if (product.stockQuantity <= 0) return "OUT";
+    return product.stockQuantity <= product.lowStockAlert ? "LOW" : "OK";
+}
+
+// Same rule as stockStatus, for rebuilding in SQL
+const STATUS_SQL = Prisma.sql`
+    CASE
+        WHEN "isActive" = FALSE THEN 'INACTIVE'
+        WHEN "stockQuantity" <= 0 THEN 'OUT'
+        WHEN "stockQuantity" <= "lowStockAlert" THEN 'LOW'
+        ELSE 'OK'
+    END
+`;
+
+/**
+ * Raise or resolve LOW_STOCK alerts for the given products (their new stock levels)
+ */
+export async function syncLowStockAlerts(
+    companyId: string,
+    products: AlertProduct[],
+    db: Db = prisma
+): Promise<{ raised: number; resolved: number }> {
+    if (products.length === 0) return { raised: 0, resolved: 0 };
+
+    const open = await db.stockAlert.findMany({
+        where: { companyId, productId: { in: products.map(p => p.id) }, type: "LOW_STOCK", isResolved: false },
+        select: { productId: true },
+    });
+    const alerted = new Set(open.map(a => a.productId));
+
+    const isLow = (p: AlertProduct) => ["LOW", "OUT"].includes(stockStatus(p));
+    const toRaise = products.filter(p => isLow(p) && !alerted.has(p.id));
+    const recovered = products.filter(p => !isLow(p) && alerted.has(p.id));
+
+    if (toRaise.length > 0) {
+        await db.stockAlert.createMany({
+            data: toRaise.map(p => ({
+                companyId,
+                productId: p.id,
+                type: "LOW_STOCK",
+                message: `Product ${p.name} is low on stock (${p.stockQuantity})`,
+                severity: p.stockQuantity <= 0 ? "CRITICAL" : "HIGH",
+            })),
+        });
+    }
+    if (recovered.length > 0) {
+        await db.stockAlert.updateMany({
+            where: { companyId, productId: { in: recovered.map(p => p.id) }, type: "LOW_STOCK", isResolved: false },
+            data: { isResolved: true, resolvedAt: new Date() },
+        });
+    }
+
+    return { raised: toRaise.length, resolved: recovered.length };
+}
+
+/**
+ * Re-evaluate products after their stock, threshold or active flag changed.
+ * Call inside the transaction that made the change; the product rows it
+ * updated stay locked, so concurrent evaluations of one product serialize.
+ */
+export async function evaluateStockLevels(
+    companyId: string,
+    productIds: string[],
+    db: Db = prisma
+): Promise<{ changed: number; raised: number; resolved: number }> {
+    if (productIds.length === 0) return { changed: 0, raised: 0, resolved: 0 };
+
+    const products = await db.product.findMany({
+        where: { companyId, id: { in: Array.from(new Set(productIds)) } },
+        select: { id: true, name: true, stockQuantity: true, lowStockAlert: true, isActive: true, stockStatus: true },
+    });
+    return applyStockStatuses(companyId, products, db);
+}
+
+/**
+ * evaluateStockLevels for callers that already hold the products' current
+ * rows (e.g. from an UPDATE ... RETURNING); skips the read
+ */
+export async function applyStockStatuses(
+    companyId: string,
+    products: (AlertProduct & { stockStatus: string })[],
+    db: Db = prisma
+): Promise<{ changed: number; raised: number; resolved: number }> {
+    const changed = products
+        .map(p => ({ ...p, next: stockStatus(p) }))
+        .filter(p => p.next !== p.stockStatus);
+    if (changed.length === 0) return { changed: 0, raised: 0, resolved: 0 };
+
+    const statusFor = Prisma.join(changed.map(p => Prisma.sql`WHEN ${p.id} THEN ${p.next}`), " ");
+    await db.$executeRaw`
+        UPDATE "Product"
+        SET "stockStatus" = CASE "id" ${statusFor} END
+        WHERE "id" IN (${Prisma.join(changed.map(p => p.id))})
+    `;
+
+    const delta = (status: StockStatus) =>
+        changed.reduce((sum, p) => sum + (p.next === status ? 1 : 0) - (p.stockStatus === status ? 1 : 0), 0);
+    const low = delta("LOW");
+    const out = delta("OUT");
+    if (low !== 0 || out !== 0) {
+        // No-op until the counter is first built; the rebuild then counts these statuses
+        await db.stockLevelCounter.updateMany({
+            where: { companyId },
+            data: { lowStockCount: { increment: low }, outOfStockCount: { increment: out } },
+        });
+    }
+
+    const alerts = await syncLowStockAlerts(companyId, changed, db);
+    return { changed: changed.length, ...alerts };
+}
+
+/**
+ * Recompute every product status and the company counter from stock quantities
+ */
+export async function rebuildStockLevels(companyId: string): Promise<{ lowStockCount: number; outOfStockCount: number }> {
+    return prisma.$transaction(async tx => {
+        await tx.$executeRaw`
+            UPDATE "Product"
+            SET "stockStatus" = ${STATUS_SQL}
+            WHERE "companyId" = ${companyId}
+        `;
+        const groups = await tx.product.groupBy({
+            by: ["stockStatus"],
+            where: { companyId, stockStatus: { in: ["LOW", "OUT"] } },
+            _count: { _all: true },
+        });
+        const counts = {
+            lowStockCount: groups.find(g => g.stockStatus === "LOW")?._count._all ?? 0,
+            outOfStockCount: groups.find(g => g.stockStatus === "OUT")?._count._all ?? 0,
+        };
+        await tx.stockLevelCounter.upsert({
+            where: { companyId },
+            create: { companyId, ...counts },
+            update: { ...counts, rebuiltAt: new Date() },
+        });
+        return counts;
+    });
+}
+
+/**
+ * Low and out-of-stock product counts, building the counter on first use
+ */
+export async function getStockLevelCounts(companyId: string): Promise<{ lowStockCount: number; outOfStockCount: number }> {
+    const counter = await prisma.stockLevelCounter.findUnique({
+        where: { companyId },
+        select: { lowStockCount: true, outOfStockCount: true },
+    });
+    return counter ?? rebuildStockLevels(companyId);
+}
@@ -0,0 +1,276 @@
+/**
+ * stock-take.ts - Bulk stock counts per warehouse
+ *
+ * Takes thousands of counted lines for one warehouse, resolves them to
+ * products and current Stock rows with one query each, and writes the
+ * differences set-based: one CASE UPDATE per chunk for the warehouse rows
+ * (guarded by the quantity that was read, so a sale racing the count is
+ * retried rather than overwritten), one for the product totals, one
+ * createMany for the movements, a bulk cost-layer update and one bulk
+ * stock-level evaluation. The result is a variance report listing only
+ * lines that differ.
+ */
+
+import { randomUUID } from "crypto";
+import { Prisma } from "@prisma/client";
+import { prisma } from "@/lib/prisma";
+import { sqlDate } from "@/lib/financial-aggregates";
+import { applyStockMovements } from "@/lib/accounting/cost-layers";
+import { evaluateStockLevels } from "@/lib/stock-alerts";
+
+export const STOCK_TAKE_CHUNK_SIZE = 1000;
+const MAX_WRITE_ATTEMPTS = 3;
+
+export interface CountedLine {
+    productId?: string;
+    sku?: string;
+    barcode?: string;
+    countedQuantity: number;
+}
+
+export interface StockVariance {
+    productId: string;
+    sku: string;
+    name: string;
+    expected: number;
+    counted: number;
+    variance: number;
+    varianceValue: number;
+}
+
+export interface StockTakeReport {
+    warehouseId: string;
+    dryRun: boolean;
+    lines: number;
+    matched: number;
+    unchanged: number;
+    unmatched: { line: number; key: string }[];
+    variances: StockVariance[];
+    totals: { unitsOver: number; unitsShort: number; netUnits: number; netValue: number };
+}
+
+/**
+ * Raised for counts that cannot be applied (unknown warehouse, bad lines, lost races)
+ */
+export class StockTakeError extends Error {
+    constructor(message: string, public status = 400) {
+        super(message);
+        this.name = "StockTakeError";
+    }
+}
+
+type TakeProduct = { id: string; sku: string; barcode: string | null; name: string; costPrice: number; stockQuantity: number; lowStockAlert: number };
+
+function chunks<T>(items: T[], size = STOCK_TAKE_CHUNK_SIZE): T[][] {
+    const out: T[][] = [];
+    for (let i = 0; i < items.length; i += size) out.push(items.slice(i, i + size));
+    return out;
+}
+
+/**
+ * Match lines to the company's products by id, SKU or barcode.
+ * Later lines for the same product replace earlier ones (a recount).
+ */
+async function resolveLines(db: Prisma.TransactionClient, companyId: string, lines: CountedLine[]) {
+    const ids = new Set<string>();
+    const skus = new Set<string>();
+    const barcodes = new Set<string>();
+    lines.forEach((line, i) => {
+        if (!Number.isInteger(line.countedQuantity) || line.countedQuantity < 0) {
+            throw new StockTakeError(`Line ${i + 1}: countedQuantity must be a whole number of at least 0`);
+        }
+        if (line.productId) ids.add(line.productId);
+        else if (line.sku) skus.add(line.sku);
+        else if (line.barcode) barcodes.add(line.barcode);
+    });
+
+    const products: TakeProduct[] = [];
+    const select = { id: true, sku: true, barcode: true, name: true, costPrice: true, stockQuantity: true, lowStockAlert: true };
+    for (const [field, values] of [["id", ids], ["sku", skus], ["barcode", barcodes]] as const) {
+        for (const chunk of chunks(Array.from(values))) {
+            products.push(...await db.product.findMany({ where: { companyId, [field]: { in: chunk } }, select }));
+        }
+    }
+
+    const byId = new Map(products.map(p => [p.id, p]));
+    const bySku = new Map(products.map(p => [p.sku, p]));
+    const byBarcode = new Map(products.filter(p => p.barcode).map(p => [p.barcode!, p]));
+
+    const counted = new Map<string, { product: TakeProduct; counted: number }>();
+    const unmatched: { line: number; key: string }[] = [];
+    lines.forEach((line, i) => {
+        const product = line.productId ? byId.get(line.productId)
+            : line.sku ? bySku.get(line.sku)
+                : line.barcode ? byBarcode.get(line.barcode) : undefined;
+        if (product) counted.set(product.id, { product, counted: line.countedQuantity });
+        else unmatched.push({ line: i + 1, key: line.productId || line.sku || line.barcode || "" });
+    });
+
+    return { counted: Array.from(counted.values()), unmatched };
+}
+
+async function currentStock(db: Prisma.TransactionClient, warehouseId: string, productIds: string[]) {
+    const onHand = new Map<string, number>();
+    for (const chunk of chunks(productIds)) {
+        const rows = await db.stock.findMany({
+            where: { warehouseId, productId: { in: chunk } },
+            select: { productId: true, quantity: true },
+        });
+        rows.forEach(row => onHand.set(row.productId, row.quantity));
+    }
+    return onHand;
+}
+
+/**
+ * Set counted quantities on rows that still hold what was read; returns the product ids written
+ */
+async function writeCounts(
+    tx: Prisma.TransactionClient,
+    warehouseId: string,
+    lines: { productId: string; expected: number; counted: number; exists: boolean }[],
+    now: Date
+): Promise<Set<string>> {
+    const written = new Set<string>();
+
+    for (const chunk of chunks(lines.filter(l => l.exists))) {
+        const countedFor = Prisma.join(chunk.map(l => Prisma.sql`WHEN ${l.productId} THEN CAST(${l.counted} AS INTEGER)`), " ");
+        const expectedFor = Prisma.join(chunk.map(l => Prisma.sql`WHEN ${l.productId} THEN CAST(${l.expected} AS INTEGER)`), " ");
+        const rows = await tx.$queryRaw<{ productId: string }[]>`
+            UPDATE "Stock"
+            SET "quantity" = CASE "productId" ${countedFor} END,
+                "updatedAt" = ${sqlDate(now)}
+            WHERE "warehouseId" = ${warehouseId}
+              AND "productId" IN (${Prisma.join(chunk.map(l => l.productId))})
+              AND "quantity" = CASE "productId" ${expectedFor} END
+            RETURNING "productId"
+        `;
+        rows.forEach(row => written.add(row.productId));
+    }
+
+    for (const chunk of chunks(lines.filter(l => !l.exists))) {
+        const values = Prisma.join(chunk.map(l =>
+            Prisma.sql`(${randomUUID()}, ${l.productId}, ${warehouseId}, CAST(${l.counted} AS INTEGER), ${sqlDate(now)})`
+        ));
+        const rows = await tx.$queryRaw<{ productId: string }[]>`
+            INSERT INTO "Stock" ("id", "productId", "warehouseId", "quantity", "updatedAt")
+            VALUES ${values}
+            ON CONFLICT ("productId", "warehouseId") DO NOTHING
+            RETURNING "productId"
+        `;
+        rows.forEach(row => written.add(row.productId));
+    }
+
+    return written;
+}
+
+/**
+ * Apply (or with dryRun, only report) a warehouse count
+ */
+export async function applyStockTake(
+    companyId: string,
+    input: { warehouseId: string; lines: CountedLine[]; reason?: string; reference?: string; userId?: string; dryRun?: boolean }
+): Promise<StockTakeReport> {
+    const { warehouseId, lines, dryRun = false } = input;
+
+    return prisma.$transaction(async tx => {
+        const warehouse = await tx.warehouse.findFirst({ where: { id: warehouseId, companyId }, select: { id: true } });
+        if (!warehouse) throw new StockTakeError("Warehouse not found", 404);
+
+        const { counted, unmatched } = await resolveLines(tx, companyId, lines);
+        const onHand = await currentStock(tx, warehouseId, counted.map(c => c.product.id));
+
+        let pending = counted.map(c => ({
+            product: c.product,
+            productId: c.product.id,
+            expected: onHand.get(c.product.id) ?? 0,
+            counted: c.counted,
+            exists: onHand.has(c.product.id),
+        }));
+        const unchanged = pending.filter(l => l.counted === l.expected).length;
+        pending = pending.filter(l => l.counted !== l.expected);
+
+        const applied: typeof pending = [];
+        const now = new Date();
+        if (dryRun) {
+            applied.push(...pending);
+        } else {
+            for (let attempt = 0; pending.length > 0; attempt++) {
+                if (attempt === MAX_WRITE_ATTEMPTS) {
+                    throw new StockTakeError(`Stock changed during the count for ${pending.length} products; retry`, 409);
+                }
+                const written = await writeCounts(tx, warehouseId, pending, now);
+                applied.push(...pending.filter(l => written.has(l.productId)));
+                const raced = pending.filter(l => !written.has(l.productId));
+                if (raced.length === 0) break;
+                // Re-read what moved underneath us and count against the new quantity
+                const reread = await currentStock(tx, warehouseId, raced.map(l => l.productId));
+                pending = raced
+                    .map(l => ({ ...l, expected: reread.get(l.productId) ?? 0, exists: reread.has(l.productId) }))
+                    .filter(l => l.counted !== l.expected);
+            }
+        }
+
+        if (!dryRun && applied.length > 0) {
+            // Product totals move by each warehouse delta
+            for (const chunk of chunks(applied)) {
+                const deltaFor = Prisma.join(chunk.map(l => Prisma.sql`WHEN ${l.productId} THEN CAST(${l.counted - l.expected} AS INTEGER)`), " ");
+                await tx.$executeRaw`
+                    UPDATE "Product"
+                    SET "stockQuantity" = "stockQuantity" + CASE "id" ${deltaFor} END,
+                        "updatedAt" = ${sqlDate(now)}
+                    WHERE "id" IN (${Prisma.join(chunk.map(l => l.productId))})
+                `;
+            }
+
+            const movements = await tx.stockMovement.createManyAndReturn({
+                data: applied.map(l => ({
+                    companyId,
+                    productId: l.productId,
+                    warehouseId,
+                    type: l.counted > l.expected ? "ADJUSTMENT_IN" : "ADJUSTMENT_OUT",
+                    quantity: Math.abs(l.counted - l.expected),
+                    unitCost: l.counted > l.expected ? l.product.costPrice : null,
+                    balanceBefore: l.expected,
+                    balanceAfter: l.counted,
+                    reference: input.reference,
+                    referenceType: "STOCK_TAKE",
+                    notes: input.reason || "Stock take",
+                    userId: input.userId,
+                    date: now,
+                })),
+            });
+            // Cost layers per chunk: a few statements each, whatever the number of lines
+            for (const chunk of chunks(movements)) {
+                await applyStockMovements(tx, chunk);
+            }
+
+            await evaluateStockLevels(companyId, applied.map(l => l.productId), tx);
+        }
+
+        const variances = applied.map(l => ({
+            productId: l.productId,
+            sku: l.product.sku,
+            name: l.product.name,
+            expected: l.expected,
+            counted: l.counted,
+            variance: l.counted - l.expected,
+            varianceValue: Math.round((l.counted - l.expected) * l.product.costPrice * 100) / 100,
+        }));
+
+        return {
+            warehouseId,
+            dryRun,
+            lines: lines.length,
+            matched: counted.length,
+            unchanged,
+            unmatched,
+            variances,
+            totals: {
+                unitsOver: variances.reduce((sum, v) => sum + Math.max(v.variance, 0), 0),
+                unitsShort: variances.reduce((sum, v) => sum + Math.max(-v.variance, 0), 0),
+                netUnits: variances.reduce((sum, v) => sum + v.variance, 0),
+                netValue: Math.round(variances.reduce((sum, v) => sum + v.varianceValue, 0) * 100) / 100,
+            },
+        };
+    }, { timeout: Math.max(10000, lines.length * 20) });
+}
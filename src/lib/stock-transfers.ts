@@ -0,0 +1,226 @@
+/**
+ * stock-transfers.ts - Warehouse-to-warehouse stock transfers
+ *
+ * A transfer is three statements however many lines it carries: one
+ * conditional UPDATE that decrements every source row only where enough stock
+ * is on hand, one INSERT ... ON CONFLICT that increments (or creates) every
+ * destination row, both RETURNING the new balances, and one createMany for
+ * the TRANSFER_OUT / TRANSFER_IN movements. If any line is short the whole
+ * transfer rolls back with the shortages listed.
+ *
+ * Transfers do not change product totals or costs, so cost layers are untouched.
+ */
+
+import { randomUUID } from "crypto";
+import { Prisma } from "@prisma/client";
+import { prisma } from "@/lib/prisma";
+import { sqlDate, toNumber } from "@/lib/financial-aggregates";
+
+// Lines per statement; keeps bind parameters well under driver limits
+export const TRANSFER_CHUNK_SIZE = 1000;
+
+export interface TransferLine {
+    productId: string;
+    quantity: number;
+}
+
+export interface TransferRequest {
+    fromWarehouseId: string;
+    toWarehouseId: string;
+    lines: TransferLine[];
+    reference?: string;
+    userId?: string;
+}
+
+export interface TransferredLine {
+    productId: string;
+    quantity: number;
+    fromBalance: number;
+    toBalance: number;
+}
+
+/**
+ * Raised for transfers that must not run (unknown warehouse or product, bad lines)
+ */
+export class StockTransferError extends Error {
+    constructor(message: string, public status = 400) {
+        super(message);
+        this.name = "StockTransferError";
+    }
+}
+
+/**
+ * Raised when a source warehouse holds less than a line asks for
+ */
+export class InsufficientStockError extends StockTransferError {
+    constructor(public shortages: { productId: string; warehouseId: string; requested: number; available: number }[]) {
+        super(
+            shortages.length === 1
+                ? `Insufficient stock in source warehouse. Available: ${shortages[0].available}`
+                : `Insufficient stock for ${shortages.length} products in source warehouse`,
+            422
+        );
+        this.name = "InsufficientStockError";
+    }
+}
+
+/**
+ * Merge repeated products and reject non-positive or fractional quantities
+ */
+function mergeLines(lines: TransferLine[]): Map<string, number> {
+    const merged = new Map<string, number>();
+    for (const line of lines) {
+        if (!line.productId || !Number.isInteger(line.quantity) || line.quantity <= 0) {
+            throw new StockTransferError("Every line needs a productId and a positive whole quantity");
+        }
+        merged.set(line.productId, (merged.get(line.productId) || 0) + line.quantity);
+    }
+    return merged;
+}
+
+async function moveChunk(
+    tx: Prisma.TransactionClient,
+    companyId: string,
+    request: TransferRequest,
+    chunk: [string, number][],
+    now: Date
+): Promise<TransferredLine[]> {
+    const { fromWarehouseId, toWarehouseId } = request;
+    const ids = Prisma.join(chunk.map(([productId]) => productId));
+    const quantityFor = Prisma.join(
+        chunk.map(([productId, quantity]) => Prisma.sql`WHEN ${productId} THEN CAST(${quantity} AS INTEGER)`),
+        " "
+    );
+
+    // Only rows holding enough stock are decremented; products are scoped to the company
+    const sources = await tx.$queryRaw<{ productId: string; quantity: unknown }[]>`
+        UPDATE "Stock"
+        SET "quantity" = "quantity" - CASE "productId" ${quantityFor} END,
+            "updatedAt" = ${sqlDate(now)}
+        WHERE "warehouseId" = ${fromWarehouseId}
+          AND "productId" IN (${ids})
+          AND "productId" IN (SELECT "id" FROM "Product" WHERE "companyId" = ${companyId})
+          AND "quantity" >= CASE "productId" ${quantityFor} END
+        RETURNING "productId", "quantity"
+    `;
+
+    if (sources.length < chunk.length) {
+        const moved = new Set(sources.map(row => row.productId));
+        const missing = chunk.filter(([productId]) => !moved.has(productId));
+        const stocks = await tx.stock.findMany({
+            where: { warehouseId: fromWarehouseId, productId: { in: missing.map(([productId]) => productId) } },
+            select: { productId: true, quantity: true },
+        });
+        const onHand = new Map(stocks.map(s => [s.productId, s.quantity]));
+        throw new InsufficientStockError(missing.map(([productId, requested]) => ({
+            productId,
+            warehouseId: fromWarehouseId,
+            requested,
+            available: onHand.get(productId) ?? 0,
+        })));
+    }
+
+    const rows = Prisma.join(chunk.map(([productId, quantity]) =>
+        Prisma.sql`(${randomUUID()}, ${productId}, ${toWarehouseId}, CAST(${quantity} AS INTEGER), ${sqlDate(now)}, ${sqlDate(now)})`
+    ));
+    const destinations = await tx.$queryRaw<{ productId: string; quantity: unknown }[]>`
+        INSERT INTO "Stock" ("id", "productId", "warehouseId", "quantity", "lastRestocked", "updatedAt")
+        VALUES ${rows}
+        ON CONFLICT ("productId", "warehouseId") DO UPDATE
+        SET "quantity" = "Stock"."quantity" + EXCLUDED."quantity",
+            "lastRestocked" = EXCLUDED."lastRestocked",
+            "updatedAt" = EXCLUDED."updatedAt"
+        RETURNING "productId", "quantity"
+    `;
+
+    const fromBalance = new Map(sources.map(row => [row.productId, toNumber(row.quantity)]));
+    const toBalance = new Map(destinations.map(row => [row.productId, toNumber(row.quantity)]));
+    const moved = chunk.map(([productId, quantity]) => ({
+        productId,
+        quantity,
+        fromBalance: fromBalance.get(productId)!,
+        toBalance: toBalance.get(productId)!,
+    }));
+
+    await tx.stockMovement.createMany({
+        data: moved.flatMap(line => [
+            {
+                companyId,
+                productId: line.productId,
+                warehouseId: fromWarehouseId,
+                type: "TRANSFER_OUT",
+                quantity: line.quantity,
+                balanceBefore: line.fromBalance + line.quantity,
+                balanceAfter: line.fromBalance,
+                reference: request.reference,
+                referenceType: "TRANSFER",
+                notes: `Transfer to warehouse ${toWarehouseId}`,
+                userId: request.userId,
+                date: now,
+            },
+            {
+                companyId,
+                productId: line.productId,
+                warehouseId: toWarehouseId,
+                type: "TRANSFER_IN",
+                quantity: line.quantity,
+                balanceBefore: line.toBalance - line.quantity,
+                balanceAfter: line.toBalance,
+                reference: request.reference,
+                referenceType: "TRANSFER",
+                notes: `Transfer from warehouse ${fromWarehouseId}`,
+                userId: request.userId,
+                date: now,
+            },
+        ]),
+    });
+
+    return moved;
+}
+
+/**
+ * Move every line of each request inside `tx`. Warehouses are checked
+ * against the company in one query; any shortage aborts the transaction.
+ */
+export async function transferStockInTransaction(
+    tx: Prisma.TransactionClient,
+    companyId: string,
+    requests: TransferRequest[]
+): Promise<TransferredLine[]> {
+    const merged = requests.map(request => {
+        if (!request.fromWarehouseId || !request.toWarehouseId) {
+            throw new StockTransferError("Missing source or destination warehouse");
+        }
+        if (request.fromWarehouseId === request.toWarehouseId) {
+            throw new StockTransferError("Cannot transfer to same warehouse");
+        }
+        return { request, lines: Array.from(mergeLines(request.lines)) };
+    });
+
+    const warehouseIds = new Set(requests.flatMap(r => [r.fromWarehouseId, r.toWarehouseId]));
+    const known = await tx.warehouse.count({ where: { companyId, id: { in: Array.from(warehouseIds) } } });
+    if (known !== warehouseIds.size) {
+        throw new StockTransferError("Warehouse not found", 404);
+    }
+
+    const now = new Date();
+    const moved: TransferredLine[] = [];
+    for (const { request, lines } of merged) {
+        for (let i = 0; i < lines.length; i += TRANSFER_CHUNK_SIZE) {
+            moved.push(...await moveChunk(tx, companyId, request, lines.slice(i, i + TRANSFER_CHUNK_SIZE), now));
+        }
+    }
+    return moved;
+}
+
+/**
+ * Run one or many warehouse transfers as a single all-or-nothing transaction
+ */
+export async function transferStock(companyId: string, requests: TransferRequest[]): Promise<TransferredLine[]> {
+    const lineCount = requests.reduce((sum, r) => sum + r.lines.length, 0);
+    return prisma.$transaction(
+        tx => transferStockInTransaction(tx, companyId, requests),
+        // Nightly rebalancing moves thousands of lines in one transaction
+        { timeout: Math.max(5000, lineCount * 20) }
+    );
+}
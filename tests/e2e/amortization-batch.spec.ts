@@ -0,0 +1,68 @@
+import { test, expect } from '@playwright/test';
+import { prisma } from '../../src/lib/prisma';
+import { createPrepaidExpense, processAllPendingAmortizations } from '../../src/lib/accounting/expense-amortization';
+import { createTestCompany } from '../fixtures';
+
+/**
+ * Batch Amortization Tests
+ * Overlapping runs must recognize each due period exactly once and post
+ * balanced journals for prepaid expenses with GL accounts, each dated in the
+ * month it recognizes.
+ */
+
+test.describe('Batch Amortization', () => {
+    let fixture: Awaited<ReturnType<typeof createTestCompany>>;
+    let companyId: string;
+    let expenseAccountId: string;
+    let assetAccountId: string;
+
+    test.beforeAll(async () => {
+        fixture = await createTestCompany('amortization-batch');
+        companyId = fixture.companyId;
+        expenseAccountId = (await prisma.account.findFirstOrThrow({ where: { companyId, accountType: 'EXPENSE' } })).id;
+        assetAccountId = (await prisma.account.findFirstOrThrow({ where: { companyId, accountType: 'ASSET' } })).id;
+    });
+
+    test.afterAll(async () => {
+        await fixture?.cleanup();
+        await prisma.$disconnect();
+    });
+
+    test('concurrent runs recognize every period once', async () => {
+        const start = new Date();
+        start.setMonth(start.getMonth() - 5);
+        const prepaid = await createPrepaidExpense({
+            companyId,
+            description: 'BATCH-AMORTIZATION-TEST',
+            totalAmount: 1200,
+            startDate: start,
+            endDate: new Date(start.getFullYear(), start.getMonth() + 11, 1),
+            expenseAccountId,
+            assetAccountId,
+        });
+
+        const options = { chunkSize: 2 };
+        const runs = await Promise.all([
+            processAllPendingAmortizations(companyId, undefined, options),
+            processAllPendingAmortizations(companyId, undefined, options),
+        ]);
+        const ours = runs.flat();
+
+        const rows = await prisma.expenseAmortization.findMany({ where: { prepaidExpenseId: prepaid.id } });
+        const due = rows.filter(r => r.periodDate <= new Date());
+        expect(ours).toHaveLength(due.length);
+        expect(due.every(r => r.isProcessed && r.journalEntryId)).toBe(true);
+        const journals = await prisma.journalEntry.findMany({ where: { id: { in: due.map(r => r.journalEntryId!) } } });
+        const journalMonth = new Map(journals.map(j => [j.id, j.entryDate.toISOString().slice(0, 7)]));
+        due.forEach(r => expect(journalMonth.get(r.journalEntryId!)).toBe(r.periodDate.toISOString().slice(0, 7)));
+
+        const updated = await prisma.prepaidExpense.findUnique({ where: { id: prepaid.id } });
+        const recognized = due.reduce((sum, r) => sum + r.amount, 0);
+        expect(updated!.recognizedAmount).toBeCloseTo(recognized, 2);
+        expect(updated!.remainingAmount).toBeCloseTo(1200 - recognized, 2);
+
+        // A third run finds nothing left to do
+        const rerun = await processAllPendingAmortizations(companyId);
+        expect(rerun).toHaveLength(0);
+    });
+});
@@ -0,0 +1,63 @@
+import { test, expect } from '@playwright/test';
+import { prisma } from '../../src/lib/prisma';
+import { createExportStream } from '../../src/lib/export-stream';
+
+/**
+ * Streaming Export Tests
+ * Paging by cursor must emit every row exactly once, whatever the batch size.
+ */
+
+async function readAll(stream: ReadableStream<Uint8Array>): Promise<string> {
+    return new Response(stream).text();
+}
+
+test.describe('Streaming Export', () => {
+    let companyId: string;
+
+    test.beforeAll(async () => {
+        const invoice = await prisma.invoice.findFirst({ select: { companyId: true } });
+        test.skip(!invoice, 'Requires a seeded database');
+        companyId = invoice!.companyId;
+    });
+
+    test.afterAll(async () => {
+        await prisma.$disconnect();
+    });
+
+    test('ndjson emits meta, every row once, and a summary', async () => {
+        const text = await readAll(createExportStream({
+            companyId,
+            entities: ['invoices', 'clients'],
+            format: 'ndjson',
+            batchSize: 7,
+        }));
+        const lines = text.trim().split('\n').map(line => JSON.parse(line));
+
+        const [invoiceCount, clientCount] = await Promise.all([
+            prisma.invoice.count({ where: { companyId } }),
+            prisma.client.count({ where: { companyId } }),
+        ]);
+        const invoiceIds = lines.filter(l => l.type === 'invoices').map(l => l.data.id);
+
+        expect(lines[0].type).toBe('meta');
+        expect(new Set(invoiceIds).size).toBe(invoiceCount);
+        expect(lines.filter(l => l.type === 'clients')).toHaveLength(clientCount);
+        expect(lines[lines.length - 1]).toEqual({
+            type: 'summary',
+            counts: { invoices: invoiceCount, ...(clientCount ? { clients: clientCount } : {}) },
+        });
+    });
+
+    test('csv has a header row and one line per product', async () => {
+        const text = await readAll(createExportStream({ companyId, entities: ['products'], format: 'csv', batchSize: 5 }));
+        const rows = text.trim().split('\n');
+
+        expect(rows[0]).toBe('sku,name,description,costPrice,sellingPrice,stockQuantity,lowStockAlert,isActive');
+        // Descriptions may contain quoted newlines, so only check the lower bound
+        expect(rows.length - 1).toBeGreaterThanOrEqual(await prisma.product.count({ where: { companyId } }));
+    });
+
+    test('csv rejects multiple entities', () => {
+        expect(() => createExportStream({ companyId, entities: ['products', 'clients'], format: 'csv' })).toThrow();
+    });
+});
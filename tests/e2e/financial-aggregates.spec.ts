@@ -0,0 +1,201 @@
+import { test, expect } from '@playwright/test';
+import { prisma } from '../../src/lib/prisma';
+import {
+    getFinancialSummary,
+    getMonthlyData,
+    getARAgingBuckets,
+    getTopClients,
+} from '../../src/lib/financial-core';
+import { verifyInvoiceTotals } from '../../src/lib/invoice-totals';
+import { rebuildMonthlyRollups } from '../../src/lib/monthly-rollups';
+
+/**
+ * Aggregation Parity Tests
+ * The SQL aggregation engine must match the original JS reducers
+ * (findMany + include items + reduce) on the seeded database.
+ */
+
+const ACCRUAL_STATUSES = ['PAID', 'PENDING', 'SENT', 'OVERDUE'];
+const OPEN_STATUSES = ['PENDING', 'OVERDUE', 'SENT'];
+
+type InvoiceWithItems = { taxRate: number; items: { quantity: number; unitPrice: number }[] };
+
+function invoiceSubtotal(inv: InvoiceWithItems) {
+    return inv.items.reduce((s, item) => s + item.quantity * item.unitPrice, 0);
+}
+
+function invoiceTotal(inv: InvoiceWithItems) {
+    return invoiceSubtotal(inv) * (1 + (inv.taxRate || 0));
+}
+
+async function referenceSummary(companyId: string, start: Date, end: Date) {
+    const invoices = await prisma.invoice.findMany({
+        where: { companyId, status: { in: ACCRUAL_STATUSES }, issueDate: { gte: start, lte: end } },
+        include: { items: true },
+    });
+    const posSales = await prisma.pOSSale.findMany({
+        where: { companyId, status: 'COMPLETED', saleDate: { gte: start, lte: end } },
+        include: { items: { include: { product: true } } },
+    });
+    const expenses = await prisma.expense.findMany({ where: { companyId, date: { gte: start, lte: end } } });
+    const paidBills = await prisma.bill.findMany({ where: { companyId, status: 'PAID', issueDate: { gte: start, lte: end } } });
+    const bankAccounts = await prisma.bankAccount.findMany({ where: { companyId } });
+    const arInvoices = await prisma.invoice.findMany({
+        where: { companyId, status: { in: OPEN_STATUSES } },
+        include: { items: true },
+    });
+    const apBills = await prisma.bill.findMany({ where: { companyId, status: { in: ['PENDING', 'OVERDUE'] } } });
+
+    const revenue = invoices.reduce((s, inv) => s + invoiceTotal(inv), 0)
+        + posSales.reduce((s, sale) => s + sale.total, 0);
+    // Cost recorded at checkout; cost prices for sales from before it was recorded
+    const cogs = posSales.reduce((s, sale) =>
+        s + (sale.costOfGoods ?? sale.items.reduce((i, item) => i + item.quantity * (item.product?.costPrice || 0), 0)), 0)
+        + invoices.reduce((s, inv) => s + invoiceSubtotal(inv), 0) * 0.6;
+    const operatingExpenses = expenses.reduce((s, e) => s + e.amount, 0)
+        + paidBills.reduce((s, b) => s + b.totalAmount, 0);
+
+    return {
+        revenue: Math.round(revenue),
+        cogs: Math.round(cogs),
+        grossProfit: Math.round(revenue - cogs),
+        operatingExpenses: Math.round(operatingExpenses),
+        netProfit: Math.round(revenue - cogs - operatingExpenses),
+        cashBalance: Math.round(bankAccounts.reduce((s, a) => s + a.balance, 0)),
+        accountsReceivable: Math.round(arInvoices.reduce((s, inv) => s + invoiceTotal(inv), 0)),
+        accountsPayable: Math.round(apBills.reduce((s, b) => s + b.totalAmount - b.paidAmount, 0)),
+    };
+}
+
+async function referenceMonthly(companyId: string, monthsBack: number) {
+    const now = new Date();
+    const startDate = new Date(now.getFullYear(), now.getMonth() - monthsBack + 1, 1);
+    const invoices = await prisma.invoice.findMany({
+        where: { companyId, status: 'PAID', issueDate: { gte: startDate } },
+        include: { items: true },
+    });
+    const posSales = await prisma.pOSSale.findMany({ where: { companyId, status: 'COMPLETED', saleDate: { gte: startDate } } });
+    const expenses = await prisma.expense.findMany({ where: { companyId, date: { gte: startDate } } });
+
+    const key = (d: Date) => `${d.getFullYear()}-${d.getMonth()}`;
+    const map = new Map<string, { revenue: number; expenses: number }>();
+    for (let i = monthsBack - 1; i >= 0; i--) {
+        map.set(key(new Date(now.getFullYear(), now.getMonth() - i, 1)), { revenue: 0, expenses: 0 });
+    }
+    invoices.forEach(inv => { const m = map.get(key(inv.issueDate)); if (m) m.revenue += invoiceTotal(inv); });
+    posSales.forEach(sale => { const m = map.get(key(sale.saleDate)); if (m) m.revenue += sale.total; });
+    expenses.forEach(exp => { const m = map.get(key(exp.date)); if (m) m.expenses += exp.amount; });
+
+    return Array.from(map.values()).map(m => ({
+        revenue: Math.round(m.revenue),
+        expenses: Math.round(m.expenses),
+    }));
+}
+
+async function referenceAging(companyId: string) {
+    const now = new Date();
+    const invoices = await prisma.invoice.findMany({
+        where: { companyId, status: { in: OPEN_STATUSES } },
+        include: { items: true },
+    });
+    const buckets: Record<string, { amount: number; count: number }> = {
+        current: { amount: 0, count: 0 },
+        '1-30': { amount: 0, count: 0 },
+        '31-60': { amount: 0, count: 0 },
+        '61-90': { amount: 0, count: 0 },
+        '90+': { amount: 0, count: 0 },
+    };
+    invoices.forEach(inv => {
+        const days = Math.floor((now.getTime() - inv.dueDate.getTime()) / (1000 * 60 * 60 * 24));
+        const bucket = days <= 0 ? 'current' : days <= 30 ? '1-30' : days <= 60 ? '31-60' : days <= 90 ? '61-90' : '90+';
+        buckets[bucket].amount += invoiceTotal(inv);
+        buckets[bucket].count++;
+    });
+    return buckets;
+}
+
+// Allow for float summation order differences before rounding
+function expectClose(actual: number, expected: number) {
+    expect(Math.abs(actual - expected)).toBeLessThanOrEqual(1);
+}
+
+test.describe('Financial Aggregation Parity', () => {
+    let companyId: string;
+    const startDate = new Date(new Date().getFullYear() - 2, 0, 1);
+    const endDate = new Date();
+
+    test.beforeAll(async () => {
+        const invoice = await prisma.invoice.findFirst({ select: { companyId: true } });
+        test.skip(!invoice, 'Requires a seeded database');
+        companyId = invoice!.companyId;
+    });
+
+    test.afterAll(async () => {
+        await prisma.$disconnect();
+    });
+
+    test('persisted invoice totals match line items', async () => {
+        const { checked, mismatches } = await verifyInvoiceTotals({ companyId });
+
+        expect(checked).toBeGreaterThan(0);
+        expect(mismatches).toEqual([]);
+    });
+
+    test('financial summary matches JS reducers', async () => {
+        const actual = await getFinancialSummary(companyId, startDate, endDate);
+        const expected = await referenceSummary(companyId, startDate, endDate);
+
+        for (const field of Object.keys(expected) as (keyof typeof expected)[]) {
+            expectClose(actual[field], expected[field]);
+        }
+    });
+
+    test('monthly rollups reconcile with raw tables', async () => {
+        const { drift } = await rebuildMonthlyRollups(companyId, { dryRun: true });
+
+        expect(drift).toEqual([]);
+    });
+
+    test('monthly data matches JS reducers', async () => {
+        const actual = await getMonthlyData(companyId, 12);
+        const expected = await referenceMonthly(companyId, 12);
+
+        expect(actual).toHaveLength(expected.length);
+        actual.forEach((month, i) => {
+            expectClose(month.revenue, expected[i].revenue);
+            expectClose(month.expenses, expected[i].expenses);
+        });
+    });
+
+    test('AR aging buckets match JS reducers', async () => {
+        const actual = await getARAgingBuckets(companyId);
+        const expected = await referenceAging(companyId);
+
+        actual.forEach(bucket => {
+            expectClose(bucket.amount, Math.round(expected[bucket.bucket].amount));
+            expect(bucket.count).toBe(expected[bucket.bucket].count);
+        });
+    });
+
+    test('top clients match JS reducers', async () => {
+        const actual = await getTopClients(companyId, 5, startDate, endDate);
+        const invoices = await prisma.invoice.findMany({
+            where: { companyId, status: 'PAID', issueDate: { gte: startDate, lte: endDate } },
+            include: { items: true, client: true },
+        });
+        const byClient = new Map<string, { value: number; count: number }>();
+        invoices.forEach(inv => {
+            const current = byClient.get(inv.client.name) || { value: 0, count: 0 };
+            current.value += invoiceTotal(inv);
+            current.count++;
+            byClient.set(inv.client.name, current);
+        });
+
+        actual.forEach(client => {
+            const expected = byClient.get(client.name);
+            expect(expected).toBeDefined();
+            expectClose(client.value, Math.round(expected!.value));
+            expect(client.count).toBe(expected!.count);
+        });
+    });
+});
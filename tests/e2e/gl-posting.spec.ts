@@ -0,0 +1,66 @@
+import { test, expect } from '@playwright/test';
+import { prisma } from '../../src/lib/prisma';
+import { createJournalEntry, JournalPostingError } from '../../src/lib/gl/auto-post';
+import { createTestCompany } from '../fixtures';
+
+/**
+ * GL Posting Tests
+ * Entries post atomically: balances move together with the entry, and
+ * rejected entries leave neither an entry nor a balance change behind.
+ */
+
+test.describe('GL Posting', () => {
+    test.describe.configure({ mode: 'serial' });
+
+    let fixture: Awaited<ReturnType<typeof createTestCompany>>;
+    let companyId: string;
+    let debitAccount: { id: string; currentBalance: number };
+    let creditAccount: { id: string; currentBalance: number };
+
+    test.beforeAll(async () => {
+        fixture = await createTestCompany('gl-posting');
+        companyId = fixture.companyId;
+        debitAccount = await prisma.account.findFirstOrThrow({ where: { companyId, normalBalance: 'DEBIT' } });
+        creditAccount = await prisma.account.findFirstOrThrow({ where: { companyId, normalBalance: 'CREDIT' } });
+    });
+
+    test.afterAll(async () => {
+        await fixture?.cleanup();
+        await prisma.$disconnect();
+    });
+
+    test('posts lines and moves balances by normal side', async () => {
+        const entry = await createJournalEntry(companyId, 'MANUAL', 'gl-posting-test', 'GL posting test', [
+            { accountId: debitAccount.id, debit: 60 },
+            { accountId: debitAccount.id, debit: 40 },
+            { accountId: creditAccount.id, credit: 100 },
+        ]);
+
+        expect(entry.lines).toHaveLength(3);
+        const [debit, credit] = await Promise.all([
+            prisma.account.findUniqueOrThrow({ where: { id: debitAccount.id } }),
+            prisma.account.findUniqueOrThrow({ where: { id: creditAccount.id } }),
+        ]);
+        expect(debit.currentBalance).toBeCloseTo(debitAccount.currentBalance + 100, 6);
+        expect(credit.currentBalance).toBeCloseTo(creditAccount.currentBalance + 100, 6);
+    });
+
+    test('rejects unknown accounts without a partial post', async () => {
+        const balance = (await prisma.account.findUniqueOrThrow({ where: { id: debitAccount.id } })).currentBalance;
+
+        await expect(createJournalEntry(companyId, 'MANUAL', 'gl-posting-rejected', 'Bad account', [
+            { accountId: debitAccount.id, debit: 10 },
+            { accountId: 'missing-account', credit: 10 },
+        ])).rejects.toBeInstanceOf(JournalPostingError);
+
+        expect(await prisma.journalEntry.findFirst({ where: { companyId, sourceId: 'gl-posting-rejected' } })).toBeNull();
+        expect((await prisma.account.findUniqueOrThrow({ where: { id: debitAccount.id } })).currentBalance).toBe(balance);
+    });
+
+    test('rejects unbalanced entries', async () => {
+        await expect(createJournalEntry(companyId, 'MANUAL', 'gl-posting-test', 'Unbalanced', [
+            { accountId: debitAccount.id, debit: 10 },
+            { accountId: creditAccount.id, credit: 9 },
+        ])).rejects.toBeInstanceOf(JournalPostingError);
+    });
+});
@@ -0,0 +1,98 @@
+import { test, expect } from '@playwright/test';
+import { prisma } from '../../src/lib/prisma';
+import {
+    enqueueJob,
+    claimJob,
+    runJob,
+    requeueStaleJobs,
+    registerJobHandler,
+    JobType,
+} from '../../src/lib/job-queue';
+
+/**
+ * Background Job Queue Tests
+ * Claims respect the per-company limit, each job is claimed once,
+ * and failures are retried with backoff until maxAttempts - also when the
+ * worker died mid-attempt.
+ */
+
+// Not real job types: handlers are registered here only
+const OK_TYPE = 'test.ok' as JobType;
+const FAIL_TYPE = 'test.fail' as JobType;
+const WORKER = 'test-worker';
+
+test.describe('Background Job Queue', () => {
+    let companyId: string;
+
+    test.beforeAll(async () => {
+        const company = await prisma.company.findFirst({ select: { id: true } });
+        test.skip(!company, 'Requires a seeded database');
+        // Claims take the oldest runnable job of any company
+        const queued = await prisma.backgroundJob.count({ where: { status: { in: ['QUEUED', 'RUNNING'] } } });
+        test.skip(queued > 0, 'Requires an idle job queue');
+        companyId = company!.id;
+
+        registerJobHandler(OK_TYPE, async ({ progress }) => {
+            await progress(1, 1, 'done');
+            return { ok: true };
+        });
+        registerJobHandler(FAIL_TYPE, async () => {
+            throw new Error('boom');
+        });
+    });
+
+    test.afterEach(async () => {
+        await prisma.backgroundJob.deleteMany({ where: { type: { in: [OK_TYPE, FAIL_TYPE] } } });
+    });
+
+    test.afterAll(async () => {
+        await prisma.$disconnect();
+    });
+
+    test('claims stop at the per-company concurrency limit', async () => {
+        await Promise.all([1, 2, 3].map(() => enqueueJob(companyId, OK_TYPE)));
+
+        const claims = await Promise.all([1, 2, 3].map(i => claimJob(`${WORKER}-${i}`, 2)));
+        const claimed = claims.filter(Boolean);
+
+        expect(claimed.length).toBeLessThanOrEqual(2);
+        expect(new Set(claimed.map(j => j!.id)).size).toBe(claimed.length);
+        expect(await prisma.backgroundJob.count({ where: { type: OK_TYPE, status: 'RUNNING' } })).toBe(claimed.length);
+    });
+
+    test('successful run stores result and progress', async () => {
+        const { id } = await enqueueJob(companyId, OK_TYPE);
+        const job = await claimJob(WORKER);
+        expect(job?.id).toBe(id);
+
+        expect(await runJob(job!, WORKER)).toBe('SUCCEEDED');
+        const done = await prisma.backgroundJob.findUnique({ where: { id } });
+        expect(done).toMatchObject({ status: 'SUCCEEDED', progressCurrent: 1, progressMessage: 'done', lockedBy: null });
+        expect(JSON.parse(done!.result!)).toEqual({ ok: true });
+    });
+
+    test('failures back off, then fail after maxAttempts', async () => {
+        const { id } = await enqueueJob(companyId, FAIL_TYPE, {}, { maxAttempts: 2 });
+
+        expect(await runJob((await claimJob(WORKER))!, WORKER)).toBe('QUEUED');
+        const retry = await prisma.backgroundJob.findUnique({ where: { id } });
+        expect(retry!.runAt.getTime()).toBeGreaterThan(Date.now());
+        expect(await claimJob(WORKER)).toBeNull();
+
+        await prisma.backgroundJob.update({ where: { id }, data: { runAt: new Date() } });
+        expect(await runJob((await claimJob(WORKER))!, WORKER)).toBe('FAILED');
+        expect(await prisma.backgroundJob.findUnique({ where: { id } })).toMatchObject({ status: 'FAILED', error: 'boom', attempts: 2 });
+    });
+
+    test('stale jobs are requeued until their attempts run out', async () => {
+        const stale = { status: 'RUNNING', lockedBy: WORKER, lockedAt: new Date(Date.now() - 60 * 60 * 1000) };
+        const [retried, exhausted] = await Promise.all([
+            prisma.backgroundJob.create({ data: { companyId, type: OK_TYPE, payload: '{}', attempts: 1, maxAttempts: 3, ...stale } }),
+            prisma.backgroundJob.create({ data: { companyId, type: OK_TYPE, payload: '{}', attempts: 3, maxAttempts: 3, ...stale } }),
+        ]);
+
+        expect(await requeueStaleJobs()).toEqual({ requeued: 1, failed: 1 });
+        expect(await prisma.backgroundJob.findUnique({ where: { id: retried.id } })).toMatchObject({ status: 'QUEUED', lockedBy: null });
+        expect(await prisma.backgroundJob.findUnique({ where: { id: exhausted.id } })).toMatchObject({ status: 'FAILED', lockedBy: null });
+    });
+});
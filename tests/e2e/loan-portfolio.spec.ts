@@ -0,0 +1,110 @@
+import { test, expect } from '@playwright/test';
+import { prisma } from '../../src/lib/prisma';
+import { generateAmortizationSchedule, calculateMonthlyPayment } from '../../src/lib/accounting/loan-accounting';
+import {
+    accrueInterest,
+    computeSchedules,
+    createLoanBook,
+    getLoanBook,
+    invalidateLoanBook,
+    upcomingPayments,
+} from '../../src/lib/accounting/loan-portfolio';
+
+/**
+ * Loan Portfolio Engine Tests
+ * Typed-array schedules, accruals and upcoming payments must match the
+ * per-loan results, and month-end accrual must stay fast on a large book.
+ */
+
+function syntheticBook(loanCount: number) {
+    const start = new Date('2024-01-15T00:00:00Z');
+    const terms = Array.from({ length: loanCount }, (_, i) => {
+        const principal = 10000 + i;
+        const annualRate = 0.05 + (i % 10) / 100;
+        return { principal, annualRate, termMonths: 60, startDate: start, monthlyPayment: calculateMonthlyPayment(principal, annualRate, 60) };
+    });
+    const schedules = computeSchedules(terms);
+
+    const loans = terms.map((t, i) => ({
+        id: `loan-${i}`,
+        loanName: `Loan ${i}`,
+        lenderName: 'Bank',
+        remainingBalance: t.principal,
+        interestRate: t.annualRate,
+    }));
+    const rows = [];
+    for (let i = 0; i < loanCount; i++) {
+        for (let r = schedules.offset[i]; r < schedules.offset[i + 1]; r++) {
+            rows.push({
+                id: `row-${r}`,
+                loanId: `loan-${i}`,
+                periodNumber: r - schedules.offset[i] + 1,
+                dueDate: new Date(schedules.dueDate[r]),
+                principalDue: schedules.principalDue[r],
+                interestDue: schedules.interestDue[r],
+                totalDue: schedules.totalDue[r],
+                balanceAfter: schedules.balanceAfter[r],
+                isPaid: r - schedules.offset[i] < 3,
+            });
+        }
+    }
+    return createLoanBook('synthetic', loans, rows);
+}
+
+test.describe('Loan Portfolio Engine', () => {
+    test.afterAll(async () => {
+        await prisma.$disconnect();
+    });
+
+    test('single-loan schedule amortizes to zero', () => {
+        const schedule = generateAmortizationSchedule(12000, 0.12, 12, new Date('2025-01-31T00:00:00Z'), 'QUARTERLY');
+
+        expect(schedule).toHaveLength(4);
+        expect(schedule[schedule.length - 1].balanceAfter).toBe(0);
+        expect(schedule.reduce((sum, p) => sum + p.principalDue, 0)).toBeCloseTo(12000, 1);
+    });
+
+    test('accrual over a large book finishes in milliseconds', () => {
+        const book = syntheticBook(10000);
+
+        const started = performance.now();
+        const accrual = accrueInterest(book, new Date());
+        const elapsed = performance.now() - started;
+
+        const expected = Array.from(book.balance).reduce((sum, b, i) => sum + b * (book.rate[i] / 12), 0);
+        expect(accrual.totalAccrual).toBeCloseTo(expected, 2);
+        expect(accrual.details).toHaveLength(10000);
+        expect(elapsed).toBeLessThan(100);
+    });
+
+    test('upcoming payments skip paid periods and stop at the horizon', () => {
+        const book = syntheticBook(5);
+        const upcoming = upcomingPayments(book, new Date('2024-07-20T00:00:00Z'));
+
+        // Periods 1-3 are paid; periods 4-6 fall due by July 2024
+        expect(upcoming).toHaveLength(15);
+        expect(upcoming.every(p => p.periodNumber >= 4 && p.periodNumber <= 6)).toBe(true);
+        expect(upcoming.map(p => p.dueDate.getTime())).toEqual([...upcoming.map(p => p.dueDate.getTime())].sort((a, b) => a - b));
+    });
+
+    test('cached book matches the database until invalidated', async () => {
+        const loan = await prisma.loan.findFirst({ where: { isActive: true } });
+        test.skip(!loan, 'Requires a seeded loan');
+
+        invalidateLoanBook(loan!.companyId);
+        const book = await getLoanBook(loan!.companyId);
+        expect(await getLoanBook(loan!.companyId)).toBe(book);
+
+        const active = await prisma.loan.count({ where: { companyId: loan!.companyId, isActive: true } });
+        expect(book.loanIds).toHaveLength(active);
+
+        invalidateLoanBook(loan!.companyId);
+        expect(await getLoanBook(loan!.companyId)).not.toBe(book);
+
+        // A fresh read rebuilds even while a cached book is live, and replaces it
+        const cached = await getLoanBook(loan!.companyId);
+        const fresh = await getLoanBook(loan!.companyId, { fresh: true });
+        expect(fresh).not.toBe(cached);
+        expect(await getLoanBook(loan!.companyId)).toBe(fresh);
+    });
+});
@@ -0,0 +1,103 @@
+import { test, expect } from '@playwright/test';
+import { prisma } from '../../src/lib/prisma';
+import { importClients, importOpeningBalances } from '../../src/lib/migration/importers';
+import { ingestRows, readCsvRows, IngestProgress } from '../../src/lib/migration/ingest';
+
+/**
+ * Bulk Migration Import Tests
+ * Bulk inserts/updates must report the same counts and row errors
+ * as importing one row at a time, including when streamed in batches.
+ */
+
+function csvStream(text: string): ReadableStream<Uint8Array> {
+    return new Response(text).body!;
+}
+
+const PREFIX = 'IMPORT-TEST-';
+const CONTACT_CLIENT = 'IMPORT-CONTACT-TEST';
+// Tests run in parallel, so the streamed import keeps clear of PREFIX's count
+const STREAM_PREFIX = 'IMPORT-STREAM-TEST-';
+const mapping = { Name: 'name', Email: 'email' };
+
+test.describe('Bulk Migration Import', () => {
+    let companyId: string;
+
+    test.beforeAll(async () => {
+        const company = await prisma.company.findFirst({ select: { id: true } });
+        test.skip(!company, 'Requires a seeded database');
+        companyId = company!.id;
+    });
+
+    test.afterAll(async () => {
+        await prisma.client.deleteMany({ where: { companyId, name: CONTACT_CLIENT } });
+        await prisma.client.deleteMany({ where: { companyId, name: { startsWith: PREFIX } } });
+        await prisma.client.deleteMany({ where: { companyId, name: { startsWith: STREAM_PREFIX } } });
+        await prisma.$disconnect();
+    });
+
+    test('inserts, updates, skips and merges repeated keys', async () => {
+        const rows = [
+            { Name: `${PREFIX}a`, Email: 'a@example.com' },
+            { Name: '', Email: 'empty@example.com' },
+            { Name: `${PREFIX}b`, Email: 'b@example.com' },
+            { Name: `${PREFIX}a`, Email: 'a2@example.com' },
+        ];
+
+        const first = await importClients(rows, mapping, companyId);
+        expect(first).toMatchObject({ success: true, created: 2, updated: 1, skipped: 1, errors: [] });
+
+        const client = await prisma.client.findFirst({ where: { companyId, name: `${PREFIX}a` } });
+        expect(client?.email).toBe('a2@example.com');
+
+        const second = await importClients(rows, mapping, companyId);
+        expect(second).toMatchObject({ created: 0, updated: 3, skipped: 1 });
+        expect(await prisma.client.count({ where: { companyId, name: { startsWith: PREFIX } } })).toBe(2);
+    });
+
+    test('a client contact person is kept in the notes', async () => {
+        const result = await importClients(
+            [{ Name: CONTACT_CLIENT, Contact: 'Mona', Notes: 'VIP' }],
+            { Name: 'name', Contact: 'contactPerson', Notes: 'notes' },
+            companyId
+        );
+
+        expect(result).toMatchObject({ success: true, created: 1 });
+        const client = await prisma.client.findFirst({ where: { companyId, name: CONTACT_CLIENT } });
+        expect(client?.notes).toBe('Contact: Mona\nVIP');
+    });
+
+    test('unknown accounts are reported against their rows', async () => {
+        const result = await importOpeningBalances(
+            [{ Code: 'NO-SUCH-ACCOUNT', Balance: '10' }],
+            { Code: 'accountCode', Balance: 'balance' },
+            companyId
+        );
+
+        expect(result.success).toBe(false);
+        expect(result.errors).toEqual([{ row: 2, message: 'Account NO-SUCH-ACCOUNT not found' }]);
+    });
+
+    test('streamed csv is validated and imported batch by batch', async () => {
+        const csv = [
+            'name,email',
+            `${STREAM_PREFIX}s1,s1@example.com`,
+            `${STREAM_PREFIX}s2,not-an-email`,
+            'x,short@example.com',
+            `${STREAM_PREFIX}s3,s3@example.com`,
+            `${STREAM_PREFIX}s4,s4@example.com`,
+        ].join('\n');
+
+        const progress: IngestProgress[] = [];
+        const result = await ingestRows(readCsvRows(csvStream(csv)), {
+            entityType: 'clients',
+            companyId,
+            batchSize: 2,
+            onProgress: p => { progress.push(p); },
+        });
+
+        expect(progress.map(p => p.rowsProcessed)).toEqual([2, 4, 5]);
+        // Row 4 fails validation (name too short) and is not imported
+        expect(result).toMatchObject({ rowsProcessed: 5, created: 4, errorCount: 1, warningCount: 1 });
+        expect(result.errors[0].row).toBe(4);
+    });
+});
@@ -0,0 +1,112 @@
+import { test, expect } from '@playwright/test';
+import { prisma } from '../../src/lib/prisma';
+import {
+    parsePageParams,
+    pageWhere,
+    pageOrder,
+    pageSelect,
+    takePage,
+    projectFields,
+    encodeCursor,
+    decodeCursor,
+    MAX_PAGE_LIMIT,
+    PageParams,
+} from '../../src/lib/pagination';
+
+/**
+ * Keyset Pagination Tests
+ * Walking every page must return each row exactly once, in (createdAt, id) order.
+ */
+
+function params(query: string, orderField?: string): PageParams {
+    const page = parsePageParams(new URLSearchParams(query), { orderField });
+    if ('error' in page) throw new Error(page.error);
+    return page;
+}
+
+test.describe('Keyset Pagination', () => {
+    test.afterAll(async () => {
+        await prisma.$disconnect();
+    });
+
+    test('cursor round-trips and rejects garbage', () => {
+        const row = { createdAt: new Date('2025-01-02T03:04:05.678Z'), id: 'abc' };
+        expect(decodeCursor(encodeCursor(row))).toEqual(row);
+        expect(decodeCursor('not-a-cursor')).toBeNull();
+        expect(parsePageParams(new URLSearchParams('cursor=not-a-cursor'))).toEqual({ error: 'Invalid cursor' });
+    });
+
+    test('limit is capped and paging is opt-in', () => {
+        expect(params(`limit=${MAX_PAGE_LIMIT * 10}`).limit).toBe(MAX_PAGE_LIMIT);
+        expect(params('').paginated).toBe(false);
+        expect(params('limit=10').paginated).toBe(true);
+    });
+
+    test('fields projection keeps id and requested keys', () => {
+        const items = [{ id: '1', name: 'a', email: 'x', phone: 'y' }];
+        expect(projectFields(items, ['name'])).toEqual([{ id: '1', name: 'a' }]);
+        expect(projectFields(items, null)).toBe(items);
+    });
+
+    test('fields select keeps the keyset columns and drops unknown names', () => {
+        expect(pageSelect(params('fields=entryNumber,lines,bogus', 'entryDate'), ['entryNumber'], { lines: { select: { id: true } } }))
+            .toEqual({ id: true, entryDate: true, entryNumber: true, lines: { select: { id: true } } });
+        expect(pageSelect(params(''), ['entryNumber'])).toBeNull();
+    });
+
+    test('walking journal pages by entry date returns every row once', async () => {
+        const entry = await prisma.journalEntry.findFirst({ select: { companyId: true } });
+        test.skip(!entry, 'Requires a seeded database');
+        const where = { companyId: entry!.companyId };
+
+        const seen: string[] = [];
+        let query = 'limit=7';
+        for (let guard = 0; guard < 1000; guard++) {
+            const page = params(query, 'entryDate');
+            const rows = await prisma.journalEntry.findMany({
+                where: pageWhere(page, where),
+                select: { id: true, entryDate: true },
+                ...pageOrder(page, { entryDate: 'desc' as const }),
+            });
+            const { items, nextCursor } = takePage(rows, page);
+            seen.push(...items.map(i => i.id));
+            if (!nextCursor) break;
+            query = `limit=7&cursor=${nextCursor}`;
+        }
+
+        const all = await prisma.journalEntry.findMany({
+            where,
+            select: { id: true },
+            orderBy: [{ entryDate: 'desc' }, { id: 'desc' }],
+        });
+        expect(seen).toEqual(all.map(i => i.id));
+    });
+
+    test('walking invoice pages returns every row once', async () => {
+        const invoice = await prisma.invoice.findFirst({ select: { companyId: true } });
+        test.skip(!invoice, 'Requires a seeded database');
+        const where = { companyId: invoice!.companyId };
+
+        const seen: string[] = [];
+        let query = 'limit=17';
+        for (let guard = 0; guard < 1000; guard++) {
+            const page = params(query);
+            const rows = await prisma.invoice.findMany({
+                where: pageWhere(page, where),
+                select: { id: true, createdAt: true },
+                ...pageOrder(page, { createdAt: 'desc' as const }),
+            });
+            const { items, nextCursor } = takePage(rows, page);
+            seen.push(...items.map(i => i.id));
+            if (!nextCursor) break;
+            query = `limit=17&cursor=${nextCursor}`;
+        }
+
+        const all = await prisma.invoice.findMany({
+            where,
+            select: { id: true },
+            orderBy: [{ createdAt: 'desc' }, { id: 'desc' }],
+        });
+        expect(seen).toEqual(all.map(i => i.id));
+    });
+});
@@ -0,0 +1,131 @@
+import { test, expect } from '@playwright/test';
+import { prisma } from '../../src/lib/prisma';
+import { applyStockMovements, verifyProductCostLayers } from '../../src/lib/accounting/cost-layers';
+import { checkoutSale, CheckoutError } from '../../src/lib/pos-checkout';
+import { createTestCompany } from '../fixtures';
+
+/**
+ * POS Checkout Tests
+ * A basket commits stock, movements, cost layers and its journal entry
+ * together, costs goods at the layers they were issued from (units sold
+ * short at the cost price), and a 10-line basket checks out in under 20ms.
+ */
+
+test.describe('POS Checkout', () => {
+    test.describe.configure({ mode: 'serial' });
+
+    let fixture: Awaited<ReturnType<typeof createTestCompany>>;
+    let companyId: string;
+    let cashierId: string;
+    let products: { id: string; costPrice: number }[] = [];
+    const prefix = 'POS-CHECKOUT-';
+
+    test.beforeAll(async () => {
+        fixture = await createTestCompany('pos-checkout');
+        companyId = fixture.companyId;
+        cashierId = fixture.userId;
+
+        products = await prisma.product.createManyAndReturn({
+            data: Array.from({ length: 10 }, (_, i) => ({
+                companyId,
+                sku: `${prefix}${i}`,
+                name: `Checkout test ${i}`,
+                costPrice: 5 + i,
+                sellingPrice: 20 + i,
+                stockQuantity: 100,
+                lowStockAlert: 10,
+            })),
+            select: { id: true, costPrice: true },
+        });
+        await prisma.$transaction(async (tx) => {
+            const receipts = await tx.stockMovement.createManyAndReturn({
+                data: products.map(p => ({
+                    companyId,
+                    productId: p.id,
+                    type: 'PURCHASE',
+                    quantity: 100,
+                    unitCost: p.costPrice,
+                    balanceAfter: 100,
+                })),
+            });
+            await applyStockMovements(tx, receipts);
+        });
+    });
+
+    test.afterAll(async () => {
+        await fixture?.cleanup();
+        await prisma.$disconnect();
+    });
+
+    test('commits stock, movements, layers and a balanced GL entry', async () => {
+        const sale = await checkoutSale(companyId, cashierId, {
+            items: products.slice(0, 3).map(p => ({ productId: p.id, quantity: 2 })),
+            paymentMethod: 'CASH',
+            discountAmount: 5,
+        });
+
+        expect(sale.items).toHaveLength(3);
+        expect(sale.total).toBeCloseTo(sale.subtotal + sale.taxAmount - 5, 2);
+
+        const stock = await prisma.product.findMany({ where: { id: { in: products.slice(0, 3).map(p => p.id) } } });
+        stock.forEach(p => expect(p.stockQuantity).toBe(98));
+
+        const movements = await prisma.stockMovement.findMany({ where: { reference: sale.saleNumber, type: 'SALE' } });
+        expect(movements).toHaveLength(3);
+        for (const p of products.slice(0, 3)) {
+            expect(await verifyProductCostLayers(p.id)).toEqual([]);
+        }
+
+        if (sale.isPostedToGL) {
+            const entry = await prisma.journalEntry.findUniqueOrThrow({ where: { id: sale.journalEntryId! }, include: { lines: true } });
+            expect(entry.totalDebit).toBeCloseTo(entry.totalCredit, 2);
+            // Cost of goods at the layers' unit costs, not an estimate
+            const cogs = products.slice(0, 3).reduce((sum, p) => sum + 2 * p.costPrice, 0);
+            expect(entry.lines.some(l => l.description === 'Cost of Goods Sold' && Math.abs(l.debit - cogs) < 0.01)).toBeTruthy();
+        }
+    });
+
+    test('units sold beyond the layers are costed at the cost price', async () => {
+        const product = await prisma.product.create({
+            data: { companyId, sku: `${prefix}short`, name: 'Checkout short', costPrice: 6, sellingPrice: 20, stockQuantity: 3 },
+        });
+        await prisma.$transaction(async (tx) => {
+            const receipt = await tx.stockMovement.create({
+                data: { companyId, productId: product.id, type: 'PURCHASE', quantity: 3, unitCost: 4, balanceAfter: 3 },
+            });
+            await applyStockMovements(tx, [receipt]);
+        });
+
+        const sale = await checkoutSale(companyId, cashierId, { items: [{ productId: product.id, quantity: 5 }], paymentMethod: 'CASH' });
+
+        // Three units from the layer at 4, two short at the cost price of 6
+        const recorded = await prisma.pOSSale.findUniqueOrThrow({ where: { id: sale.id } });
+        expect(recorded.costOfGoods).toBeCloseTo(3 * 4 + 2 * 6, 2);
+    });
+
+    test('rejects unknown products without selling anything', async () => {
+        const before = await prisma.product.findUniqueOrThrow({ where: { id: products[0].id } });
+
+        await expect(checkoutSale(companyId, cashierId, {
+            items: [{ productId: products[0].id, quantity: 1 }, { productId: 'missing-product', quantity: 1 }],
+            paymentMethod: 'CASH',
+        })).rejects.toBeInstanceOf(CheckoutError);
+
+        const after = await prisma.product.findUniqueOrThrow({ where: { id: products[0].id } });
+        expect(after.stockQuantity).toBe(before.stockQuantity);
+    });
+
+    test('a 10-line basket checks out in under 20ms', async () => {
+        const basket = products.map(p => ({ productId: p.id, quantity: 1 }));
+        const durations: number[] = [];
+        for (let i = 0; i < 25; i++) {
+            const started = performance.now();
+            await checkoutSale(companyId, cashierId, { items: basket, paymentMethod: 'CASH' });
+            durations.push(performance.now() - started);
+        }
+
+        // Median after warm-up (connection pool, caches)
+        const sorted = durations.slice(5).sort((a, b) => a - b);
+        expect(sorted[Math.floor(sorted.length / 2)]).toBeLessThan(20);
+    });
+});
@@ -0,0 +1,84 @@
+import { test, expect } from '@playwright/test';
+import { prisma } from '../../src/lib/prisma';
+import { checkoutSale } from '../../src/lib/pos-checkout';
+import { getSalesReport, hourStart, posSaleBuckets, rebuildSalesBuckets } from '../../src/lib/pos-sales-buckets';
+import { createTestCompany } from '../fixtures';
+
+/**
+ * POS Sales Bucket Tests
+ * Posted sales land in their hour's total, terminal, cashier, product and
+ * tender buckets, the report reads ranges from them, and a dry-run rebuild
+ * from the raw sales finds no drift.
+ */
+
+test.describe('POS Sales Buckets', () => {
+    test.describe.configure({ mode: 'serial' });
+
+    let fixture: Awaited<ReturnType<typeof createTestCompany>>;
+    let companyId: string;
+    let cashierId: string;
+    let productId: string;
+    const sales: Awaited<ReturnType<typeof checkoutSale>>[] = [];
+
+    test.beforeAll(async () => {
+        fixture = await createTestCompany('pos-buckets');
+        companyId = fixture.companyId;
+        cashierId = fixture.userId;
+
+        const product = await prisma.product.create({
+            data: { companyId, sku: 'POS-BUCKETS-0', name: 'Bucket test', costPrice: 2, sellingPrice: 10, stockQuantity: 50 },
+        });
+        productId = product.id;
+    });
+
+    test.afterAll(async () => {
+        await fixture?.cleanup();
+        await prisma.$disconnect();
+    });
+
+    test('only completed sales contribute', () => {
+        const sale = {
+            status: 'COMPLETED', saleDate: new Date(), total: 22, taxAmount: 2, paymentMethod: 'CASH', terminalId: null, cashierId: 'c1',
+            items: [{ productId: 'p1', quantity: 2, total: 20 }],
+        };
+        expect(posSaleBuckets(sale).map(b => b.dimension)).toEqual(['TOTAL', 'TERMINAL', 'CASHIER', 'PAYMENT', 'PRODUCT']);
+        expect(posSaleBuckets({ ...sale, status: 'REFUNDED' })).toEqual([]);
+    });
+
+    test('posted sales fill the buckets the report reads', async () => {
+        for (const [paymentMethod, quantity] of [['CASH', 2], ['CARD', 3]] as const) {
+            sales.push(await checkoutSale(companyId, cashierId, { items: [{ productId: productId, quantity }], paymentMethod }));
+        }
+
+        const hour = hourStart(sales[0].saleDate);
+        const [cashierBucket, productBucket] = await Promise.all([
+            prisma.pOSSalesBucket.findMany({ where: { companyId, dimension: 'CASHIER', key: cashierId } }),
+            prisma.pOSSalesBucket.findMany({ where: { companyId, dimension: 'PRODUCT', key: productId } }),
+        ]);
+        const expectedTotal = sales.reduce((sum, sale) => sum + sale.total, 0);
+        if (hourStart(sales[1].saleDate).getTime() === hour.getTime()) {
+            expect(cashierBucket).toHaveLength(1);
+            expect(cashierBucket[0].salesCount).toBe(2);
+            expect(cashierBucket[0].amount).toBeCloseTo(expectedTotal, 2);
+            expect(productBucket[0].quantity).toBe(5);
+        }
+
+        const today = new Date();
+        today.setHours(0, 0, 0, 0);
+        const report = await getSalesReport(companyId, {
+            from: today,
+            to: new Date(today.getFullYear(), today.getMonth(), today.getDate() + 1),
+            granularity: 'hour',
+        });
+        expect(report.series).toHaveLength(24);
+        const cashier = report.cashiers.find(c => c.cashierId === cashierId);
+        expect(cashier).toMatchObject({ name: 'pos-buckets user', transactions: 2 });
+        expect(cashier!.sales).toBeCloseTo(expectedTotal, 2);
+        expect(report.series.reduce((sum, point) => sum + point.sales, 0)).toBeCloseTo(report.totalSales, 1);
+    });
+
+    test('a dry-run rebuild finds the buckets in line with the sales', async () => {
+        const { drift } = await rebuildSalesBuckets(companyId, { dryRun: true });
+        expect(drift).toEqual([]);
+    });
+});
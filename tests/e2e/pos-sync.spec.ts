@@ -0,0 +1,65 @@
+import { test, expect } from '@playwright/test';
+import { prisma } from '../../src/lib/prisma';
+import { syncSales } from '../../src/lib/pos-sync';
+import { createTestCompany } from '../fixtures';
+
+/**
+ * POS Offline Sync Tests
+ * A queued upload records each sale once: keys already recorded or repeated
+ * in the upload come back as duplicates, bad sales fail on their own, and
+ * uploading the same queue again changes nothing.
+ */
+
+test.describe('POS Offline Sync', () => {
+    let fixture: Awaited<ReturnType<typeof createTestCompany>>;
+    let companyId: string;
+    let cashierId: string;
+    let productId: string;
+    const prefix = `POS-SYNC-${Date.now()}-`;
+
+    test.beforeAll(async () => {
+        fixture = await createTestCompany('pos-sync');
+        companyId = fixture.companyId;
+        cashierId = fixture.userId;
+
+        const product = await prisma.product.create({
+            data: { companyId, sku: `${prefix}0`, name: 'Sync test', costPrice: 3, sellingPrice: 8, stockQuantity: 50 },
+        });
+        productId = product.id;
+    });
+
+    test.afterAll(async () => {
+        await fixture?.cleanup();
+        await prisma.$disconnect();
+    });
+
+    test('records each queued sale once and reports every one', async () => {
+        const ringUp = (n: number, minutesAgo: number) => ({
+            idempotencyKey: `${prefix}sale-${n}`,
+            saleDate: new Date(Date.now() - minutesAgo * 60000).toISOString(),
+            items: [{ productId: productId, quantity: 2 }],
+            paymentMethod: 'CASH',
+        });
+        const queue = [
+            ringUp(1, 30),
+            ringUp(2, 20),
+            ringUp(1, 30),
+            { ...ringUp(3, 10), items: [{ productId: 'missing-product', quantity: 1 }] },
+        ];
+
+        const report = await syncSales(companyId, cashierId, queue);
+
+        expect(report.results.map(r => r.status)).toEqual(['created', 'created', 'duplicate', 'failed']);
+        expect(report).toMatchObject({ created: 2, duplicates: 1, failed: 1 });
+        expect((await prisma.product.findUniqueOrThrow({ where: { id: productId } })).stockQuantity).toBe(46);
+
+        // Movements keep the order the sales were rung up in
+        const movements = await prisma.stockMovement.findMany({ where: { productId: productId, type: 'SALE' }, orderBy: { date: 'asc' } });
+        expect(movements.map(m => m.balanceAfter)).toEqual([48, 46]);
+
+        // Uploading the same queue again records nothing new
+        const again = await syncSales(companyId, cashierId, queue.slice(0, 2));
+        expect(again.results.map(r => r.status)).toEqual(['duplicate', 'duplicate']);
+        expect((await prisma.product.findUniqueOrThrow({ where: { id: productId } })).stockQuantity).toBe(46);
+    });
+});
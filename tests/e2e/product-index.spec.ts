@@ -0,0 +1,78 @@
+import { test, expect } from '@playwright/test';
+import { prisma } from '../../src/lib/prisma';
+import {
+    applyStockSnapshot,
+    clearProductIndexes,
+    getCatalogDelta,
+    lookupProductCode,
+    markProductsChanged,
+} from '../../src/lib/product-index';
+
+/**
+ * Product Index Tests
+ * Scans resolve by barcode or SKU from memory, a change marked by a write
+ * path shows up on the next lookup, stock patches apply in place, and the
+ * terminal catalog downloads in full or as a delta.
+ */
+
+test.describe('Product Index', () => {
+    let companyId: string;
+    let productId: string;
+    const prefix = `PRODUCT-INDEX-${Date.now()}-`;
+
+    test.beforeAll(async () => {
+        const membership = await prisma.companyMembership.findFirst({ select: { companyId: true } });
+        test.skip(!membership, 'Requires a seeded database');
+        companyId = membership!.companyId;
+
+        const product = await prisma.product.create({
+            data: { companyId, sku: `${prefix}0`, barcode: `${prefix}BC`, name: 'Index test', costPrice: 4, sellingPrice: 9, stockQuantity: 20 },
+        });
+        productId = product.id;
+        clearProductIndexes();
+    });
+
+    test.afterAll(async () => {
+        if (companyId) await prisma.product.deleteMany({ where: { companyId, sku: { startsWith: prefix } } });
+        clearProductIndexes();
+        await prisma.$disconnect();
+    });
+
+    test('looks up a product by barcode or SKU', async () => {
+        const byBarcode = await lookupProductCode(companyId, `${prefix}BC`);
+        expect(byBarcode).toMatchObject({ id: productId, sellingPrice: 9, costPrice: 4, stockQuantity: 20 });
+        expect((await lookupProductCode(companyId, `${prefix}0`))?.id).toBe(productId);
+        expect(await lookupProductCode(companyId, `${prefix}missing`)).toBeNull();
+    });
+
+    test('picks up changes once a write path marks them', async () => {
+        await lookupProductCode(companyId, `${prefix}BC`);
+        await prisma.product.update({ where: { id: productId }, data: { sellingPrice: 11, barcode: `${prefix}BC2` } });
+        markProductsChanged(companyId);
+
+        expect((await lookupProductCode(companyId, `${prefix}BC2`))?.sellingPrice).toBe(11);
+        expect(await lookupProductCode(companyId, `${prefix}BC`)).toBeNull();
+    });
+
+    test('patches stock in place from a snapshot', async () => {
+        const before = await lookupProductCode(companyId, `${prefix}0`);
+        applyStockSnapshot(companyId, [{ id: productId, stockQuantity: 7, updatedAt: new Date(before!.updatedAt + 1) }]);
+        expect((await lookupProductCode(companyId, `${prefix}0`))?.stockQuantity).toBe(7);
+
+        // An older snapshot does not overwrite a newer one
+        applyStockSnapshot(companyId, [{ id: productId, stockQuantity: 3, updatedAt: new Date(before!.updatedAt - 1) }]);
+        expect((await lookupProductCode(companyId, `${prefix}0`))?.stockQuantity).toBe(7);
+    });
+
+    test('downloads the catalog in full or as a delta', async () => {
+        const full = await getCatalogDelta(companyId);
+        expect(full.full).toBe(true);
+        const idColumn = full.fields.indexOf('id');
+        expect(full.products.some(row => row[idColumn] === productId)).toBeTruthy();
+
+        // Nothing that changed well before `since` is resent
+        const delta = await getCatalogDelta(companyId, full.syncedAt + 60 * 60 * 1000);
+        expect(delta.full).toBe(false);
+        expect(delta.products).toHaveLength(0);
+    });
+});
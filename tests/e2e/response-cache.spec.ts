@@ -0,0 +1,74 @@
+import { test, expect } from '@playwright/test';
+import {
+    MemoryLRUBackend,
+    withCompanyCache,
+    invalidateCompanyCache,
+    getCacheStats,
+} from '../../src/lib/response-cache';
+
+/**
+ * Response Cache Tests
+ * Entries are scoped per company and query, and a write to one company
+ * must not serve stale data or evict another company's entries.
+ */
+
+test.describe('Response Cache', () => {
+    test('serves a hit for the same company and params', async () => {
+        let computed = 0;
+        const compute = async () => ({ n: ++computed });
+
+        const first = await withCompanyCache('co-a', 'test_hit', { period: 'month' }, compute);
+        const second = await withCompanyCache('co-a', 'test_hit', { period: 'month' }, compute);
+
+        expect(first).toEqual({ value: { n: 1 }, hit: false });
+        expect(second).toEqual({ value: { n: 1 }, hit: true });
+    });
+
+    test('keys on company and normalized params', async () => {
+        let computed = 0;
+        const compute = async () => ++computed;
+
+        await withCompanyCache('co-a', 'test_keys', new URLSearchParams('a=1&b=2'), compute);
+        const reordered = await withCompanyCache('co-a', 'test_keys', new URLSearchParams('b=2&a=1'), compute);
+        const otherCompany = await withCompanyCache('co-b', 'test_keys', new URLSearchParams('a=1&b=2'), compute);
+
+        expect(reordered.hit).toBe(true);
+        expect(otherCompany.hit).toBe(false);
+        expect(computed).toBe(2);
+    });
+
+    test('invalidation only affects the written company', async () => {
+        const compute = async () => 'payload';
+
+        await withCompanyCache('co-c', 'test_invalidate', undefined, compute);
+        await withCompanyCache('co-d', 'test_invalidate', undefined, compute);
+        await invalidateCompanyCache('co-c');
+
+        expect((await withCompanyCache('co-c', 'test_invalidate', undefined, compute)).hit).toBe(false);
+        expect((await withCompanyCache('co-d', 'test_invalidate', undefined, compute)).hit).toBe(true);
+    });
+
+    test('counts hits and misses per scope', async () => {
+        const compute = async () => 1;
+
+        await withCompanyCache('co-e', 'test_stats', undefined, compute);
+        await withCompanyCache('co-e', 'test_stats', undefined, compute);
+        await withCompanyCache('co-e', 'test_stats', undefined, compute);
+
+        expect(getCacheStats().scopes['test_stats']).toEqual({ hits: 2, misses: 1 });
+    });
+
+    test('LRU backend evicts least recently used entries and expires by TTL', async () => {
+        const lru = new MemoryLRUBackend(2);
+        await lru.set('a', 1, 60_000);
+        await lru.set('b', 2, 60_000);
+        await lru.get('a');
+        await lru.set('c', 3, 60_000);
+
+        expect(await lru.get('a')).toBe(1);
+        expect(await lru.get('b')).toBeUndefined();
+
+        await lru.set('d', 4, -1);
+        expect(await lru.get('d')).toBeUndefined();
+    });
+});
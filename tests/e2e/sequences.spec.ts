@@ -0,0 +1,86 @@
+import { test, expect } from '@playwright/test';
+import { prisma } from '../../src/lib/prisma';
+import {
+    allocateSequence,
+    nextDocumentNumber,
+    SequenceBlockPool,
+    DocumentType,
+} from '../../src/lib/sequences';
+
+/**
+ * Document Sequence Stress Tests
+ * Concurrent allocations must never hand out the same number, whether
+ * numbers are taken one at a time or in pre-allocated blocks.
+ */
+
+// Not a real document type: no existing rows to seed from, cleaned up afterwards
+const STRESS_TYPE = 'STRESS_TEST' as DocumentType;
+const WRITERS = 200;
+
+test.describe('Document Sequences', () => {
+    let companyId: string;
+    // The real JOURNAL sequence before the test took a number, and the value it took
+    let journalBefore: number | null = null;
+    let journalTaken: number | null = null;
+
+    test.beforeAll(async () => {
+        const company = await prisma.company.findFirst({ select: { id: true } });
+        test.skip(!company, 'Requires a seeded database');
+        companyId = company!.id;
+        await prisma.documentSequence.deleteMany({ where: { companyId, docType: STRESS_TYPE } });
+    });
+
+    test.afterAll(async () => {
+        await prisma.documentSequence.deleteMany({ where: { companyId, docType: STRESS_TYPE } });
+        if (journalTaken !== null) {
+            // Hand the number back unless something else has allocated since
+            const where = { companyId, docType: 'JOURNAL', lastValue: journalTaken };
+            if (journalBefore === null) {
+                await prisma.documentSequence.deleteMany({ where });
+            } else {
+                await prisma.documentSequence.updateMany({ where, data: { lastValue: journalBefore } });
+            }
+        }
+        await prisma.$disconnect();
+    });
+
+    test('concurrent single allocations are unique and gap-free', async () => {
+        const values = await Promise.all(
+            Array.from({ length: WRITERS }, () => allocateSequence(companyId, STRESS_TYPE))
+        );
+
+        expect(new Set(values).size).toBe(WRITERS);
+        const sorted = [...values].sort((a, b) => a - b);
+        expect(sorted[sorted.length - 1] - sorted[0]).toBe(WRITERS - 1);
+    });
+
+    test('concurrent block allocations do not overlap', async () => {
+        const blockSize = 25;
+        const starts = await Promise.all(
+            Array.from({ length: 20 }, () => allocateSequence(companyId, STRESS_TYPE, blockSize))
+        );
+
+        const covered = new Set<number>();
+        starts.forEach(start => {
+            for (let v = start; v < start + blockSize; v++) covered.add(v);
+        });
+        expect(covered.size).toBe(starts.length * blockSize);
+    });
+
+    test('block pool hands out unique numbers under concurrency', async () => {
+        const pool = new SequenceBlockPool(STRESS_TYPE, 16);
+        const numbers = await Promise.all(Array.from({ length: WRITERS }, () => pool.next(companyId)));
+
+        expect(new Set(numbers).size).toBe(WRITERS);
+    });
+
+    test('first journal number continues after existing entries', async () => {
+        const entries = await prisma.journalEntry.findMany({ where: { companyId }, select: { journalNumber: true } });
+        const sequence = { companyId_docType: { companyId, docType: 'JOURNAL' } };
+        journalBefore = (await prisma.documentSequence.findUnique({ where: sequence }))?.lastValue ?? null;
+        const number = await nextDocumentNumber(companyId, 'JOURNAL');
+        journalTaken = (await prisma.documentSequence.findUniqueOrThrow({ where: sequence })).lastValue;
+
+        expect(entries.map(e => e.journalNumber)).not.toContain(number);
+    });
+});
@@ -0,0 +1,69 @@
+import { test, expect } from '@playwright/test';
+import { prisma } from '../../src/lib/prisma';
+import { checkoutSale } from '../../src/lib/pos-checkout';
+import { getShiftSummary, summarizeShiftSales } from '../../src/lib/shift-summary';
+import { createTestCompany } from '../fixtures';
+
+/**
+ * Shift Summary Tests
+ * Sales posted during a tracked shift keep its per-tender running totals,
+ * which match the grouped query over the sales and give the close its
+ * expected cash without rescanning. A shift closes once, and sales after the
+ * close leave its totals alone.
+ */
+
+test.describe('Shift Summary', () => {
+    let fixture: Awaited<ReturnType<typeof createTestCompany>>;
+    let companyId: string;
+    let cashierId: string;
+    let productId: string;
+    let shiftId: string;
+
+    test.beforeAll(async () => {
+        fixture = await createTestCompany('shift-summary');
+        companyId = fixture.companyId;
+        cashierId = fixture.userId;
+
+        const product = await prisma.product.create({
+            data: { companyId, sku: 'SHIFT-SUMMARY-0', name: 'Shift test', costPrice: 2, sellingPrice: 10, taxRate: 0.1, stockQuantity: 50 },
+        });
+        productId = product.id;
+        const shift = await prisma.cashierShift.create({
+            data: { companyId, cashierId, startTime: new Date(Date.now() - 1000), openingCash: 100, totalsTracked: true },
+        });
+        shiftId = shift.id;
+    });
+
+    test.afterAll(async () => {
+        await fixture?.cleanup();
+        await prisma.$disconnect();
+    });
+
+    test('running totals match the grouped query', async () => {
+        for (const [paymentMethod, quantity] of [['CASH', 2], ['CARD', 3], ['CASH', 1]] as const) {
+            await checkoutSale(companyId, cashierId, { items: [{ productId, quantity }], paymentMethod });
+        }
+
+        const shift = await prisma.cashierShift.findUniqueOrThrow({ where: { id: shiftId } });
+        const summary = await getShiftSummary(shift);
+        expect(summary).toMatchObject({ salesCount: 3, itemCount: 6, totalSales: 66, taxTotal: 6, cashSales: 33, expectedCash: 133 });
+        expect(summary.tenders.map(t => t.tender)).toEqual(['CARD', 'CASH']);
+
+        // Same figures from the sales themselves
+        const grouped = await getShiftSummary({ ...shift, totalsTracked: false });
+        expect(grouped).toMatchObject({ ...summary, tenders: expect.anything() });
+        const byTender = new Map((await summarizeShiftSales(shift)).map(t => [t.tender, t]));
+        summary.tenders.forEach(t => {
+            expect(byTender.get(t.tender)).toMatchObject({ salesCount: t.salesCount, itemCount: t.itemCount });
+            expect(byTender.get(t.tender)!.total).toBeCloseTo(t.total, 2);
+        });
+
+        // Only the first close claims the shift, and later sales stay out of its totals
+        const close = () => prisma.cashierShift.updateMany({ where: { id: shiftId, endTime: null }, data: { endTime: new Date() } });
+        expect((await close()).count).toBe(1);
+        expect((await close()).count).toBe(0);
+        await checkoutSale(companyId, cashierId, { items: [{ productId, quantity: 1 }], paymentMethod: 'CASH' });
+        const closed = await prisma.cashierShift.findUniqueOrThrow({ where: { id: shiftId } });
+        expect(await getShiftSummary(closed)).toMatchObject({ salesCount: 3, totalSales: 66 });
+    });
+});
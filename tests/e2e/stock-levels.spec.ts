@@ -0,0 +1,62 @@
+import { test, expect } from '@playwright/test';
+import { prisma } from '../../src/lib/prisma';
+import { evaluateStockLevels, getStockLevelCounts, rebuildStockLevels } from '../../src/lib/stock-alerts';
+
+/**
+ * Stock Level Counter Tests
+ * Evaluating only touched products must keep the per-company counters equal
+ * to a full recount and raise or resolve one alert per status change.
+ */
+
+test.describe('Stock Level Counters', () => {
+    let companyId: string;
+    let productId: string | undefined;
+
+    test.beforeAll(async () => {
+        const company = await prisma.company.findFirst({ select: { id: true } });
+        test.skip(!company, 'Requires a seeded database');
+        companyId = company!.id;
+        await rebuildStockLevels(companyId);
+    });
+
+    test.afterAll(async () => {
+        if (productId) {
+            await prisma.product.delete({ where: { id: productId } });
+            await rebuildStockLevels(companyId);
+        }
+        await prisma.$disconnect();
+    });
+
+    test('transitions move the counters and alerts', async () => {
+        const start = await getStockLevelCounts(companyId);
+        const product = await prisma.product.create({
+            data: { companyId, sku: `LEVELS-${Date.now()}`, name: 'Levels test', sellingPrice: 1, stockQuantity: 50, lowStockAlert: 10 },
+        });
+        productId = product.id;
+        const setStock = async (stockQuantity: number) => {
+            await prisma.product.update({ where: { id: product.id }, data: { stockQuantity } });
+            return evaluateStockLevels(companyId, [product.id]);
+        };
+
+        expect(await setStock(50)).toMatchObject({ changed: 1, raised: 0 });
+        expect(await getStockLevelCounts(companyId)).toEqual(start);
+
+        expect(await setStock(5)).toMatchObject({ changed: 1, raised: 1 });
+        expect(await getStockLevelCounts(companyId)).toEqual({ ...start, lowStockCount: start.lowStockCount + 1 });
+
+        // Still low: nothing to do
+        expect(await setStock(4)).toMatchObject({ changed: 0 });
+
+        expect(await setStock(0)).toMatchObject({ changed: 1, raised: 0 });
+        expect(await getStockLevelCounts(companyId)).toEqual({ ...start, outOfStockCount: start.outOfStockCount + 1 });
+
+        expect(await setStock(30)).toMatchObject({ changed: 1, resolved: 1 });
+        expect(await getStockLevelCounts(companyId)).toEqual(start);
+        expect(await prisma.stockAlert.count({ where: { productId: product.id, isResolved: false } })).toBe(0);
+
+        // The maintained counter agrees with a full recount
+        await setStock(2);
+        const maintained = await getStockLevelCounts(companyId);
+        expect(await rebuildStockLevels(companyId)).toEqual(maintained);
+    });
+});
@@ -0,0 +1,85 @@
+import { test, expect } from '@playwright/test';
+import { prisma } from '../../src/lib/prisma';
+import { applyStockTake } from '../../src/lib/stock-take';
+import { verifyProductCostLayers } from '../../src/lib/accounting/cost-layers';
+
+/**
+ * Stock Take Tests
+ * Counted lines become warehouse quantities, product totals, movements and
+ * alerts in bulk, and the variance report lists only lines that differ.
+ * Cost layers follow the counts and match a replay of each product's history.
+ */
+
+test.describe('Stock Take', () => {
+    let companyId: string;
+    let warehouseId: string;
+    const products: { id: string; sku: string }[] = [];
+
+    test.beforeAll(async () => {
+        const company = await prisma.company.findFirst({ select: { id: true } });
+        test.skip(!company, 'Requires a seeded database');
+        companyId = company!.id;
+
+        const stamp = Date.now();
+        warehouseId = (await prisma.warehouse.create({ data: { companyId, name: 'Stock take', code: `ST-${stamp}` } })).id;
+        for (let i = 0; i < 200; i++) {
+            const product = await prisma.product.create({
+                data: { companyId, sku: `TAKE-${stamp}-${i}`, name: `Take ${i}`, costPrice: 2, sellingPrice: 5, stockQuantity: 20, lowStockAlert: 5 },
+            });
+            products.push({ id: product.id, sku: product.sku });
+        }
+        await prisma.stock.createMany({ data: products.slice(0, 150).map(p => ({ productId: p.id, warehouseId, quantity: 20 })) });
+    });
+
+    test.afterAll(async () => {
+        if (products.length) await prisma.product.deleteMany({ where: { id: { in: products.map(p => p.id) } } });
+        if (warehouseId) await prisma.warehouse.delete({ where: { id: warehouseId } });
+        await prisma.$disconnect();
+    });
+
+    // Even products counted as on hand; odd ones short by 17; the last 50 have no Stock row yet
+    const lines = () => [
+        ...products.map((p, i) => ({ sku: p.sku, countedQuantity: i < 150 ? (i % 2 === 0 ? 20 : 3) : 8 })),
+        { sku: 'NO-SUCH-SKU', countedQuantity: 1 },
+    ];
+
+    test('dry run reports variances without writing', async () => {
+        const report = await applyStockTake(companyId, { warehouseId, lines: lines(), dryRun: true });
+
+        expect(report).toMatchObject({ lines: 201, matched: 200, unchanged: 75, unmatched: [{ line: 201, key: 'NO-SUCH-SKU' }] });
+        expect(report.variances).toHaveLength(125);
+        expect(report.totals).toEqual({ unitsOver: 400, unitsShort: 75 * 17, netUnits: 400 - 75 * 17, netValue: (400 - 75 * 17) * 2 });
+        expect(await prisma.stockMovement.count({ where: { warehouseId } })).toBe(0);
+    });
+
+    test('applying the count updates stock, movements and alerts', async () => {
+        const report = await applyStockTake(companyId, { warehouseId, lines: lines(), reference: 'COUNT-1' });
+        expect(report.variances).toHaveLength(125);
+
+        const stock = await prisma.stock.findMany({ where: { warehouseId } });
+        expect(stock).toHaveLength(200);
+        expect(stock.find(s => s.productId === products[1].id)!.quantity).toBe(3);
+        expect(stock.find(s => s.productId === products[199].id)!.quantity).toBe(8);
+
+        const short = await prisma.product.findUnique({ where: { id: products[1].id } });
+        expect(short!.stockQuantity).toBe(3);
+        expect(await prisma.stockMovement.count({ where: { warehouseId, reference: 'COUNT-1' } })).toBe(125);
+        expect(await prisma.stockAlert.count({ where: { productId: { in: products.map(p => p.id) }, isResolved: false } })).toBe(75);
+
+        // Counting again finds nothing to change
+        const recount = await applyStockTake(companyId, { warehouseId, lines: lines() });
+        expect(recount.variances).toHaveLength(0);
+        expect(recount.unchanged).toBe(200);
+
+        // A second count moves the existing layers in bulk: overages open layers, shortages consume them
+        const second = await applyStockTake(companyId, {
+            warehouseId,
+            lines: products.map((p, i) => ({ sku: p.sku, countedQuantity: i % 2 === 0 ? 25 : 1 })),
+            reference: 'COUNT-2',
+        });
+        expect(second.variances).toHaveLength(200);
+        for (const product of [products[0], products[1], products[150], products[199]]) {
+            expect(await verifyProductCostLayers(product.id)).toEqual([]);
+        }
+    });
+});
@@ -0,0 +1,74 @@
+import { test, expect } from '@playwright/test';
+import { prisma } from '../../src/lib/prisma';
+import { transferStock, InsufficientStockError } from '../../src/lib/stock-transfers';
+
+/**
+ * Stock Transfer Tests
+ * Transfers return exact balances, never overdraw the source, and batches
+ * of many lines move all-or-nothing.
+ */
+
+test.describe('Stock Transfers', () => {
+    let companyId: string;
+    let from: string;
+    let to: string;
+    const productIds: string[] = [];
+
+    test.beforeAll(async () => {
+        const company = await prisma.company.findFirst({ select: { id: true } });
+        test.skip(!company, 'Requires a seeded database');
+        companyId = company!.id;
+
+        const stamp = Date.now();
+        from = (await prisma.warehouse.create({ data: { companyId, name: 'Transfer source', code: `TS-${stamp}` } })).id;
+        to = (await prisma.warehouse.create({ data: { companyId, name: 'Transfer destination', code: `TD-${stamp}` } })).id;
+
+        for (let i = 0; i < 50; i++) {
+            const product = await prisma.product.create({
+                data: { companyId, sku: `TRANSFER-${stamp}-${i}`, name: `Transfer ${i}`, sellingPrice: 1 },
+            });
+            productIds.push(product.id);
+        }
+        await prisma.stock.createMany({ data: productIds.map(productId => ({ productId, warehouseId: from, quantity: 100 })) });
+    });
+
+    test.afterAll(async () => {
+        if (productIds.length) await prisma.product.deleteMany({ where: { id: { in: productIds } } });
+        if (from) await prisma.warehouse.deleteMany({ where: { id: { in: [from, to] } } });
+        await prisma.$disconnect();
+    });
+
+    test('single transfer returns exact balances on both sides', async () => {
+        const [line] = await transferStock(companyId, [{ fromWarehouseId: from, toWarehouseId: to, lines: [{ productId: productIds[0], quantity: 30 }] }]);
+        expect(line).toMatchObject({ quantity: 30, fromBalance: 70, toBalance: 30 });
+
+        const [again] = await transferStock(companyId, [{ fromWarehouseId: from, toWarehouseId: to, lines: [{ productId: productIds[0], quantity: 5 }] }]);
+        expect(again).toMatchObject({ fromBalance: 65, toBalance: 35 });
+
+        const movements = await prisma.stockMovement.findMany({ where: { productId: productIds[0], type: 'TRANSFER_IN' }, orderBy: { date: 'asc' } });
+        expect(movements.map(m => [m.balanceBefore, m.balanceAfter])).toEqual([[0, 30], [30, 35]]);
+    });
+
+    test('concurrent transfers never overdraw the source', async () => {
+        const attempt = () => transferStock(companyId, [{ fromWarehouseId: from, toWarehouseId: to, lines: [{ productId: productIds[1], quantity: 40 }] }])
+            .then(() => true, () => false);
+        const results = await Promise.all([attempt(), attempt(), attempt()]);
+
+        expect(results.filter(Boolean)).toHaveLength(2);
+        const source = await prisma.stock.findUnique({ where: { productId_warehouseId: { productId: productIds[1], warehouseId: from } } });
+        expect(source!.quantity).toBe(20);
+    });
+
+    test('a short line rolls back the whole batch', async () => {
+        const lines = productIds.slice(2).map((productId, i) => ({ productId, quantity: i === 10 ? 500 : 10 }));
+
+        const error = await transferStock(companyId, [{ fromWarehouseId: from, toWarehouseId: to, lines }]).catch(e => e);
+        expect(error).toBeInstanceOf(InsufficientStockError);
+        expect(error.shortages).toEqual([{ productId: productIds[12], warehouseId: from, requested: 500, available: 100 }]);
+        expect(await prisma.stock.count({ where: { warehouseId: to, productId: { in: productIds.slice(2) } } })).toBe(0);
+
+        const moved = await transferStock(companyId, [{ fromWarehouseId: from, toWarehouseId: to, lines: lines.map(l => ({ ...l, quantity: 10 })) }]);
+        expect(moved).toHaveLength(48);
+        expect(moved.every(l => l.fromBalance === 90 && l.toBalance === 10)).toBe(true);
+    });
+});
@@ -0,0 +1,113 @@
+import { test, expect } from '@playwright/test';
+import { prisma } from '../../src/lib/prisma';
+import { calculateFIFO, calculateWeightedAverage } from '../../src/lib/accounting/inventory-valuation';
+import { computeStockValuation, getStockValuation, isClosedPeriodEnd } from '../../src/lib/accounting/stock-valuation';
+
+/**
+ * Stock Valuation Report Tests
+ * The chunked pass must match the per-product valuation functions, honour
+ * as-of dates, value stock its movements do not cover at cost price, and
+ * reuse closed-period snapshots until history changes.
+ */
+
+test.describe('Stock Valuation Report', () => {
+    test.describe.configure({ mode: 'serial' });
+
+    let companyId: string;
+    let productId: string | undefined;
+    let unbackedProductId: string | undefined;
+
+    const receipts = [
+        { date: new Date(2024, 0, 10), type: 'IN' as const, quantity: 10, unitCost: 4 },
+        { date: new Date(2024, 0, 20), type: 'IN' as const, quantity: 10, unitCost: 6 },
+        { date: new Date(2024, 1, 5), type: 'OUT' as const, quantity: 12, unitCost: 0 },
+        { date: new Date(2024, 2, 1), type: 'IN' as const, quantity: 5, unitCost: 8 },
+    ];
+
+    test.beforeAll(async () => {
+        const company = await prisma.company.findFirst({ select: { id: true } });
+        test.skip(!company, 'Requires a seeded database');
+        companyId = company!.id;
+
+        const product = await prisma.product.create({
+            data: { companyId, sku: `VALUATION-${Date.now()}`, name: 'Valuation test', costPrice: 8, sellingPrice: 5 },
+        });
+        productId = product.id;
+        await prisma.stockMovement.createMany({
+            data: receipts.map(m => ({
+                companyId,
+                productId: product.id,
+                type: m.type === 'IN' ? 'PURCHASE' : 'SALE',
+                quantity: m.type === 'IN' ? m.quantity : -m.quantity,
+                unitCost: m.type === 'IN' ? m.unitCost : null,
+                date: m.date,
+            })),
+        });
+    });
+
+    test.afterAll(async () => {
+        if (unbackedProductId) await prisma.product.delete({ where: { id: unbackedProductId } });
+        if (productId) {
+            await prisma.product.delete({ where: { id: productId } });
+            await prisma.inventoryValuationSnapshot.deleteMany({ where: { companyId } });
+        }
+        await prisma.$disconnect();
+    });
+
+    test('chunked pass matches the valuation functions', async () => {
+        const report = await computeStockValuation(companyId, { chunkSize: 3 });
+        const row = report.products.find(p => p.productId === productId)!;
+
+        expect(row.quantity).toBe(13);
+        expect(row.fifoValue).toBeCloseTo(calculateFIFO(receipts).endingInventory, 2);
+        expect(row.averageValue).toBeCloseTo(calculateWeightedAverage(receipts).endingInventory, 2);
+        // Selling below cost triggers an NRV write-down to 13 x 5
+        expect(row.nrv).toBe(65);
+        expect(row.fifoWriteDown).toBeCloseTo(row.fifoValue - 65, 2);
+
+        const unchunked = await computeStockValuation(companyId);
+        expect(unchunked.totals).toEqual(report.totals);
+    });
+
+    test('as-of date excludes later movements', async () => {
+        const report = await computeStockValuation(companyId, { asOf: new Date(2024, 0, 31, 23, 59, 59) });
+        const row = report.products.find(p => p.productId === productId)!;
+
+        expect(row.quantity).toBe(20);
+        expect(row.fifoValue).toBe(100);
+    });
+
+    test('stock beyond the movements opens at cost price in current reports', async () => {
+        // 15 on the card, only 10 received through movements
+        const product = await prisma.product.create({
+            data: { companyId, sku: `VALUATION-UNBACKED-${Date.now()}`, name: 'Valuation unbacked test', costPrice: 3, sellingPrice: 10, stockQuantity: 15 },
+        });
+        unbackedProductId = product.id;
+        await prisma.stockMovement.create({
+            data: { companyId, productId: product.id, type: 'PURCHASE', quantity: 10, unitCost: 4, date: new Date(Date.now() - 86400000) },
+        });
+
+        const row = (await computeStockValuation(companyId)).products.find(p => p.productId === product.id)!;
+        expect(row).toMatchObject({ quantity: 15, unbacked: 5, fifoValue: 55 });
+
+        // A past date has no card balance to compare with
+        const past = await computeStockValuation(companyId, { asOf: new Date(Date.now() - 60000) });
+        expect(past.products.find(p => p.productId === product.id)).toMatchObject({ quantity: 10, fifoValue: 40 });
+    });
+
+    test('closed month ends are cached until a back-dated movement', async () => {
+        const asOf = new Date(2024, 1, 29);
+        expect(isClosedPeriodEnd(asOf)).toBe(true);
+        expect(isClosedPeriodEnd(new Date(2024, 1, 28))).toBe(false);
+
+        expect((await getStockValuation(companyId, { asOf })).cached).toBe(false);
+        expect((await getStockValuation(companyId, { asOf })).cached).toBe(true);
+
+        await prisma.stockMovement.create({
+            data: { companyId, productId: productId!, type: 'PURCHASE', quantity: 1, unitCost: 1, date: new Date(2024, 1, 10) },
+        });
+        const { report, cached } = await getStockValuation(companyId, { asOf });
+        expect(cached).toBe(false);
+        expect(report.products.find(p => p.productId === productId)!.quantity).toBe(9);
+    });
+});
@@ -1,4 +1,6 @@
 import { test as base, expect } from '@playwright/test';
+import { prisma } from '../src/lib/prisma';
+import { seedDefaultChartOfAccounts } from '../src/lib/gl/auto-post';
 
 // Extend base test with authentication
 export const test = base.extend<{ authenticatedPage: void }>({
@@ -39,3 +41,32 @@ export async function login(page: any, locale: string = 'en') {
     // After login, pages are at /{locale}/dashboard or /dashboard
     await page.waitForURL(new RegExp(`/${locale}/dashboard`), { timeout: 30000 });
 }
+
+/**
+ * A company of its own, with the default chart of accounts and one member,
+ * for specs that post to the ledger. Specs run in parallel, so each one
+ * writes only to its company and cleanup() deletes it by id instead of
+ * restoring shared balances.
+ */
+export async function createTestCompany(name: string) {
+    const stamp = `${name}-${Date.now()}-${Math.random().toString(36).slice(2, 8)}`.toLowerCase();
+    const user = await prisma.user.create({
+        data: { email: `${stamp}@example.com`, name: `${name} user`, password: '-' },
+    });
+    const company = await prisma.company.create({
+        data: { name: stamp, memberships: { create: { userId: user.id, role: 'ADMIN' } } },
+    });
+    await seedDefaultChartOfAccounts(company.id);
+
+    return {
+        companyId: company.id,
+        userId: user.id,
+        cleanup: async () => {
+            // Rows that block a cascade from the company go first
+            await prisma.journalEntry.deleteMany({ where: { companyId: company.id } });
+            await prisma.pOSSale.deleteMany({ where: { companyId: company.id } });
+            await prisma.company.delete({ where: { id: company.id } });
+            await prisma.user.delete({ where: { id: user.id } });
+        },
+    };
+}